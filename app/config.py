@@ -4,7 +4,7 @@
 import os
 import platform
 from pathlib import Path
-import psutil
+from utils.system_resources import available_cores, memory_usage
 
 class AppConfig:
     """应用程序配置类"""
@@ -15,8 +15,10 @@ class AppConfig:
     
     def load_default_config(self):
         """加载默认配置"""
-        # 获取系统内存信息，用于智能配置缓存大小
-        system_memory = psutil.virtual_memory().total // (1024 * 1024 * 1024)  # 内存大小（GB）
+        # 获取可用内存信息（容器中以cgroup限制为准），用于初步配置缓存大小，
+        # 启动时再由 app.performance_profile 按实测性能细化
+        system_memory = memory_usage()['total'] // (1024 * 1024 * 1024)  # 内存大小（GB）
+        cores = available_cores()
         
         # 根据系统内存大小配置缓存
         if system_memory < 4:  # 小于4GB内存的设备
@@ -28,6 +30,7 @@ class AppConfig:
         else:  # 8GB以上内存的设备
             cache_size = 100
             thread_pool_size = 4
+        thread_pool_size = min(thread_pool_size, cores)
         
         self._config = {
             'image_processing': {
@@ -42,6 +45,29 @@ class AppConfig:
                 'theme': 'dark_theme', # 默认主题，可以是 'dark_theme' 或 'light_theme'
                 'language': 'zh_CN'
             },
+            'save': {
+                'jpeg_quality': 95,  # JPEG质量 [0, 100]
+                'png_compression': 3,  # PNG压缩级别 [0, 9]，越高文件越小但编码越慢
+                'webp_quality': 90,  # WebP质量 [1, 100]
+            },
+            'stitching': {
+                'feature_max_pixels': 1000000,  # 检测特征时图像的最大像素数，超过时在缩小的副本上检测
+                'match_ratio': 0.75,  # 特征匹配比值检验的阈值
+                'min_matches': 10,  # 两幅图像之间至少需要的RANSAC内点数
+                'max_canvas_pixels': 200000000,  # 拼接结果的最大像素数，超过时视为匹配错误
+                'blend_bands': 5,  # 接缝多频段融合的频段数，0表示不融合
+            },
+            'collage': {
+                'padding': 10,  # 拼图中图像之间的默认间距（像素）
+                'auto_max_width': 3000,  # auto 布局水平排列时的最大总宽度，超过时垂直排列
+            },
+            'super_resolution': {
+                'model_path': '',  # ESRGAN等超分辨率模型（ONNX格式）的路径，为空时用双三次插值放大
+                'backend': 'auto',  # 推理后端：'auto'（优先onnxruntime）、'onnxruntime' 或 'opencv'
+                'scale': 2,  # 放大倍数，使用模型时必须与模型一致
+                'tile_size': 192,  # 送入模型的分块大小
+                'tile_overlap': 16,  # 相邻分块各自向外扩展的像素数，在重叠区域内羽化拼接
+            },
             'paths': {
                 'save_dir': str(Path.home() / 'Pictures' / 'ImagePro'),
                 'temp_dir': str(Path.home() / 'AppData' / 'Local' / 'Temp' / 'ImagePro')
@@ -49,12 +75,38 @@ class AppConfig:
             'performance': {
                 'thread_pool_size': thread_pool_size,
                 'cache_size': cache_size,  # 缓存最近处理的图像数量
-                'memory_check_interval': 60,  # 内存检查间隔时间（秒）
+                'adaptive_profile': True,  # 启动时按资源限制和实测性能调整下列性能配置（见 app/performance_profile.py）
+                'history_budget_mb': 0,  # 撤销历史的内存预算（MB），0表示只按cache_size限制数量
+                'memory_budget_mb': 0,  # 本进程的内存预算（MB），0表示以容器限制或物理内存为准
+                'memory_use_psi': True,  # 是否参考Linux PSI内存压力（/proc/pressure/memory）
+                'memory_psi_some_threshold': 10.0,  # PSI some avg10超过此值（%）时按警告处理
+                'memory_psi_full_threshold': 5.0,  # PSI full avg10超过此值（%）时按危急处理
                 'auto_gc_threshold': 80,  # 内存使用率超过此值时触发垃圾回收（百分比）
                 'lazy_loading': True,  # 是否使用延迟加载优化启动速度
                 'preview_quality': 'medium',  # 预览质量：low, medium, high
                 'image_downscale_threshold': 20,  # 超过此分辨率（百万像素）时自动缩小预览图像
                 'tile_size': 256,  # 图像处理时的分块大小
+                'analysis_min_pixels': 1000000,  # 直方图和自动增强统计量使用图像金字塔中不少于此像素数的最小一层
+                'denoise_preview_pixels': 1000000,  # 非局部均值去噪预览使用图像金字塔中不少于此像素数的最小一层
+                'tile_overlap': 16,  # 分块处理时相邻分块的重叠宽度（像素），应不小于滤波半径
+                'tile_cache_mb': 256,  # 大图像分块读取时已解码数据段的缓存上限（MB）
+                'recipe_cache_mb': 256,  # 编辑配方回放时中间结果的缓存上限（MB）
+                'process_pool_size': cores,  # 算子进程池的工作进程数
+                'parallel_min_pixels': 4000000,  # 像素数低于此值的图像不分块并行，直接执行
+                'opencv_threads': 0,  # OpenCV内部线程数，0表示使用全部可用核心
+                'opencv_optimized': True,  # 是否启用OpenCV的IPP/SIMD优化路径
+                'concurrency_mode': 'auto',  # 并行策略：auto（按任务选择）、internal（OpenCV内部多线程）、tiles（分块并行）
+                'job_history_size': 200,  # 保留的处理任务记录（耗时、核心利用率）数量
+                'profiling': True,  # 是否记录每次处理/预览各阶段的耗时
+                'profile_allocations': False,  # 是否用tracemalloc统计各阶段的内存分配（开销较大）
+                'profiler_history': 200,  # 保留的性能剖析记录数量
+                # 各算子的执行后端：inline（当前线程）、thread（线程池分块）、process（共享内存进程池分块）
+                'operator_backends': {
+                    'adjust_highlights': 'process',
+                    'adjust_shadows': 'process',
+                    'apply_usm_sharpen': 'process',
+                    'auto_white_balance': 'process',
+                },
             }
         }
         
@@ -122,18 +174,18 @@ class AppConfig:
                 self._config = json.load(f)
     
     def get_memory_usage(self):
-        """获取当前内存使用情况
+        """获取当前内存使用情况（容器中以cgroup限制为准）
         
         Returns:
             dict: 内存使用信息
         """
-        usage = psutil.virtual_memory()
+        usage = memory_usage()
         return {
-            'total': usage.total,
-            'available': usage.available,
-            'percent': usage.percent,
-            'used': usage.used,
-            'free': usage.free
+            'total': usage['total'],
+            'available': usage['available'],
+            'percent': usage['percent'],
+            'used': usage['used'],
+            'free': usage['available']
         }
     
     def is_low_memory(self):
@@ -3,23 +3,29 @@
 """
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QToolBar, QStatusBar, QFileDialog, QMessageBox,
-                             QLabel, QProgressBar, QDockWidget)
-from PySide6.QtCore import Qt, QSize, QTimer
+                             QLabel, QProgressBar, QDockWidget, QPushButton)
+from PySide6.QtCore import Qt, QSize
 from PySide6.QtGui import QAction, QActionGroup
 import os
-import gc
 
 from views.image_view import ImageView
 from models.image_model import ImageModel
 from controllers.image_controller import ImageController
 
 from utils.memory_monitor import memory_monitor
+from utils.process_pool import get_operator_pool
+from utils.profiler import profiler
 from app.config import config
 from views.inspector_panel import InspectorPanel
+from views.dialogs.collage_dialog import CollageDialog
+from models.edit_recipe import EditRecipe
 
 class MainWindow(QMainWindow):
     """主窗口类"""
     
+    # 预览请求名称与配方中操作名称不一致的映射
+    _PREVIEW_OPERATION_NAMES = {"rotate_preview": "rotate"}
+    
     def __init__(self):
         super().__init__()
         
@@ -28,6 +34,8 @@ class MainWindow(QMainWindow):
         self.resize(1024, 768)     #窗口大小
         
         # 创建模型、视图和控制器
+        self._last_preview_request = None  # 最近一次预览的 (操作名称, 参数)，应用预览时记入编辑配方
+        self._pending_operation = None  # 后台处理中的 (操作名称, 参数)，完成后记入编辑配方
         self.image_model = ImageModel() #图像模型，在模型中处理图像的加载、保存、撤销、重做等操作(modeels文件夹image_model.py)
         self.image_view = ImageView() #图像视图，在视图中显示图像(views文件夹image_view.py)
         self.image_controller = ImageController(self.image_model) #图像控制器，在控制器中处理图像的预览、亮度、对比度、模糊等操作(controllers文件夹image_controller.py)
@@ -63,42 +71,51 @@ class MainWindow(QMainWindow):
         # 初始化内存监控
         self._setup_memory_monitor()
         
-        # 启动内存状态更新计时器
-        self._start_memory_status_timer()
-        
         # 初始化主题菜单
         self._initialize_theme_menu_state()
     
     def _setup_memory_monitor(self):
         """设置内存监控器"""
-        # 注册模型和视图
+        # 注册模型和视图的内存池，以及算子工作进程池
         memory_monitor.register_image_model(self.image_model)
         memory_monitor.register_image_view(self.image_view)
+        operator_pool = get_operator_pool()
+        memory_monitor.register_pool('worker_pools', "工作进程池", operator_pool.memory_bytes,
+                                     operator_pool.release, rebuild_cost=4)
         
         # 连接内存监控信号
         memory_monitor.memory_warning.connect(self._on_memory_warning)
         memory_monitor.memory_critical.connect(self._on_memory_critical)
         memory_monitor.memory_status.connect(self._on_memory_status)
         
-        # 开始监控
-        memory_monitor.start_monitoring()
-    
-    def _start_memory_status_timer(self):
-        """启动内存状态更新计时器"""
-        self._memory_timer = QTimer(self)
-        self._memory_timer.timeout.connect(self._update_memory_status)
-        self._memory_timer.start(2000)  # 每2秒更新一次状态
+        # 内存检查由分配驱动，不再定时轮询；启动时显示一次当前状态
+        self._update_memory_status()
     
-    def _update_memory_status(self):
-        """更新内存状态显示"""
+    def _update_memory_status(self, memory_info=None):
+        """更新内存状态显示
+        
+        Args:
+            memory_info: 内存信息，为None时重新读取
+        """
         if hasattr(self, '_memory_label') and hasattr(self, '_memory_bar'):
-            memory_info = memory_monitor.get_memory_info()
+            if memory_info is None:
+                memory_info = memory_monitor.get_memory_info()
             used_memory = memory_info['used']
             total_memory = memory_info['total']
             percent = memory_info['percent']
             
-            # 更新内存标签
+            # 更新内存标签，悬停提示中列出各子系统的占用
             self._memory_label.setText(f"内存: {used_memory:.0f}MB/{total_memory:.0f}MB")
+            lines = [f"本进程: {memory_info['process']:.0f}MB"]
+            if memory_info['source'] != 'host':
+                lines.append("内存总量: " + ("容器限制" if memory_info['source'] == 'cgroup' else "内存预算"))
+            if memory_info['pressure'] is not None:
+                lines.append(f"内存压力(PSI): some {memory_info['pressure']['some']:.1f}% / "
+                             f"full {memory_info['pressure']['full']:.1f}%")
+            for pool in memory_info['pools']:
+                suffix = "" if pool['evictable'] else "（不可释放）"
+                lines.append(f"{pool['label']}: {pool['bytes'] / (1024 * 1024):.1f}MB{suffix}")
+            self._memory_label.setToolTip("\n".join(lines))
             
             # 更新内存条
             self._memory_bar.setValue(int(percent))
@@ -117,7 +134,7 @@ class MainWindow(QMainWindow):
         Args:
             percent: 内存使用百分比
         """
-        self.statusBar.showMessage(f"内存使用率较高: {percent:.1f}%，系统将自动优化内存使用", 5000)
+        self.statusBar.showMessage(f"内存使用率较高: {percent:.1f}%，已释放可重建的缓存", 5000)
     
     def _on_memory_critical(self, percent):
         """内存危急处理
@@ -125,9 +142,8 @@ class MainWindow(QMainWindow):
         Args:
             percent: 内存使用百分比
         """
-        self.statusBar.showMessage(f"内存使用率过高: {percent:.1f}%，正在强制清理内存...", 5000)
-        # 强制清理内存
-        QTimer.singleShot(100, self._force_cleanup_memory)
+        # 内存监控器已在分配前同步释放缓存并削减撤销历史
+        self.statusBar.showMessage(f"内存使用率过高: {percent:.1f}%，已释放缓存和较早的撤销历史", 5000)
     
     def _on_memory_status(self, memory_info):
         """内存状态处理
@@ -135,20 +151,15 @@ class MainWindow(QMainWindow):
         Args:
             memory_info: 内存信息
         """
-        # 可扩展为在日志中记录详细内存使用情况
-        pass
+        self._update_memory_status(memory_info)
     
     def _force_cleanup_memory(self):
-        """强制清理内存"""
-        # 清理图像处理缓存
-        self.image_model.clear_memory()
-        self.image_view.clear_cache()
-        
-        # 强制垃圾回收
-        gc.collect()
+        """强制清理内存：清空可重建的缓存，内存仍然紧张时才削减撤销历史"""
+        released = memory_monitor.force_cleanup()
+        freed = sum(size for _, size in released) / (1024 * 1024)
         
         # 更新状态
-        self.statusBar.showMessage("内存清理完成", 3000)
+        self.statusBar.showMessage(f"内存清理完成，释放 {freed:.1f}MB", 3000)
     
     def _create_actions(self):
         """创建动作"""
@@ -161,6 +172,22 @@ class MainWindow(QMainWindow):
         self.save_action.setShortcut("Ctrl+S")
         self.save_action.triggered.connect(self._on_save)
         
+        self.export_recipe_action = QAction("导出编辑配方...", self)
+        self.export_recipe_action.setToolTip("将当前编辑步骤保存为可回放的JSON配方")
+        self.export_recipe_action.triggered.connect(self._on_export_recipe)
+        
+        self.apply_recipe_action = QAction("应用编辑配方...", self)
+        self.apply_recipe_action.setToolTip("在原始图像上回放JSON配方")
+        self.apply_recipe_action.triggered.connect(self._on_apply_recipe)
+        
+        self.stitch_action = QAction("拼接全景图...", self)
+        self.stitch_action.setToolTip("基于特征匹配将多幅图像拼接为全景图")
+        self.stitch_action.triggered.connect(self._on_stitch_panorama)
+        
+        self.collage_action = QAction("创建拼图...", self)
+        self.collage_action.setToolTip("按水平、垂直、网格等布局把多幅图像排列为一幅拼图")
+        self.collage_action.triggered.connect(self._on_create_collage)
+        
         self.exit_action = QAction("退出", self)
         self.exit_action.setShortcut("Ctrl+Q")
         self.exit_action.triggered.connect(self.close)
@@ -175,10 +202,23 @@ class MainWindow(QMainWindow):
         self.redo_action.triggered.connect(self._on_redo)
         
         # 优化操作
+        self.super_resolution_action = QAction("超分辨率放大", self)
+        self.super_resolution_action.setToolTip("按 super_resolution 配置的模型和倍数在后台逐块放大当前图像")
+        self.super_resolution_action.triggered.connect(self._on_super_resolution)
+        
         self.cleanup_action = QAction("清理内存", self)
         self.cleanup_action.setShortcut("Ctrl+Shift+M")
         self.cleanup_action.setToolTip("手动清理内存缓存 (Ctrl+Shift+M)")
         self.cleanup_action.triggered.connect(self._force_cleanup_memory)
+        
+        self.profiler_overlay_action = QAction("性能叠加层", self, checkable=True)
+        self.profiler_overlay_action.setShortcut("Ctrl+Shift+P")
+        self.profiler_overlay_action.setToolTip("在图像上显示每次操作各阶段的耗时 (Ctrl+Shift+P)")
+        self.profiler_overlay_action.toggled.connect(self._on_profiler_overlay_toggled)
+        
+        self.export_profile_action = QAction("导出性能记录...", self)
+        self.export_profile_action.setToolTip("将最近操作的耗时记录导出为JSON或Chrome trace")
+        self.export_profile_action.triggered.connect(self._on_export_profile)
 
         # 新增主题切换动作
         self.set_dark_theme_action = QAction("暗色主题", self, checkable=True)
@@ -231,6 +271,12 @@ class MainWindow(QMainWindow):
         file_menu.addAction(self.open_action)
         file_menu.addAction(self.save_action)
         file_menu.addSeparator()
+        file_menu.addAction(self.export_recipe_action)
+        file_menu.addAction(self.apply_recipe_action)
+        file_menu.addSeparator()
+        file_menu.addAction(self.stitch_action)
+        file_menu.addAction(self.collage_action)
+        file_menu.addSeparator()
         file_menu.addAction(self.exit_action)
         
         # 编辑菜单
@@ -240,7 +286,12 @@ class MainWindow(QMainWindow):
         
         # 工具菜单
         tools_menu = self.menuBar().addMenu("工具")
+        tools_menu.addAction(self.super_resolution_action)
+        tools_menu.addSeparator()
         tools_menu.addAction(self.cleanup_action)
+        tools_menu.addSeparator()
+        tools_menu.addAction(self.profiler_overlay_action)
+        tools_menu.addAction(self.export_profile_action)
 
         # 新增视图菜单
         view_menu = self.menuBar().addMenu("视图")
@@ -317,6 +368,24 @@ class MainWindow(QMainWindow):
         self._memory_bar.setTextVisible(False)
         self.statusBar.addPermanentWidget(self._memory_bar)
         
+        # 添加后台保存进度条，仅在保存时显示
+        self._save_progress_bar = QProgressBar()
+        self._save_progress_bar.setFixedWidth(120)
+        self._save_progress_bar.setRange(0, 100)
+        self._save_progress_bar.hide()
+        self.statusBar.addWidget(self._save_progress_bar)
+        
+        # 添加后台处理进度条和取消按钮，仅在后台处理时显示
+        self._operation_progress_bar = QProgressBar()
+        self._operation_progress_bar.setFixedWidth(120)
+        self._operation_progress_bar.setRange(0, 100)
+        self._operation_progress_bar.hide()
+        self.statusBar.addWidget(self._operation_progress_bar)
+        self._cancel_operation_button = QPushButton("取消")
+        self._cancel_operation_button.clicked.connect(self.image_controller.cancel_operation)
+        self._cancel_operation_button.hide()
+        self.statusBar.addWidget(self._cancel_operation_button)
+        
         self.statusBar.showMessage("就绪")
     
     def _connect_signals(self):
@@ -324,6 +393,13 @@ class MainWindow(QMainWindow):
         # 图像模型信号
         self.image_model.image_changed.connect(self._on_image_changed)
         self.image_model.error_occurred.connect(self._on_error)
+        self.image_model.save_progress.connect(self._on_save_progress)
+        self.image_model.save_finished.connect(self._on_save_finished)
+        self.image_model.operation_progress.connect(self._operation_progress_bar.setValue)
+        self.image_model.operation_finished.connect(self._on_operation_finished)
+        
+        # 性能剖析记录
+        profiler.record_finished.connect(self._on_profile_recorded)
         
         # 图像视图信号
         self.image_view.image_changed.connect(self._on_view_changed)
@@ -373,12 +449,60 @@ class MainWindow(QMainWindow):
             self,
             "打开图像",
             "",
-            "图像文件 (*.png *.jpg *.jpeg *.bmp *.gif)"
+            "图像文件 (*.png *.jpg *.jpeg *.bmp *.gif *.tif *.tiff)"
         )
         if file_path:
             # 打开大文件前先清理内存
             self._force_cleanup_memory()
-            self.image_model.load_image(file_path)
+            if self.image_model.load_image(file_path) and self.image_model.is_tiled():
+                tiled = self.image_model.tiled_image
+                self.statusBar.showMessage(
+                    f"大图像 {tiled.width}x{tiled.height} 以分块方式打开，当前显示缩略预览", 5000
+                )
+    
+    def _on_stitch_panorama(self):
+        """选择多幅图像拼接为全景图"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self,
+            "选择要拼接的图像（按住Ctrl多选）",
+            "",
+            "图像文件 (*.png *.jpg *.jpeg *.bmp *.tif *.tiff)"
+        )
+        if len(file_paths) < 2:
+            if file_paths:
+                QMessageBox.warning(self, "警告", "请至少选择2幅图像")
+            return
+        
+        self._force_cleanup_memory()
+        # 在后台拼接，显示进度条和取消按钮；拼接结果是新图像，不记入编辑配方
+        if self.image_controller.stitch_panorama(file_paths):
+            self._pending_operation = ("stitch_panorama", len(file_paths))
+            self._operation_progress_bar.setValue(0)
+            self._operation_progress_bar.show()
+            self._cancel_operation_button.show()
+            self.statusBar.showMessage(f"正在拼接 {len(file_paths)} 幅图像...")
+    
+    def _on_create_collage(self):
+        """选择多幅图像和布局，合成为一幅拼图"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self,
+            "选择要拼图的图像（按住Ctrl多选）",
+            "",
+            "图像文件 (*.png *.jpg *.jpeg *.bmp *.tif *.tiff)"
+        )
+        if not file_paths:
+            return
+        dialog = CollageDialog(len(file_paths), self)
+        if dialog.exec() != CollageDialog.Accepted:
+            return
+        
+        self._force_cleanup_memory()
+        if self.image_controller.create_collage(file_paths, **dialog.get_parameters()):
+            self._pending_operation = ("create_collage", len(file_paths))
+            self._operation_progress_bar.setValue(0)
+            self._operation_progress_bar.show()
+            self._cancel_operation_button.show()
+            self.statusBar.showMessage(f"正在合成 {len(file_paths)} 幅图像的拼图...")
     
     def _on_save(self):
         """保存文件处理"""
@@ -390,10 +514,173 @@ class MainWindow(QMainWindow):
             self,
             "保存图像",
             "",
-            "PNG图像 (*.png);;JPEG图像 (*.jpg);;BMP图像 (*.bmp)"
+            "PNG图像 (*.png);;JPEG图像 (*.jpg);;WebP图像 (*.webp);;TIFF图像 (*.tif);;BMP图像 (*.bmp)"
         )
         if file_path:
-            self.image_model.save_image(file_path)
+            # 在后台线程中编码和写入，避免保存大图像时界面卡顿
+            if self.image_model.save_image_async(file_path):
+                self.save_action.setEnabled(False)
+                self._save_progress_bar.setValue(0)
+                self._save_progress_bar.show()
+                self.statusBar.showMessage(f"正在保存: {file_path}")
+    
+    def _on_save_progress(self, percent):
+        """后台保存进度更新
+        
+        Args:
+            percent: 保存进度百分比
+        """
+        self._save_progress_bar.setValue(percent)
+    
+    def _on_save_finished(self, success, message):
+        """后台保存完成处理
+        
+        Args:
+            success: 是否保存成功
+            message: 成功时为文件路径，失败时为错误信息
+        """
+        self._save_progress_bar.hide()
+        self.save_action.setEnabled(True)
+        if success:
+            self.statusBar.showMessage(f"已保存: {message}", 3000)
+        else:
+            self._show_error_message("保存图像失败", message)
+    
+    def _start_nlmeans_denoise(self, parameters):
+        """在后台开始非局部均值去噪，显示进度条和取消按钮
+        
+        Args:
+            parameters: 去噪参数
+        
+        Returns:
+            bool: 是否成功启动
+        """
+        started = self.image_controller.apply_nlmeans_denoise(
+            h=parameters.get('h', 10),
+            h_color=parameters.get('h_color', 10),
+            template_window_size=parameters.get('template_window_size', 7),
+            search_window_size=parameters.get('search_window_size', 21)
+        )
+        if started:
+            self._pending_operation = ("nlmeans_denoise", dict(parameters))
+            self._operation_progress_bar.setValue(0)
+            self._operation_progress_bar.show()
+            self._cancel_operation_button.show()
+            self.statusBar.showMessage("正在后台处理: nlmeans_denoise")
+        return started
+    
+    def _on_super_resolution(self):
+        """在后台对当前图像做超分辨率放大，显示进度条和取消按钮"""
+        if not self.image_model.has_image():
+            QMessageBox.warning(self, "警告", "没有图像")
+            return
+        scale = config.get('super_resolution.scale', 2)
+        if self.image_controller.apply_super_resolution(scale):
+            self._pending_operation = ("super_resolution", {'scale': scale})
+            self._operation_progress_bar.setValue(0)
+            self._operation_progress_bar.show()
+            self._cancel_operation_button.show()
+            self.statusBar.showMessage(f"正在后台处理: super_resolution ({scale}x)")
+    
+    def _on_operation_finished(self, success, message):
+        """后台处理完成处理
+        
+        Args:
+            success: 结果是否已提交
+            message: 失败或取消的原因
+        """
+        self._operation_progress_bar.hide()
+        self._cancel_operation_button.hide()
+        pending, self._pending_operation = self._pending_operation, None
+        if success:
+            if pending is not None and pending[0] in ("stitch_panorama", "create_collage"):
+                # 生成的新图像不记入编辑配方
+                height, width = self.image_model.current_image.shape[:2]
+                action = "拼接" if pending[0] == "stitch_panorama" else "合成拼图"
+                self.statusBar.showMessage(f"已{action} {pending[1]} 幅图像: {width}x{height}", 5000)
+            elif pending is not None:
+                self.image_model.record_step(*pending)
+                self.statusBar.showMessage(f"已应用{pending[0]}处理", 3000)
+        else:
+            self.statusBar.showMessage(message, 3000)
+    
+    def _on_export_recipe(self):
+        """导出编辑配方"""
+        if not self.image_model.has_image():
+            QMessageBox.warning(self, "警告", "没有图像")
+            return
+        try:
+            recipe = self.image_model.get_recipe()
+        except ValueError as e:
+            QMessageBox.warning(self, "警告", str(e))
+            return
+        
+        file_path, _ = QFileDialog.getSaveFileName(self, "导出编辑配方", "", "编辑配方 (*.json)")
+        if file_path:
+            recipe.save(file_path)
+            self.statusBar.showMessage(f"已导出编辑配方（{len(recipe)} 步）: {file_path}", 3000)
+    
+    def _on_apply_recipe(self):
+        """加载编辑配方并在原始图像上回放"""
+        if not self.image_model.has_image():
+            QMessageBox.warning(self, "警告", "没有图像")
+            return
+        
+        file_path, _ = QFileDialog.getOpenFileName(self, "应用编辑配方", "", "编辑配方 (*.json)")
+        if file_path:
+            try:
+                recipe = EditRecipe.load(file_path)
+            except (OSError, ValueError, KeyError) as e:
+                self._show_error_message("读取编辑配方失败", str(e))
+                return
+            if self.image_controller.apply_recipe(recipe):
+                self.statusBar.showMessage(f"已应用编辑配方（{len(recipe)} 步）", 3000)
+    
+    def _record_recipe_step(self, operation, parameters):
+        """将成功执行的处理请求记入编辑配方
+        
+        Args:
+            operation: 处理请求的操作名称
+            parameters: 处理请求的参数
+        """
+        if operation == "apply_preview":
+            # 应用预览时记录的是被预览的操作
+            if self._last_preview_request is None:
+                return
+            operation, parameters = self._last_preview_request
+            self._last_preview_request = None
+        operation = self._PREVIEW_OPERATION_NAMES.get(operation, operation)
+        self.image_model.record_step(operation, parameters)
+    
+    def _on_profiler_overlay_toggled(self, checked):
+        """显示或隐藏性能叠加层"""
+        self.image_view.set_overlay_text((profiler.format_overlay() or "等待操作...") if checked else None)
+    
+    def _on_profile_recorded(self, record):
+        """一次操作记录完成时刷新性能叠加层"""
+        if self.profiler_overlay_action.isChecked():
+            self.image_view.set_overlay_text(profiler.format_overlay(record))
+    
+    def _on_export_profile(self):
+        """导出性能记录"""
+        if not profiler.get_records():
+            QMessageBox.information(self, "提示", "还没有性能记录")
+            return
+        
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "导出性能记录", "", "Chrome trace (*.trace.json);;性能记录 (*.json)"
+        )
+        if not file_path:
+            return
+        try:
+            if selected_filter.startswith("Chrome") or file_path.endswith(".trace.json"):
+                profiler.export_chrome_trace(file_path)
+            else:
+                profiler.export_json(file_path)
+        except OSError as e:
+            self._show_error_message("导出性能记录失败", str(e))
+            return
+        self.statusBar.showMessage(f"已导出 {len(profiler.get_records())} 条性能记录: {file_path}", 3000)
     
     def _on_undo(self):
         """撤销操作处理"""
@@ -404,135 +691,163 @@ class MainWindow(QMainWindow):
         self.image_model.redo()
     
     def _on_process_requested(self, operation: str, parameters: dict):
-        print(f"MainWindow: Process requested - Operation: {operation}, Parameters: {parameters}") # 调试
+        record = profiler.begin(operation, 'process')
+        started_async = False  # 后台处理的操作在完成后才记入编辑配方
+        success = False  # 只有控制器报告成功的操作才记入编辑配方
         try:
             if operation == "brightness_contrast":
-                self.image_controller.adjust_brightness_contrast(
+                success = self.image_controller.adjust_brightness_contrast(
                     brightness=parameters['brightness'],
                     contrast=parameters['contrast']
                 )
             elif operation == "blur":
                 blur_type = parameters.get('blur_type', 'gaussian')
                 if blur_type == 'gaussian':
-                    self.image_controller.apply_gaussian_blur(
+                    success = self.image_controller.apply_gaussian_blur(
                         parameters.get('kernel_size', 3),
                         parameters.get('sigma', 0)
                     )
                 elif blur_type == 'median':
-                    self.image_controller.apply_median_blur(
+                    success = self.image_controller.apply_median_blur(
                         parameters.get('kernel_size', 3)
                     )
                 elif blur_type == 'bilateral':
-                    self.image_controller.apply_bilateral_filter(
+                    success = self.image_controller.apply_bilateral_filter(
                         parameters.get('d', 9),
                         parameters.get('sigma_color', 75),
                         parameters.get('sigma_space', 75)
                     )
             elif operation == "rotate":
-                print("Processing rotate...") # 调试
-                self.image_controller.rotate_image(
+                success = self.image_controller.rotate_image(
                     angle=parameters.get('angle', 0),
                     scale=parameters.get('scale', 1.0), # 确保 ImageController.rotate_image 处理 scale
                     expand=parameters.get('expand', False)
                 )
             elif operation == "flip":
-                print("Processing flip...") # 调试
-                self.image_controller.flip_image(
+                success = self.image_controller.flip_image(
                     parameters.get('flip_code', 1)
                 )
             elif operation == "crop":
-                print("Processing crop...") # 调试
-                self.image_controller.crop_image(
+                success = self.image_controller.crop_image(
                     parameters.get('x', 0),
                     parameters.get('y', 0),
                     parameters.get('width', 100),
                     parameters.get('height', 100)
                 )
             elif operation == "apply_preview":
-                self.image_controller.apply_last_preview()
+                request = self._last_preview_request
+                if request is not None and request[0] == "rotate_preview":
+                    # 旋转预览没有修改图像，应用时执行旋转
+                    success = self.image_controller.rotate_image(
+                        angle=request[1].get('angle', 0),
+                        scale=request[1].get('scale', 1.0),
+                        expand=request[1].get('expand', False)
+                    )
+                elif request is not None and request[0] == "nlmeans_denoise":
+                    # 预览只在缩小图上计算，应用时在后台处理全分辨率图像
+                    started_async = self._start_nlmeans_denoise(request[1])
+                    self._last_preview_request = None
+                else:
+                    self.image_controller.apply_last_preview()
             elif operation == "laplacian":
-                self.image_controller.apply_laplacian_sharpen(
+                success = self.image_controller.apply_laplacian_sharpen(
                     kernel_size=parameters.get('kernel_size', 3),
                     strength=parameters.get('strength', 1.0)
                 )
             elif operation == "usm":
-                self.image_controller.apply_usm_sharpen(
+                success = self.image_controller.apply_usm_sharpen(
                     radius=parameters.get('radius', 5),
                     amount=parameters.get('amount', 1.0),
                     threshold=parameters.get('threshold', 0)
                 )
+            elif operation == "frequency_denoise":
+                success = self.image_controller.apply_frequency_denoise(
+                    radius=parameters.get('radius', 30)
+                )
+            elif operation == "nlmeans_denoise":
+                started_async = self._start_nlmeans_denoise(parameters)
+            elif operation == "wavelet_denoise":
+                success = self.image_controller.apply_wavelet_denoise(
+                    threshold_scale=parameters.get('threshold_scale', 1.0),
+                    wavelet=parameters.get('wavelet', 'sym8'),
+                    level=parameters.get('level', 2)
+                )
             elif operation == "histogram_equalization":
-                self.image_controller.apply_histogram_equalization(
+                success = self.image_controller.apply_histogram_equalization(
                     per_channel=parameters.get('per_channel', False)
                 )
                 # 直方图均衡化后自动刷新直方图显示
                 self._refresh_histogram_display()
             elif operation == "exposure":
-                self.image_controller.adjust_exposure(
+                success = self.image_controller.adjust_exposure(
                     exposure=parameters.get('exposure', 0.0)
                 )
             elif operation == "highlights":
-                self.image_controller.adjust_highlights(
+                success = self.image_controller.adjust_highlights(
                     highlights=parameters.get('highlights', 0.0)
                 )
             elif operation == "shadows":
-                self.image_controller.adjust_shadows(
+                success = self.image_controller.adjust_shadows(
                     shadows=parameters.get('shadows', 0.0)
                 )
             elif operation == "local_exposure":
-                self.image_controller.adjust_local_exposure(
+                success = self.image_controller.adjust_local_exposure(
                     center_x=parameters.get('center_x', 0),
                     center_y=parameters.get('center_y', 0),
                     radius=parameters.get('radius', 100),
                     strength=parameters.get('strength', 0.5)
                 )
             elif operation == "auto_contrast":
-                self.image_controller.apply_auto_contrast(
+                success = self.image_controller.apply_auto_contrast(
                     clip_limit=parameters.get('clip_limit', 2.0),
                     tile_grid_size=parameters.get('tile_grid_size', (8, 8))
                 )
             elif operation == "auto_color":
-                self.image_controller.apply_auto_color(
+                success = self.image_controller.apply_auto_color(
                     saturation_scale=parameters.get('saturation_scale', 1.3),
                     vibrance_scale=parameters.get('vibrance_scale', 1.2)
                 )
             elif operation == "auto_white_balance":
-                self.image_controller.apply_auto_white_balance(
+                success = self.image_controller.apply_auto_white_balance(
                     method=parameters.get('method', 'adaptive')
                 )
             elif operation == "auto_all":
-                self.image_controller.apply_auto_all(
+                success = self.image_controller.apply_auto_all(
                     contrast=parameters.get('contrast', True),
                     color=parameters.get('color', True),
                     white_balance=parameters.get('white_balance', True)
                 )
             elif operation == "one_click_optimize":
                 # 处理一键优化操作，参数名称需要映射
-                self.image_controller.apply_auto_all(
+                success = self.image_controller.apply_auto_all(
                     contrast=parameters.get('enable_contrast', True),
                     color=parameters.get('enable_color', True),
                     white_balance=parameters.get('enable_wb', True)
                 )
             elif operation == "rotate":
-                self.image_controller.rotate_image(
+                success = self.image_controller.rotate_image(
                     angle=parameters.get('angle', 0),
                     scale=parameters.get('scale', 1.0),
                     expand=parameters.get('expand', False)
                 )
             elif operation == "flip":
-                self.image_controller.flip_image(
+                success = self.image_controller.flip_image(
                     flip_code=parameters.get('flip_code', 1)
                 )
             elif operation == "crop":
-                self.image_controller.crop_image(
+                success = self.image_controller.crop_image(
                     x=parameters.get('x', 0),
                     y=parameters.get('y', 0),
                     width=parameters.get('width', 100),
                     height=parameters.get('height', 100)
                 )
             
-            # 更新状态栏
-            self.statusBar.showMessage(f"已应用{operation}处理", 3000)
+            if success and not started_async:
+                # 记入编辑配方
+                self._record_recipe_step(operation, parameters)
+                
+                # 更新状态栏
+                self.statusBar.showMessage(f"已应用{operation}处理", 3000)
             
         except Exception as e:
             error_msg = f"处理失败: {str(e)}"
@@ -540,18 +855,19 @@ class MainWindow(QMainWindow):
             self.statusBar.showMessage(error_msg, 5000)
             import traceback # 详细错误信息
             traceback.print_exc() # 详细错误信息
+        finally:
+            profiler.end(record)
     
     def _on_image_changed(self):
         """图像发生变化时的回调"""
-        self.image_view.update_image(self.image_model.current_image)
+        self.image_view.update_image(self.image_model.current_image, self.image_model.image_pyramid())
         
         # 更新裁剪面板的图像信息
         if self.image_model.has_image():
             current_image = self.image_model.current_image
             if current_image is not None:
                 height, width = current_image.shape[:2]
-                if hasattr(self.inspector_panel, 'geometry_section'):
-                    self.inspector_panel.geometry_section.update_image_info(width, height)
+                self.inspector_panel.update_image_info(width, height)
                 
                 # 自动刷新直方图显示
                 self._refresh_histogram_display()
@@ -641,7 +957,7 @@ class MainWindow(QMainWindow):
     def _on_cancel_preview(self):
         """取消预览处理"""
         # 重置视图以取消预览效果
-        self.image_view.update_image(self.image_model.current_image)
+        self.image_view.update_image(self.image_model.current_image, self.image_model.image_pyramid())
     
     def _on_histogram_requested(self, parameters):
         """直方图数据请求处理
@@ -654,7 +970,7 @@ class MainWindow(QMainWindow):
         # 转换字符串通道参数为数字索引
         channel_index = None
         if channel == "red":
-            channel_index = 2  # OpenCV顺序：BGR，红色是索引2
+            channel_index = 2  # 内部统一为BGR顺序，红色是索引2
         elif channel == "green":
             channel_index = 1
         elif channel == "blue":
@@ -662,15 +978,14 @@ class MainWindow(QMainWindow):
         elif channel == "all":
             channel_index = None  # 所有通道
         
-        print(f"MainWindow: Requesting histogram for channel: {channel} (index: {channel_index})")
-        hist_data = self.image_controller.calculate_histogram(channel=channel_index)
-        if hist_data is not None:
-            print(f"MainWindow: Received histogram data, updating panel")
-            if hasattr(self.inspector_panel, 'update_histogram'):
+        with profiler.phase('histogram'):
+            hist_data = self.image_controller.calculate_histogram(channel=channel_index)
+            if hist_data is not None and hasattr(self.inspector_panel, 'update_histogram'):
                 self.inspector_panel.update_histogram(hist_data)
     
     def _on_preview_requested(self, operation: str, parameters: dict):
-        print(f"MainWindow: Preview requested - Operation: {operation}, Parameters: {parameters}") # 调试
+        self._last_preview_request = (operation, dict(parameters))
+        record = profiler.begin(operation, 'preview')
         try:
             if operation == "brightness_contrast":
                 self.image_controller.preview_brightness_contrast(
@@ -678,12 +993,14 @@ class MainWindow(QMainWindow):
                     contrast=parameters['contrast']
                 )
             elif operation == "rotate_preview":
-                print("Previewing rotate...") # 调试
-                self.image_controller.preview_rotate_image(
+                # 旋转预览只变换视图中的图像项，不重新计算像素；应用时才对图像执行旋转
+                transform = self.image_controller.rotation_preview_transform(
                     angle=parameters.get('angle', 0),
-                    scale=parameters.get('scale', 1.0), # 确保 ImageController.preview_rotate_image 处理 scale
+                    scale=parameters.get('scale', 1.0),
                     expand=parameters.get('expand', False)
                 )
+                if transform is not None:
+                    self.image_view.set_preview_transform(*transform)
             elif operation == "crop":
                 self.image_controller.preview_crop_image(
                     parameters.get('x', 0),
@@ -693,21 +1010,26 @@ class MainWindow(QMainWindow):
                 )
             elif operation == "blur":
                 blur_type = parameters.get('blur_type', 'gaussian')
+                success = False
                 if blur_type == 'gaussian':
-                    self.image_controller.apply_gaussian_blur(
+                    success = self.image_controller.apply_gaussian_blur(
                         parameters.get('kernel_size', 3),
                         parameters.get('sigma', 0)
                     )
                 elif blur_type == 'median':
-                    self.image_controller.apply_median_blur(
+                    success = self.image_controller.apply_median_blur(
                         parameters.get('kernel_size', 3)
                     )
                 elif blur_type == 'bilateral':
-                    self.image_controller.apply_bilateral_filter(
+                    success = self.image_controller.apply_bilateral_filter(
                         parameters.get('d', 9),
                         parameters.get('sigma_color', 75),
                         parameters.get('sigma_space', 75)
                     )
+                # 模糊没有预览版本，成功时直接作为正式操作记录
+                if success:
+                    self._record_recipe_step(operation, parameters)
+                self._last_preview_request = None
             elif operation == "laplacian":
                 self.image_controller.preview_laplacian_sharpen(
                     kernel_size=parameters.get('kernel_size', 3),
@@ -719,6 +1041,23 @@ class MainWindow(QMainWindow):
                     amount=parameters.get('amount', 1.0),
                     threshold=parameters.get('threshold', 0)
                 )
+            elif operation == "frequency_denoise":
+                self.image_controller.preview_frequency_denoise(
+                    radius=parameters.get('radius', 30)
+                )
+            elif operation == "nlmeans_denoise":
+                self.image_controller.preview_nlmeans_denoise(
+                    h=parameters.get('h', 10),
+                    h_color=parameters.get('h_color', 10),
+                    template_window_size=parameters.get('template_window_size', 7),
+                    search_window_size=parameters.get('search_window_size', 21)
+                )
+            elif operation == "wavelet_denoise":
+                self.image_controller.preview_wavelet_denoise(
+                    threshold_scale=parameters.get('threshold_scale', 1.0),
+                    wavelet=parameters.get('wavelet', 'sym8'),
+                    level=parameters.get('level', 2)
+                )
             elif operation == "histogram_equalization":
                 self.image_controller.preview_histogram_equalization(
                     per_channel=parameters.get('per_channel', False)
@@ -778,6 +1117,8 @@ class MainWindow(QMainWindow):
             self.statusBar.showMessage(f"预览失败: {str(e)}", 3000)
             import traceback # 详细错误信息
             traceback.print_exc() # 详细错误信息
+        finally:
+            profiler.end(record)
     
     def _refresh_histogram_display(self):
         """刷新直方图显示
@@ -791,7 +1132,6 @@ class MainWindow(QMainWindow):
                 
                 # 请求更新直方图数据
                 parameters = {'channel': current_channel}
-                print(f"MainWindow: Auto-refreshing histogram for channel: {current_channel}")
                 self._on_histogram_requested(parameters)
                 
         except Exception as e:
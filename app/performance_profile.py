@@ -0,0 +1,217 @@
+"""
+自适应性能配置模块 - 按本机（容器）的资源限制和实测性能调整性能相关配置
+
+AppConfig 的默认值只按内存总量粗略分档。启动时本模块：
+
+1. 读取可用核心数（CPU亲和性和cgroup CPU配额）和可用内存（cgroup内存限制）
+2. 运行一次很短的微基准，测量内存带宽和单核处理吞吐量
+3. 据此推算撤销历史的字节预算、分块大小、线程池/进程池大小和预览缩放阈值
+
+结果连同硬件指纹保存为JSON，之后启动直接读取；资源限制或库版本变化时重新测量。
+"""
+import json
+import math
+import os
+import platform
+import time
+import cv2
+import numpy as np
+from app.config import config
+from utils.system_resources import available_cores, cgroup_cpu_limit, memory_usage
+
+PROFILE_VERSION = 1
+PROFILE_FILE_NAME = "performance_profile.json"
+
+# 推算配置时使用的目标值
+TILE_TARGET_SECONDS = 0.004  # 单个分块的处理时间，兼顾调度开销和负载均衡
+PREVIEW_TARGET_SECONDS = 0.1  # 预览一次的处理时间
+PREVIEW_PASSES = 4  # 预览一次读写缓冲区的次数（计算、QImage、上传、直方图）
+HISTORY_MEMORY_FRACTION = 0.25  # 撤销历史可占用的内存比例
+WORKER_MEMORY_MB = 150  # 每个算子工作进程的常驻内存估计
+WORKER_MEMORY_FRACTION = 0.1  # 工作进程可占用的内存比例
+
+def measure_memory_bandwidth(size_mb=32, repeats=3):
+    """测量内存复制带宽
+
+    Args:
+        size_mb: 测试缓冲区大小（MB），应远大于CPU缓存
+        repeats: 重复次数，取最快一次
+
+    Returns:
+        float: 带宽（GB/s），按读写字节合计
+    """
+    source = np.ones(size_mb * 1024 * 1024, dtype=np.uint8)
+    target = np.empty_like(source)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        np.copyto(target, source)
+        best = min(best, time.perf_counter() - start)
+    return 2 * source.nbytes / best / 1e9
+
+def measure_core_throughput(size=1024, repeats=3):
+    """测量单核的处理吞吐量
+
+    在单线程下对彩色图像做5x5高斯模糊，作为典型邻域算子的代表。
+
+    Args:
+        size: 测试图像边长
+        repeats: 重复次数，取最快一次
+
+    Returns:
+        float: 每像素耗时（ns）
+    """
+    image = np.random.default_rng(0).integers(0, 256, (size, size, 3), dtype=np.uint8)
+    threads = cv2.getNumThreads()
+    cv2.setNumThreads(1)
+    try:
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            cv2.GaussianBlur(image, (5, 5), 0)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        cv2.setNumThreads(threads)
+    return best / (size * size) * 1e9
+
+def detect_resources():
+    """读取当前进程可用的核心数和内存
+
+    Returns:
+        dict: {'cores', 'cpu_quota', 'memory_total': 字节数, 'memory_source': 'cgroup' 或 'host'}
+    """
+    memory = memory_usage()
+    return {
+        'cores': available_cores(),
+        'cpu_quota': cgroup_cpu_limit(),
+        'memory_total': memory['total'],
+        'memory_source': memory['source'],
+    }
+
+def fingerprint(resources):
+    """生成硬件和库版本指纹，变化时需要重新测量"""
+    return {
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cores': resources['cores'],
+        'cpu_quota': resources['cpu_quota'],
+        'memory_total': resources['memory_total'],
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+
+def _round_power_of_two(value, lower, upper):
+    return int(min(upper, max(lower, 2 ** round(math.log2(max(value, 1))))))
+
+def derive_settings(resources, bandwidth, ns_per_pixel):
+    """由资源限制和实测性能推算配置
+
+    Args:
+        resources: detect_resources() 的返回值
+        bandwidth: 内存带宽（GB/s）
+        ns_per_pixel: 单核每像素耗时（ns）
+
+    Returns:
+        dict: 配置键 -> 值
+    """
+    cores = resources['cores']
+    memory_mb = resources['memory_total'] / (1024 * 1024)
+
+    # 单个分块处理约 TILE_TARGET_SECONDS，取2的幂
+    tile_pixels = TILE_TARGET_SECONDS / (ns_per_pixel * 1e-9)
+    tile_size = _round_power_of_two(math.sqrt(tile_pixels), 128, 1024)
+
+    # 工作进程数不超过核心数，常驻内存不超过内存的一定比例
+    workers = max(1, min(cores, int(memory_mb * WORKER_MEMORY_FRACTION / WORKER_MEMORY_MB)))
+
+    # 预览在目标时间内完成：既受全部核心的计算吞吐限制，也受内存带宽限制（每像素3字节）
+    compute_pixels = PREVIEW_TARGET_SECONDS / (ns_per_pixel * 1e-9) * cores
+    bandwidth_pixels = PREVIEW_TARGET_SECONDS * bandwidth * 1e9 / (3 * PREVIEW_PASSES)
+    preview_megapixels = min(compute_pixels, bandwidth_pixels) / 1e6
+
+    return {
+        'performance.history_budget_mb': int(memory_mb * HISTORY_MEMORY_FRACTION),
+        'performance.tile_size': tile_size,
+        'performance.thread_pool_size': cores,
+        'performance.process_pool_size': workers,
+        'performance.image_downscale_threshold': round(min(40.0, max(2.0, preview_megapixels)), 1),
+    }
+
+def measure_profile():
+    """测量资源和性能，生成性能配置
+
+    Returns:
+        dict: 性能配置
+    """
+    resources = detect_resources()
+    bandwidth = measure_memory_bandwidth()
+    ns_per_pixel = measure_core_throughput()
+    return {
+        'version': PROFILE_VERSION,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'fingerprint': fingerprint(resources),
+        'resources': resources,
+        'benchmark': {'memory_bandwidth_gbs': bandwidth, 'ns_per_pixel': ns_per_pixel},
+        'settings': derive_settings(resources, bandwidth, ns_per_pixel),
+    }
+
+def default_profile_path():
+    """性能配置文件的默认路径"""
+    return os.path.join(config.get('paths.temp_dir'), PROFILE_FILE_NAME)
+
+def load_profile(path=None):
+    """读取已保存的性能配置，文件不存在、版本不符或硬件指纹变化时返回None
+
+    Args:
+        path: 配置文件路径，默认为 default_profile_path()
+    """
+    path = path or default_profile_path()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if profile.get('version') != PROFILE_VERSION:
+        return None
+    if profile.get('fingerprint') != fingerprint(detect_resources()):
+        return None
+    return profile
+
+def save_profile(profile, path=None):
+    """保存性能配置
+
+    Args:
+        profile: 性能配置
+        path: 配置文件路径，默认为 default_profile_path()
+    """
+    path = path or default_profile_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, ensure_ascii=False, indent=4)
+    os.replace(temp_path, path)
+
+def apply_profile(profile):
+    """将性能配置推算的设置写入全局配置"""
+    for key, value in profile['settings'].items():
+        config.set(key, value)
+
+def load_or_measure_profile(path=None, remeasure=False):
+    """读取已保存的性能配置，没有可用配置时测量并保存，然后应用到全局配置
+
+    Args:
+        path: 配置文件路径，默认为 default_profile_path()
+        remeasure: 是否忽略已保存的配置重新测量
+
+    Returns:
+        dict: 生效的性能配置
+    """
+    profile = None if remeasure else load_profile(path)
+    if profile is None:
+        profile = measure_profile()
+        try:
+            save_profile(profile, path)
+        except OSError as e:
+            print(f"保存性能配置失败: {str(e)}")
+    apply_profile(profile)
+    return profile
@@ -0,0 +1,250 @@
+# This Python file uses the following encoding: utf-8
+"""
+无界面批处理入口
+
+将一组处理操作（编辑配方）应用到目录中的所有图像，不依赖PySide6界面：
+
+    python batch.py 输入目录 输出目录 --recipe recipe.json
+    python -m imagepro.batch 输入目录 输出目录 --recipe '[{"operation": "usm", "parameters": {"amount": 1.5}}]'
+
+配方为JSON列表，每一步包含操作名称和参数，名称与界面发出的处理请求一致
+（见 controllers/operation_registry.py）；也可以是界面导出的编辑配方文件（models/edit_recipe.py）。
+
+图像在进程池中并行处理，同时在途的图像数量有上限，以限制内存占用；
+工作进程只接收文件路径，像素数据不在进程间传递。结束时报告吞吐量（张/秒、百万像素/秒）。
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# 以 python -m imagepro.batch 运行时，项目内的模块仍按顶层包名导入
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+
+from controllers.operation_registry import get_operation, run_operation
+from models.edit_recipe import EditRecipe
+from utils.image_io import save_image_atomic
+from app.config import config
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+
+def load_recipe_steps(source):
+    """读取编辑配方
+
+    Args:
+        source: 配方文件路径或JSON字符串
+
+    Returns:
+        list: [(操作名称, 参数字典), ...]
+    """
+    if os.path.isfile(source):
+        recipe = EditRecipe.load(source)
+    else:
+        recipe = EditRecipe.from_json(source)
+
+    steps = []
+    for step in recipe.steps:
+        get_operation(step['operation'])  # 提前校验操作名称，避免在工作进程中才失败
+        steps.append((step['operation'], step['parameters']))
+    return steps
+
+def find_images(input_dir, recursive=False):
+    """查找目录中的图像文件
+
+    Args:
+        input_dir: 输入目录
+        recursive: 是否包含子目录
+
+    Returns:
+        list: 按路径排序的图像文件列表
+    """
+    images = []
+    for root, dirs, files in os.walk(input_dir):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(images)
+
+def output_paths_for(inputs, input_dir, output_dir, output_format=None):
+    """计算各输入图像的输出路径，保持输入目录的相对结构
+
+    Args:
+        inputs: 输入文件路径列表
+        input_dir: 输入目录
+        output_dir: 输出目录
+        output_format: 输出扩展名，默认沿用输入格式
+
+    Returns:
+        dict: 输入路径 -> 输出路径
+
+    Raises:
+        ValueError: 多个输入映射到同一个输出文件（如指定输出格式时的 a.png 和 a.jpg）
+    """
+    paths = {}
+    sources = {}
+    for input_path in inputs:
+        relative = os.path.relpath(input_path, input_dir)
+        if output_format:
+            relative = os.path.splitext(relative)[0] + '.' + output_format.lstrip('.')
+        path = os.path.join(output_dir, relative)
+        key = os.path.normcase(os.path.abspath(path))
+        if key in sources:
+            raise ValueError(f"{sources[key]} 和 {input_path} 的输出文件相同: {path}")
+        sources[key] = input_path
+        paths[input_path] = path
+    return paths
+
+def _init_worker():
+    """工作进程初始化：每个进程处理一张图像，关闭OpenCV内部多线程避免与进程池争用CPU"""
+    cv2.setNumThreads(1)
+    # 批处理已在图像之间并行，算子不再嵌套使用进程池
+    config.set('performance.operator_backends', {})
+
+def process_file(input_path, output_path, steps, options=None):
+    """在工作进程中处理单张图像
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径
+        steps: [(操作名称, 参数字典), ...]
+        options: 编码设置
+
+    Returns:
+        tuple: (输入路径, 百万像素数, 错误信息或None)
+    """
+    try:
+        image = cv2.imread(input_path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"无法加载图像: {input_path}")
+        megapixels = image.shape[0] * image.shape[1] / 1e6
+
+        for name, parameters in steps:
+            image = run_operation(image, name, parameters)
+
+        save_image_atomic(image, output_path, options)
+        return input_path, megapixels, None
+    except Exception as e:
+        return input_path, 0.0, str(e)
+
+def run_batch(input_dir, output_dir, steps, workers=None, max_in_flight=None,
+              output_format=None, options=None, recursive=False, progress_callback=None):
+    """批量处理目录中的图像
+
+    Args:
+        input_dir: 输入目录
+        output_dir: 输出目录，保持输入目录的相对结构
+        steps: [(操作名称, 参数字典), ...]
+        workers: 工作进程数，默认为CPU核心数
+        max_in_flight: 同时在途的最大图像数，默认为工作进程数的2倍
+        output_format: 输出扩展名（如 'png'），默认沿用输入格式
+        options: 编码设置
+        recursive: 是否包含子目录
+        progress_callback: 每完成一张图像时调用 callback(完成数, 总数, 结果)
+
+    Returns:
+        dict: 统计信息（成功数、失败列表、耗时、吞吐量）
+
+    Raises:
+        ValueError: 多个输入映射到同一个输出文件，此时不处理任何图像
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max(1, max_in_flight or workers * 2)
+    inputs = find_images(input_dir, recursive)
+
+    output_paths = output_paths_for(inputs, input_dir, output_dir, output_format)
+    for path in set(map(os.path.dirname, output_paths.values())):
+        os.makedirs(path, exist_ok=True)
+
+    succeeded = 0
+    failed = []
+    megapixels = 0.0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        pending = set()
+        queue = iter(inputs)
+        done_count = 0
+        while True:
+            # 补充任务直到达到在途上限
+            for input_path in queue:
+                pending.add(executor.submit(process_file, input_path, output_paths[input_path], steps, options))
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                input_path, image_mp, error = result
+                if error is None:
+                    succeeded += 1
+                    megapixels += image_mp
+                else:
+                    failed.append((input_path, error))
+                done_count += 1
+                if progress_callback is not None:
+                    progress_callback(done_count, len(inputs), result)
+
+    elapsed = time.perf_counter() - start
+    return {
+        'total': len(inputs),
+        'succeeded': succeeded,
+        'failed': failed,
+        'elapsed': elapsed,
+        'megapixels': megapixels,
+        'images_per_second': succeeded / elapsed if elapsed > 0 else 0.0,
+        'megapixels_per_second': megapixels / elapsed if elapsed > 0 else 0.0,
+    }
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="ImagePro 无界面批处理")
+    parser.add_argument('input_dir', help="输入图像目录")
+    parser.add_argument('output_dir', help="输出目录")
+    parser.add_argument('--recipe', required=True, help="编辑配方：JSON文件路径或JSON字符串")
+    parser.add_argument('--workers', type=int, default=None, help="工作进程数（默认CPU核心数）")
+    parser.add_argument('--max-in-flight', type=int, default=None, help="同时在途的最大图像数（默认工作进程数的2倍）")
+    parser.add_argument('--format', dest='output_format', default=None, help="输出格式扩展名，如 png、jpg")
+    parser.add_argument('--quality', type=int, default=None, help="JPEG/WebP质量")
+    parser.add_argument('--recursive', action='store_true', help="包含子目录")
+    args = parser.parse_args(argv)
+
+    try:
+        steps = load_recipe_steps(args.recipe)
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"配方无效: {e}", file=sys.stderr)
+        return 2
+
+    options = {}
+    if args.quality is not None:
+        options['jpeg_quality'] = args.quality
+        options['webp_quality'] = args.quality
+
+    def report(done, total, result):
+        input_path, _, error = result
+        status = "失败: " + error if error else "完成"
+        print(f"[{done}/{total}] {os.path.basename(input_path)} {status}")
+
+    try:
+        stats = run_batch(
+            args.input_dir, args.output_dir, steps,
+            workers=args.workers, max_in_flight=args.max_in_flight,
+            output_format=args.output_format, options=options,
+            recursive=args.recursive, progress_callback=report
+        )
+    except ValueError as e:
+        print(f"输出路径冲突: {e}", file=sys.stderr)
+        return 2
+
+    print(f"处理完成: 成功 {stats['succeeded']} 张，失败 {len(stats['failed'])} 张，耗时 {stats['elapsed']:.2f} 秒")
+    print(f"吞吐量: {stats['images_per_second']:.2f} 张/秒，{stats['megapixels_per_second']:.2f} 百万像素/秒")
+    return 1 if stats['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,10 @@
    - 自适应阈值处理
    - 图像旋转
    - 图像锐化
+   - 频域去噪
+   - 非局部均值去噪（后台分块执行，预览在缩小图上计算）
+   - 小波去噪
+   - 全景拼接
    - 图像直方图
    - 图像曝光调整
 
@@ -30,6 +34,8 @@
    - 便于维护和测试
 
 """
+import cv2
+from app.config import config
 from utils.image_utils import (
     adjust_brightness_contrast,
     apply_gaussian_blur,
@@ -39,10 +45,14 @@ from utils.image_utils import (
     apply_threshold,
     apply_adaptive_threshold,
     rotate_image,
+    rotation_transform,
     flip_image,
     crop_image,
     apply_laplacian_sharpen,
     apply_usm_sharpen,
+    denoise_frequency,
+    denoise_nlmeans,
+    denoise_wavelet,
     apply_custom_sharpen,
     calculate_histogram,
     apply_histogram_equalization,
@@ -53,8 +63,16 @@ from utils.image_utils import (
     auto_contrast_enhancement,
     auto_color_correction,
     auto_white_balance,
-    auto_image_enhance
+    auto_image_enhance,
+    white_balance_statistics,
+    white_balance_gains,
+    apply_channel_gains
 )
+from utils.process_pool import OperationCancelled, run_operator
+from utils.stitching import Stitcher
+from utils.collage import create_collage
+from utils.super_resolution import upscale_tiled
+from controllers.operation_registry import run_operation
 
 class ImageController:
     """图像控制器类，负责图像处理操作"""
@@ -164,6 +182,8 @@ class ImageController:
         def operation(image):
             return rotate_image(image, angle, center=None, scale=scale, expand=expand)
         
+        # 标明为几何变换，连续的旋转由模型合成为一次重采样
+        operation.affine = lambda shape: rotation_transform(shape, angle, None, scale, expand)
         return self.image_model.apply_operation(operation)
     
     def flip_image(self, flip_code):
@@ -245,6 +265,22 @@ class ImageController:
         
         return self.image_model.preview_operation(operation)
     
+    def rotation_preview_transform(self, angle, scale=1.0, expand=False):
+        """计算旋转预览用的变换，由视图以变换图像项的方式显示，不重新计算像素
+        
+        Args:
+            angle: 旋转角度（度），正值表示逆时针旋转
+            scale: 缩放比例，默认为1.0
+            expand: 是否扩展图像以包含整个旋转后的图像，默认为False
+        
+        Returns:
+            tuple: (2x3 仿射矩阵, (输出宽, 输出高))，与应用旋转时相同；没有图像时为None
+        """
+        image = self.image_model.current_image
+        if image is None:
+            return None
+        return rotation_transform(image.shape, angle, None, scale, expand)
+    
     def preview_flip_image(self, flip_code):
         """预览翻转图像效果
         
@@ -293,7 +329,7 @@ class ImageController:
             bool: 操作是否成功
         """
         def operation(image):
-            return apply_usm_sharpen(image, radius, amount, threshold)
+            return run_operator(apply_usm_sharpen, image, radius=radius, amount=amount, threshold=threshold)
         
         return self.image_model.apply_operation(operation)
     
@@ -339,10 +375,212 @@ class ImageController:
             bool: 操作是否成功
         """
         def operation(image):
-            return apply_usm_sharpen(image, radius, amount, threshold)
+            return run_operator(apply_usm_sharpen, image, radius=radius, amount=amount, threshold=threshold)
+        
+        return self.image_model.preview_operation(operation)
+    
+    def apply_frequency_denoise(self, radius=30):
+        """应用傅里叶低通去噪
+        
+        Args:
+            radius: 低通半径，越小去噪越强、图像越模糊
+        
+        Returns:
+            bool: 操作是否成功
+        """
+        # 正向变换按图像缓存，预览后应用或多次调整半径时只需逆变换；分块模式下逐块计算
+        spectrum = None if self.image_model.is_tiled() else self.image_model.frequency_spectrum()
+        
+        def operation(image):
+            return denoise_frequency(image, radius, spectrum=spectrum)
+        
+        return self.image_model.apply_operation(operation)
+    
+    def preview_frequency_denoise(self, radius=30):
+        """预览傅里叶低通去噪效果
+        
+        Args:
+            radius: 低通半径，越小去噪越强、图像越模糊
+        
+        Returns:
+            bool: 操作是否成功
+        """
+        spectrum = self.image_model.frequency_spectrum()
+        
+        def operation(image):
+            return denoise_frequency(image, radius, spectrum=spectrum)
+        
+        return self.image_model.preview_operation(operation)
+    
+    def apply_wavelet_denoise(self, threshold_scale=1.0, wavelet='sym8', level=2):
+        """应用小波去噪
+        
+        Args:
+            threshold_scale: 阈值倍数，越大去噪越强
+            wavelet: 小波名称
+            level: 分解层数
+        
+        Returns:
+            bool: 操作是否成功
+        """
+        # 分解按图像缓存，预览后应用或多次调整阈值时只需收缩和逆变换；分块模式下逐块计算
+        decomposition = None if self.image_model.is_tiled() else self.image_model.wavelet_decomposition(
+            wavelet=wavelet, level=level)
+        
+        def operation(image):
+            return denoise_wavelet(image, threshold_scale, wavelet, level, decomposition=decomposition)
+        
+        return self.image_model.apply_operation(operation)
+    
+    def preview_wavelet_denoise(self, threshold_scale=1.0, wavelet='sym8', level=2):
+        """预览小波去噪效果
+        
+        Args:
+            threshold_scale: 阈值倍数，越大去噪越强
+            wavelet: 小波名称
+            level: 分解层数
+        
+        Returns:
+            bool: 操作是否成功
+        """
+        decomposition = self.image_model.wavelet_decomposition(wavelet=wavelet, level=level)
+        
+        def operation(image):
+            return denoise_wavelet(image, threshold_scale, wavelet, level, decomposition=decomposition)
+        
+        return self.image_model.preview_operation(operation)
+    
+    def apply_nlmeans_denoise(self, h=10, h_color=10, template_window_size=7, search_window_size=21):
+        """在后台按分块应用非局部均值去噪
+        
+        处理进度和结果通过图像模型的 operation_progress、operation_finished 信号通知。
+        
+        Args:
+            h: 亮度滤波强度，越大去噪越强、细节损失越多
+            h_color: 色度滤波强度
+            template_window_size: 相似度比较的模板窗口大小（奇数）
+            search_window_size: 搜索相似块的窗口大小（奇数）
+        
+        Returns:
+            bool: 是否成功启动处理
+        """
+        return self.image_model.apply_operation_async(
+            denoise_nlmeans, h=h, h_color=h_color,
+            template_window_size=template_window_size, search_window_size=search_window_size
+        )
+    
+    def apply_super_resolution(self, scale=None):
+        """在后台按分块放大当前图像（超分辨率模型，未配置时双三次插值）
+        
+        分块模式下直接从全分辨率分块图像读取；放大结果超出内存限制时写入磁盘，以分块模式打开。
+        处理进度和结果通过图像模型的 operation_progress、operation_finished 信号通知。
+        
+        Args:
+            scale: 放大倍数，默认为 super_resolution.scale
+        
+        Returns:
+            bool: 是否成功启动处理
+        """
+        return self.image_model.apply_operation_async(
+            upscale_tiled, scale=scale or config.get('super_resolution.scale', 2), spill_to_disk=True
+        )
+    
+    def preview_nlmeans_denoise(self, h=10, h_color=10, template_window_size=7, search_window_size=21):
+        """在缩小图上快速预览非局部均值去噪效果
+        
+        在图像金字塔中不少于 performance.denoise_preview_pixels 像素的一层上计算后放大到原尺寸。
+        缩小时噪声已被平均，滤波强度按缩小比例降低。
+        
+        Args:
+            h: 亮度滤波强度
+            h_color: 色度滤波强度
+            template_window_size: 相似度比较的模板窗口大小（奇数）
+            search_window_size: 搜索相似块的窗口大小（奇数）
+        
+        Returns:
+            bool: 操作是否成功
+        """
+        proxy = self.image_model.analysis_image(config.get('performance.denoise_preview_pixels', 1000000))
+        if proxy is None:
+            return False
+        
+        def operation(image):
+            height, width = image.shape[:2]
+            scale = proxy.shape[1] / width
+            result = denoise_nlmeans(proxy, h * scale, h_color * scale,
+                                     template_window_size, search_window_size)
+            if result.shape != image.shape:
+                result = cv2.resize(result, (width, height), interpolation=cv2.INTER_LINEAR)
+            return result
         
         return self.image_model.preview_operation(operation)
     
+    def cancel_operation(self):
+        """取消正在后台进行的处理"""
+        self.image_model.cancel_operation()
+    
+    def stitch_panorama(self, file_paths):
+        """在后台基于特征匹配将多幅图像拼接为全景图，完成后作为新图像打开
+        
+        读取、特征检测和合成都在后台线程中进行，进度通过image_model.operation_progress汇报，
+        可用cancel_operation取消，完成后发出image_model.operation_finished信号。
+        
+        Args:
+            file_paths: 输入图像路径列表，第一幅作为参考坐标系
+        
+        Returns:
+            bool: 是否成功启动拼接任务
+        """
+        file_paths = list(file_paths)
+        
+        def generate(progress_callback, cancel_event):
+            try:
+                images = []
+                for file_path in file_paths:
+                    if cancel_event.is_set():
+                        raise OperationCancelled("拼接已取消")
+                    image = cv2.imread(str(file_path), cv2.IMREAD_COLOR)
+                    if image is None:
+                        raise ValueError(f"无法加载图像: {file_path}")
+                    images.append(image)
+                return Stitcher(images).compose(progress_callback, cancel_event)
+            except (ValueError, MemoryError, cv2.error) as e:
+                raise ValueError(f"拼接失败: {str(e)}") from e
+        
+        return self.image_model.generate_image_async(generate)
+    
+    def create_collage(self, file_paths, layout="auto", padding=0, background=(255, 255, 255)):
+        """在后台按布局把多幅图像合成为拼图，完成后作为新图像打开
+        
+        与stitch_panorama一样通过image_model的operation_progress/operation_finished信号汇报进度和结果。
+        
+        Args:
+            file_paths: 输入图像路径列表
+            layout: 布局名称，见 utils.collage.LAYOUTS
+            padding: 图像之间的间距（像素）
+            background: 背景颜色，BGR顺序
+        
+        Returns:
+            bool: 是否成功启动拼图任务
+        """
+        file_paths = list(file_paths)
+        
+        def generate(progress_callback, cancel_event):
+            try:
+                images = []
+                for file_path in file_paths:
+                    if cancel_event.is_set():
+                        raise OperationCancelled("拼图已取消")
+                    image = cv2.imread(str(file_path), cv2.IMREAD_COLOR)
+                    if image is None:
+                        raise ValueError(f"无法加载图像: {file_path}")
+                    images.append(image)
+                return create_collage(images, layout, padding, background, progress_callback=progress_callback)
+            except (ValueError, MemoryError, cv2.error) as e:
+                raise ValueError(f"拼图失败: {str(e)}") from e
+        
+        return self.image_model.generate_image_async(generate)
+    
     def calculate_histogram(self, channel=None, mask=None, bins=256, range_values=(0, 256)):
         """计算当前图像的直方图
         
@@ -357,14 +595,20 @@ class ImageController:
         """
         if not self.image_model.has_image():
             return None
-            
-        return calculate_histogram(
-            self.image_model.current_image,
-            channel=channel,
-            mask=mask,
-            bins=bins,
-            range_values=range_values
-        )
+        
+        image = self.image_model.current_image
+        if mask is not None:
+            return calculate_histogram(image, channel=channel, mask=mask, bins=bins, range_values=range_values)
+        
+        # 无掩码时在图像金字塔的缩小层上统计，计数按像素数之比还原到原图
+        level = self.image_model.analysis_image(image=image)
+        hist = calculate_histogram(level, channel=channel, bins=bins, range_values=range_values)
+        ratio = (image.shape[0] * image.shape[1]) / (level.shape[0] * level.shape[1])
+        if ratio == 1:
+            return hist
+        if isinstance(hist, list):
+            return [channel_hist * ratio for channel_hist in hist]
+        return hist * ratio
         
     def apply_histogram_equalization(self, per_channel=False):
         """应用直方图均衡化
@@ -432,7 +676,7 @@ class ImageController:
             bool: 操作是否成功
         """
         def operation(image):
-            return adjust_highlights(image, highlights=highlights)
+            return run_operator(adjust_highlights, image, highlights=highlights)
             
         return self.image_model.apply_operation(operation)
         
@@ -446,7 +690,7 @@ class ImageController:
             bool: 操作是否成功
         """
         def operation(image):
-            return adjust_highlights(image, highlights=highlights)
+            return run_operator(adjust_highlights, image, highlights=highlights)
             
         return self.image_model.preview_operation(operation)
         
@@ -460,7 +704,7 @@ class ImageController:
             bool: 操作是否成功
         """
         def operation(image):
-            return adjust_shadows(image, shadows=shadows)
+            return run_operator(adjust_shadows, image, shadows=shadows)
             
         return self.image_model.apply_operation(operation)
         
@@ -474,7 +718,7 @@ class ImageController:
             bool: 操作是否成功
         """
         def operation(image):
-            return adjust_shadows(image, shadows=shadows)
+            return run_operator(adjust_shadows, image, shadows=shadows)
             
         return self.image_model.preview_operation(operation)
         
@@ -582,21 +826,33 @@ class ImageController:
             bool: 操作是否成功
         """
         def operation(image):
-            return auto_white_balance(image, method=method)
+            return run_operator(auto_white_balance, image, method=method)
             
         return self.image_model.apply_operation(operation)
         
     def preview_auto_white_balance(self, method='adaptive'):
         """预览自动白平衡效果
         
+        灰色世界的增益只依赖通道均值，缩小后基本不变，由图像金字塔缩小层上的统计量估计，预览只需逐像素乘以增益。
+        完美反射和自适应方法用到的通道最大值和标准差在模糊、缩小后的层上偏低，
+        与应用时一样在原图上统计，预览与应用的结果一致。
+        
         Args:
             method: 白平衡方法，可选值：'gray_world', 'perfect_reflector', 'adaptive'
             
         Returns:
             bool: 操作是否成功
         """
-        def operation(image):
-            return auto_white_balance(image, method=method)
+        level = self.image_model.analysis_image() if method == 'gray_world' else None
+        if level is None or level.ndim != 3 or level.shape[2] != 3:
+            # 仅彩色图像需要白平衡
+            def operation(image):
+                return run_operator(auto_white_balance, image, method=method)
+        else:
+            gains = white_balance_gains(white_balance_statistics(level), method)
+            
+            def operation(image):
+                return apply_channel_gains(image, gains)
             
         return self.image_model.preview_operation(operation)
         
@@ -630,4 +886,15 @@ class ImageController:
         def operation(image):
             return auto_image_enhance(image, contrast=contrast, color=color, white_balance=white_balance)
             
-        return self.image_model.preview_operation(operation) 
\ No newline at end of file
+        return self.image_model.preview_operation(operation)
+
+    def apply_recipe(self, recipe):
+        """在原始图像上回放编辑配方
+        
+        Args:
+            recipe: EditRecipe编辑配方
+            
+        Returns:
+            bool: 操作是否成功
+        """
+        return self.image_model.replay_recipe(recipe, run_operation)
@@ -0,0 +1,174 @@
+"""
+图像处理操作注册表
+
+将 MainWindow._on_process_requested 中使用的操作名称和参数映射到 utils.image_utils 中的处理函数，
+使同一组编辑可以脱离界面执行（批处理、编辑配方回放等）。
+
+每个操作都是 func(image, **parameters) 形式的纯函数，参数名称和默认值与界面发出的参数保持一致。
+受GIL限制的算子通过 utils.process_pool.run_operator 按配置的后端执行。
+"""
+from utils.image_utils import (
+    adjust_brightness_contrast,
+    apply_gaussian_blur,
+    apply_median_blur,
+    apply_bilateral_filter,
+    convert_to_grayscale,
+    apply_threshold,
+    apply_adaptive_threshold,
+    rotate_image,
+    flip_image,
+    crop_image,
+    apply_laplacian_sharpen,
+    apply_usm_sharpen,
+    denoise_frequency,
+    denoise_nlmeans,
+    denoise_wavelet,
+    apply_histogram_equalization,
+    adjust_exposure,
+    adjust_highlights,
+    adjust_shadows,
+    adjust_local_exposure,
+    auto_contrast_enhancement,
+    auto_color_correction,
+    auto_white_balance,
+    auto_image_enhance
+)
+from utils.process_pool import run_operator, run_tiled_operator
+from utils.super_resolution import upscale_tiled
+
+def _brightness_contrast(image, brightness=0, contrast=1.0):
+    return adjust_brightness_contrast(image, brightness, contrast)
+
+def _blur(image, blur_type='gaussian', kernel_size=3, sigma=0, d=9, sigma_color=75, sigma_space=75):
+    if blur_type == 'gaussian':
+        return apply_gaussian_blur(image, kernel_size, sigma)
+    if blur_type == 'median':
+        return apply_median_blur(image, kernel_size)
+    if blur_type == 'bilateral':
+        return apply_bilateral_filter(image, d, sigma_color, sigma_space)
+    raise ValueError(f"未知的模糊类型: {blur_type}")
+
+def _rotate(image, angle=0, scale=1.0, expand=False):
+    return rotate_image(image, angle, center=None, scale=scale, expand=expand)
+
+def _flip(image, flip_code=1):
+    return flip_image(image, flip_code)
+
+def _crop(image, x=0, y=0, width=100, height=100):
+    return crop_image(image, x, y, width, height)
+
+def _laplacian(image, kernel_size=3, strength=1.0):
+    return apply_laplacian_sharpen(image, kernel_size, strength)
+
+def _usm(image, radius=5, amount=1.0, threshold=0):
+    return run_operator(apply_usm_sharpen, image, radius=radius, amount=amount, threshold=threshold)
+
+def _frequency_denoise(image, radius=30):
+    return denoise_frequency(image, radius)
+
+def _nlmeans_denoise(image, h=10, h_color=10, template_window_size=7, search_window_size=21):
+    return run_tiled_operator(denoise_nlmeans, image, h=h, h_color=h_color,
+                              template_window_size=template_window_size,
+                              search_window_size=search_window_size)
+
+def _wavelet_denoise(image, threshold_scale=1.0, wavelet='sym8', level=2):
+    return denoise_wavelet(image, threshold_scale, wavelet, level)
+
+def _super_resolution(image, scale=2):
+    return upscale_tiled(image, scale=scale)
+
+def _histogram_equalization(image, per_channel=False):
+    return apply_histogram_equalization(image, per_channel)
+
+def _exposure(image, exposure=0.0):
+    return adjust_exposure(image, exposure)
+
+def _highlights(image, highlights=0.0):
+    return run_operator(adjust_highlights, image, highlights=highlights)
+
+def _shadows(image, shadows=0.0):
+    return run_operator(adjust_shadows, image, shadows=shadows)
+
+def _local_exposure(image, center_x=0, center_y=0, radius=100, strength=0.5):
+    return adjust_local_exposure(image, center_x, center_y, radius, strength)
+
+def _auto_contrast(image, clip_limit=2.0, tile_grid_size=(8, 8)):
+    # JSON中的元组会被读成列表，OpenCV需要元组
+    return auto_contrast_enhancement(image, clip_limit, tuple(tile_grid_size))
+
+def _auto_color(image, saturation_scale=1.3, vibrance_scale=1.2):
+    return auto_color_correction(image, saturation_scale, vibrance_scale)
+
+def _auto_white_balance(image, method='adaptive'):
+    return run_operator(auto_white_balance, image, method=method)
+
+def _auto_all(image, contrast=True, color=True, white_balance=True):
+    return auto_image_enhance(image, contrast=contrast, color=color, white_balance=white_balance)
+
+def _one_click_optimize(image, enable_contrast=True, enable_color=True, enable_wb=True):
+    # 一键优化面板使用不同的参数名称
+    return auto_image_enhance(image, contrast=enable_contrast, color=enable_color, white_balance=enable_wb)
+
+def _grayscale(image):
+    return convert_to_grayscale(image)
+
+def _threshold(image, threshold=127, max_value=255, threshold_type=0):
+    return apply_threshold(image, threshold, max_value, threshold_type)
+
+def _adaptive_threshold(image, max_value=255, block_size=11, c=2):
+    return apply_adaptive_threshold(image, max_value, block_size, c)
+
+# 操作名称 -> 处理函数
+OPERATIONS = {
+    'brightness_contrast': _brightness_contrast,
+    'blur': _blur,
+    'rotate': _rotate,
+    'flip': _flip,
+    'crop': _crop,
+    'laplacian': _laplacian,
+    'usm': _usm,
+    'frequency_denoise': _frequency_denoise,
+    'nlmeans_denoise': _nlmeans_denoise,
+    'wavelet_denoise': _wavelet_denoise,
+    'super_resolution': _super_resolution,
+    'histogram_equalization': _histogram_equalization,
+    'exposure': _exposure,
+    'highlights': _highlights,
+    'shadows': _shadows,
+    'local_exposure': _local_exposure,
+    'auto_contrast': _auto_contrast,
+    'auto_color': _auto_color,
+    'auto_white_balance': _auto_white_balance,
+    'auto_all': _auto_all,
+    'one_click_optimize': _one_click_optimize,
+    'grayscale': _grayscale,
+    'threshold': _threshold,
+    'adaptive_threshold': _adaptive_threshold,
+}
+
+def get_operation(name):
+    """按名称获取处理函数
+
+    Args:
+        name: 操作名称
+
+    Returns:
+        callable: func(image, **parameters)
+    """
+    try:
+        return OPERATIONS[name]
+    except KeyError:
+        raise ValueError(f"未知的操作: {name}") from None
+
+def run_operation(image, name, parameters=None):
+    """对图像执行指定名称的操作
+
+    Args:
+        image: 输入图像
+        name: 操作名称
+        parameters: 操作参数
+
+    Returns:
+        ndarray: 处理后的图像
+    """
+    return get_operation(name)(image, **(parameters or {}))
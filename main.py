@@ -1,17 +1,16 @@
 # This Python file uses the following encoding: utf-8
 import sys
-import gc
-import psutil
+from utils.startup import startup_timer  # 最先导入，作为启动计时的起点
 from PySide6.QtWidgets import QApplication, QSplashScreen
 from PySide6.QtGui import QPixmap
-from PySide6.QtCore import Qt, QTimer
-from app.main_window import MainWindow
+from PySide6.QtCore import Qt
 from app.config import config
+from utils.system_resources import memory_usage
 
 def check_system_resources():
-    """检查系统资源是否满足要求"""
-    memory = psutil.virtual_memory()
-    available_memory_gb = memory.available / (1024 * 1024 * 1024)
+    """检查系统资源是否满足要求（在容器中以cgroup内存限制为准）"""
+    memory = memory_usage()
+    available_memory_gb = memory['available'] / (1024 * 1024 * 1024)
     
     if available_memory_gb < 1.0:  # 可用内存小于1GB
         print(f"警告: 可用内存较低 ({available_memory_gb:.1f}GB)，应用可能运行缓慢")
@@ -19,34 +18,55 @@ def check_system_resources():
     return True
 
 if __name__ == "__main__":
-    # 强制进行一次垃圾回收，确保启动时内存占用最小
-    gc.collect()
+    startup_timer.mark('imports')
     
     # 创建应用
     app = QApplication(sys.argv)
     app.setApplicationName("ImagePro")
+    startup_timer.mark('qapplication')
     
-    # 创建并显示启动画面
+    # 创建并显示启动画面，numpy、OpenCV和主窗口模块在启动画面显示后才导入
     splash_pixmap = QPixmap(500, 300)
     splash_pixmap.fill(Qt.white)
     
     splash = QSplashScreen(splash_pixmap)
     splash.show()
     app.processEvents()
+    startup_timer.mark('splash')
     
     # 检查系统资源
     check_system_resources()
     
-    # 创建主窗口
+    # 按资源限制和实测性能调整分块大小、线程池和缓存预算（首次启动时测量并保存）
+    from app.performance_profile import load_or_measure_profile
+    if config.get('performance.adaptive_profile', True):
+        splash.showMessage("正在测量系统性能...", Qt.AlignBottom | Qt.AlignHCenter, Qt.black)
+        load_or_measure_profile()
+    startup_timer.mark('profile')
+    
+    # 按配置设置OpenCV线程数和优化开关，避免与应用自身的并行争用核心
+    from utils.concurrency import get_concurrency_manager
+    get_concurrency_manager()
+    
+    # 导入并创建主窗口
     splash.showMessage("正在初始化界面...", Qt.AlignBottom | Qt.AlignHCenter, Qt.black)
+    from app.main_window import MainWindow
+    startup_timer.mark('main_window_import')
     window = MainWindow()
+    startup_timer.mark('main_window')
+    
+    # 主窗口首次绘制完成时输出启动耗时
+    def on_first_paint():
+        startup_timer.mark('first_paint')
+        print(startup_timer.report())
     
-    # 延迟显示主窗口，让启动画面多显示一会儿
-    def show_main_window():
-        window.show()
-        splash.finish(window)
+    window.image_view.first_painted.connect(on_first_paint)
+    window.show()
+    splash.finish(window)
     
-    QTimer.singleShot(1000, show_main_window)
+    # 配置了进程池后端时，在后台提前启动工作进程，首次处理不必等待进程启动和模块导入
+    from utils.process_pool import warm_up_in_background
+    warm_up_in_background()
     
     # 运行应用
     sys.exit(app.exec())
@@ -0,0 +1,220 @@
+"""
+编辑配方模块
+
+主要功能：
+1. 编辑配方
+   - 以操作名称和参数的形式记录编辑链，名称与界面发出的处理请求一致
+   - 支持JSON序列化，可保存、加载并应用到其他图像
+
+2. 配方回放
+   - 中间结果按 (源图像, 配方前缀) 的哈希键缓存
+   - 修改第N步后重新回放，只需重新计算第N步及之后的步骤
+   - 缓存按字节数限制，淘汰最久未使用的结果
+
+"""
+import hashlib
+import json
+from collections import OrderedDict
+import numpy as np
+from app.config import config
+
+RECIPE_VERSION = 1
+
+def image_digest(image):
+    """计算图像内容的哈希值，作为回放缓存键的起点
+
+    Args:
+        image: 图像数组
+
+    Returns:
+        str: 十六进制哈希值
+    """
+    digest = hashlib.sha1()
+    digest.update(f"{image.shape}|{image.dtype}".encode('utf-8'))
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+class EditRecipe:
+    """可序列化的编辑配方"""
+
+    def __init__(self, steps=None, source=None):
+        """初始化编辑配方
+
+        Args:
+            steps: 步骤列表，每步为 {'operation': 名称, 'parameters': 参数字典}
+            source: 源图像路径（仅作记录）
+        """
+        self.steps = [self._normalize_step(step) for step in (steps or [])]
+        self.source = source
+
+    @staticmethod
+    def _normalize_step(step):
+        """统一步骤格式并校验参数可序列化"""
+        if isinstance(step, (tuple, list)):
+            operation, parameters = step
+        else:
+            operation, parameters = step['operation'], step.get('parameters', {})
+        if not isinstance(operation, str):
+            raise ValueError(f"无效的操作名称: {operation}")
+        # 通过一次JSON往返得到规范化的参数（元组变为列表），保证哈希键稳定
+        parameters = json.loads(json.dumps(parameters or {}))
+        return {'operation': operation, 'parameters': parameters}
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __eq__(self, other):
+        return isinstance(other, EditRecipe) and self.steps == other.steps
+
+    def add_step(self, operation, parameters=None):
+        """在末尾追加一步
+
+        Args:
+            operation: 操作名称
+            parameters: 操作参数
+        """
+        self.steps.append(self._normalize_step((operation, parameters)))
+
+    def replace_step(self, index, operation=None, parameters=None):
+        """修改第index步的操作或参数，后续步骤保持不变
+
+        Args:
+            index: 步骤索引
+            operation: 新的操作名称，None表示不变
+            parameters: 新的参数，None表示不变
+        """
+        step = self.steps[index]
+        self.steps[index] = self._normalize_step((
+            operation if operation is not None else step['operation'],
+            parameters if parameters is not None else step['parameters']
+        ))
+
+    def copy(self):
+        """复制配方"""
+        return EditRecipe(self.steps, self.source)
+
+    def prefix_keys(self, source_key):
+        """计算每个配方前缀对应的缓存键
+
+        键按链式哈希计算：key[0] 只依赖源图像，key[i] 依赖 key[i-1] 和第i步，
+        因此修改第N步只会改变 key[N+1] 及之后的键。
+
+        Args:
+            source_key: 源图像哈希值
+
+        Returns:
+            list: 长度为步骤数+1的键列表，key[i] 表示应用前i步后的结果
+        """
+        keys = [hashlib.sha1(source_key.encode('utf-8')).hexdigest()]
+        for step in self.steps:
+            encoded = json.dumps(step, sort_keys=True, separators=(',', ':'))
+            keys.append(hashlib.sha1((keys[-1] + encoded).encode('utf-8')).hexdigest())
+        return keys
+
+    def to_dict(self):
+        return {'version': RECIPE_VERSION, 'source': self.source, 'steps': self.steps}
+
+    @classmethod
+    def from_dict(cls, data):
+        # 兼容只包含步骤列表的简化格式
+        if isinstance(data, list):
+            return cls(data)
+        return cls(data.get('steps', []), data.get('source'))
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=4)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def save(self, file_path):
+        """保存配方到JSON文件"""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+
+    @classmethod
+    def load(cls, file_path):
+        """从JSON文件加载配方"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return cls.from_json(f.read())
+
+class RecipeReplayer:
+    """带中间结果缓存的配方回放器"""
+
+    def __init__(self, max_cache_bytes=None):
+        """初始化回放器
+
+        Args:
+            max_cache_bytes: 中间结果缓存上限（字节），默认读取 performance.recipe_cache_mb
+        """
+        if max_cache_bytes is None:
+            max_cache_bytes = config.get('performance.recipe_cache_mb', 256) * 1024 * 1024
+        self._max_cache_bytes = max_cache_bytes
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self.computed_steps = 0  # 累计实际执行的步骤数，便于观察缓存效果
+
+    def _get(self, key):
+        image = self._cache.get(key)
+        if image is not None:
+            self._cache.move_to_end(key)
+        return image
+
+    def _put(self, key, image):
+        if key in self._cache or image.nbytes > self._max_cache_bytes:
+            return
+        # 缓存只读视图：从缓存取出的中间结果不能被原地修改，
+        # 而步骤返回的数组本身（可能就是源图像或调用方持有的结果）保持可写
+        cached = image.view()
+        cached.flags.writeable = False
+        self._cache[key] = cached
+        self._cache_bytes += image.nbytes
+        while self._cache_bytes > self._max_cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= evicted.nbytes
+
+    def replay(self, source, recipe, run_step, source_key=None):
+        """回放配方
+
+        从缓存中最长的已计算前缀开始，只执行其后的步骤。
+
+        Args:
+            source: 源图像
+            recipe: EditRecipe
+            run_step: 执行单步的函数 run_step(image, operation, parameters)
+            source_key: 源图像哈希值，默认根据像素内容计算
+
+        Returns:
+            ndarray: 回放结果（可写；完全命中缓存时为缓存结果的副本）
+        """
+        if source_key is None:
+            source_key = image_digest(source)
+        keys = recipe.prefix_keys(source_key)
+
+        # 查找已缓存的最长前缀
+        start, image = 0, source
+        for index in range(len(keys) - 1, 0, -1):
+            cached = self._get(keys[index])
+            if cached is not None:
+                start, image = index, cached
+                break
+
+        if start == len(recipe.steps) and start > 0:
+            return image.copy()
+        for index in range(start, len(recipe.steps)):
+            step = recipe.steps[index]
+            image = run_step(image, step['operation'], step['parameters'])
+            self.computed_steps += 1
+            self._put(keys[index + 1], image)
+        return image
+
+    def clear(self):
+        """清空缓存"""
+        self._cache.clear()
+        self._cache_bytes = 0
+
+    @property
+    def cache_bytes(self):
+        """当前缓存占用的字节数"""
+        return self._cache_bytes
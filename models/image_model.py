@@ -11,16 +11,22 @@
    - 使用双端队列实现撤销/重做功能
    - 自动限制历史记录大小
    - 支持历史状态切换
+   - 同步记录可序列化的编辑配方，支持导出和带缓存的回放
 
 3. 异步处理机制
    - 使用线程池处理图像操作
    - 实现非阻塞的图像处理
    - 支持任务队列管理
+   - 耗时较长的操作在后台线程中分块执行，汇报进度并可取消，完成后在主线程提交结果
 
 4. 内存优化
    - 实现图像数据缓存机制
    - 自动垃圾回收
    - 内存使用监控
+   - 超大图像以分块方式流式读取，界面只显示缩略预览
+   - 为当前图像维护延迟计算的图像金字塔，缩小显示、直方图和统计量使用其中合适的一层
+   - 连续的几何变换（旋转、缩放）合成为一个矩阵，从变换前的图像只重采样一次
+   - 缓存预览前图像的频谱和小波分解，频域、小波去噪调整参数时不重复正向变换
 
 5. 信号通知
    - 图像变化通知
@@ -30,8 +36,7 @@
 """
 import cv2
 import numpy as np
-from PySide6.QtGui import QImage
-from PySide6.QtCore import QObject, Signal
+from PySide6.QtCore import QObject, Qt, Signal
 from collections import deque
 from app.config import config
 import threading
@@ -39,6 +44,25 @@ from queue import Queue, Empty
 import time
 import gc
 import weakref
+from utils.concurrency import get_concurrency_manager
+from utils.memory_monitor import memory_monitor
+from utils.image_io import save_image_atomic
+from utils.image_utils import CHANNEL_ORDER, frequency_spectrum, wavelet_decomposition, warp_affine_chain
+from utils.qt_utils import numpy_to_qimage
+from utils.process_pool import OperationCancelled, TILEABLE_OPERATORS, run_tiled_operator
+from utils.profiler import profiler
+from utils.tiled_image import TiledImage, open_tiled_image, read_image_size
+from models.edit_recipe import EditRecipe, RecipeReplayer, image_digest
+from models.image_pyramid import ImagePyramid
+
+def _buffer_owner(image):
+    """返回持有图像像素内存的数组
+    
+    翻转、90度旋转和裁剪的结果是共享原图内存的视图，统计内存占用时按底层数组去重。
+    """
+    while isinstance(image.base, np.ndarray):
+        image = image.base
+    return image
 
 class ImageModel(QObject):
     """图像数据模型类，负责图像数据的存储和管理"""
@@ -47,6 +71,11 @@ class ImageModel(QObject):
     image_changed = Signal()  # 图像数据改变信号
     history_changed = Signal()  # 历史记录改变信号
     error_occurred = Signal(str)  # 错误信号
+    save_progress = Signal(int)  # 后台保存进度信号（百分比）
+    save_finished = Signal(bool, str)  # 后台保存完成信号（是否成功，文件路径或错误信息）
+    operation_progress = Signal(int)  # 后台处理进度信号（百分比）
+    operation_finished = Signal(bool, str)  # 后台处理完成信号（是否成功，失败或取消的原因）
+    _operation_done = Signal()  # 后台处理线程结束，在主线程中提交结果
     
     def __init__(self):
         super().__init__()
@@ -59,6 +88,12 @@ class ImageModel(QObject):
         self._history = deque(maxlen=self._max_history_size)
         self._history_index = -1  # 当前历史记录索引
         
+        # 与历史记录一一对应的编辑配方步骤，None表示未记录名称的操作
+        self._recipe_history = deque(maxlen=self._max_history_size)
+        self._source_path = None  # 当前图像的文件路径
+        self._source_key = None  # 原始图像的哈希值，首次回放时计算
+        self._replayer = RecipeReplayer()
+        
         # 处理队列
         self._process_queue = Queue() # 线程安全的队列，用于存储待处理的图像操作任务
         self._result_queue = Queue() # 线程安全的队列，用于存储处理结果
@@ -75,6 +110,33 @@ class ImageModel(QObject):
         
         # 图像像素数据引用计数，用于重用内存
         self._pixel_data_refs = {}
+        
+        # 后台保存线程
+        self._save_thread = None
+        
+        # 后台处理线程：结果 (开始时的图像, 结果, 异常) 由主线程取走并提交
+        self._operation_thread = None
+        self._operation_cancel = threading.Event()
+        self._operation_result = None
+        self._operation_lock = threading.Lock()
+        self._operation_done.connect(self._commit_async_result, Qt.QueuedConnection)
+        
+        # 分块模式：缩略预览图的id -> (预览图, 对应的全分辨率分块图像)
+        self._tiled_images = {}
+        self._preview_source = None  # 预览开始时的分块图像
+        self._last_preview = None  # 最近一次预览的操作 (func, args, kwargs)
+        
+        # 图像金字塔：图像id -> ImagePyramid，只保留当前、原始和预览图像的金字塔
+        self._pyramids = {}
+        
+        # 几何变换链：变换结果的id -> (结果, 变换前的图像, [(仿射矩阵, 输出尺寸), ...])
+        self._affine_chains = {}
+        
+        # 频域去噪的正向变换缓存：(图像, frequency_spectrum的结果)，只保留最近一幅图像
+        self._spectrum = None
+        
+        # 小波去噪的分解缓存：(图像, (小波, 层数), wavelet_decomposition的结果)，只保留最近一幅图像
+        self._wavelet = None
     
     @property
     def original_image(self):
@@ -86,6 +148,126 @@ class ImageModel(QObject):
         """获取当前图像"""
         return self._current_image
     
+    @property
+    def channel_order(self):
+        """获取当前图像的通道顺序
+        
+        Returns:
+            str: 彩色图像为 'BGR'（或带透明通道的 'BGRA'），灰度图像为 'GRAY'，无图像时为None
+        """
+        image = self._current_image
+        if image is None:
+            return None
+        if image.ndim == 2 or image.shape[2] == 1:
+            return 'GRAY'
+        if image.shape[2] == 4:
+            return CHANNEL_ORDER + 'A'
+        return CHANNEL_ORDER
+    
+    @property
+    def tiled_image(self):
+        """获取当前图像对应的全分辨率分块图像，非分块模式时为None"""
+        return self._tiled_source(self._current_image)
+    
+    def is_tiled(self):
+        """检查当前图像是否处于分块模式（显示的是缩略预览）
+        
+        Returns:
+            bool: 是否为分块模式
+        """
+        return self.tiled_image is not None
+    
+    def _tiled_source(self, image):
+        """查找预览图对应的分块图像"""
+        if image is None:
+            return None
+        if image is self._preview_image and self._preview_source is not None:
+            return self._preview_source
+        entry = self._tiled_images.get(id(image))
+        if entry is not None and entry[0] is image:
+            return entry[1]
+        return None
+    
+    def _register_tiled(self, tiled):
+        """为分块图像生成缩略预览图并登记对应关系
+        
+        Args:
+            tiled: 全分辨率分块图像
+        
+        Returns:
+            ndarray: 用于显示和预览的缩略图
+        """
+        max_pixels = int(config.get('performance.image_downscale_threshold', 20) * 1000000)
+        proxy = tiled.get_overview(max_pixels)
+        self._tiled_images[id(proxy)] = (proxy, tiled)
+        self._pixel_data_refs[id(proxy)] = 1
+        return proxy
+    
+    def _job(self, operation_func, image, tiled=None):
+        """以处理任务的形式执行操作，记录耗时和核心利用率
+        
+        开始前按处理期间驻留内存的大小检查内存预算，必要时先释放缓存。
+        """
+        memory_monitor.reserve(self._working_set(image, tiled))
+        shape = (tiled if tiled is not None else image).shape
+        return get_concurrency_manager().job(getattr(operation_func, '__name__', 'operation'), shape[0] * shape[1])
+    
+    def _working_set(self, image, tiled=None, overlap=None):
+        """估算处理期间驻留内存的字节数
+        
+        非分块模式下为与输入同样大小的结果缓冲区。分块模式下结果写入磁盘映射文件，
+        内存中只有同时处理的分块（含邻域，输入和结果各一份）和新的缩略预览图。
+        
+        Args:
+            image: 输入图像（分块模式下为缩略预览图）
+            tiled: 分块模式下对应的全分辨率分块图像
+            overlap: 分块之间的重叠宽度，为None时使用 performance.tile_overlap
+        
+        Returns:
+            int: 字节数
+        """
+        if tiled is None:
+            return int(np.prod(image.shape))
+        if overlap is None:
+            overlap = config.get('performance.tile_overlap', 16)
+        tile = config.get('performance.tile_size', 256) + 2 * overlap
+        workers = max(1, config.get('performance.thread_pool_size', 4))
+        channels = tiled.shape[2] if len(tiled.shape) > 2 else 1
+        return tile * tile * channels * workers * 2 + int(np.prod(image.shape))
+    
+    def _apply_tiled(self, tiled, operation_func, args, kwargs):
+        """在全分辨率分块图像上逐块执行操作，返回新的缩略预览图"""
+        overlap = config.get('performance.tile_overlap', 16)
+        result = tiled.map_tiles(operation_func, *args, overlap=overlap, **kwargs)
+        return self._register_tiled(result)
+    
+    def _apply_affine(self, image, operation_func, args, kwargs):
+        """执行几何变换操作
+        
+        操作函数带有 affine 属性（输入形状 -> (2x3 仿射矩阵, 输出尺寸)）。
+        图像本身是几何变换的结果时，把本次变换与之前的变换合成，从变换前的图像只重采样一次，
+        避免每一步插值累积的模糊和误差。
+        """
+        step = operation_func.affine(image.shape, *args, **kwargs)
+        entry = self._affine_chains.get(id(image))
+        if entry is not None and entry[0] is image:
+            source, steps = entry[1], entry[2] + [step]
+            result = warp_affine_chain(source, steps)
+        else:
+            source, steps = image, [step]
+            result = operation_func(image, *args, **kwargs)
+        self._prune_affine_chains()
+        self._affine_chains[id(result)] = (result, source, steps)
+        return result
+    
+    def _prune_affine_chains(self):
+        """丢弃结果或变换前的图像已不在历史记录中的变换链，避免持有已释放的图像"""
+        live = {id(image) for image in self._history}
+        live.update(id(image) for image in (self._current_image, self._original_image) if image is not None)
+        for key, entry in list(self._affine_chains.items()):
+            if key not in live or id(entry[1]) not in live:
+                del self._affine_chains[key]
+    
     def _process_worker(self):
         """
         处理线程工作函数
@@ -100,7 +282,8 @@ class ImageModel(QObject):
                 
                 # 执行处理
                 func, args, kwargs = task
-                result = func(*args, **kwargs)
+                with get_concurrency_manager().job(getattr(func, '__name__', 'process')):
+                    result = func(*args, **kwargs)
                 
                 # 返回结果
                 self._result_queue.put(result)
@@ -125,6 +308,11 @@ class ImageModel(QObject):
             # 删除当前位置之后的历史记录
             while len(self._history) > self._history_index + 1:
                 self._history.pop()
+        while len(self._recipe_history) > self._history_index + 1:
+            self._recipe_history.pop()
+        
+        # 新的历史状态在当前配方后追加一个待记录的步骤
+        self._recipe_history.append(self._current_recipe_steps() + [None])
         
         # 添加新图像（智能拷贝，避免不必要的内存分配）
         # 只在必要时进行深拷贝，减少内存消耗
@@ -137,10 +325,23 @@ class ImageModel(QObject):
             # 添加新引用
             img_copy = image.copy()
             self._pixel_data_refs[id(img_copy)] = 1
+            tiled = self._tiled_source(image)
+            if tiled is not None:
+                self._tiled_images[id(img_copy)] = (img_copy, tiled)
             self._history.append(img_copy)
         
         self._history_index = len(self._history) - 1
         
+        # 撤销历史超过字节预算时丢弃最早的状态；
+        # 刚压入的状态通常在操作完成后就不再是当前图像，预先计入历史占用
+        budget = config.get('performance.history_budget_mb', 0) * 1024 * 1024
+        if budget:
+            owner = _buffer_owner(image)
+            pending = owner.nbytes if id(owner) in self._referenced_ids() else 0
+            excess = self.history_bytes() + pending - budget
+            if excess > 0:
+                self.trim_history(excess)
+        
         # 检查是否需要主动清理内存
         self._check_memory_cleanup()
     
@@ -167,11 +368,33 @@ class ImageModel(QObject):
             # 强制执行垃圾回收
             gc.collect()
     
+    def _clear_image_state(self):
+        """释放当前图像、历史记录和各种缓存"""
+        self._current_image = None
+        self._original_image = None
+        self._preview_image = None
+        
+        # 清理历史记录
+        self._history.clear()
+        self._history_index = -1
+        self._recipe_history.clear()
+        self._replayer.clear()
+        self._pyramids.clear()
+        self._affine_chains.clear()
+        self._spectrum = None
+        self._wavelet = None
+        self._release_tiled_images()
+        
+        # 尝试回收内存
+        gc.collect()
+    
     def load_image(self, file_path):
         """
         加载图像函数
-        读取图像，并检查图像大小是否超过限制，如果超过限制，则抛出异常。（出于性能，资源考虑）
-        将图像转换为RGB格式，并更新图像数据。（opencv读取的图像为BGR格式）
+        读取图像，并检查图像大小是否超过限制。（出于性能，资源考虑）
+        超过限制的TIFF/PNG图像不整体解码，而是以分块方式流式读取，
+        当前图像为其缩略预览，处理和保存在全分辨率分块图像上进行。
+        图像保持OpenCV解码得到的BGR通道顺序，不做颜色空间转换。
         
         Args:
             file_path (str): 图像文件路径
@@ -179,77 +402,174 @@ class ImageModel(QObject):
         try:
             # 清理先前可能的大型图像数据
             if self._current_image is not None or self._original_image is not None:
-                # 释放之前的图像引用
-                self._current_image = None
-                self._original_image = None
-                self._preview_image = None
-                
-                # 清理历史记录
-                self._history.clear()
-                self._history_index = -1
-                
-                # 尝试回收内存
-                gc.collect()
+                self._clear_image_state()
             
-            # 读取图像
-            image = cv2.imread(file_path, cv2.IMREAD_COLOR)
-            if image is None:
-                raise ValueError(f"无法加载图像: {file_path}")
-            
-            # 检查图像大小
+            # 解码前先从文件头检查图像大小，超过限制时改用分块读取
             max_size = config.get('image_processing.max_image_size', (10000, 10000))
-            if image.shape[0] > max_size[0] or image.shape[1] > max_size[1]:
-                raise ValueError(f"图像尺寸超过限制: {max_size}")
+            image_size = read_image_size(file_path)
+            if image_size is not None and (image_size[0] > max_size[0] or image_size[1] > max_size[1]):
+                image = self._register_tiled(open_tiled_image(file_path))
+            else:
+                # 解码前按文件头给出的尺寸检查内存预算
+                if image_size is not None:
+                    memory_monitor.reserve(image_size[0] * image_size[1] * 3)
+                # 读取图像
+                image = cv2.imread(file_path, cv2.IMREAD_COLOR)
+                if image is None:
+                    raise ValueError(f"无法加载图像: {file_path}")
+                
+                # 检查图像大小（文件头无法识别尺寸的格式）
+                if image.shape[0] > max_size[0] or image.shape[1] > max_size[1]:
+                    raise ValueError(f"图像尺寸超过限制: {max_size}")
             """
             图像数组的shape通常包含三个维度：
             第一个维度(shape[0])：图像的高度（行数）
             第二个维度(shape[1])：图像的宽度（列数）
-            第三个维度(shape[2])：颜色通道数（如RGB图像为3，灰度图像为1）
+            第三个维度(shape[2])：颜色通道数（如BGR图像为3，灰度图像为1）
             """
             
-            # 转换为RGB格式
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # 更新图像数据
-            self._original_image = image.copy()
-            self._current_image = image.copy()
-            self._preview_image = None  # 清除预览状态
-            
-            # 记录像素数据引用
-            self._pixel_data_refs[id(self._original_image)] = 1
-            self._pixel_data_refs[id(self._current_image)] = 1
-            
-            # 清空历史记录并添加当前图像
-            self._history.clear()
-            self._history.append(self._current_image)
-            self._history_index = 0
-            
-            # 发出信号
-            self.image_changed.emit()
-            self.history_changed.emit()
-            
+            self._set_new_image(image, file_path)
             return True
         except Exception as e:
             self.error_occurred.emit(str(e))
             return False
     
-    def save_image(self, file_path):
-        """保存图像，主要是调用opencv的imwrite函数
+    def set_image(self, image, source_path=None):
+        """以内存中生成的图像（如拼接结果）作为新的原始图像，清空历史记录
         
+        Args:
+            image: BGR顺序的图像
+            source_path: 图像的来源路径，没有时为None
+        
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            if image is None or image.size == 0:
+                raise ValueError("图像为空")
+            if self._current_image is not None or self._original_image is not None:
+                self._clear_image_state()
+            self._set_new_image(image, source_path)
+            return True
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+            return False
+    
+    def _set_new_image(self, image, source_path):
+        """设置新的原始图像并重置历史记录和编辑配方"""
+        # 更新图像数据（图像数组不会被原地修改，原始图像和当前图像可共享同一缓冲区）
+        self._original_image = image
+        self._current_image = image
+        self._preview_image = None  # 清除预览状态
+        
+        # 记录像素数据引用
+        self._pixel_data_refs[id(self._current_image)] = 1
+        
+        # 清空历史记录并添加当前图像
+        self._history.clear()
+        self._history.append(self._current_image)
+        self._history_index = 0
+        
+        # 新图像的编辑配方为空
+        self._recipe_history.clear()
+        self._recipe_history.append([])
+        self._source_path = source_path
+        self._source_key = None
+        
+        # 发出信号
+        self.image_changed.emit()
+        self.history_changed.emit()
+    
+    def save_image(self, file_path, options=None):
+        """同步保存图像，先编码再原子地写入目标文件
+
         Args:
             file_path (str): 保存路径
+            options (dict): 编码设置，如 jpeg_quality、png_compression、webp_quality
         """
         try:
             if self._current_image is None:
                 raise ValueError("没有可保存的图像")
-            
-            # 转换为BGR格式（OpenCV保存图像需要BGR格式）
-            bgr_image = cv2.cvtColor(self._current_image, cv2.COLOR_RGB2BGR)
-            cv2.imwrite(file_path, bgr_image)
+
+            tiled = self.tiled_image
+            if tiled is not None:
+                # 分块模式保存全分辨率图像而不是缩略预览
+                tiled.save(file_path, options)
+            else:
+                # 内部图像已是BGR顺序，可直接交给OpenCV编码
+                save_image_atomic(self._current_image, file_path, options)
             return True
         except Exception as e:
             self.error_occurred.emit(str(e))
             return False
+
+    def save_image_async(self, file_path, options=None):
+        """在后台线程中保存图像，不阻塞界面
+
+        编码和写入都在工作线程中完成，通过save_progress信号汇报进度，
+        完成后发出save_finished信号。
+
+        Args:
+            file_path (str): 保存路径
+            options (dict): 编码设置，如 jpeg_quality、png_compression、webp_quality
+
+        Returns:
+            bool: 是否成功启动保存任务
+        """
+        if self._current_image is None:
+            self.error_occurred.emit("没有可保存的图像")
+            return False
+        if self.is_saving():
+            self.error_occurred.emit("上一次保存尚未完成")
+            return False
+
+        # 图像数组只会被替换而不会被原地修改，保存引用即可获得一致的快照
+        image = self._current_image
+        self._save_thread = threading.Thread(
+            target=self._save_worker, args=(image, str(file_path), options, self.tiled_image)
+        )
+        self._save_thread.daemon = True
+        self._save_thread.start()
+        return True
+
+    def _save_worker(self, image, file_path, options, tiled=None):
+        """后台保存线程工作函数
+
+        Args:
+            image: 要保存的图像
+            file_path: 保存路径
+            options: 编码设置
+            tiled: 分块模式下对应的全分辨率分块图像
+        """
+        try:
+            if tiled is not None:
+                tiled.save(file_path, options, self.save_progress.emit)
+            else:
+                save_image_atomic(image, file_path, options, self.save_progress.emit)
+            self.save_finished.emit(True, file_path)
+        except Exception as e:
+            self.save_finished.emit(False, str(e))
+
+    def is_saving(self):
+        """检查是否有正在进行的后台保存
+
+        Returns:
+            bool: 是否正在保存
+        """
+        return self._save_thread is not None and self._save_thread.is_alive()
+
+    def wait_for_save(self, timeout=None):
+        """等待后台保存完成
+
+        Args:
+            timeout: 超时时间（秒），None表示一直等待
+
+        Returns:
+            bool: 保存线程是否已结束
+        """
+        if self._save_thread is not None:
+            self._save_thread.join(timeout)
+        return not self.is_saving()
     
     def apply_operation(self, operation_func, *args, **kwargs):
         """应用图像处理操作
@@ -262,18 +582,29 @@ class ImageModel(QObject):
         if self._current_image is None:
             return False
         
+        pushed = False
         try:
             # 如果有预览状态，先恢复
             base_image = self._current_image
             if self._preview_image is not None:
                 base_image = self._preview_image
-                self._preview_image = None
+            tiled = self._tiled_source(base_image)
+            self._preview_image = None
+            self._preview_source = None
             
             # 保存当前状态到历史记录
             self._add_to_history(base_image)
+            pushed = True
             
-            # 应用操作
-            result = operation_func(base_image, *args, **kwargs)
+            # 应用操作，分块模式下在全分辨率图像上逐块执行
+            with self._job(operation_func, base_image, tiled), profiler.phase('compute') as phase:
+                if tiled is not None:
+                    result = self._apply_tiled(tiled, operation_func, args, kwargs)
+                elif hasattr(operation_func, 'affine'):
+                    result = self._apply_affine(base_image, operation_func, args, kwargs)
+                else:
+                    result = operation_func(base_image, *args, **kwargs)
+                phase['bytes'] = getattr(result, 'nbytes', 0)
             if result is not None:
                 self._current_image = result
                 # 记录新图像的引用
@@ -284,14 +615,205 @@ class ImageModel(QObject):
             self.history_changed.emit()
             return True
         except Exception as e:
+            if pushed:
+                # 操作失败时撤回刚压入的历史状态，不留下无法记入配方的步骤
+                self._discard_last_history()
             self.error_occurred.emit(str(e))
             return False
     
+    def _discard_last_history(self):
+        """撤回 _add_to_history 最近压入的历史状态及其待记录的配方步骤"""
+        image = self._history.pop()
+        if len(self._recipe_history) > len(self._history):
+            self._recipe_history.pop()
+        self._history_index = len(self._history) - 1
+        if all(other is not image for other in (*self._history, self._current_image, self._original_image)):
+            self._pixel_data_refs.pop(id(image), None)
+            self._tiled_images.pop(id(image), None)
+    
+    def apply_operation_async(self, operation_func, **kwargs):
+        """在后台线程中按分块执行耗时较长的操作，不阻塞界面
+        
+        通过operation_progress信号汇报进度，可用cancel_operation在分块之间取消。
+        结果在主线程中提交到历史记录，之后发出operation_finished信号；
+        处理期间图像已被其他操作改变时丢弃结果。
+        
+        Args:
+            operation_func: 可分块的处理函数（见 utils.process_pool.TILEABLE_OPERATORS），
+                或自行分块、接受progress_callback和cancel_event参数的函数（如超分辨率放大）；
+                后者带有 accepts_tiled 属性时，分块模式下直接处理全分辨率分块图像，可返回TiledImage
+            **kwargs: 操作参数
+        
+        Returns:
+            bool: 是否成功启动处理任务
+        """
+        if self._current_image is None:
+            return False
+        if self.is_processing():
+            self.error_occurred.emit("上一个处理任务尚未完成")
+            return False
+        
+        base_image = self._current_image if self._preview_image is None else self._preview_image
+        tiled = self._tiled_source(base_image)
+        # 在主线程中检查内存预算，需要时释放的缓存只在主线程中访问
+        overlap = None
+        if tiled is not None and operation_func.__name__ in TILEABLE_OPERATORS:
+            overlap = TILEABLE_OPERATORS[operation_func.__name__](**kwargs)
+        memory_monitor.reserve(self._working_set(base_image, tiled, overlap))
+        
+        self._operation_cancel = threading.Event()
+        self._operation_result = None
+        self._operation_thread = threading.Thread(
+            target=self._operation_worker,
+            args=(base_image, tiled, operation_func, kwargs, self._operation_cancel)
+        )
+        self._operation_thread.daemon = True
+        self._operation_thread.start()
+        return True
+    
+    def _operation_worker(self, base_image, tiled, operation_func, kwargs, cancel_event):
+        """后台处理线程工作函数
+        
+        Args:
+            base_image: 开始处理时的图像
+            tiled: 分块模式下对应的全分辨率分块图像
+            operation_func: 处理函数
+            kwargs: 操作参数
+            cancel_event: 取消事件
+        """
+        result, error = None, None
+        try:
+            if operation_func.__name__ not in TILEABLE_OPERATORS:
+                if tiled is not None and not getattr(operation_func, 'accepts_tiled', False):
+                    raise ValueError("分块模式下不支持该操作")
+                result = operation_func(
+                    base_image if tiled is None else tiled, progress_callback=self.operation_progress.emit,
+                    cancel_event=cancel_event, **kwargs
+                )
+            elif tiled is not None:
+                def process(region):
+                    if cancel_event.is_set():
+                        raise OperationCancelled("处理已取消")
+                    return operation_func(region, **kwargs)
+                process.__name__ = operation_func.__name__
+                overlap = TILEABLE_OPERATORS[operation_func.__name__](**kwargs)
+                result = tiled.map_tiles(process, overlap=overlap, progress_callback=self.operation_progress.emit)
+            else:
+                result = run_tiled_operator(
+                    operation_func, base_image, progress_callback=self.operation_progress.emit,
+                    cancel_event=cancel_event, **kwargs
+                )
+        except Exception as e:
+            error = e
+        with self._operation_lock:
+            self._operation_result = (base_image, result, error)
+        self._operation_done.emit()
+    
+    def generate_image_async(self, generator):
+        """在后台线程中生成一幅新图像（如拼接全景图），完成后作为新的原始图像打开
+        
+        与apply_operation_async共用进度、取消和完成信号，结果同样在主线程中提交。
+        
+        Args:
+            generator: 生成函数 generator(progress_callback, cancel_event)，返回BGR顺序的图像，
+                取消时应抛出OperationCancelled
+        
+        Returns:
+            bool: 是否成功启动处理任务
+        """
+        if self.is_processing():
+            self.error_occurred.emit("上一个处理任务尚未完成")
+            return False
+        
+        self._operation_cancel = threading.Event()
+        self._operation_result = None
+        self._operation_thread = threading.Thread(
+            target=self._generate_worker, args=(generator, self._operation_cancel)
+        )
+        self._operation_thread.daemon = True
+        self._operation_thread.start()
+        return True
+    
+    def _generate_worker(self, generator, cancel_event):
+        """后台生成线程工作函数，结果的基准图像记为None"""
+        result, error = None, None
+        try:
+            result = generator(self.operation_progress.emit, cancel_event)
+        except Exception as e:
+            error = e
+        with self._operation_lock:
+            self._operation_result = (None, result, error)
+        self._operation_done.emit()
+    
+    def _commit_async_result(self):
+        """在主线程中提交后台处理的结果，重复调用时不做任何事"""
+        with self._operation_lock:
+            entry, self._operation_result = self._operation_result, None
+        if entry is None:
+            return
+        base_image, result, error = entry
+        current_base = self._current_image if self._preview_image is None else self._preview_image
+        if isinstance(error, OperationCancelled) or self._operation_cancel.is_set():
+            # 取消请求晚于最后一个分块时结果已算完，同样不提交
+            self.operation_finished.emit(False, "处理已取消")
+            return
+        if error is not None:
+            self.error_occurred.emit(str(error))
+            self.operation_finished.emit(False, str(error))
+            return
+        if base_image is None:
+            # 生成的新图像与处理开始时的图像无关，直接替换
+            self.operation_finished.emit(self.set_image(result), "")
+            return
+        if current_base is not base_image:
+            self.operation_finished.emit(False, "图像在处理期间已改变，结果已丢弃")
+            return
+        
+        self._preview_image = None
+        self._preview_source = None
+        self._add_to_history(base_image)
+        if isinstance(result, TiledImage):
+            result = self._register_tiled(result)
+        self._current_image = result
+        self._pixel_data_refs[id(result)] = 1
+        self.image_changed.emit()
+        self.history_changed.emit()
+        self.operation_finished.emit(True, "")
+    
+    def cancel_operation(self):
+        """请求取消正在进行的后台处理，已开始的分块处理完后停止"""
+        self._operation_cancel.set()
+    
+    def is_processing(self):
+        """检查是否有正在进行的后台处理
+        
+        Returns:
+            bool: 是否正在处理
+        """
+        return self._operation_thread is not None and self._operation_thread.is_alive()
+    
+    def wait_for_operation(self, timeout=None):
+        """等待后台处理完成并提交结果
+        
+        Args:
+            timeout: 超时时间（秒），None表示一直等待
+        
+        Returns:
+            bool: 处理线程是否已结束
+        """
+        if self._operation_thread is not None:
+            self._operation_thread.join(timeout)
+        if self.is_processing():
+            return False
+        self._commit_async_result()
+        return True
+    
     def undo(self):
         """撤销操作"""
         if self._history_index > 0:
             # 清除预览状态
             self._preview_image = None
+            self._preview_source = None
             
             self._history_index -= 1
             # 使用引用而非拷贝以节省内存
@@ -306,6 +828,7 @@ class ImageModel(QObject):
         if self._history_index < len(self._history) - 1:
             # 清除预览状态
             self._preview_image = None
+            self._preview_source = None
             
             self._history_index += 1
             # 使用引用而非拷贝以节省内存
@@ -320,14 +843,89 @@ class ImageModel(QObject):
         if self._original_image is not None:
             # 清除预览状态
             self._preview_image = None
+            self._preview_source = None
             
             self._add_to_history(self._original_image)
+            self._recipe_history[-1] = []  # 重置后配方回到空
             self._current_image = self._original_image
             self.image_changed.emit()
             self.history_changed.emit()
             return True
         return False
     
+    def _current_recipe_steps(self):
+        """获取当前历史状态对应的配方步骤"""
+        if 0 <= self._history_index < len(self._recipe_history):
+            return list(self._recipe_history[self._history_index])
+        return []
+    
+    def record_step(self, operation, parameters=None):
+        """为最近一次操作记录名称和参数
+        
+        apply_operation只接收处理函数，操作名称由发起请求的一方（如主窗口）在操作成功后补充。
+        
+        Args:
+            operation: 操作名称，与 MainWindow._on_process_requested 中的名称一致
+            parameters: 操作参数
+        
+        Returns:
+            bool: 是否有待记录的步骤
+        """
+        if not 0 <= self._history_index < len(self._recipe_history):
+            return False
+        steps = self._recipe_history[self._history_index]
+        if not steps or steps[-1] is not None:
+            return False
+        steps[-1] = EditRecipe([(operation, parameters)]).steps[0]
+        return True
+    
+    def get_recipe(self):
+        """获取从原始图像到当前图像的编辑配方
+        
+        Returns:
+            EditRecipe: 编辑配方
+        """
+        steps = self._current_recipe_steps()
+        if any(step is None for step in steps):
+            raise ValueError("编辑历史中包含未记录名称的操作，无法导出配方")
+        return EditRecipe(steps, source=self._source_path)
+    
+    def replay_recipe(self, recipe, run_step):
+        """在原始图像上回放编辑配方，结果作为一次操作加入历史记录
+        
+        中间结果按 (原始图像, 配方前缀) 缓存，修改某一步后再次回放只重新计算该步及之后的步骤。
+        
+        Args:
+            recipe: EditRecipe
+            run_step: 执行单步的函数 run_step(image, operation, parameters)
+        
+        Returns:
+            bool: 是否成功
+        """
+        if self._original_image is None:
+            return False
+        
+        try:
+            if self.is_tiled():
+                raise ValueError("分块模式下不支持配方回放")
+            if self._source_key is None:
+                self._source_key = image_digest(self._original_image)
+            result = self._replayer.replay(self._original_image, recipe, run_step, self._source_key)
+            
+            self._preview_image = None
+            self._preview_source = None
+            self._add_to_history(self._current_image)
+            self._recipe_history[-1] = [dict(step) for step in recipe.steps]
+            self._current_image = result
+            self._pixel_data_refs[id(result)] = 1
+            
+            self.image_changed.emit()
+            self.history_changed.emit()
+            return True
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+            return False
+    
     def to_qimage(self, image=None):
         """将OpenCV图像转换为QImage
         
@@ -342,19 +940,8 @@ class ImageModel(QObject):
         if image is None:
             return None
         
-        # 确保图像是BGR格式
-        if len(image.shape) == 2:  # 灰度图
-            # 避免不必要的转换，直接创建QImage
-            height, width = image.shape
-            bytes_per_line = width
-            return QImage(image.data, width, height, bytes_per_line, QImage.Format_Grayscale8)
-        
-        # 创建QImage
-        height, width, channel = image.shape
-        bytes_per_line = channel * width
-        
-        # 直接使用RGB格式创建QImage，避免额外的颜色空间转换
-        return QImage(image.data, width, height, bytes_per_line, QImage.Format_RGB888)
+        # 内部图像为BGR顺序，直接以Format_BGR888引用像素缓冲区，无需颜色转换
+        return numpy_to_qimage(image)
     
     def get_image(self):
         """获取当前图像
@@ -448,12 +1035,21 @@ class ImageModel(QObject):
         try:
             # 保存当前状态用于恢复
             if self._preview_image is None:
+                self._preview_source = self._tiled_source(self._current_image)
                 self._preview_image = self._current_image.copy()
                 # 记录预览图像引用
                 self._pixel_data_refs[id(self._preview_image)] = 1
+                # 预览前的图像与当前图像内容相同，沿用已计算的频谱
+                if self._spectrum is not None and self._spectrum[0] is self._current_image:
+                    self._spectrum = (self._preview_image, self._spectrum[1])
+                if self._wavelet is not None and self._wavelet[0] is self._current_image:
+                    self._wavelet = (self._preview_image,) + self._wavelet[1:]
             
-            # 基于预览前的图像应用操作
-            result = operation_func(self._preview_image.copy(), *args, **kwargs)
+            # 基于预览前的图像应用操作（分块模式下只作用于缩略预览图）
+            self._last_preview = (operation_func, args, kwargs)
+            with self._job(operation_func, self._preview_image), profiler.phase('compute') as phase:
+                result = operation_func(self._preview_image.copy(), *args, **kwargs)
+                phase['bytes'] = self._preview_image.nbytes + getattr(result, 'nbytes', 0)
             if result is not None:
                 # 更新当前图像但不记录历史
                 self._current_image = result
@@ -472,14 +1068,268 @@ class ImageModel(QObject):
         if self._current_image is None:
             return False
         
+        # 分块模式下预览只作用于缩略图，需要在全分辨率图像上重新执行预览的操作
+        if self._preview_source is not None and self._last_preview is not None:
+            func, args, kwargs = self._last_preview
+            try:
+                with self._job(func, self._current_image, self._preview_source), profiler.phase('compute') as phase:
+                    self._current_image = self._apply_tiled(self._preview_source, func, args, kwargs)
+                    phase['bytes'] = self._current_image.nbytes
+            except Exception as e:
+                self.error_occurred.emit(str(e))
+                return False
+            self.image_changed.emit()
+        
         # 保存当前状态到历史记录
         self._add_to_history(self._preview_image if self._preview_image is not None else self._current_image)
         self._preview_image = None  # 清除预览状态
+        self._preview_source = None
         
         # 发出历史变化信号
         self.history_changed.emit()
         return True
     
+    def _release_tiled_images(self):
+        """关闭所有分块图像，释放文件句柄和磁盘映射"""
+        for _, tiled in self._tiled_images.values():
+            tiled.close()
+        self._tiled_images.clear()
+        self._preview_source = None
+        self._last_preview = None
+    
+    def _referenced_ids(self):
+        """当前图像、原始图像和预览图像的像素内存（底层数组）的id，这些数据不能通过清理缓存释放"""
+        return {id(_buffer_owner(image)) for image in (self._current_image, self._original_image, self._preview_image)
+                if image is not None}
+    
+    def history_bytes(self):
+        """撤销历史额外占用的字节数（不含当前、原始和预览图像，共享内存的几何变换视图不重复计算）"""
+        pinned = self._referenced_ids()
+        owners = (_buffer_owner(image) for image in self._history)
+        unique = {id(owner): owner.nbytes for owner in owners if id(owner) not in pinned}
+        return sum(unique.values())
+    
+    def trim_history(self, bytes_needed):
+        """从最早的历史状态开始丢弃，直到释放足够的内存
+        
+        至少保留最近一步撤销所需的状态，编辑配方历史同步丢弃。
+        
+        Args:
+            bytes_needed: 需要释放的字节数
+        
+        Returns:
+            int: 实际释放的字节数
+        """
+        freed = 0
+        pinned = self._referenced_ids()
+        while freed < bytes_needed and self._history_index > 1:
+            image = self._history.popleft()
+            if self._recipe_history:
+                self._recipe_history.popleft()
+            self._history_index -= 1
+            if all(other is not image for other in self._history):
+                self._pixel_data_refs.pop(id(image), None)
+                self._tiled_images.pop(id(image), None)
+            owner = _buffer_owner(image)
+            if id(owner) not in pinned and all(_buffer_owner(other) is not owner for other in self._history):
+                freed += owner.nbytes
+        self._prune_affine_chains()
+        if freed:
+            self.history_changed.emit()
+        return freed
+    
+    def image_pyramid(self, image=None):
+        """获取图像的金字塔，各层在首次访问时计算
+        
+        当前图像变化后，旧图像的金字塔被回收给新图像：形状相同时只重新计算变化的分块。
+        
+        Args:
+            image: 图像，默认为当前图像；应为当前、原始或预览图像之一
+        
+        Returns:
+            ImagePyramid: 图像金字塔，没有图像时为None
+        """
+        if image is None:
+            image = self._current_image
+        if image is None:
+            return None
+        pyramid = self._pyramids.get(id(image))
+        if pyramid is not None and pyramid.base is image:
+            return pyramid
+        
+        # 回收不再引用的图像的金字塔
+        live = [other for other in (self._current_image, self._original_image, self._preview_image)
+                if other is not None]
+        reusable = None
+        for key in list(self._pyramids):
+            stale = self._pyramids[key]
+            if any(stale.base is other for other in live):
+                continue
+            del self._pyramids[key]
+            if reusable is None and stale.shape == image.shape:
+                reusable = stale
+        if reusable is not None:
+            reusable.update(image)
+            pyramid = reusable
+        else:
+            pyramid = ImagePyramid(image)
+        self._pyramids[id(image)] = pyramid
+        return pyramid
+    
+    def analysis_image(self, min_pixels=None, image=None):
+        """获取用于分析（直方图、自动增强统计量）的缩小图像
+        
+        Args:
+            min_pixels: 所需的最少像素数，默认为配置项 performance.analysis_min_pixels
+            image: 要分析的图像，默认为预览前的图像（不在预览时即当前图像），与预览和应用操作的输入一致
+        
+        Returns:
+            ndarray: 金字塔中像素数不少于min_pixels的最小一层，没有图像时为None
+        """
+        if image is None:
+            image = self._preview_image if self._preview_image is not None else self._current_image
+        if image is None:
+            return None
+        if min_pixels is None:
+            min_pixels = config.get('performance.analysis_min_pixels', 1000000)
+        return self.image_pyramid(image).level_for_pixels(min_pixels)
+    
+    def frequency_spectrum(self, image=None):
+        """获取图像用于频域去噪的正向变换，同一图像只计算一次
+        
+        Args:
+            image: 图像，默认为预览前的图像（不在预览时即当前图像），与预览和应用操作的输入一致
+        
+        Returns:
+            dict: utils.image_utils.frequency_spectrum 的结果，没有图像时为None
+        """
+        if image is None:
+            image = self._preview_image if self._preview_image is not None else self._current_image
+        if image is None:
+            return None
+        cached = self._spectrum
+        if cached is not None and cached[0] is image:
+            return cached[1]
+        # 先丢弃旧的频谱再计算，避免同时占用两份内存
+        self._spectrum = None
+        memory_monitor.reserve(image.shape[0] * image.shape[1] * 8)
+        spectrum = frequency_spectrum(image)
+        self._spectrum = (image, spectrum)
+        return spectrum
+    
+    def spectrum_bytes(self):
+        """缓存的频谱占用的字节数"""
+        cached = self._spectrum
+        if cached is None:
+            return 0
+        spectrum = cached[1]
+        return sum(spectrum[key].nbytes for key in ('spectrum', 'yuv', 'alpha') if spectrum[key] is not None)
+    
+    def clear_spectrum(self, bytes_needed=None):
+        """丢弃缓存的频谱，下次去噪时重新计算
+        
+        Returns:
+            int: 释放的字节数
+        """
+        freed = self.spectrum_bytes()
+        self._spectrum = None
+        return freed
+    
+    def wavelet_decomposition(self, image=None, wavelet='sym8', level=2):
+        """获取图像用于小波去噪的分解，同一图像和参数只计算一次
+        
+        Args:
+            image: 图像，默认为预览前的图像（不在预览时即当前图像），与预览和应用操作的输入一致
+            wavelet: 小波名称
+            level: 分解层数
+        
+        Returns:
+            dict: utils.image_utils.wavelet_decomposition 的结果，没有图像时为None
+        """
+        if image is None:
+            image = self._preview_image if self._preview_image is not None else self._current_image
+        if image is None:
+            return None
+        cached = self._wavelet
+        if cached is not None and cached[0] is image and cached[1] == (wavelet, level):
+            return cached[2]
+        # 先丢弃旧的分解再计算，避免同时占用两份内存
+        self._wavelet = None
+        memory_monitor.reserve(int(np.prod(image.shape)) * 4)
+        decomposition = wavelet_decomposition(image, wavelet, level)
+        self._wavelet = (image, (wavelet, level), decomposition)
+        return decomposition
+    
+    def wavelet_bytes(self):
+        """缓存的小波分解占用的字节数"""
+        cached = self._wavelet
+        if cached is None:
+            return 0
+        decomposition = cached[2]
+        coeffs = decomposition['coeffs']
+        total = coeffs[0].nbytes + sum(band.nbytes for bands in coeffs[1:] for band in bands)
+        if decomposition['alpha'] is not None:
+            total += decomposition['alpha'].nbytes
+        return total
+    
+    def clear_wavelet(self, bytes_needed=None):
+        """丢弃缓存的小波分解，下次去噪时重新计算
+        
+        Returns:
+            int: 释放的字节数
+        """
+        freed = self.wavelet_bytes()
+        self._wavelet = None
+        return freed
+    
+    def pyramid_bytes(self):
+        """图像金字塔中已计算的缩小层占用的字节数"""
+        return sum(pyramid.nbytes for pyramid in list(self._pyramids.values()))
+    
+    def clear_pyramids(self, bytes_needed=None):
+        """丢弃图像金字塔中已计算的缩小层，之后按需重新计算
+        
+        Returns:
+            int: 释放的字节数
+        """
+        return sum(pyramid.clear() for pyramid in list(self._pyramids.values()))
+    
+    def preview_bytes(self):
+        """预览缓冲区占用的字节数（预览期间保存的原图）"""
+        return self._preview_image.nbytes if self._preview_image is not None else 0
+    
+    def replay_cache_bytes(self):
+        """编辑配方回放缓存占用的字节数"""
+        return self._replayer.cache_bytes
+    
+    def clear_replay_cache(self, bytes_needed=None):
+        """清空编辑配方回放缓存
+        
+        Returns:
+            int: 释放的字节数
+        """
+        freed = self._replayer.cache_bytes
+        self._replayer.clear()
+        return freed
+    
+    def _tiled_sources(self):
+        tiled_images = {id(tiled): tiled for _, tiled in self._tiled_images.values()}
+        if self._preview_source is not None:
+            tiled_images[id(self._preview_source)] = self._preview_source
+        return tiled_images.values()
+    
+    def tile_cache_bytes(self):
+        """分块图像已解码数据段缓存占用的字节数"""
+        return sum(tiled.cache_bytes for tiled in self._tiled_sources())
+    
+    def clear_tile_caches(self, bytes_needed=None):
+        """清空分块图像的解码缓存，之后按需重新解码
+        
+        Returns:
+            int: 释放的字节数
+        """
+        return sum(tiled.clear_cache() for tiled in self._tiled_sources())
+    
     def clear_memory(self):
         """主动清理内存"""
         # 整理历史记录
@@ -487,15 +1337,18 @@ class ImageModel(QObject):
             # 仅保留必要的历史记录
             step = 2 if len(self._history) > self._max_history_size * 0.8 else 1
             new_history = deque(maxlen=self._max_history_size)
+            new_recipe_history = deque(maxlen=self._max_history_size)
             
             # 保留当前索引和关键点的历史
             for i in range(0, len(self._history), step):
                 if i == self._history_index or i == 0 or i == len(self._history) - 1:
                     new_history.append(self._history[i])
+                    new_recipe_history.append(self._recipe_history[i])
             
             # 更新历史记录和索引
             self._history_index = list(new_history).index(self._history[self._history_index])
             self._history = new_history
+            self._recipe_history = new_recipe_history
         
         # 清理像素数据引用
         self._check_memory_cleanup()
@@ -510,12 +1363,29 @@ class ImageModel(QObject):
         if self._process_thread.is_alive():
             self._process_thread.join()
         
+        # 等待后台保存完成，避免留下未完成的临时文件
+        if self._save_thread is not None and self._save_thread.is_alive():
+            self._save_thread.join()
+        
+        # 取消后台处理，结果不再提交
+        self._operation_cancel.set()
+        if self._operation_thread is not None and self._operation_thread.is_alive():
+            self._operation_thread.join()
+        self._operation_result = None
+        
         # 清理资源
         self._current_image = None
         self._original_image = None
         self._preview_image = None
         self._history.clear()
+        self._recipe_history.clear()
+        self._replayer.clear()
         self._pixel_data_refs.clear()
+        self._pyramids.clear()
+        self._affine_chains.clear()
+        self._spectrum = None
+        self._wavelet = None
+        self._release_tiled_images()
         
         # 强制清理内存
         gc.collect()
@@ -0,0 +1,244 @@
+"""
+图像金字塔模块
+
+主要功能：
+1. 高斯金字塔
+   - 第0层为原图（引用，不复制），每层由上一层 cv2.pyrDown 得到，宽高各约为上一层的一半
+   - 各层在首次访问时才计算，之后缓存
+   - 每次更换图像版本号加一，使用方可据此判断缓存的结果是否过期
+
+2. 增量更新
+   - 新图像与旧图像形状相同时逐块比较，只重新计算变化的分块在各层对应的区域
+   - 变化面积过大时直接丢弃已计算的层，按需重新计算
+
+3. 多分辨率访问
+   - level_for_pixels：像素数不少于N的最小一层，用于直方图、统计量等分析
+   - index_for_scale：显示缩放比例下不损失清晰度的最小一层，用于缩小显示
+
+"""
+import math
+import threading
+import cv2
+import numpy as np
+
+MIN_LEVEL_SIZE = 16  # 各层的短边不小于此值（第0层除外）
+DIRTY_TILE_SIZE = 256  # 比较新旧图像时的分块大小
+MAX_DIRTY_FRACTION = 0.25  # 变化的分块超过此比例时不做增量更新
+
+# pyrDown 的5x5高斯核：输出像素 i 由输入像素 2i-2 .. 2i+2 计算
+_KERNEL_RADIUS = 2
+
+def _dirty_span(start, stop, size):
+    """上一层 [start, stop) 变化时，下一层（长度size）受影响的范围"""
+    return max(0, (start - 1) // 2), min(size, (stop + 1) // 2 + 1)
+
+def _source_span(start, stop, size):
+    """计算下一层 [start, stop) 所需的上一层（长度size）范围，起点为偶数以保持采样相位"""
+    return max(0, 2 * start - 2 * _KERNEL_RADIUS), min(size, 2 * stop + 2 * _KERNEL_RADIUS)
+
+def find_dirty_tiles(old, new, tile_size=DIRTY_TILE_SIZE, max_fraction=MAX_DIRTY_FRACTION):
+    """逐块比较两幅形状相同的图像，找出发生变化的区域
+
+    同一行中相邻的变化分块合并为一个矩形。
+
+    Args:
+        old: 旧图像
+        new: 新图像
+        tile_size: 分块大小
+        max_fraction: 变化的分块超过此比例时提前结束
+
+    Returns:
+        list: [(x, y, 宽, 高), ...]，变化过多或形状不同时返回None
+    """
+    if old.shape != new.shape or old.dtype != new.dtype:
+        return None
+    height, width = old.shape[:2]
+    rows = range(0, height, tile_size)
+    columns = range(0, width, tile_size)
+    limit = max_fraction * len(rows) * len(columns)
+    dirty_count = 0
+    rects = []
+    for y in rows:
+        y1 = min(height, y + tile_size)
+        run_start = None
+        for x in columns:
+            x1 = min(width, x + tile_size)
+            if np.array_equal(old[y:y1, x:x1], new[y:y1, x:x1]):
+                if run_start is not None:
+                    rects.append((run_start, y, x - run_start, y1 - y))
+                    run_start = None
+                continue
+            dirty_count += 1
+            if dirty_count > limit:
+                return None
+            if run_start is None:
+                run_start = x
+        if run_start is not None:
+            rects.append((run_start, y, width - run_start, y1 - y))
+    return rects
+
+class ImagePyramid:
+    """延迟计算、带版本号的高斯金字塔"""
+
+    def __init__(self, image=None):
+        """初始化图像金字塔
+
+        Args:
+            image: 第0层图像，可以之后用 set_image 设置
+        """
+        self._lock = threading.RLock()
+        self._levels = []  # 已计算的层，第0层为原图
+        self._version = 0
+        if image is not None:
+            self.set_image(image)
+
+    @property
+    def base(self):
+        """第0层图像，未设置时为None"""
+        return self._levels[0] if self._levels else None
+
+    @property
+    def version(self):
+        """版本号，每次更换或更新图像时加一"""
+        return self._version
+
+    @property
+    def shape(self):
+        """第0层图像的形状"""
+        return self._levels[0].shape if self._levels else None
+
+    @property
+    def nbytes(self):
+        """已计算的各层（不含第0层）占用的字节数"""
+        with self._lock:
+            return sum(level.nbytes for level in self._levels[1:])
+
+    def set_image(self, image, dirty_rects=None):
+        """更换第0层图像
+
+        Args:
+            image: 新图像
+            dirty_rects: 相对旧图像发生变化的区域 [(x, y, 宽, 高), ...]；
+                为None或形状不同时丢弃已计算的层
+        """
+        with self._lock:
+            old = self.base
+            if (dirty_rects is None or old is None
+                    or old.shape != image.shape or old.dtype != image.dtype):
+                self._levels = [image]
+            else:
+                self._levels[0] = image
+                for x, y, width, height in dirty_rects:
+                    self._update_region(x, y, x + width, y + height)
+            self._version += 1
+
+    def update(self, image):
+        """更换第0层图像，与旧图像形状相同时只重新计算变化的区域
+
+        Args:
+            image: 新图像
+        """
+        with self._lock:
+            old = self.base
+            if old is image:
+                return
+            # 还没有计算过其他层时不需要比较
+            rects = find_dirty_tiles(old, image) if old is not None and len(self._levels) > 1 else None
+            self.set_image(image, rects)
+
+    def _update_region(self, x0, y0, x1, y1):
+        """第0层 [x0, x1) x [y0, y1) 变化后，重新计算已计算各层的对应区域"""
+        for index in range(1, len(self._levels)):
+            source = self._levels[index - 1]
+            target = self._levels[index]
+            target_height, target_width = target.shape[:2]
+            x0, x1 = _dirty_span(x0, x1, target_width)
+            y0, y1 = _dirty_span(y0, y1, target_height)
+            if x0 >= x1 or y0 >= y1:
+                return
+            # 在带边距的裁剪区域上计算，边距内的结果与对整层计算相同
+            sx0, sx1 = _source_span(x0, x1, source.shape[1])
+            sy0, sy1 = _source_span(y0, y1, source.shape[0])
+            reduced = cv2.pyrDown(source[sy0:sy1, sx0:sx1])
+            ox, oy = x0 - sx0 // 2, y0 - sy0 // 2
+            target[y0:y1, x0:x1] = reduced[oy:oy + y1 - y0, ox:ox + x1 - x0]
+
+    def level_count(self):
+        """可用的层数（包括第0层）"""
+        shape = self.shape
+        if shape is None:
+            return 0
+        count = 1
+        height, width = shape[:2]
+        while True:
+            height, width = (height + 1) // 2, (width + 1) // 2
+            if min(height, width) < MIN_LEVEL_SIZE:
+                return count
+            count += 1
+
+    def level_shape(self, index):
+        """第index层的 (高, 宽)，不需要计算该层"""
+        height, width = self.shape[:2]
+        for _ in range(index):
+            height, width = (height + 1) // 2, (width + 1) // 2
+        return height, width
+
+    def level(self, index):
+        """获取第index层，尚未计算时逐层计算
+
+        Args:
+            index: 层号，超出可用层数时取最小的一层
+
+        Returns:
+            ndarray: 该层图像，未设置图像时为None
+        """
+        with self._lock:
+            if not self._levels:
+                return None
+            index = max(0, min(index, self.level_count() - 1))
+            while len(self._levels) <= index:
+                self._levels.append(cv2.pyrDown(self._levels[-1]))
+            return self._levels[index]
+
+    def index_for_pixels(self, min_pixels):
+        """像素数不少于min_pixels的最小一层的层号"""
+        index = 0
+        for candidate in range(1, self.level_count()):
+            height, width = self.level_shape(candidate)
+            if height * width < min_pixels:
+                break
+            index = candidate
+        return index
+
+    def level_for_pixels(self, min_pixels):
+        """获取像素数不少于min_pixels的最小一层，图像本身不足时返回第0层
+
+        Args:
+            min_pixels: 所需的最少像素数
+
+        Returns:
+            ndarray: 该层图像，未设置图像时为None
+        """
+        if self.shape is None:
+            return None
+        return self.level(self.index_for_pixels(min_pixels))
+
+    def index_for_scale(self, scale):
+        """以scale倍显示时不损失清晰度的最小一层的层号
+
+        该层缩放到显示大小时仍不小于显示尺寸，即缩小倍率 2^k 不超过 1/scale。
+        """
+        if self.shape is None or scale <= 0 or scale > 0.5:
+            return 0
+        return max(0, min(int(math.floor(math.log2(1.0 / scale))), self.level_count() - 1))
+
+    def clear(self, bytes_needed=None):
+        """丢弃已计算的各层（保留第0层），之后按需重新计算
+
+        Returns:
+            int: 释放的字节数
+        """
+        with self._lock:
+            freed = self.nbytes
+            del self._levels[1:]
+            return freed
@@ -128,8 +128,8 @@ class TestMainWindow(unittest.TestCase):
         # 验证内存进度条已创建
         self.assertIsNotNone(self.window._memory_bar)
         
-        # 验证内存监控定时器已启动
-        self.assertTrue(self.window._memory_timer.isActive())
+        # 内存状态由分配驱动更新，启动时已显示一次
+        self.assertTrue(self.window._memory_label.text().startswith("内存:"))
     
     def _mock_file_open_dialog(self, image_path):
         """模拟文件打开对话框"""
@@ -167,6 +167,23 @@ class TestMainWindow(unittest.TestCase):
         # 清理
         os.remove(self.test_image_path)
     
+    def test_failed_operation_not_recorded(self):
+        """测试控制器报告失败的操作不记入编辑配方"""
+        import numpy as np
+        errors = []
+        self.window._show_error_message = lambda title, message: errors.append(message)
+        self.window.image_model.set_image(np.zeros((100, 100, 3), dtype=np.uint8))
+        
+        # 未知的白平衡方法和无效的核大小会使操作失败
+        self.window._on_process_requested("auto_white_balance", {'method': 'unknown'})
+        self.window._on_preview_requested("blur", {'blur_type': 'median', 'kernel_size': -3})
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(len(self.window.image_model.get_recipe()), 0)
+        
+        self.window._on_process_requested("flip", {'flip_code': 1})
+        self.assertEqual(self.window.image_model.get_recipe().steps,
+                         [{'operation': 'flip', 'parameters': {'flip_code': 1}}])
+    
     def test_memory_cleanup(self):
         """测试内存清理功能"""
         # 触发内存清理
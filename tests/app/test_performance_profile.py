@@ -0,0 +1,74 @@
+"""
+测试自适应性能配置
+"""
+import os
+import sys
+import unittest
+import tempfile
+import shutil
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+# 使用通用的模块导入机制
+sys.path.append(os.path.join(project_root, "tests"))
+from test_import_with_config import create_module_imports
+create_module_imports()
+
+import app.performance_profile as performance_profile
+from app.config import config
+
+class TestPerformanceProfile(unittest.TestCase):
+    """测试按资源和实测性能推算配置"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "profile.json")
+        self.resources = {'cores': 4, 'cpu_quota': 4.0, 'memory_total': 8 * 1024 ** 3, 'memory_source': 'cgroup'}
+        self._settings = {key: config.get(key) for key in (
+            'performance.history_budget_mb', 'performance.tile_size', 'performance.thread_pool_size',
+            'performance.process_pool_size', 'performance.image_downscale_threshold')}
+
+    def tearDown(self):
+        """每个测试方法执行后的清理工作"""
+        for key, value in self._settings.items():
+            config.set(key, value)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_derive_settings(self):
+        """测试推算的预算、分块大小、进程池大小和预览阈值"""
+        settings = performance_profile.derive_settings(self.resources, bandwidth=10.0, ns_per_pixel=4.0)
+        self.assertEqual(settings['performance.history_budget_mb'], 2048)
+        self.assertEqual(settings['performance.thread_pool_size'], 4)
+        self.assertEqual(settings['performance.process_pool_size'], 4)
+        self.assertIn(settings['performance.tile_size'], (128, 256, 512, 1024))
+
+        # 更慢的核心分块更小，预览阈值更低
+        slow = performance_profile.derive_settings(self.resources, bandwidth=10.0, ns_per_pixel=64.0)
+        self.assertLess(slow['performance.tile_size'], settings['performance.tile_size'])
+        self.assertLess(slow['performance.image_downscale_threshold'],
+                        settings['performance.image_downscale_threshold'])
+
+        # 内存很少时限制工作进程数
+        small = dict(self.resources, memory_total=1024 ** 3)
+        self.assertEqual(performance_profile.derive_settings(small, 10.0, 4.0)['performance.process_pool_size'], 1)
+
+    def test_persist_and_apply(self):
+        """测试测量结果保存后直接读取，并写入全局配置"""
+        profile = performance_profile.load_or_measure_profile(self.path)
+        self.assertTrue(os.path.exists(self.path))
+        self.assertGreater(profile['benchmark']['memory_bandwidth_gbs'], 0)
+        for key, value in profile['settings'].items():
+            self.assertEqual(config.get(key), value)
+
+        self.assertEqual(performance_profile.load_profile(self.path), profile)
+
+        # 硬件指纹变化时需要重新测量
+        profile['fingerprint']['cores'] += 1
+        performance_profile.save_profile(profile, self.path)
+        self.assertIsNone(performance_profile.load_profile(self.path))
+
+if __name__ == "__main__":
+    unittest.main()
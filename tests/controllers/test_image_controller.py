@@ -23,6 +23,8 @@ try:
     # 导入模块
     from models.image_model import ImageModel
     from controllers.image_controller import ImageController
+    from app.config import config
+    from utils.image_utils import auto_white_balance
 except Exception as e:
     print(f"预加载模块失败: {e}")
     import traceback
@@ -206,6 +208,59 @@ class TestImageController(unittest.TestCase):
         
         # 验证应用后可以撤销
         self.assertTrue(self.model.can_undo())
+    
+    def test_white_balance_preview_matches_apply(self):
+        """测试按最大值估计增益的白平衡预览与应用结果一致，不受缩小层上最大值偏低的影响"""
+        image = np.full((100, 100, 3), 120, dtype=np.uint8)
+        image[..., 2] = 90
+        image[50, 50] = (200, 160, 250)  # 孤立亮点在缩小层上被模糊
+        self.model.set_image(image)
+        min_pixels = config.get('performance.analysis_min_pixels')
+        config.set('performance.analysis_min_pixels', 100)
+        try:
+            for method in ('perfect_reflector', 'adaptive'):
+                self.assertTrue(self.controller.preview_auto_white_balance(method))
+                self.assertTrue(np.array_equal(self.model.current_image, auto_white_balance(image, method)))
+        finally:
+            config.set('performance.analysis_min_pixels', min_pixels)
+    
+    def test_apply_super_resolution(self):
+        """测试在后台逐块放大图像，结果可以撤销"""
+        from PySide6.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication([])
+        height, width = self.model.current_image.shape[:2]
+        
+        self.assertTrue(self.controller.apply_super_resolution(scale=2))
+        self.assertTrue(self.model.wait_for_operation(timeout=30))
+        app.processEvents()
+        self.assertEqual(self.model.current_image.shape[:2], (height * 2, width * 2))
+        self.assertTrue(self.model.can_undo())
+        self.model.undo()
+        self.assertEqual(self.model.current_image.shape[:2], (height, width))
+
+    def test_super_resolution_tiled(self):
+        """测试分块模式下从分块图像读取并把放大结果写入磁盘，仍以分块模式打开"""
+        from PySide6.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication([])
+        max_size = config.get('image_processing.max_image_size')
+        config.set('image_processing.max_image_size', (50, 50))
+        try:
+            self.assertTrue(self.model.load_image(str(self.test_image_path)))
+            self.assertTrue(self.model.is_tiled())
+            original = np.asarray(self.model.tiled_image.to_array())
+            
+            self.assertTrue(self.controller.apply_super_resolution(scale=2))
+            self.assertTrue(self.model.wait_for_operation(timeout=30))
+            app.processEvents()
+            self.assertTrue(self.model.is_tiled())
+            self.assertEqual(self.model.tiled_image.shape, (200, 200, 3))
+            expected = cv2.resize(original.astype(np.float32), (200, 200), interpolation=cv2.INTER_CUBIC)
+            result = np.asarray(self.model.tiled_image.to_array())
+            self.assertLessEqual(np.abs(result.astype(int) - np.clip(np.rint(expected), 0, 255)).max(), 1)
+            self.model.undo()
+            self.assertEqual(self.model.tiled_image.shape, (100, 100, 3))
+        finally:
+            config.set('image_processing.max_image_size', max_size)
 
 def load_tests(loader, standard_tests, pattern):
     """自定义测试加载函数，使unittest发现所有测试"""
@@ -128,12 +128,12 @@ class TestImageRotationController(unittest.TestCase):
         # 验证操作成功
         self.assertTrue(result)
         
-        # 验证图像已经被修改
-        # 验证旋转后图像与原始图像不同
-        self.assertFalse(np.array_equal(
-            cv2.imread(str(self.output_path / "original.png")), 
+        # 验证旋转是无损的像素重排（测试图像关于中心对称，旋转180度后与原图相同）
+        self.assertTrue(np.array_equal(
+            cv2.rotate(cv2.imread(str(self.output_path / "original.png")), cv2.ROTATE_180),
             cv2.imread(str(self.output_path / "rotated_180.png"))
         ))
+        self.assertTrue(self.model.can_undo())
     
     def test_rotate_with_expand(self):
         """测试使用expand参数旋转图像"""
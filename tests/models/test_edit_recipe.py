@@ -0,0 +1,125 @@
+"""
+测试编辑配方与回放缓存
+"""
+import os
+import sys
+import unittest
+import numpy as np
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+# 使用通用的模块导入机制
+sys.path.append(os.path.join(project_root, "tests"))
+try:
+    from test_import_with_config import import_module_from_file, create_module_imports
+    
+    # 预先导入所有必要的模块
+    create_module_imports()
+    
+    # 导入模块
+    from models.edit_recipe import EditRecipe, RecipeReplayer, image_digest
+    from controllers.operation_registry import run_operation
+except Exception as e:
+    print(f"预加载模块失败: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
+
+class TestEditRecipe(unittest.TestCase):
+    """测试EditRecipe和RecipeReplayer"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self.image = np.random.default_rng(0).integers(0, 256, (48, 64, 3), dtype=np.uint8)
+        self.recipe = EditRecipe([
+            ('brightness_contrast', {'brightness': 10, 'contrast': 1.1}),
+            ('blur', {'blur_type': 'gaussian', 'kernel_size': 5, 'sigma': 0}),
+            ('auto_contrast', {'clip_limit': 2.0, 'tile_grid_size': (8, 8)}),
+        ])
+        self.calls = []
+
+    def _run_step(self, image, operation, parameters):
+        self.calls.append(operation)
+        return run_operation(image, operation, parameters)
+
+    def test_json_round_trip(self):
+        """测试配方序列化后保持不变"""
+        loaded = EditRecipe.from_json(self.recipe.to_json())
+        self.assertEqual(loaded, self.recipe)
+        self.assertEqual(loaded.steps[2]['parameters']['tile_grid_size'], [8, 8])
+
+    def test_prefix_keys(self):
+        """测试修改第N步只改变其后的缓存键"""
+        keys = self.recipe.prefix_keys("source")
+        tweaked = self.recipe.copy()
+        tweaked.replace_step(1, parameters={'blur_type': 'gaussian', 'kernel_size': 7, 'sigma': 0})
+        tweaked_keys = tweaked.prefix_keys("source")
+
+        self.assertEqual(len(keys), 4)
+        self.assertEqual(keys[:2], tweaked_keys[:2])
+        self.assertNotEqual(keys[2], tweaked_keys[2])
+        self.assertNotEqual(keys[3], tweaked_keys[3])
+        self.assertNotEqual(keys[0], self.recipe.prefix_keys("other")[0])
+
+    def test_replay_recomputes_from_changed_step(self):
+        """测试调整第N步后只重新计算第N步及之后的步骤"""
+        replayer = RecipeReplayer()
+        source_key = image_digest(self.image)
+        first = replayer.replay(self.image, self.recipe, self._run_step, source_key)
+        self.assertEqual(len(self.calls), 3)
+
+        # 原样再次回放完全命中缓存
+        self.calls.clear()
+        again = replayer.replay(self.image, self.recipe, self._run_step, source_key)
+        self.assertEqual(self.calls, [])
+        self.assertTrue(np.array_equal(first, again))
+
+        # 修改第2步，只重新计算第2、3步
+        tweaked = self.recipe.copy()
+        tweaked.replace_step(1, parameters={'blur_type': 'gaussian', 'kernel_size': 7, 'sigma': 0})
+        result = replayer.replay(self.image, tweaked, self._run_step, source_key)
+        self.assertEqual(self.calls, ['blur', 'auto_contrast'])
+
+        expected = self.image
+        for step in tweaked.steps:
+            expected = run_operation(expected, step['operation'], step['parameters'])
+        self.assertTrue(np.array_equal(result, expected))
+
+    def test_replay_keeps_arrays_writable(self):
+        """测试缓存只读视图，源图像和回放结果保持可写"""
+        replayer = RecipeReplayer()
+        # 不修改图像的步骤直接返回源图像
+        recipe = EditRecipe([('auto_white_balance', {'method': 'gray_world'})])
+        gray = self.image[..., 0].copy()
+        result = replayer.replay(gray, recipe, self._run_step)
+        self.assertIs(result, gray)
+        self.assertTrue(gray.flags.writeable)
+
+        first = replayer.replay(self.image, self.recipe, self._run_step)
+        self.assertTrue(first.flags.writeable)
+        self.assertTrue(self.image.flags.writeable)
+        cached = replayer.replay(self.image, self.recipe, self._run_step)
+        self.assertTrue(cached.flags.writeable)
+        self.assertIsNot(cached, first)
+        self.assertTrue(np.array_equal(cached, first))
+
+        # 修改完全命中缓存得到的结果不影响缓存
+        cached[...] = 0
+        self.assertTrue(np.array_equal(replayer.replay(self.image, self.recipe, self._run_step), first))
+
+    def test_cache_is_bounded(self):
+        """测试缓存按字节数限制"""
+        replayer = RecipeReplayer(max_cache_bytes=self.image.nbytes * 2)
+        replayer.replay(self.image, self.recipe, self._run_step)
+        self.assertLessEqual(replayer.cache_bytes, self.image.nbytes * 2)
+
+def load_tests(loader, standard_tests, pattern):
+    """自定义测试加载函数，使unittest发现所有测试"""
+    suite = unittest.TestSuite()
+    suite.addTests(loader.loadTestsFromTestCase(TestEditRecipe))
+    return suite
+
+if __name__ == "__main__":
+    unittest.main()
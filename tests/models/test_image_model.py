@@ -33,6 +33,7 @@ try:
     # 导入模块
     from models.image_model import ImageModel
     from app.config import config
+    from utils.memory_monitor import memory_monitor
 except Exception as e:
     print(f"预加载模块失败: {e}")
     import traceback
@@ -124,7 +125,212 @@ class TestImageModel(unittest.TestCase):
         # 清理
         if save_path.exists():
             save_path.unlink()
+
+    def test_channel_order(self):
+        """测试内部BGR通道顺序及显示转换"""
+        self.model.load_image(str(self.test_image_path))
+        self.assertEqual(self.model.channel_order, 'BGR')
+
+        # 红色矩形在BGR顺序中位于通道2
+        self.assertEqual(list(self.model.current_image[30, 30]), [0, 0, 255])
+
+        # 显示时按BGR格式解释，颜色保持正确
+        qimage = self.model.to_qimage()
+        color = qimage.pixelColor(30, 30)
+        self.assertEqual((color.red(), color.green(), color.blue()), (255, 0, 0))
+
+        # 保存后重新读取，像素与加载时完全一致
+        save_path = self.test_dir / "test_channel_order.png"
+        self.model.save_image(str(save_path))
+        saved = cv2.imread(str(save_path), cv2.IMREAD_COLOR)
+        save_path.unlink()
+        self.assertTrue(np.array_equal(saved, self.model.current_image))
+
+    def test_save_image_async(self):
+        """测试后台保存图像"""
+        self.model.load_image(str(self.test_image_path))
+
+        save_path = self.test_dir / "test_save_async.jpg"
+        if save_path.exists():
+            save_path.unlink()
+
+        progress = []
+        finished = []
+        self.model.save_progress.connect(progress.append)
+        self.model.save_finished.connect(lambda ok, message: finished.append((ok, message)))
+
+        # 启动后台保存并等待完成，跨线程信号需要事件循环派发
+        from PySide6.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication([])
+        self.assertTrue(self.model.save_image_async(str(save_path), {'jpeg_quality': 90}))
+        self.assertTrue(self.model.wait_for_save(timeout=10))
+        app.processEvents()
+
+        # 验证保存结果和信号
+        self.assertTrue(save_path.exists())
+        self.assertEqual(finished, [(True, str(save_path))])
+        self.assertEqual(progress[-1], 100)
+
+        # 清理
+        save_path.unlink()
+
+    def test_apply_operation_async(self):
+        """测试后台分块处理：汇报进度、提交到历史记录、取消和丢弃过期结果"""
+        from utils.image_utils import denoise_nlmeans
+        self.model.load_image(str(self.test_image_path))
+        original = self.model.current_image
+        
+        progress = []
+        finished = []
+        self.model.operation_progress.connect(progress.append)
+        self.model.operation_finished.connect(lambda ok, message: finished.append(ok))
+        
+        from PySide6.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication([])
+        self.assertTrue(self.model.apply_operation_async(denoise_nlmeans, h=10))
+        self.assertFalse(self.model.apply_operation_async(denoise_nlmeans, h=10))
+        self.assertTrue(self.model.wait_for_operation(timeout=30))
+        app.processEvents()
+        
+        # 结果只提交一次，与整图处理一致
+        self.assertEqual(finished, [True])
+        self.assertEqual(progress[-1], 100)
+        np.testing.assert_array_equal(self.model.current_image, denoise_nlmeans(original, h=10))
+        self.assertTrue(self.model.can_undo())
+        
+        # 取消后图像不变
+        denoised = self.model.current_image
+        self.model.cancel_operation()
+        self.assertTrue(self.model.apply_operation_async(denoise_nlmeans, h=10))
+        self.model.cancel_operation()
+        self.model.wait_for_operation(timeout=30)
+        self.assertIs(self.model.current_image, denoised)
+        
+        # 处理期间图像被其他操作改变时丢弃结果
+        self.assertTrue(self.model.apply_operation_async(denoise_nlmeans, h=10))
+        self.model.apply_operation(cv2.GaussianBlur, (3, 3), 0)
+        blurred = self.model.current_image
+        self.model.wait_for_operation(timeout=30)
+        self.assertIs(self.model.current_image, blurred)
+        self.assertEqual(finished[-1], False)
     
+    def test_tiled_mode(self):
+        """测试超过尺寸限制的图像以分块方式打开、处理和保存"""
+        max_size = config.get('image_processing.max_image_size')
+        threshold = config.get('performance.image_downscale_threshold')
+        config.set('image_processing.max_image_size', (50, 50))
+        config.set('performance.image_downscale_threshold', 0.0025)  # 缩略预览不超过2500像素
+        try:
+            self.assertTrue(self.model.load_image(str(self.test_image_path)))
+            self.assertTrue(self.model.is_tiled())
+            self.assertEqual(self.model.tiled_image.shape, (100, 100, 3))
+            self.assertEqual(self.model.current_image.shape[:2], (50, 50))
+
+            # 处理作用于全分辨率图像，撤销后回到原图
+            self.assertTrue(self.model.apply_operation(cv2.GaussianBlur, (5, 5), 0))
+            self.assertTrue(self.model.is_tiled())
+            original = cv2.imread(str(self.test_image_path))
+            blurred = np.asarray(self.model.tiled_image.to_array())
+            self.assertTrue(np.array_equal(blurred, cv2.GaussianBlur(original, (5, 5), 0)))
+            self.model.undo()
+            self.assertTrue(np.array_equal(np.asarray(self.model.tiled_image.to_array()), original))
+
+            # 预览只作用于缩略图，应用预览时在全分辨率上重新执行
+            self.model.preview_operation(cv2.bitwise_not)
+            self.model.apply_last_preview()
+            self.assertTrue(np.array_equal(np.asarray(self.model.tiled_image.to_array()), 255 - original))
+
+            # 保存全分辨率结果
+            save_path = self.test_dir / "test_tiled_save.png"
+            self.assertTrue(self.model.save_image(str(save_path)))
+            saved = cv2.imread(str(save_path))
+            save_path.unlink()
+            self.assertTrue(np.array_equal(saved, 255 - original))
+        finally:
+            config.set('image_processing.max_image_size', max_size)
+            config.set('performance.image_downscale_threshold', threshold)
+
+    def test_tiled_memory_budget(self):
+        """测试分块处理只按驻留内存的分块和缩略图检查预算，不会因全图尺寸削减撤销历史"""
+        keys = ('image_processing.max_image_size', 'performance.image_downscale_threshold',
+                'performance.tile_size', 'performance.tile_overlap', 'performance.thread_pool_size')
+        saved = {key: config.get(key) for key in keys}
+        config.set('image_processing.max_image_size', (50, 50))
+        config.set('performance.image_downscale_threshold', 0.0004)  # 缩略预览不超过400像素
+        config.set('performance.tile_size', 8)
+        config.set('performance.tile_overlap', 2)
+        config.set('performance.thread_pool_size', 1)
+        memory_monitor.register_image_model(self.model)
+        try:
+            self.assertTrue(self.model.load_image(str(self.test_image_path)))
+            self.assertTrue(self.model.is_tiled())
+
+            # 全分辨率图像恰好占满内存预算，按全图大小预留会达到危急等级
+            total = int(np.prod(self.model.tiled_image.shape))
+            memory_monitor.get_usage = lambda: {
+                'total': total, 'used': 0, 'available': total,
+                'percent': 0.0, 'source': 'cgroup', 'pressure': None,
+            }
+            memory_monitor.invalidate_usage()
+            # 逐块读取的临时缓冲区很快释放，不能在采样有效期内累加成整幅图像的用量
+            critical = []
+            memory_monitor.memory_critical.connect(critical.append)
+            for _ in range(3):
+                self.assertTrue(self.model.apply_operation(cv2.GaussianBlur, (5, 5), 0))
+            memory_monitor.memory_critical.disconnect(critical.append)
+            self.assertEqual(critical, [])
+            self.assertEqual(len(self.model._history), 4)
+            self.assertEqual(self.model._history_index, 3)
+        finally:
+            del memory_monitor.get_usage
+            memory_monitor.invalidate_usage()
+            for key, value in saved.items():
+                config.set(key, value)
+
+    def test_recipe_recording(self):
+        """测试编辑配方随操作、撤销和回放同步更新"""
+        self.model.load_image(str(self.test_image_path))
+        self.assertEqual(len(self.model.get_recipe()), 0)
+
+        # 未记录名称的操作不能导出
+        self.model.apply_operation(cv2.GaussianBlur, (3, 3), 0)
+        with self.assertRaises(ValueError):
+            self.model.get_recipe()
+        self.assertTrue(self.model.record_step('blur', {'kernel_size': 3}))
+        self.assertFalse(self.model.record_step('blur', {'kernel_size': 3}))
+        self.assertEqual(self.model.get_recipe().steps, [{'operation': 'blur', 'parameters': {'kernel_size': 3}}])
+
+        # 撤销后配方回到上一状态
+        self.model.undo()
+        self.assertEqual(len(self.model.get_recipe()), 0)
+        self.model.redo()
+        self.assertEqual(len(self.model.get_recipe()), 1)
+
+        # 在原始图像上回放配方
+        from controllers.operation_registry import run_operation
+        recipe = self.model.get_recipe()
+        recipe.add_step('flip', {'flip_code': 1})
+        self.assertTrue(self.model.replay_recipe(recipe, run_operation))
+        self.assertEqual(self.model.get_recipe(), recipe)
+        expected = run_operation(run_operation(self.model.original_image, 'blur', {'kernel_size': 3}), 'flip', {'flip_code': 1})
+        self.assertTrue(np.array_equal(self.model.current_image, expected))
+
+    def test_failed_operation_rolls_back_history(self):
+        """测试操作失败时不留下历史状态和待记录的配方步骤"""
+        self.model.load_image(str(self.test_image_path))
+        self.model.apply_operation(cv2.GaussianBlur, (3, 3), 0)
+        self.model.record_step('blur', {'kernel_size': 3})
+        current = self.model.current_image
+
+        def fail(image):
+            raise ValueError("处理失败")
+        self.assertFalse(self.model.apply_operation(fail))
+        self.assertIs(self.model.current_image, current)
+        self.assertEqual(len(self.model._history), len(self.model._recipe_history))
+        self.assertEqual(self.model.get_recipe().steps, [{'operation': 'blur', 'parameters': {'kernel_size': 3}}])
+        self.model.undo()
+        self.assertFalse(self.model.can_undo())
+
     def test_undo_redo_capability(self):
         """测试撤销和重做基本能力，不验证实际图像内容"""
         # 先加载测试图像
@@ -162,6 +368,237 @@ class TestImageModel(unittest.TestCase):
         self.assertTrue(self.model.can_undo())
         self.assertFalse(self.model.can_redo())
     
+    def test_memory_accounting(self):
+        """测试撤销历史的内存统计和按需削减"""
+        self.model.load_image(str(self.test_image_path))
+        self.assertEqual(self.model.history_bytes(), 0)
+
+        for value in range(1, 5):
+            self.model.apply_operation(lambda image, v=value: image + v)
+        self.assertGreater(self.model.history_bytes(), 0)
+        length = len(self.model._history)
+
+        # 原图始终被引用，丢弃它不释放内存，会继续丢弃下一个状态
+        freed = self.model.trim_history(1)
+        self.assertGreater(freed, 0)
+        self.assertLess(len(self.model._history), length)
+        self.assertEqual(len(self.model._recipe_history), len(self.model._history))
+        self.assertTrue(self.model.can_undo())
+
+        # 需要释放的内存很多时也至少保留最近一步撤销
+        self.model.trim_history(float('inf'))
+        self.assertTrue(self.model.can_undo())
+        self.model.undo()
+        self.assertIsNotNone(self.model.current_image)
+
+    def test_history_budget(self):
+        """测试撤销历史按字节预算丢弃最早的状态"""
+        self.model.load_image(str(self.test_image_path))
+        image_mb = self.model.current_image.nbytes / (1024 * 1024)
+        budget = config.get('performance.history_budget_mb')
+        config.set('performance.history_budget_mb', image_mb * 2.5)
+        try:
+            for value in range(1, 8):
+                self.model.apply_operation(lambda image, v=value: image + v)
+            self.assertLessEqual(self.model.history_bytes(), image_mb * 2.5 * 1024 * 1024)
+            self.assertEqual(len(self.model._recipe_history), len(self.model._history))
+            self.assertTrue(self.model.can_undo())
+        finally:
+            config.set('performance.history_budget_mb', budget)
+
+    def test_image_pyramid(self):
+        """测试图像金字塔随当前图像更新，旧金字塔被回收并增量更新"""
+        path = self.test_dir / "test_pyramid.png"
+        cv2.imwrite(str(path), np.random.default_rng(0).integers(0, 256, (600, 800, 3), dtype=np.uint8))
+        try:
+            self.model.load_image(str(path))
+        finally:
+            path.unlink()
+        pyramid = self.model.image_pyramid()
+        self.assertIs(pyramid.base, self.model.current_image)
+        pyramid.level(2)
+        config.set('performance.analysis_min_pixels', 20000)
+        try:
+            level = self.model.analysis_image()
+        finally:
+            config.set('performance.analysis_min_pixels', 1000000)
+        self.assertEqual(level.shape[:2], (150, 200))
+        self.assertGreater(self.model.pyramid_bytes(), 0)
+
+        def paint_square(image):
+            result = image.copy()
+            result[10:50, 10:50] = 0
+            return result
+        self.model.apply_operation(paint_square)
+        self.model.undo()
+        self.model.redo()
+        updated = self.model.image_pyramid()
+        self.assertIs(updated.base, self.model.current_image)
+        np.testing.assert_array_equal(updated.level(2), cv2.pyrDown(cv2.pyrDown(self.model.current_image)))
+        # 原图的金字塔仍被保留，撤销历史中其他状态的金字塔被回收
+        self.assertIs(self.model.image_pyramid(self.model.original_image), pyramid)
+        self.assertLessEqual(len(self.model._pyramids), 2)
+
+        freed = self.model.clear_pyramids()
+        self.assertGreater(freed, 0)
+        self.assertEqual(self.model.pyramid_bytes(), 0)
+
+    def test_geometric_views(self):
+        """测试翻转、旋转和裁剪不复制像素，撤销历史不增加内存占用"""
+        from utils.image_utils import flip_image, rotate_image, crop_image
+        self.model.load_image(str(self.test_image_path))
+        original = self.model.current_image
+        
+        self.model.apply_operation(flip_image, 1)
+        self.model.apply_operation(rotate_image, 90, expand=True)
+        self.model.apply_operation(crop_image, 10, 10, 50, 60)
+        self.assertTrue(np.shares_memory(self.model.current_image, original))
+        self.assertEqual(self.model.current_image.shape, (60, 50, 3))
+        self.assertEqual(self.model.history_bytes(), 0)
+        
+        expected = cv2.rotate(cv2.flip(original, 1), cv2.ROTATE_90_COUNTERCLOCKWISE)[10:70, 10:60]
+        np.testing.assert_array_equal(self.model.current_image, expected)
+        
+        # 撤销只切换视图
+        self.model.undo()
+        self.assertEqual(self.model.current_image.shape, (100, 100, 3))
+        self.assertTrue(np.shares_memory(self.model.current_image, original))
+        
+        # 后续像素算子得到连续的结果
+        self.model.apply_operation(cv2.GaussianBlur, (3, 3), 0)
+        self.assertTrue(self.model.current_image.flags['C_CONTIGUOUS'])
+        self.assertEqual(self.model.history_bytes(), 0)
+
+    def test_affine_chain(self):
+        """测试连续旋转从变换前的图像只重采样一次，中间插入其他操作时重新开始"""
+        from utils.image_utils import rotate_image, rotation_transform, warp_affine_chain
+        self.model.load_image(str(self.test_image_path))
+        original = self.model.current_image
+        
+        def rotate(angle):
+            def operation(image):
+                return rotate_image(image, angle, expand=True)
+            operation.affine = lambda shape: rotation_transform(shape, angle, expand=True)
+            return operation
+        
+        self.model.apply_operation(rotate(30))
+        first = self.model.current_image
+        self.model.apply_operation(rotate(-30))
+        steps = [rotation_transform(original.shape, 30, expand=True), rotation_transform(first.shape, -30, expand=True)]
+        np.testing.assert_array_equal(self.model.current_image, warp_affine_chain(original, steps))
+        # 合成为恒等变换后，原图所在区域的像素不受插值影响
+        height, width = self.model.current_image.shape[:2]
+        y, x = (height - 100) // 2, (width - 100) // 2
+        np.testing.assert_array_equal(self.model.current_image[y + 25:y + 35, x + 25:x + 35], original[25:35, 25:35])
+        
+        # 第三次旋转继续合成，三步仍只重采样一次
+        second = self.model.current_image
+        self.model.apply_operation(rotate(15))
+        steps.append(rotation_transform(second.shape, 15, expand=True))
+        np.testing.assert_array_equal(self.model.current_image, warp_affine_chain(original, steps))
+        
+        # 中间有像素算子时不再合成
+        self.model.apply_operation(cv2.GaussianBlur, (3, 3), 0)
+        blurred = self.model.current_image
+        self.model.apply_operation(rotate(10))
+        np.testing.assert_array_equal(self.model.current_image, rotate_image(blurred, 10, expand=True))
+
+    def test_frequency_spectrum_cache(self):
+        """测试频谱按预览前的图像缓存，预览时调整参数不重复计算"""
+        from utils.image_utils import denoise_frequency
+        self.model.load_image(str(self.test_image_path))
+        spectrum = self.model.frequency_spectrum()
+        self.assertIs(self.model.frequency_spectrum(), spectrum)
+        self.assertGreater(self.model.spectrum_bytes(), 0)
+        
+        # 开始预览后预览前的图像是当前图像的副本，沿用同一份频谱
+        self.model.preview_operation(denoise_frequency, 10, spectrum=spectrum)
+        self.assertIs(self.model.frequency_spectrum(), spectrum)
+        self.model.preview_operation(denoise_frequency, 20, spectrum=spectrum)
+        self.assertIs(self.model.frequency_spectrum(), spectrum)
+        
+        # 应用后图像变化，重新计算
+        self.model.apply_last_preview()
+        self.assertIsNot(self.model.frequency_spectrum(), spectrum)
+        self.assertGreater(self.model.clear_spectrum(), 0)
+        self.assertEqual(self.model.spectrum_bytes(), 0)
+
+    def test_wavelet_decomposition_cache(self):
+        """测试小波分解按预览前的图像和参数缓存"""
+        from utils.image_utils import denoise_wavelet
+        self.model.load_image(str(self.test_image_path))
+        decomposition = self.model.wavelet_decomposition()
+        self.assertIs(self.model.wavelet_decomposition(), decomposition)
+        self.assertIsNot(self.model.wavelet_decomposition(level=1), decomposition)
+        decomposition = self.model.wavelet_decomposition()
+        
+        self.model.preview_operation(denoise_wavelet, 0.5, decomposition=decomposition)
+        self.assertIs(self.model.wavelet_decomposition(), decomposition)
+        self.model.apply_last_preview()
+        self.assertIsNot(self.model.wavelet_decomposition(), decomposition)
+        self.assertGreater(self.model.clear_wavelet(), 0)
+        self.assertEqual(self.model.wavelet_bytes(), 0)
+    
+    def test_set_image(self):
+        """测试以内存中生成的图像作为新的原始图像"""
+        self.model.load_image(str(self.test_image_path))
+        self.model.apply_operation(cv2.GaussianBlur, (3, 3), 0)
+        generated = np.zeros((40, 60, 3), np.uint8)
+        self.assertTrue(self.model.set_image(generated))
+        self.assertIs(self.model.original_image, generated)
+        self.assertIs(self.model.current_image, generated)
+        self.assertFalse(self.model.can_undo())
+        self.assertEqual(len(self.model.get_recipe()), 0)
+        self.assertFalse(self.model.set_image(np.zeros((0, 0, 3), np.uint8)))
+    
+    def test_generate_image_async(self):
+        """测试在后台生成新图像：汇报进度、作为新图像打开、取消和出错"""
+        from PySide6.QtWidgets import QApplication
+        from utils.process_pool import OperationCancelled
+        app = QApplication.instance() or QApplication([])
+        self.model.load_image(str(self.test_image_path))
+        
+        progress = []
+        finished = []
+        self.model.operation_progress.connect(progress.append)
+        self.model.operation_finished.connect(lambda ok, message: finished.append(ok))
+        generated = np.zeros((40, 60, 3), np.uint8)
+        
+        def generate(progress_callback, cancel_event):
+            progress_callback(100)
+            return generated
+        
+        self.assertTrue(self.model.generate_image_async(generate))
+        self.assertTrue(self.model.wait_for_operation(timeout=30))
+        app.processEvents()
+        self.assertEqual(finished, [True])
+        self.assertEqual(progress, [100])
+        self.assertIs(self.model.current_image, generated)
+        self.assertFalse(self.model.can_undo())
+        
+        # 取消后图像不变
+        def cancelled(progress_callback, cancel_event):
+            cancel_event.wait(30)
+            raise OperationCancelled("拼接已取消")
+        
+        self.assertTrue(self.model.generate_image_async(cancelled))
+        self.model.cancel_operation()
+        self.model.wait_for_operation(timeout=30)
+        self.assertIs(self.model.current_image, generated)
+        self.assertEqual(finished[-1], False)
+        
+        # 出错时发出错误信号
+        errors = []
+        self.model.error_occurred.connect(errors.append)
+        
+        def failing(progress_callback, cancel_event):
+            raise ValueError("拼接失败")
+        
+        self.assertTrue(self.model.generate_image_async(failing))
+        self.model.wait_for_operation(timeout=30)
+        self.assertEqual(errors, ["拼接失败"])
+        self.assertIs(self.model.current_image, generated)
+    
     def test_reset(self):
         """测试重置功能"""
         # 先加载图像
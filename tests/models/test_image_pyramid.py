@@ -0,0 +1,107 @@
+"""
+测试图像金字塔
+"""
+import os
+import sys
+import unittest
+import numpy as np
+import cv2
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+# 使用通用的模块导入机制
+sys.path.append(os.path.join(project_root, "tests"))
+try:
+    from test_import_with_config import import_module_from_file, create_module_imports
+    
+    # 预先导入所有必要的模块
+    create_module_imports()
+    
+    # 导入模块
+    from models.image_pyramid import ImagePyramid, find_dirty_tiles
+except Exception as e:
+    print(f"预加载模块失败: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
+
+class TestImagePyramid(unittest.TestCase):
+    """测试ImagePyramid"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self.rng = np.random.default_rng(0)
+        self.image = self.rng.integers(0, 256, (601, 803, 3), dtype=np.uint8)
+
+    def test_lazy_levels(self):
+        """测试各层按需计算，与逐次pyrDown一致"""
+        pyramid = ImagePyramid(self.image)
+        self.assertIs(pyramid.level(0), self.image)
+        self.assertEqual(pyramid.nbytes, 0)
+
+        expected = self.image
+        for index in range(1, pyramid.level_count()):
+            expected = cv2.pyrDown(expected)
+            self.assertEqual(pyramid.level_shape(index), expected.shape[:2])
+            np.testing.assert_array_equal(pyramid.level(index), expected)
+        self.assertGreater(pyramid.nbytes, 0)
+        self.assertGreaterEqual(min(pyramid.level_shape(pyramid.level_count() - 1)), 16)
+
+        used = pyramid.nbytes
+        self.assertEqual(pyramid.clear(), used)
+        self.assertEqual(pyramid.nbytes, 0)
+        self.assertIs(pyramid.base, self.image)
+
+    def test_level_selection(self):
+        """测试按像素数和显示比例选择层"""
+        pyramid = ImagePyramid(self.image)
+        level = pyramid.level_for_pixels(50000)
+        self.assertGreaterEqual(level.shape[0] * level.shape[1], 50000)
+        height, width = pyramid.level_shape(pyramid.index_for_pixels(50000) + 1)
+        self.assertLess(height * width, 50000)
+        self.assertIs(pyramid.level_for_pixels(10 ** 9), self.image)
+
+        self.assertEqual(pyramid.index_for_scale(1.0), 0)
+        self.assertEqual(pyramid.index_for_scale(0.6), 0)
+        self.assertEqual(pyramid.index_for_scale(0.5), 1)
+        self.assertEqual(pyramid.index_for_scale(0.2), 2)
+        self.assertEqual(pyramid.index_for_scale(0.0001), pyramid.level_count() - 1)
+
+    def test_incremental_update(self):
+        """测试局部修改只更新变化区域，结果与重新计算相同"""
+        pyramid = ImagePyramid(self.image)
+        levels = [pyramid.level(index) for index in range(pyramid.level_count())]
+        version = pyramid.version
+
+        edited = self.image.copy()
+        edited[300:340, 500:620] = 255
+        edited[-3:, :5] = 0
+        rects = find_dirty_tiles(self.image, edited)
+        self.assertEqual(len(rects), 2)
+        pyramid.update(edited)
+
+        self.assertGreater(pyramid.version, version)
+        self.assertIs(pyramid.base, edited)
+        expected = ImagePyramid(edited)
+        for index in range(1, pyramid.level_count()):
+            # 已计算的层原地更新
+            self.assertIs(pyramid.level(index), levels[index])
+            np.testing.assert_array_equal(pyramid.level(index), expected.level(index))
+
+    def test_full_invalidation(self):
+        """测试整体变化或形状变化时丢弃已计算的层"""
+        pyramid = ImagePyramid(self.image)
+        pyramid.level(2)
+        self.assertIsNone(find_dirty_tiles(self.image, 255 - self.image))
+        pyramid.update(255 - self.image)
+        self.assertEqual(pyramid.nbytes, 0)
+
+        pyramid.level(1)
+        pyramid.update(self.image[:300])
+        self.assertEqual(pyramid.nbytes, 0)
+        self.assertEqual(pyramid.level(1).shape[:2], (150, 402))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,293 @@
+"""
+性能基准运行器 - 用于测量图像处理函数的耗时和内存峰值
+
+对 utils/image_utils.py 中的公开函数和 models/image_processor.py 中 ImageProcessor 的方法，
+在合成的 1/12/48 百万像素彩色和灰度图像上计时，记录每像素耗时（ns/pixel）和内存分配峰值，
+结果可保存为JSON基准，之后的运行与基准比较并标出性能回退。
+
+    python tests/run_benchmarks.py --save benchmark_baseline.json
+    python tests/run_benchmarks.py --compare benchmark_baseline.json --sizes 1mp 12mp
+
+内存峰值通过 tracemalloc 统计，包含NumPy和OpenCV返回数组的分配，不包含OpenCV内部的临时缓冲区。
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import platform
+import argparse
+import tracemalloc
+from datetime import datetime
+
+# 添加项目根目录到系统路径，确保能够正确导入应用模块
+# 去掉脚本所在的tests目录，避免tests/utils包遮蔽项目的utils目录
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path[:] = [project_root] + [p for p in sys.path if os.path.abspath(p or os.curdir) != tests_dir]
+
+import cv2
+import numpy as np
+
+from utils import image_utils
+from models.image_processor import ImageProcessor
+
+# 合成图像尺寸（高，宽）
+SIZES = {
+    '1mp': (1000, 1000),
+    '12mp': (3000, 4000),
+    '48mp': (6000, 8000),
+}
+
+INPUT_KINDS = ('rgb', 'gray')
+
+MISSING = object()  # 公开函数没有配置基准参数
+
+# 各函数的基准参数；None 表示不以图像为输入的辅助函数，不参与计时
+IMAGE_UTILS_CASES = {
+    'adjust_brightness_contrast': {'brightness': 20, 'contrast': 1.2},
+    'apply_gaussian_blur': {'kernel_size': 5, 'sigma': 0},
+    'apply_median_blur': {'kernel_size': 5},
+    'apply_bilateral_filter': {'d': 9, 'sigma_color': 75, 'sigma_space': 75},
+    'convert_to_grayscale': {},
+    'apply_threshold': {'threshold': 127},
+    'apply_adaptive_threshold': {'block_size': 11, 'c': 2},
+    'rotation_transform': None,
+    'rotate_image': {'angle': 30, 'expand': True},
+    'compose_affine': None,
+    'warp_affine_chain': None,
+    'flip_image': {'flip_code': 1},
+    'crop_image': {'x': 10, 'y': 10, 'width': 500, 'height': 500},
+    'apply_laplacian_sharpen': {'kernel_size': 3, 'strength': 1.0},
+    'apply_usm_sharpen': {'radius': 5, 'amount': 1.0, 'threshold': 5},
+    'apply_custom_sharpen': {'kernel': np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)},
+    'frequency_spectrum': {},
+    'denoise_frequency': {'radius': 30},
+    'denoise_nlmeans': {'h': 10},
+    'wavelet_decomposition': {},
+    'denoise_wavelet': {'threshold_scale': 1.0},
+    'noise_generator': None,
+    'add_gaussian_noise': {'sigma': 10.0},
+    'add_uniform_noise': {'amplitude': 20.0},
+    'add_salt_pepper_noise': {'amount': 0.05},
+    'calculate_histogram': {},
+    'apply_histogram_equalization': {},
+    'adjust_exposure': {'exposure': 0.5},
+    'adjust_highlights': {'highlights': 0.5},
+    'adjust_shadows': {'shadows': 0.5},
+    'adjust_local_exposure': {'center_x': 500, 'center_y': 500, 'radius': 300, 'strength': 0.5},
+    'auto_contrast_enhancement': {},
+    'auto_color_correction': {},
+    'white_balance_statistics': {},
+    'merge_white_balance_statistics': None,
+    'white_balance_gains': None,
+    'apply_channel_gains': {'gains': (1.1, 1.0, 0.9)},
+    'auto_white_balance': {'method': 'adaptive'},
+    'auto_image_enhance': {},
+}
+
+IMAGE_PROCESSOR_CASES = {
+    'resize': {'size': (640, 480), 'interpolation': cv2.INTER_AREA},
+    'rotate': {'angle': 30},
+    'flip': {'flip_code': 1},
+    'adjust_brightness': {'value': 20},
+    'adjust_contrast': {'value': 1.2},
+    'adjust_saturation': {'value': 1.3},
+    'apply_filter': {'kernel': np.ones((3, 3), dtype=np.float32) / 9},
+    'gaussian_blur': {'kernel_size': (5, 5)},
+    'median_blur': {'kernel_size': 5},
+    'bilateral_filter': {'d': 9, 'sigma_color': 75, 'sigma_space': 75},
+    'threshold': {'thresh': 127, 'maxval': 255, 'type': cv2.THRESH_BINARY},
+    'adaptive_threshold': {
+        'maxval': 255, 'adaptive_method': cv2.ADAPTIVE_THRESH_MEAN_C,
+        'threshold_type': cv2.THRESH_BINARY, 'block_size': 11, 'C': 2
+    },
+    'canny': {'threshold1': 50, 'threshold2': 150},
+    'convert_color': {'code': cv2.COLOR_BGR2HSV},
+}
+
+def public_functions():
+    """列出需要计时的公开函数
+
+    Returns:
+        list: [(基准名称, 函数, 参数), ...]，参数为None表示不以图像为输入，为MISSING表示缺少基准参数
+    """
+    functions = []
+    for name, func in inspect.getmembers(image_utils, inspect.isfunction):
+        if name.startswith('_') or func.__module__ != image_utils.__name__:
+            continue
+        functions.append((f"image_utils.{name}", func, IMAGE_UTILS_CASES.get(name, MISSING)))
+    for name, func in inspect.getmembers(ImageProcessor, inspect.isfunction):
+        if name.startswith('_'):
+            continue
+        functions.append((f"ImageProcessor.{name}", func, IMAGE_PROCESSOR_CASES.get(name, MISSING)))
+    return functions
+
+def make_image(size, kind, seed=0):
+    """生成合成测试图像：平滑渐变叠加噪声，接近自然照片的统计特性
+
+    Args:
+        size: 尺寸键，如 '12mp'
+        kind: 'rgb' 或 'gray'
+        seed: 随机种子
+
+    Returns:
+        ndarray: BGR或灰度图像
+    """
+    height, width = SIZES[size]
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    base = 255 * (0.5 + 0.25 * np.sin(6 * x + 3 * y) * np.cos(4 * y))
+    if kind == 'gray':
+        noise = rng.normal(0, 12, (height, width)).astype(np.float32)
+        return np.clip(base + noise, 0, 255).astype(np.uint8)
+    channels = [base * scale for scale in (0.8, 1.0, 0.9)]
+    noise = rng.normal(0, 12, (height, width, 3)).astype(np.float32)
+    return np.clip(np.dstack(channels) + noise, 0, 255).astype(np.uint8)
+
+def benchmark_function(func, image, kwargs, repeats=3):
+    """对单个函数计时并统计内存峰值
+
+    计时取多次运行的最小值；内存峰值在单独的一次运行中用 tracemalloc 统计，避免跟踪开销影响计时。
+
+    Returns:
+        dict: 每像素耗时、单次耗时和内存峰值
+    """
+    pixels = image.shape[0] * image.shape[1]
+    func(image, **kwargs)  # 预热，排除首次调用的初始化开销
+
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        func(image, **kwargs)
+        best = min(best, time.perf_counter_ns() - start)
+
+    tracemalloc.start()
+    try:
+        func(image, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'ns_per_pixel': best / pixels,
+        'seconds': best / 1e9,
+        'peak_bytes': peak,
+        'peak_bytes_per_pixel': peak / pixels,
+    }
+
+def run_benchmarks(sizes=None, kinds=INPUT_KINDS, pattern=None, repeats=3, progress=print):
+    """运行基准测试
+
+    Args:
+        sizes: 尺寸键列表，默认全部
+        kinds: 输入类型列表
+        pattern: 只运行名称包含该字符串的函数
+        repeats: 计时重复次数
+        progress: 输出进度的函数，为None时不输出
+
+    Returns:
+        dict: 包含环境信息和各项结果的基准数据
+    """
+    sizes = sizes or list(SIZES)
+    results = {}
+    skipped = {}
+    functions = [entry for entry in public_functions() if not pattern or pattern in entry[0]]
+
+    for size in sizes:
+        for kind in kinds:
+            image = make_image(size, kind)
+            probe = make_image('1mp', kind)[:64, :64]
+            for name, func, kwargs in functions:
+                if kwargs is None or kwargs is MISSING:
+                    skipped[name] = "不以图像为输入" if kwargs is None else "缺少基准参数"
+                    continue
+                key = f"{name}|{kind}|{size}"
+                try:
+                    # 先在小图上试运行，跳过不支持该输入类型的函数
+                    func(probe, **kwargs)
+                except Exception as e:
+                    skipped[key] = f"{type(e).__name__}: {str(e).strip().splitlines()[0]}"
+                    continue
+                results[key] = benchmark_function(func, image, kwargs, repeats)
+                if progress is not None:
+                    result = results[key]
+                    progress(f"{key:60s} {result['ns_per_pixel']:8.2f} ns/pixel "
+                             f"{result['peak_bytes'] / 1e6:9.1f} MB")
+
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'opencv_threads': cv2.getNumThreads(),
+            'repeats': repeats,
+        },
+        'results': results,
+        'skipped': skipped,
+    }
+
+def compare_results(current, baseline, time_tolerance=0.15, memory_tolerance=0.10):
+    """与基准比较，找出性能回退
+
+    Args:
+        current: 本次运行的结果
+        baseline: 基准结果
+        time_tolerance: 允许的每像素耗时增长比例
+        memory_tolerance: 允许的内存峰值增长比例
+
+    Returns:
+        list: [(基准名称, 指标, 基准值, 当前值, 增长比例), ...]
+    """
+    regressions = []
+    for key, result in current['results'].items():
+        reference = baseline['results'].get(key)
+        if reference is None:
+            continue
+        for metric, tolerance in (('ns_per_pixel', time_tolerance), ('peak_bytes', memory_tolerance)):
+            before, after = reference[metric], result[metric]
+            if before > 0 and after > before * (1 + tolerance):
+                regressions.append((key, metric, before, after, after / before - 1))
+    return regressions
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description="运行图像处理性能基准")
+    parser.add_argument("--sizes", nargs='+', choices=list(SIZES), default=list(SIZES), help="图像尺寸")
+    parser.add_argument("--kinds", nargs='+', choices=INPUT_KINDS, default=list(INPUT_KINDS), help="输入类型")
+    parser.add_argument("-k", "--pattern", default=None, help="只运行名称包含该字符串的函数")
+    parser.add_argument("--repeats", type=int, default=3, help="计时重复次数")
+    parser.add_argument("--save", default=None, help="将结果保存为JSON基准文件")
+    parser.add_argument("--compare", default=None, help="与JSON基准文件比较")
+    parser.add_argument("--time-tolerance", type=float, default=0.15, help="允许的耗时增长比例")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10, help="允许的内存峰值增长比例")
+    args = parser.parse_args(argv)
+
+    data = run_benchmarks(args.sizes, args.kinds, args.pattern, args.repeats)
+
+    for name, reason in sorted(data['skipped'].items()):
+        print(f"跳过: {name} ({reason})")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        print(f"基准已保存: {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(data, baseline, args.time_tolerance, args.memory_tolerance)
+        for key, metric, before, after, ratio in regressions:
+            print(f"性能回退: {key} {metric} {before:.2f} -> {after:.2f} (+{ratio:.0%})")
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能回退")
+            return 1
+        print("未发现性能回退")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+启动耗时基准 - 测量应用冷启动各阶段的耗时并检查是否超出预算
+
+每次测量都在新的子进程中以Qt offscreen平台无界面运行，依次记录：
+
+1. imports：导入PySide6和主窗口模块（含numpy、OpenCV等依赖）
+2. qapplication：创建QApplication
+3. main_window：创建MainWindow
+4. first_paint：显示主窗口到图像视图首次绘制完成
+
+另外以 python -X importtime 单独运行一次导入，按顶层包汇总模块导入耗时。
+多次测量取中位数，结果以JSON输出，超出预算文件中的任一项时返回非零退出码。
+
+    python tests/run_startup_benchmark.py
+    python tests/run_startup_benchmark.py --repeats 5 --save startup.json --budget tests/startup_budget.json
+
+启动时的自适应性能配置（app/performance_profile.py）首次运行需要测量，之后读取缓存，不计入本基准。
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+
+# 添加项目根目录到系统路径，确保能够正确导入应用模块
+# 去掉脚本所在的tests目录，避免tests/app、tests/utils包遮蔽项目的同名目录
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path[:] = [project_root] + [p for p in sys.path if os.path.abspath(p or os.curdir) != tests_dir]
+
+DEFAULT_BUDGET = os.path.join(tests_dir, "startup_budget.json")
+PHASES = ('imports', 'qapplication', 'main_window', 'first_paint')
+
+# 导入耗时分析运行的代码，与 measure_startup 的导入阶段相同
+IMPORT_CODE = (
+    "import sys; sys.path.insert(0, {root!r}); "
+    "import PySide6.QtWidgets; import app.main_window"
+)
+
+def _child_env():
+    env = dict(os.environ)
+    env['QT_QPA_PLATFORM'] = 'offscreen'
+    # 子进程以项目根目录为工作目录，不继承tests目录
+    env.pop('PYTHONPATH', None)
+    return env
+
+def measure_startup(timeout=30.0):
+    """在当前进程中测量一次启动（应在新的子进程中调用）
+
+    Args:
+        timeout: 等待首次绘制的最长时间（秒）
+
+    Returns:
+        dict: {'phases': {阶段: 毫秒}, 'total': 毫秒}
+    """
+    from utils.startup import StartupTimer
+    timer = StartupTimer()
+
+    from PySide6.QtCore import QTimer
+    from PySide6.QtWidgets import QApplication
+    from app.main_window import MainWindow
+    timer.mark('imports')
+
+    app = QApplication([sys.argv[0]])
+    timer.mark('qapplication')
+
+    window = MainWindow()
+    timer.mark('main_window')
+
+    painted = []
+
+    def on_first_paint():
+        timer.mark('first_paint')
+        painted.append(True)
+        app.quit()
+
+    window.image_view.first_painted.connect(on_first_paint)
+    QTimer.singleShot(int(timeout * 1000), app.quit)
+    window.show()
+    app.exec()
+    if not painted:
+        raise RuntimeError("等待主窗口首次绘制超时")
+    return timer.to_dict()
+
+def run_child(timeout=60.0):
+    """在新的子进程中测量一次启动
+
+    Returns:
+        dict: measure_startup() 的结果
+    """
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"],
+        cwd=project_root, env=_child_env(), capture_output=True, text=True, timeout=timeout,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"启动测量失败:\n{completed.stderr}")
+    # 应用启动时会打印日志，结果在最后一行
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def parse_importtime(output):
+    """解析 -X importtime 的输出
+
+    Args:
+        output: 子进程的标准错误输出
+
+    Returns:
+        list: [(模块名, 自身耗时微秒, 累计耗时微秒, 嵌套层级), ...]
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # 表头
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return entries
+
+def measure_imports(top=15, timeout=60.0):
+    """以 python -X importtime 运行一次导入，按顶层包汇总耗时
+
+    Args:
+        top: 输出自身耗时最长的模块数
+
+    Returns:
+        dict: {'total': 毫秒, 'packages': {顶层包: 毫秒}, 'slowest': [[模块, 自身毫秒, 累计毫秒], ...]}
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_CODE.format(root=project_root)],
+        cwd=project_root, env=_child_env(), capture_output=True, text=True, timeout=timeout,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"导入分析失败:\n{completed.stderr}")
+    entries = parse_importtime(completed.stderr)
+
+    packages = {}
+    for name, self_us, _, _ in entries:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0.0) + self_us / 1000
+    slowest = sorted(entries, key=lambda entry: entry[1], reverse=True)[:top]
+    return {
+        'total': sum(cumulative for _, _, cumulative, depth in entries if depth == 0) / 1000,
+        'packages': dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)),
+        'slowest': [[name, self_us / 1000, cumulative / 1000] for name, self_us, cumulative, _ in slowest],
+    }
+
+def run_startup_benchmark(repeats=3, progress=print):
+    """多次测量启动耗时，取各阶段的中位数
+
+    Returns:
+        dict: 测量结果
+    """
+    runs = []
+    for index in range(repeats):
+        runs.append(run_child())
+        progress(f"第{index + 1}次: 总计 {runs[-1]['total']:.0f} ms")
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'repeats': repeats,
+        'phases': {phase: statistics.median(run['phases'][phase] for run in runs) for phase in PHASES},
+        'total': statistics.median(run['total'] for run in runs),
+        'imports': measure_imports(),
+    }
+
+def check_budget(result, budget):
+    """检查结果是否超出预算
+
+    Args:
+        result: run_startup_benchmark() 的结果
+        budget: 预算，{'total': 毫秒, 'phases': {阶段: 毫秒}, 'import_packages': {顶层包: 毫秒}}
+
+    Returns:
+        list: [(指标, 预算, 实测), ...]
+    """
+    exceeded = []
+    if 'total' in budget and result['total'] > budget['total']:
+        exceeded.append(('total', budget['total'], result['total']))
+    for phase, limit in budget.get('phases', {}).items():
+        value = result['phases'].get(phase)
+        if value is not None and value > limit:
+            exceeded.append((f"phases.{phase}", limit, value))
+    for package, limit in budget.get('import_packages', {}).items():
+        value = result['imports']['packages'].get(package, 0.0)
+        if value > limit:
+            exceeded.append((f"import_packages.{package}", limit, value))
+    return exceeded
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description="测量应用启动耗时")
+    parser.add_argument("--repeats", type=int, default=3, help="测量次数，取中位数")
+    parser.add_argument("--budget", default=DEFAULT_BUDGET, help="预算JSON文件，为空字符串时不检查")
+    parser.add_argument("--save", default=None, help="将结果保存为JSON文件")
+    parser.add_argument("--child", action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_startup()))
+        return 0
+
+    result = run_startup_benchmark(args.repeats, progress=lambda text: print(text, file=sys.stderr))
+    print(json.dumps(result, ensure_ascii=False, indent=4))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=4)
+        print(f"结果已保存: {args.save}", file=sys.stderr)
+
+    if args.budget:
+        with open(args.budget, 'r', encoding='utf-8') as f:
+            budget = json.load(f)
+        exceeded = check_budget(result, budget)
+        for metric, limit, value in exceeded:
+            print(f"超出预算: {metric} {value:.0f} ms > {limit:.0f} ms", file=sys.stderr)
+        if exceeded:
+            return 1
+        print("启动耗时在预算之内", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
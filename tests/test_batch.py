@@ -0,0 +1,116 @@
+"""
+测试无界面批处理入口
+"""
+import os
+import sys
+import unittest
+import tempfile
+import shutil
+import json
+import numpy as np
+import cv2
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# 使用通用的模块导入机制
+sys.path.append(os.path.join(project_root, "tests"))
+try:
+    from test_import_with_config import import_module_from_file, create_module_imports
+    
+    # 预先导入所有必要的模块
+    create_module_imports()
+    
+    # 导入模块
+    from controllers.operation_registry import run_operation
+    batch = import_module_from_file("batch", os.path.join(project_root, "batch.py"))
+except Exception as e:
+    print(f"预加载模块失败: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
+
+class TestBatch(unittest.TestCase):
+    """测试批处理"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, "input")
+        self.output_dir = os.path.join(self.temp_dir, "output")
+        os.makedirs(self.input_dir)
+
+        rng = np.random.default_rng(0)
+        self.images = {}
+        for index in range(3):
+            image = rng.integers(0, 256, (40, 60, 3), dtype=np.uint8)
+            name = f"image_{index}.png"
+            cv2.imwrite(os.path.join(self.input_dir, name), image)
+            self.images[name] = image
+
+        self.steps = [
+            ('brightness_contrast', {'brightness': 10, 'contrast': 1.2}),
+            ('blur', {'blur_type': 'median', 'kernel_size': 3}),
+        ]
+
+    def tearDown(self):
+        """每个测试方法执行后的清理工作"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_load_recipe_steps(self):
+        """测试从JSON读取配方并校验操作名称"""
+        recipe = json.dumps({'steps': [{'operation': 'usm', 'parameters': {'amount': 1.5}}]})
+        self.assertEqual(batch.load_recipe_steps(recipe), [('usm', {'amount': 1.5})])
+
+        with self.assertRaises(ValueError):
+            batch.load_recipe_steps('[{"operation": "no_such_operation"}]')
+
+    def test_run_batch(self):
+        """测试多进程批处理结果与逐步执行一致"""
+        progress = []
+        stats = batch.run_batch(
+            self.input_dir, self.output_dir, self.steps,
+            workers=2, max_in_flight=2, output_format='png',
+            progress_callback=lambda done, total, result: progress.append(done)
+        )
+
+        self.assertEqual(stats['succeeded'], 3)
+        self.assertEqual(stats['failed'], [])
+        self.assertEqual(progress, [1, 2, 3])
+        self.assertAlmostEqual(stats['megapixels'], 3 * 40 * 60 / 1e6)
+        self.assertGreater(stats['images_per_second'], 0)
+
+        for name, image in self.images.items():
+            expected = image
+            for operation, parameters in self.steps:
+                expected = run_operation(expected, operation, parameters)
+            result = cv2.imread(os.path.join(self.output_dir, name))
+            self.assertTrue(np.array_equal(result, expected))
+
+    def test_failed_image_is_reported(self):
+        """测试无法读取的文件记录为失败而不中断批处理"""
+        with open(os.path.join(self.input_dir, "broken.png"), 'wb') as f:
+            f.write(b"not an image")
+
+        exit_code = batch.main([self.input_dir, self.output_dir, '--recipe', '[]', '--workers', '1'])
+        self.assertEqual(exit_code, 1)
+        self.assertEqual(len(os.listdir(self.output_dir)), 3)
+
+    def test_output_collision(self):
+        """测试指定输出格式时同名不同扩展名的输入报错，不覆盖输出"""
+        cv2.imwrite(os.path.join(self.input_dir, "image_0.jpg"), self.images["image_0.png"])
+
+        with self.assertRaises(ValueError):
+            batch.run_batch(self.input_dir, self.output_dir, self.steps, workers=1, output_format='png')
+        self.assertFalse(os.path.exists(self.output_dir))
+
+        exit_code = batch.main([self.input_dir, self.output_dir, '--recipe', '[]', '--format', 'webp'])
+        self.assertEqual(exit_code, 2)
+
+        # 沿用输入格式时不冲突
+        stats = batch.run_batch(self.input_dir, self.output_dir, self.steps, workers=1)
+        self.assertEqual(stats['succeeded'], 4)
+
+if __name__ == "__main__":
+    unittest.main()
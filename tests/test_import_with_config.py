@@ -50,6 +50,22 @@ def import_module_from_file(module_name, file_path):
         
 def create_module_imports():
     """创建关键模块的导入"""
+    # 导入startup模块
+    startup_file = project_root / "utils" / "startup.py"
+    if startup_file.exists():
+        startup_module = import_module_from_file("startup", str(startup_file))
+        if startup_module:
+            sys.modules["utils.startup"] = startup_module
+            print("创建了utils.startup模块!")
+
+    # 导入system_resources模块（config依赖它读取容器的资源限制）
+    system_resources_file = project_root / "utils" / "system_resources.py"
+    if system_resources_file.exists():
+        system_resources_module = import_module_from_file("system_resources", str(system_resources_file))
+        if system_resources_module:
+            sys.modules["utils.system_resources"] = system_resources_module
+            print("创建了utils.system_resources模块!")
+
     # 导入config模块
     config_file = project_root / "app" / "config.py"
     if config_file.exists():
@@ -65,7 +81,111 @@ def create_module_imports():
         if image_utils_module:
             sys.modules["utils.image_utils"] = image_utils_module
             print("创建了utils.image_utils模块!")
-    
+
+    # 导入concurrency模块
+    concurrency_file = project_root / "utils" / "concurrency.py"
+    if concurrency_file.exists():
+        concurrency_module = import_module_from_file("concurrency", str(concurrency_file))
+        if concurrency_module:
+            sys.modules["utils.concurrency"] = concurrency_module
+            print("创建了utils.concurrency模块!")
+
+    # 导入performance_profile模块
+    performance_profile_file = project_root / "app" / "performance_profile.py"
+    if performance_profile_file.exists():
+        performance_profile_module = import_module_from_file("performance_profile", str(performance_profile_file))
+        if performance_profile_module:
+            sys.modules["app.performance_profile"] = performance_profile_module
+            print("创建了app.performance_profile模块!")
+
+    # 导入memory_monitor模块
+    memory_monitor_file = project_root / "utils" / "memory_monitor.py"
+    if memory_monitor_file.exists():
+        memory_monitor_module = import_module_from_file("memory_monitor", str(memory_monitor_file))
+        if memory_monitor_module:
+            sys.modules["utils.memory_monitor"] = memory_monitor_module
+            print("创建了utils.memory_monitor模块!")
+
+    # 导入process_pool模块
+    process_pool_file = project_root / "utils" / "process_pool.py"
+    if process_pool_file.exists():
+        process_pool_module = import_module_from_file("process_pool", str(process_pool_file))
+        if process_pool_module:
+            sys.modules["utils.process_pool"] = process_pool_module
+            print("创建了utils.process_pool模块!")
+
+    # 导入image_io模块
+    image_io_file = project_root / "utils" / "image_io.py"
+    if image_io_file.exists():
+        image_io_module = import_module_from_file("image_io", str(image_io_file))
+        if image_io_module:
+            sys.modules["utils.image_io"] = image_io_module
+            print("创建了utils.image_io模块!")
+
+    # 导入qt_utils模块
+    qt_utils_file = project_root / "utils" / "qt_utils.py"
+    if qt_utils_file.exists():
+        qt_utils_module = import_module_from_file("qt_utils", str(qt_utils_file))
+        if qt_utils_module:
+            sys.modules["utils.qt_utils"] = qt_utils_module
+            print("创建了utils.qt_utils模块!")
+
+    # 导入profiler模块
+    profiler_file = project_root / "utils" / "profiler.py"
+    if profiler_file.exists():
+        profiler_module = import_module_from_file("profiler", str(profiler_file))
+        if profiler_module:
+            sys.modules["utils.profiler"] = profiler_module
+            print("创建了utils.profiler模块!")
+
+    # 导入tiled_image模块
+    tiled_image_file = project_root / "utils" / "tiled_image.py"
+    if tiled_image_file.exists():
+        tiled_image_module = import_module_from_file("tiled_image", str(tiled_image_file))
+        if tiled_image_module:
+            sys.modules["utils.tiled_image"] = tiled_image_module
+            print("创建了utils.tiled_image模块!")
+
+    # 导入stitching模块
+    stitching_file = project_root / "utils" / "stitching.py"
+    if stitching_file.exists():
+        stitching_module = import_module_from_file("stitching", str(stitching_file))
+        if stitching_module:
+            sys.modules["utils.stitching"] = stitching_module
+            print("创建了utils.stitching模块!")
+
+    # 导入collage模块
+    collage_file = project_root / "utils" / "collage.py"
+    if collage_file.exists():
+        collage_module = import_module_from_file("collage", str(collage_file))
+        if collage_module:
+            sys.modules["utils.collage"] = collage_module
+            print("创建了utils.collage模块!")
+
+    # 导入super_resolution模块
+    super_resolution_file = project_root / "utils" / "super_resolution.py"
+    if super_resolution_file.exists():
+        super_resolution_module = import_module_from_file("super_resolution", str(super_resolution_file))
+        if super_resolution_module:
+            sys.modules["utils.super_resolution"] = super_resolution_module
+            print("创建了utils.super_resolution模块!")
+
+    # 导入edit_recipe模块
+    edit_recipe_file = project_root / "models" / "edit_recipe.py"
+    if edit_recipe_file.exists():
+        edit_recipe_module = import_module_from_file("edit_recipe", str(edit_recipe_file))
+        if edit_recipe_module:
+            sys.modules["models.edit_recipe"] = edit_recipe_module
+            print("创建了models.edit_recipe模块!")
+
+    # 导入image_pyramid模块
+    image_pyramid_file = project_root / "models" / "image_pyramid.py"
+    if image_pyramid_file.exists():
+        image_pyramid_module = import_module_from_file("image_pyramid", str(image_pyramid_file))
+        if image_pyramid_module:
+            sys.modules["models.image_pyramid"] = image_pyramid_module
+            print("创建了models.image_pyramid模块!")
+
     # 导入image_model模块
     image_model_file = project_root / "models" / "image_model.py"
     if image_model_file.exists():
@@ -82,6 +202,14 @@ def create_module_imports():
                 except Exception as e:
                     print(f"创建ImageModel实例失败: {e}")
                 
+    # 导入operation_registry模块
+    registry_file = project_root / "controllers" / "operation_registry.py"
+    if registry_file.exists():
+        registry_module = import_module_from_file("operation_registry", str(registry_file))
+        if registry_module:
+            sys.modules["controllers.operation_registry"] = registry_module
+            print("创建了controllers.operation_registry模块!")
+            
     # 导入image_controller模块
     controller_file = project_root / "controllers" / "image_controller.py"
     if controller_file.exists():
@@ -0,0 +1,94 @@
+"""
+测试拼图模块
+"""
+import os
+import sys
+import unittest
+import numpy as np
+import cv2
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.collage import compute_layout, create_collage
+
+class TestCollage(unittest.TestCase):
+    """测试拼图布局和合成"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        rng = np.random.default_rng(0)
+        self.images = [
+            rng.integers(0, 256, (100, 200, 3), dtype=np.uint8),
+            rng.integers(0, 256, (150, 100, 3), dtype=np.uint8),
+            rng.integers(0, 256, (80, 120, 3), dtype=np.uint8),
+        ]
+        self.sizes = [(image.shape[1], image.shape[0]) for image in self.images]
+
+    def test_basic_layouts(self):
+        """测试水平、垂直排列保持原始大小"""
+        rects, size = compute_layout(self.sizes, "horizontal", padding=10)
+        self.assertEqual(rects, [(0, 0, 200, 100), (210, 0, 100, 150), (320, 0, 120, 80)])
+        self.assertEqual(size, (440, 150))
+
+        rects, size = compute_layout(self.sizes, "vertical", padding=5)
+        self.assertEqual(rects, [(0, 0, 200, 100), (0, 105, 100, 150), (0, 260, 120, 80)])
+        self.assertEqual(size, (200, 340))
+
+        # auto 布局按总宽度选择方向
+        self.assertEqual(compute_layout(self.sizes, "auto")[1], (420, 150))
+        self.assertEqual(compute_layout([(2000, 10), (2000, 10)], "auto")[1], (2000, 20))
+
+    def test_three_image_layouts(self):
+        """测试上2下1和左1右2布局"""
+        rects, size = compute_layout(self.sizes, "top2_bottom1", padding=10)
+        self.assertEqual(rects[0], (0, 0, 100, 50))
+        self.assertEqual(rects[1], (110, 0, 100, 150))
+        self.assertEqual(rects[2], (0, 160, 210, 140))
+        self.assertEqual(size, (210, 300))
+
+        rects, size = compute_layout(self.sizes, "left1_right2", padding=10)
+        self.assertEqual(rects[1][2:], (53, 80))
+        self.assertEqual(rects[2][2:], (120, 80))
+        self.assertEqual(rects[0], (0, 0, 340, 170))
+        self.assertEqual(size, (470, 170))
+
+        with self.assertRaises(ValueError):
+            compute_layout(self.sizes[:2], "top2_bottom1")
+        with self.assertRaises(ValueError):
+            compute_layout(self.sizes, "diagonal")
+
+    def test_grid_layout(self):
+        """测试网格布局中图像等比缩放后居中放入单元格"""
+        rects, size = compute_layout(self.sizes + [(200, 150)], "grid", padding=4)
+        self.assertEqual(size, (404, 304))
+        for x, y, w, h in rects:
+            self.assertTrue(w == 200 or h == 150)
+        self.assertEqual(rects[1], (254, 0, 100, 150))
+        self.assertEqual(rects[3], (204, 154, 200, 150))
+
+    def test_create_collage(self):
+        """测试缩放结果直接写入画布，背景保持背景色"""
+        progress = []
+        result = create_collage(self.images, "top2_bottom1", padding=10, background=(1, 2, 3),
+                                progress_callback=progress.append)
+        self.assertEqual(result.shape, (300, 210, 3))
+        self.assertEqual(progress[-1], 100)
+        np.testing.assert_array_equal(result[10:150, 110:210], self.images[1][10:, :])
+        expected = cv2.resize(self.images[0], (100, 50), interpolation=cv2.INTER_AREA)
+        np.testing.assert_array_equal(result[0:50, 0:100], expected)
+        np.testing.assert_array_equal(result[50:160, 0:100], np.broadcast_to([1, 2, 3], (110, 100, 3)))
+
+    def test_channel_conversion(self):
+        """测试灰度和BGRA输入转换为BGR"""
+        gray = np.full((20, 30), 77, np.uint8)
+        bgra = np.full((20, 30, 4), (10, 20, 30, 255), np.uint8)
+        result = create_collage([gray, bgra], "horizontal")
+        np.testing.assert_array_equal(result[:, :30], 77)
+        np.testing.assert_array_equal(result[:, 30:], np.broadcast_to([10, 20, 30], (20, 30, 3)))
+        with self.assertRaises(ValueError):
+            create_collage([gray.astype(np.float32)], "horizontal")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+测试运行时并发管理模块
+"""
+import os
+import sys
+import unittest
+import cv2
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from app.config import config
+from utils.concurrency import ConcurrencyManager
+
+class TestConcurrencyManager(unittest.TestCase):
+    """测试并行策略选择和任务记录"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self._saved = {
+            key: config.get(key)
+            for key in ('performance.opencv_threads', 'performance.concurrency_mode',
+                        'performance.parallel_min_pixels')
+        }
+        self._threads = cv2.getNumThreads()
+        config.set('performance.opencv_threads', 3)
+        self.manager = ConcurrencyManager()
+        self.manager.configure()
+
+    def tearDown(self):
+        """每个测试方法执行后的清理工作"""
+        for key, value in self._saved.items():
+            config.set(key, value)
+        cv2.setNumThreads(self._threads)
+
+    def test_configure(self):
+        """测试按配置设置OpenCV线程数"""
+        self.assertEqual(self.manager.opencv_threads, 3)
+        self.assertEqual(cv2.getNumThreads(), 3)
+
+    def test_choose_strategy(self):
+        """测试按模式、像素数和可分块性选择策略"""
+        config.set('performance.parallel_min_pixels', 1000)
+        config.set('performance.concurrency_mode', 'auto')
+        self.assertEqual(self.manager.choose_strategy(10), 'internal')
+        expected = 'tiles' if self.manager.cores > 1 else 'internal'
+        self.assertEqual(self.manager.choose_strategy(10000), expected)
+        self.assertEqual(self.manager.choose_strategy(10000, tileable=False), 'internal')
+
+        config.set('performance.concurrency_mode', 'tiles')
+        self.assertEqual(self.manager.choose_strategy(10), 'tiles')
+        config.set('performance.concurrency_mode', 'bogus')
+        with self.assertRaises(ValueError):
+            self.manager.choose_strategy(10)
+
+    def test_job_records(self):
+        """测试分块任务期间OpenCV降为单线程，嵌套任务合并到外层记录"""
+        with self.manager.job('outer', 100) as record:
+            self.assertEqual(cv2.getNumThreads(), 3)
+            with self.manager.job('inner', 100, 'tiles') as inner:
+                self.assertIs(inner, record)
+                self.assertEqual(cv2.getNumThreads(), 1)
+                self.manager.add_worker_cpu(0.5)
+        self.assertEqual(cv2.getNumThreads(), 3)
+
+        history = self.manager.get_history()
+        self.assertEqual(len(history), 1)
+        record = history[0]
+        self.assertEqual(record['name'], 'outer')
+        self.assertEqual(record['strategy'], 'tiles')
+        self.assertGreaterEqual(record['cpu_time'], 0.5)
+        self.assertGreater(record['utilization'], 0)
+
+        with self.assertRaises(ValueError):
+            with self.manager.job('bad', strategy='bogus'):
+                pass
+
+if __name__ == "__main__":
+    unittest.main()
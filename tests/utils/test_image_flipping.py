@@ -35,6 +35,13 @@ class TestImageFlipping(unittest.TestCase):
         if self.output_path.exists():
             shutil.rmtree(str(self.output_path))
     
+    def test_flip_is_view(self):
+        """测试翻转结果为共享内存的视图，与cv2.flip结果一致"""
+        for flip_code in (0, 1, -1):
+            flipped = flip_image(self.test_image, flip_code)
+            self.assertTrue(np.shares_memory(flipped, self.test_image))
+            np.testing.assert_array_equal(flipped, cv2.flip(self.test_image, flip_code))
+    
     def test_horizontal_flip(self):
         """测试水平翻转"""
         # 水平翻转图像
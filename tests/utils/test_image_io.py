@@ -0,0 +1,107 @@
+"""
+测试图像读写工具函数
+"""
+import os
+import sys
+import unittest
+import tempfile
+import shutil
+import numpy as np
+import cv2
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.image_io import (
+    get_image_format,
+    build_encode_params,
+    encode_image,
+    save_image_atomic,
+    write_bytes_atomic
+)
+
+class TestImageIO(unittest.TestCase):
+    """测试图像读写工具函数"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_image = np.zeros((64, 80, 3), dtype=np.uint8)
+        self.test_image[10:30, 10:40] = [0, 0, 255]
+        self.test_image[40:60, 50:70] = [0, 255, 0]
+
+    def tearDown(self):
+        """每个测试方法执行后的清理工作"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_get_image_format(self):
+        """测试根据扩展名识别格式"""
+        self.assertEqual(get_image_format("a.JPG"), "jpeg")
+        self.assertEqual(get_image_format("a.png"), "png")
+        self.assertEqual(get_image_format("a.webp"), "webp")
+        with self.assertRaises(ValueError):
+            get_image_format("a.unknown")
+
+    def test_build_encode_params(self):
+        """测试按格式构建编码参数"""
+        jpeg_params = build_encode_params("a.jpg", {'jpeg_quality': 80})
+        self.assertEqual(jpeg_params[:2], [cv2.IMWRITE_JPEG_QUALITY, 80])
+
+        png_params = build_encode_params("a.png", {'png_compression': 12})
+        # 超出范围的压缩级别被限制在[0, 9]
+        self.assertEqual(png_params, [cv2.IMWRITE_PNG_COMPRESSION, 9])
+
+        self.assertEqual(build_encode_params("a.bmp"), [])
+
+    def test_jpeg_quality_affects_size(self):
+        """测试JPEG质量参数影响编码大小"""
+        noisy = np.random.RandomState(0).randint(0, 256, (128, 128, 3), dtype=np.uint8)
+        low = encode_image(noisy, "a.jpg", {'jpeg_quality': 20})
+        high = encode_image(noisy, "a.jpg", {'jpeg_quality': 95})
+        self.assertLess(low.size, high.size)
+
+    def test_save_image_atomic(self):
+        """测试原子保存与进度汇报"""
+        path = os.path.join(self.temp_dir, "out.png")
+        progress = []
+        save_image_atomic(self.test_image, path, progress_callback=progress.append)
+
+        # 文件内容无损
+        loaded = cv2.imread(path, cv2.IMREAD_COLOR)
+        self.assertTrue(np.array_equal(loaded, self.test_image))
+
+        # 进度单调递增并以100结束
+        self.assertEqual(progress[-1], 100)
+        self.assertEqual(progress, sorted(progress))
+
+        # 不留下临时文件
+        self.assertEqual(os.listdir(self.temp_dir), ["out.png"])
+
+    def test_failed_save_keeps_existing_file(self):
+        """测试编码失败时保留原文件"""
+        path = os.path.join(self.temp_dir, "out.png")
+        save_image_atomic(self.test_image, path)
+        original_bytes = open(path, 'rb').read()
+
+        with self.assertRaises(Exception):
+            save_image_atomic("not an image", path)
+
+        self.assertEqual(open(path, 'rb').read(), original_bytes)
+        self.assertEqual(os.listdir(self.temp_dir), ["out.png"])
+
+    @unittest.skipIf(os.name == 'nt', "Windows不支持POSIX权限")
+    def test_file_mode(self):
+        """测试新文件按umask设置权限，替换已有文件时保留原有权限"""
+        umask = os.umask(0o022)
+        os.umask(umask)
+        path = os.path.join(self.temp_dir, "out.png")
+        save_image_atomic(self.test_image, path)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o666 & ~umask)
+
+        os.chmod(path, 0o640)
+        write_bytes_atomic(b"data", path)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+
+if __name__ == "__main__":
+    unittest.main()
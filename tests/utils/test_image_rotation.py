@@ -21,7 +21,7 @@ try:
     create_module_imports()
     
     # 导入模块
-    from utils.image_utils import rotate_image
+    from utils.image_utils import rotate_image, rotation_transform, warp_affine_chain
 except Exception as e:
     print(f"预加载模块失败: {e}")
     import traceback
@@ -95,6 +95,51 @@ class TestImageRotation(unittest.TestCase):
         # 颜色应该接近
         self.assertTrue(np.all(np.abs(original_color.astype(int) - rotated_opposite.astype(int)) < 50))
     
+    def test_rotate_quarter_turns_are_views(self):
+        """测试旋转90度的整数倍时返回无损的视图"""
+        image = np.random.default_rng(0).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+        rotated = rotate_image(image, 90, expand=True)
+        self.assertTrue(np.shares_memory(rotated, image))
+        np.testing.assert_array_equal(rotated, cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE))
+        np.testing.assert_array_equal(rotate_image(image, -90, expand=True), cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE))
+        np.testing.assert_array_equal(rotate_image(image, 180), cv2.rotate(image, cv2.ROTATE_180))
+        
+        # 不扩展画布时非正方形图像旋转90度仍需插值到原画布
+        self.assertEqual(rotate_image(image, 90).shape, image.shape)
+        self.assertFalse(np.shares_memory(rotate_image(image, 90), image))
+    
+    def test_rotation_transform(self):
+        """测试rotation_transform给出rotate_image实际使用的矩阵和输出尺寸"""
+        image = np.random.default_rng(0).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+        for angle, expand in ((90, True), (180, False), (-90, True), (30, True), (30, False)):
+            matrix, size = rotation_transform(image.shape, angle, expand=expand)
+            expected = rotate_image(image, angle, expand=expand)
+            self.assertEqual(size, (expected.shape[1], expected.shape[0]))
+            warped = cv2.warpAffine(image, matrix, size, flags=cv2.INTER_NEAREST if angle % 90 == 0 else cv2.INTER_LINEAR)
+            np.testing.assert_array_equal(warped, expected)
+    
+    def test_warp_affine_chain(self):
+        """测试连续旋转合成后只重采样一次：旋转后转回与原图一致，画布裁剪与逐步旋转相同"""
+        y, x = np.mgrid[0:120, 0:160]
+        image = cv2.GaussianBlur(np.dstack([x, y, x + y]).astype(np.uint8), (9, 9), 3)
+        first = rotation_transform(image.shape, 30)
+        second = rotation_transform(image.shape, -30)
+        chained = warp_affine_chain(image, [first, second])
+        sequential = rotate_image(rotate_image(image, 30), -30)
+        self.assertEqual(chained.shape, image.shape)
+        
+        # 没有被裁掉的像素与原图相同（两次旋转互相抵消，合成为恒等变换）
+        valid = chained.any(axis=2)
+        np.testing.assert_array_equal(chained[valid], image[valid])
+        # 第一步画布之外的四角与逐步旋转一样被裁掉，只在边缘插值处略有差别
+        self.assertFalse(chained[0, 0].any())
+        self.assertLess(np.count_nonzero(valid != sequential.any(axis=2)), 0.02 * valid.size)
+        
+        # 扩展画布时中间画布包含全部内容，结果尺寸与逐步旋转相同
+        expanded = rotate_image(image, 20, expand=True)
+        steps = [rotation_transform(image.shape, 20, expand=True), rotation_transform(expanded.shape, 25, expand=True)]
+        self.assertEqual(warp_affine_chain(image, steps).shape, rotate_image(expanded, 25, expand=True).shape)
+    
     def test_rotate_45_degrees(self):
         """测试旋转45度"""
         # 旋转图像45度
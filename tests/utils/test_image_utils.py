@@ -19,7 +19,15 @@ from utils.image_utils import (
     apply_bilateral_filter,
     convert_to_grayscale,
     apply_threshold,
-    apply_adaptive_threshold
+    apply_adaptive_threshold,
+    frequency_spectrum,
+    denoise_frequency,
+    wavelet_decomposition,
+    denoise_wavelet,
+    noise_generator,
+    add_gaussian_noise,
+    add_uniform_noise,
+    add_salt_pepper_noise
 )
 
 class TestImageUtils(unittest.TestCase):
@@ -187,5 +195,107 @@ class TestImageUtils(unittest.TestCase):
         self.assertTrue(0 in unique_values)
         self.assertTrue(255 in unique_values)
 
+    def test_denoise_frequency(self):
+        """测试傅里叶低通去噪：扩展到快速尺寸，预先计算的频谱与直接计算结果相同"""
+        rng = np.random.default_rng(0)
+        y, x = np.mgrid[0:101, 0:151]
+        clean = cv2.GaussianBlur(np.dstack([x, y, x + y]).astype(np.uint8), (0, 0), 4)
+        noisy = np.clip(clean + rng.normal(0, 15, clean.shape), 0, 255).astype(np.uint8)
+        
+        spectrum = frequency_spectrum(noisy)
+        self.assertEqual(spectrum['padded'], (cv2.getOptimalDFTSize(101), cv2.getOptimalDFTSize(151)))
+        # 实数输入只保存一半频谱
+        self.assertEqual(spectrum['spectrum'].shape, (spectrum['padded'][0], spectrum['padded'][1] // 2 + 1))
+        
+        denoised = denoise_frequency(noisy, 20, spectrum=spectrum)
+        np.testing.assert_array_equal(denoised, denoise_frequency(noisy, 20))
+        self.assertEqual(denoised.shape, noisy.shape)
+        self.assertEqual(denoised.dtype, np.uint8)
+        
+        # 亮度噪声明显减少，整体亮度不变
+        def luma(image):
+            return cv2.cvtColor(image, cv2.COLOR_BGR2YUV)[..., 0].astype(float)
+        self.assertLess(np.abs(luma(denoised) - luma(clean)).mean(), 0.5 * np.abs(luma(noisy) - luma(clean)).mean())
+        self.assertAlmostEqual(luma(denoised).mean(), luma(noisy).mean(), delta=1.0)
+        
+        # 灰度图像
+        gray = denoise_frequency(noisy[..., 0], 20)
+        self.assertEqual(gray.shape, (101, 151))
+
+    def test_denoise_wavelet(self):
+        """测试小波去噪：各通道一起以float32分解，预先计算的分解与直接计算结果相同"""
+        rng = np.random.default_rng(0)
+        y, x = np.mgrid[0:101, 0:151]
+        clean = cv2.GaussianBlur(np.dstack([x, y, x + y]).astype(np.uint8), (0, 0), 4)
+        noisy = np.clip(clean + rng.normal(0, 15, clean.shape), 0, 255).astype(np.uint8)
+        
+        decomposition = wavelet_decomposition(noisy)
+        self.assertEqual(decomposition['coeffs'][0].dtype, np.float32)
+        self.assertEqual(decomposition['coeffs'][0].shape[2], 3)
+        self.assertEqual(decomposition['sigma'].shape, (3,))
+        
+        denoised = denoise_wavelet(noisy, 1.0, decomposition=decomposition)
+        np.testing.assert_array_equal(denoised, denoise_wavelet(noisy, 1.0))
+        self.assertEqual(denoised.shape, noisy.shape)
+        self.assertEqual(denoised.dtype, np.uint8)
+        error = np.abs(denoised.astype(float) - clean).mean()
+        self.assertLess(error, 0.5 * np.abs(noisy.astype(float) - clean).mean())
+        
+        # 阈值为0时完全重建（奇数尺寸）
+        np.testing.assert_array_equal(denoise_wavelet(noisy, 0.0, decomposition=decomposition), noisy)
+        
+        # 灰度和带Alpha通道的图像，Alpha通道不变
+        self.assertEqual(denoise_wavelet(noisy[..., 0]).shape, (101, 151))
+        bgra = np.dstack([noisy, np.full((101, 151), 200, np.uint8)])
+        result = denoise_wavelet(bgra)
+        self.assertEqual(result.shape, bgra.shape)
+        self.assertTrue(np.all(result[..., 3] == 200))
+    
+    def test_noise_reproducible(self):
+        """测试相同种子得到相同的噪声，各单元的随机数流由SeedSequence.spawn派生"""
+        image = np.full((300, 600, 3), 128, np.uint8)
+        first = add_gaussian_noise(image, sigma=10, seed=7)
+        np.testing.assert_array_equal(first, add_gaussian_noise(image, sigma=10, seed=7))
+        self.assertFalse(np.array_equal(first, add_gaussian_noise(image, sigma=10, seed=8)))
+        self.assertTrue(np.all(image == 128))
+        self.assertAlmostEqual(float(first.std()), 10, delta=0.5)
+        
+        # 单元 (1, 2) 的随机数流即种子的第1个子序列再派生的第2个子序列
+        spawned = np.random.SeedSequence(7).spawn(2)[1].spawn(3)[2]
+        expected = np.random.Generator(np.random.PCG64(spawned)).random(4)
+        np.testing.assert_array_equal(noise_generator(7, 1, 2).random(4), expected)
+    
+    def test_noise_tiling_independent(self):
+        """测试按任意分块原地加噪的结果与整图加噪相同"""
+        image = np.random.default_rng(0).integers(0, 256, (300, 530, 3), dtype=np.uint8)
+        for add_noise in (add_gaussian_noise, add_uniform_noise, add_salt_pepper_noise):
+            whole = add_noise(image, seed=3)
+            tiled = image.copy()
+            for y in range(0, 300, 70):
+                for x in range(0, 530, 100):
+                    tile = tiled[y:y + 70, x:x + 100]
+                    self.assertIs(add_noise(tile, seed=3, origin=(x, y), out=tile), tile)
+            np.testing.assert_array_equal(tiled, whole)
+    
+    def test_noise_values(self):
+        """测试噪声截断而不回绕，椒盐噪声比例和取值"""
+        black = np.zeros((256, 256), np.uint8)
+        white = np.full((256, 256), 255, np.uint8)
+        self.assertGreater(add_gaussian_noise(black, sigma=20).mean(), 5)
+        self.assertGreater(add_gaussian_noise(white, sigma=20).min(), 150)
+        uniform = add_uniform_noise(np.full((256, 256), 100, np.uint8), amplitude=20).astype(int)
+        self.assertGreaterEqual(uniform.min(), 80)
+        self.assertLessEqual(uniform.max(), 120)
+        
+        gray = np.full((512, 512, 3), 128, np.uint8)
+        noisy = add_salt_pepper_noise(gray, amount=0.1, salt_ratio=0.3)
+        salt = np.all(noisy == 255, axis=2).mean()
+        pepper = np.all(noisy == 0, axis=2).mean()
+        self.assertAlmostEqual(salt, 0.03, delta=0.005)
+        self.assertAlmostEqual(pepper, 0.07, delta=0.005)
+        self.assertAlmostEqual(np.all(noisy == 128, axis=2).mean(), 0.9, delta=0.005)
+        with self.assertRaises(ValueError):
+            add_gaussian_noise(gray.astype(np.float32))
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+测试内存监控器的子系统内存池
+"""
+import os
+import sys
+import unittest
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.memory_monitor import (
+    MemoryMonitor, HISTORY_REBUILD_COST, USAGE_SAMPLE_TTL, PRESSURE_NONE, PRESSURE_WARNING, PRESSURE_CRITICAL
+)
+
+class FakePool:
+    """可释放的假内存池"""
+
+    def __init__(self, size):
+        self.size = size
+
+    def bytes(self):
+        return self.size
+
+    def evict(self, bytes_needed):
+        freed = self.size
+        self.size = 0
+        return freed
+
+class TestMemoryMonitor(unittest.TestCase):
+    """测试按重建代价释放内存池"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self.monitor = MemoryMonitor()
+        self.pools = {name: FakePool(100) for name in ('view', 'replay', 'workers', 'history')}
+        for cost, name in enumerate(('view', 'replay', 'workers')):
+            pool = self.pools[name]
+            self.monitor.register_pool(name, name, pool.bytes, pool.evict, rebuild_cost=cost + 1)
+        history = self.pools['history']
+        self.monitor.register_pool('history', 'history', history.bytes, history.evict,
+                                   rebuild_cost=HISTORY_REBUILD_COST)
+        self.monitor.register_pool('preview', 'preview', lambda: 50)
+
+    def test_pool_usage(self):
+        """测试各内存池的统计按重建代价排序"""
+        usage = self.monitor.get_pool_usage()
+        self.assertEqual([item['name'] for item in usage], ['preview', 'view', 'replay', 'workers', 'history'])
+        self.assertFalse(usage[0]['evictable'])
+        self.assertEqual(sum(item['bytes'] for item in usage), 450)
+
+    def test_evict_cheapest_first(self):
+        """测试先释放重建代价低的内存池，释放量足够后停止"""
+        released = self.monitor.evict(150)
+        self.assertEqual(released, [('view', 100), ('replay', 100)])
+        self.assertEqual(self.pools['workers'].size, 100)
+
+        # 限制重建代价时不削减撤销历史
+        released = self.monitor.evict(1000, max_cost=HISTORY_REBUILD_COST - 1)
+        self.assertEqual(released, [('workers', 100)])
+        self.assertEqual(self.pools['history'].size, 100)
+
+        self.monitor.unregister_pool('history')
+        self.assertEqual(self.monitor.evict(1000), [])
+
+    def _fake_usage(self, used, total=1000, pressure=None):
+        self.samples = 0
+
+        def get_usage():
+            self.samples += 1
+            return {
+                'total': total, 'used': used, 'available': total - used,
+                'percent': used / total * 100, 'source': 'cgroup', 'pressure': pressure,
+            }
+        self.monitor.get_usage = get_usage
+        self.monitor.invalidate_usage()
+
+    def test_pressure_level(self):
+        """测试按使用率和PSI压力判断压力等级"""
+        self.assertEqual(self.monitor.pressure_level(10), PRESSURE_NONE)
+        self.assertEqual(self.monitor.pressure_level(75), PRESSURE_WARNING)
+        self.assertEqual(self.monitor.pressure_level(95), PRESSURE_CRITICAL)
+        self.assertEqual(self.monitor.pressure_level(10, {'some': 30.0, 'full': 0.0}), PRESSURE_WARNING)
+        self.assertEqual(self.monitor.pressure_level(10, {'some': 30.0, 'full': 20.0}), PRESSURE_CRITICAL)
+
+    def test_reserve_evicts_synchronously(self):
+        """测试分配前检查预算，按压力等级同步释放内存池"""
+        warnings = []
+        self.monitor.memory_warning.connect(warnings.append)
+
+        # 分配后仍在预算内，不释放
+        self._fake_usage(100)
+        self.assertEqual(self.monitor.reserve(100), PRESSURE_NONE)
+        self.assertEqual(sum(pool.size for pool in self.pools.values()), 400)
+
+        # 分配后超过警告阈值，释放缓存但保留撤销历史
+        self._fake_usage(600)
+        self.assertEqual(self.monitor.reserve(150), PRESSURE_WARNING)
+        self.assertEqual(len(warnings), 1)
+        self.assertEqual(self.pools['view'].size, 0)
+        self.assertEqual(self.pools['history'].size, 100)
+
+        # 超过危急阈值时还会削减撤销历史
+        self._fake_usage(900)
+        self.assertEqual(self.monitor.reserve(100), PRESSURE_CRITICAL)
+        self.assertEqual(sum(pool.size for pool in self.pools.values()), 0)
+
+        buffer = self.monitor.allocate((4, 5, 3))
+        self.assertEqual(buffer.shape, (4, 5, 3))
+
+    def test_reserve_caches_usage(self):
+        """测试采样有效期内不重复读取内存用量，每次预留只按采样加上本次的字节数检查"""
+        self._fake_usage(100)
+        for _ in range(10):
+            self.assertEqual(self.monitor.reserve(100), PRESSURE_NONE)
+        self.assertEqual(self.samples, 1)
+        self.assertEqual(self.pools['view'].size, 100)
+
+        # 单次预留超过警告阈值时释放，释放后丢弃采样
+        self.assertEqual(self.monitor.reserve(650), PRESSURE_WARNING)
+        self.assertEqual(self.pools['view'].size, 0)
+        samples = self.samples
+        self.assertEqual(self.monitor.reserve(100), PRESSURE_NONE)
+        self.assertEqual(self.samples, samples + 1)
+
+        # 采样过期后重新读取
+        self.monitor._usage_sample_time -= USAGE_SAMPLE_TTL
+        self.monitor.reserve(100)
+        self.assertEqual(self.samples, samples + 2)
+
+if __name__ == "__main__":
+    unittest.main()
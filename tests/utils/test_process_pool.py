@@ -0,0 +1,129 @@
+"""
+测试共享内存进程池
+"""
+import os
+import sys
+import importlib
+import threading
+import unittest
+import numpy as np
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+
+class TestProcessPool(unittest.TestCase):
+    """测试按算子选择后端的分块执行"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        # 传给工作进程的函数按模块名称序列化，测试时从sys.modules取当前注册的模块，
+        # 避免其他测试重新导入模块后函数对象不一致
+        self.pool_module = importlib.import_module("utils.process_pool")
+        # 工作进程以spawn方式启动时沿用父进程的sys.path，去掉tests目录，
+        # 避免工作进程将tests/app包当作项目的app包导入
+        self._sys_path = list(sys.path)
+        tests_dir = os.path.join(project_root, "tests")
+        sys.path[:] = [project_root] + [p for p in sys.path if os.path.abspath(p) != tests_dir]
+        image_utils = importlib.import_module("utils.image_utils")
+        self.config = self.pool_module.config
+        self._backends = self.config.get('performance.operator_backends')
+        self._min_pixels = self.config.get('performance.parallel_min_pixels')
+        self._mode = self.config.get('performance.concurrency_mode')
+        self.config.set('performance.parallel_min_pixels', 0)
+        # 强制分块并行，单核机器上也执行线程池和进程池路径
+        self.config.set('performance.concurrency_mode', 'tiles')
+        rng = np.random.default_rng(0)
+        self.image = (rng.random((97, 80, 3)) * np.array([120, 200, 250])).astype(np.uint8)
+        self.cases = [
+            (image_utils.adjust_highlights, {'highlights': 0.5}),
+            (image_utils.adjust_shadows, {'shadows': 0.5}),
+            (image_utils.apply_usm_sharpen, {'radius': 3, 'amount': 1.0, 'threshold': 5}),
+            (image_utils.auto_white_balance, {'method': 'adaptive'}),
+        ]
+
+    def tearDown(self):
+        """每个测试方法执行后的清理工作"""
+        self.pool_module.get_operator_pool().shutdown()
+        sys.path[:] = self._sys_path
+        self.config.set('performance.operator_backends', self._backends)
+        self.config.set('performance.parallel_min_pixels', self._min_pixels)
+        self.config.set('performance.concurrency_mode', self._mode)
+
+    def test_shared_image(self):
+        """测试共享内存图像的创建、连接和释放"""
+        SharedImage = self.pool_module.SharedImage
+        shared = SharedImage.from_array(self.image)
+        attached = SharedImage.attach(shared.descriptor)
+        self.assertTrue(np.array_equal(attached.array, self.image))
+        attached.close()
+        shared.close()
+
+    def test_split_rows(self):
+        """测试行带划分覆盖全部行且不重叠"""
+        split_rows = self.pool_module.split_rows
+        bands = split_rows(97, 4)
+        self.assertEqual(bands[0][0], 0)
+        self.assertEqual(bands[-1][1], 97)
+        for (_, end), (start, _) in zip(bands, bands[1:]):
+            self.assertEqual(end, start)
+        self.assertEqual(len(split_rows(3, 8)), 3)
+
+    def test_backend_selection(self):
+        """测试按算子和图像大小选择后端"""
+        get_backend = self.pool_module.get_backend
+        self.config.set('performance.operator_backends', {'adjust_shadows': 'thread'})
+        self.assertEqual(get_backend('adjust_shadows', self.image), 'thread')
+        self.assertEqual(get_backend('adjust_highlights', self.image), 'inline')
+        self.config.set('performance.parallel_min_pixels', self.image.shape[0] * self.image.shape[1] + 1)
+        self.assertEqual(get_backend('adjust_shadows', self.image), 'inline')
+
+    def test_warm_up_in_background(self):
+        """测试只在配置了process后端时于后台预热工作进程"""
+        pool = self.pool_module.get_operator_pool()
+        self.config.set('performance.operator_backends', {'adjust_shadows': 'thread'})
+        self.assertIsNone(self.pool_module.warm_up_in_background())
+        self.assertEqual(pool.memory_bytes(), 0)
+
+        self.config.set('performance.operator_backends', {'adjust_shadows': 'process'})
+        thread = self.pool_module.warm_up_in_background()
+        self.assertTrue(thread.daemon)
+        thread.join(timeout=60)
+        self.assertFalse(thread.is_alive())
+        self.assertGreater(pool.memory_bytes(), 0)
+
+    def test_backends_match_inline(self):
+        """测试线程和进程后端的分块结果与直接执行一致"""
+        for backend in ('thread', 'process'):
+            for func, kwargs in self.cases:
+                self.config.set('performance.operator_backends', {func.__name__: backend})
+                expected = func(self.image, **kwargs)
+                result = self.pool_module.run_operator(func, self.image, **kwargs)
+                self.assertTrue(np.array_equal(result, expected), f"{func.__name__} ({backend})")
+
+    def test_tiled_operator(self):
+        """测试带重叠的分块执行与整图一致，汇报进度并可取消"""
+        image_utils = importlib.import_module("utils.image_utils")
+        kwargs = {'h': 10, 'template_window_size': 7, 'search_window_size': 21}
+        expected = image_utils.denoise_nlmeans(self.image, **kwargs)
+        for mode in ('tiles', 'internal'):
+            self.config.set('performance.concurrency_mode', mode)
+            progress = []
+            result = self.pool_module.run_tiled_operator(
+                image_utils.denoise_nlmeans, self.image, progress_callback=progress.append, tile_size=32, **kwargs
+            )
+            self.assertTrue(np.array_equal(result, expected), mode)
+            self.assertEqual(progress[-1], 100)
+            self.assertEqual(progress, sorted(progress))
+
+            # 第一个分块完成后取消，不再开始新的分块
+            cancel_event = threading.Event()
+            with self.assertRaises(self.pool_module.OperationCancelled):
+                self.pool_module.run_tiled_operator(
+                    image_utils.denoise_nlmeans, self.image, progress_callback=lambda value: cancel_event.set(),
+                    cancel_event=cancel_event, tile_size=32, **kwargs
+                )
+
+if __name__ == "__main__":
+    unittest.main()
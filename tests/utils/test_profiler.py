@@ -0,0 +1,90 @@
+"""
+测试操作性能剖析模块
+"""
+import os
+import sys
+import json
+import time
+import unittest
+import tempfile
+import shutil
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.profiler import OperationProfiler, PHASES
+
+class TestOperationProfiler(unittest.TestCase):
+    """测试阶段计时、滚动记录和导出"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self.profiler = OperationProfiler()
+        self.temp_dir = tempfile.mkdtemp()
+        self.finished = []
+        self.profiler.record_finished.connect(self.finished.append)
+
+    def tearDown(self):
+        """每个测试方法执行后的清理工作"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run_operation(self, name="usm", kind='process'):
+        record = self.profiler.begin(name, kind)
+        time.sleep(0.002)
+        with self.profiler.phase('compute') as phase:
+            time.sleep(0.002)
+            phase['bytes'] = 1024
+        with self.profiler.phase('pixmap'):
+            pass
+        self.profiler.end(record)
+        return record
+
+    def test_phases(self):
+        """测试排队时间、阶段耗时和分配字节数"""
+        record = self._run_operation()
+        self.assertEqual(self.finished, [record])
+        self.assertGreaterEqual(record['phases']['queue'], 0.002)
+        self.assertGreaterEqual(record['phases']['compute'], 0.002)
+        self.assertEqual(record['bytes']['compute'], 1024)
+        self.assertGreaterEqual(record['total'], record['phases']['queue'] + record['phases']['compute'])
+
+    def test_nested_and_inactive(self):
+        """测试嵌套请求只记录最外层，没有活动操作时阶段不记录"""
+        with self.profiler.phase('compute') as phase:
+            phase['bytes'] = 1
+        self.assertEqual(self.profiler.get_records(), [])
+
+        outer = self.profiler.begin("apply_preview")
+        inner = self.profiler.begin("usm")
+        self.assertIsNone(inner)
+        self.profiler.end(inner)
+        self.profiler.end(outer)
+        records = self.profiler.get_records()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['name'], "apply_preview")
+
+    def test_overlay_and_export(self):
+        """测试叠加层文本以及JSON和Chrome trace导出"""
+        self.assertEqual(self.profiler.format_overlay(), "")
+        self._run_operation("usm")
+        self._run_operation("blur", 'preview')
+        text = self.profiler.format_overlay()
+        self.assertIn("预览 blur", text)
+        self.assertIn("最近2次平均", text)
+        self.assertEqual(set(self.profiler.summary()['phases']), set(PHASES))
+
+        json_path = os.path.join(self.temp_dir, "profile.json")
+        self.profiler.export_json(json_path)
+        with open(json_path, encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['records']), 2)
+
+        trace_path = os.path.join(self.temp_dir, "profile.trace.json")
+        self.profiler.export_chrome_trace(trace_path)
+        with open(trace_path, encoding='utf-8') as f:
+            events = json.load(f)['traceEvents']
+        self.assertTrue(all(event['ph'] == 'X' for event in events))
+        self.assertEqual({event['name'] for event in events if event['cat'] == 'usm'}, {'queue', 'compute', 'pixmap'})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+"""
+测试启动阶段计时
+"""
+import os
+import sys
+import json
+import time
+import unittest
+import tempfile
+import shutil
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.startup import StartupTimer
+
+class TestStartupTimer(unittest.TestCase):
+    """测试阶段耗时的记录和导出"""
+
+    def test_phases(self):
+        """测试每个阶段记录从上一阶段结束起的耗时"""
+        timer = StartupTimer()
+        time.sleep(0.002)
+        first = timer.mark('imports')
+        second = timer.mark('main_window')
+        self.assertGreaterEqual(first, 0.002)
+        self.assertEqual([name for name, _ in timer.phases()], ['imports', 'main_window'])
+        self.assertAlmostEqual(timer.elapsed(), first + second)
+        self.assertIn("imports", timer.report())
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "startup.json")
+            timer.save(path)
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.assertEqual(set(data['phases']), {'imports', 'main_window'})
+            self.assertAlmostEqual(data['total'], timer.elapsed() * 1000)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+测试全景拼接模块
+"""
+import os
+import sys
+import threading
+import unittest
+import numpy as np
+import cv2
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.process_pool import OperationCancelled
+from utils.stitching import Stitcher, detect_features, estimate_homography, multiband_blend
+
+class TestStitching(unittest.TestCase):
+    """测试基于特征匹配的拼接"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        # 平滑的随机纹理，各处都有可区分的特征
+        rng = np.random.default_rng(0)
+        self.scene = cv2.resize(rng.integers(0, 256, (60, 135, 3), dtype=np.uint8), (900, 400),
+                                interpolation=cv2.INTER_CUBIC)
+        self.parts = [self.scene[:, 0:400], self.scene[:, 250:650], self.scene[:, 500:900]]
+
+    def test_detect_features_downscaled(self):
+        """测试在缩小副本上检测的关键点坐标换算回原图"""
+        points, descriptors, _ = detect_features(self.parts[0], max_pixels=40000)
+        self.assertEqual(len(points), len(descriptors))
+        self.assertGreater(len(points), 50)
+        self.assertGreater(points[:, 0].max(), 300)
+
+        homography, inliers = estimate_homography(detect_features(self.parts[0]), detect_features(self.parts[1]))
+        self.assertGreater(inliers, 50)
+        np.testing.assert_allclose(homography[:2, 2], [250, 0], atol=0.5)
+
+    def test_compose(self):
+        """测试一次性合成到预先计算大小的画布，输入顺序不影响结果"""
+        stitcher = Stitcher(self.parts)
+        result = stitcher.compose()
+        self.assertEqual(result.shape, self.scene.shape)
+        self.assertLess(np.abs(result.astype(int) - self.scene).mean(), 0.5)
+
+        # 特征和单应矩阵已缓存
+        features = stitcher.features(1)
+        transforms = stitcher.transforms()
+        stitcher.compose()
+        self.assertIs(stitcher.features(1), features)
+        self.assertIs(stitcher.transforms(), transforms)
+
+        # 输入不按拍摄顺序排列时，以第一幅为参考
+        shuffled = Stitcher([self.parts[1], self.parts[2], self.parts[0]], feature_max_pixels=40000)
+        self.assertEqual(shuffled.compose().shape, self.scene.shape)
+        np.testing.assert_allclose(shuffled.transforms()[2][:2, 2], [-250, 0], atol=1.0)
+
+    def test_progress_and_cancel(self):
+        """测试进度汇报和取消"""
+        progress = []
+        Stitcher(self.parts, feature_max_pixels=40000).compose(progress.append)
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(progress[-1], 100)
+        self.assertIn(50, progress)
+
+        cancel_event = threading.Event()
+        stitcher = Stitcher(self.parts, feature_max_pixels=40000)
+
+        def cancel_after_detection(percent):
+            if percent >= 50:
+                cancel_event.set()
+
+        with self.assertRaises(OperationCancelled):
+            stitcher.compose(cancel_after_detection, cancel_event)
+        # 已检测的特征保留，重新合成时不必再检测
+        self.assertIsNotNone(stitcher._features[0])
+
+    def test_multiband_blend(self):
+        """测试多频段融合：权重全为0或1时还原输入，过渡带内低频平滑渐变"""
+        a = self.parts[0].astype(np.float32)
+        b = self.parts[1].astype(np.float32)
+        zeros = np.zeros(a.shape[:2], np.float32)
+        np.testing.assert_allclose(multiband_blend(a, b, zeros, 5), a, atol=1e-3)
+        np.testing.assert_allclose(multiband_blend(a, b, zeros + 1, 5), b, atol=1e-3)
+
+        flat_a = np.full((64, 128), 100, np.float32)
+        weight = np.zeros((64, 128), np.float32)
+        weight[:, 64:] = 1
+        profile = multiband_blend(flat_a, flat_a + 40, weight, 4)[32]
+        self.assertLess(np.abs(np.diff(profile)).max(), 10)
+        self.assertAlmostEqual(profile[0], 100, places=3)
+        self.assertAlmostEqual(profile[-1], 140, places=3)
+
+    def test_seam_blending(self):
+        """测试重叠处的亮度差异被平滑过渡，重叠区域以外不受影响"""
+        darker = (self.scene * 0.7).astype(np.uint8)
+        parts = [darker[:, 0:400], cv2.add(darker[:, 250:650], 40), darker[:, 500:900]]
+
+        hard = Stitcher(parts, blend_bands=0).compose()
+        blended = Stitcher(parts, blend_bands=5).compose()
+        self.assertEqual(blended.shape, hard.shape)
+
+        def max_step(image):
+            # 按列平均后相邻列的最大跳变
+            profile = image.astype(np.float64).mean(axis=(0, 2))
+            return np.abs(np.diff(profile)).max()
+
+        self.assertGreater(max_step(hard[:, 300:450]), 20)
+        self.assertLess(max_step(blended[:, 300:450]), 10)
+        # 融合只作用于重叠区域附近
+        np.testing.assert_array_equal(blended[:, :200], hard[:, :200])
+
+    def test_unmatched_image(self):
+        """测试无法匹配的图像"""
+        flat = np.full((200, 200, 3), 128, np.uint8)
+        with self.assertRaises(ValueError):
+            Stitcher([self.parts[0], flat]).compose()
+        with self.assertRaises(ValueError):
+            Stitcher([self.parts[0]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+测试超分辨率模块
+"""
+import os
+import sys
+import threading
+import unittest
+import numpy as np
+import cv2
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from utils.process_pool import OperationCancelled
+from utils.super_resolution import SuperResolutionModel, get_model, clear_models, upscale_tiled
+from utils.tiled_image import TiledImage, tiled_from_array
+from app.config import config
+
+class EdgeSensitiveModel:
+    """分块边缘处输出偏差较大的模型，用于检查羽化拼接"""
+
+    scale = 2
+
+    def __init__(self):
+        self.calls = 0
+
+    def upscale(self, tile):
+        self.calls += 1
+        result = cv2.resize(tile.astype(np.float32), None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+        result[:4] += 50
+        result[-4:] += 50
+        result[:, :4] += 50
+        result[:, -4:] += 50
+        return result
+
+class TestSuperResolution(unittest.TestCase):
+    """测试分块超分辨率放大"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        rng = np.random.default_rng(0)
+        self.image = cv2.resize(rng.integers(0, 200, (30, 40, 3), dtype=np.uint8), (250, 170),
+                                interpolation=cv2.INTER_CUBIC)
+
+    def tearDown(self):
+        """每个测试方法执行后的清理工作"""
+        clear_models()
+
+    def test_tiled_matches_whole_image(self):
+        """测试分块放大与整图放大一致，并汇报进度"""
+        whole = cv2.resize(self.image.astype(np.float32), (500, 340), interpolation=cv2.INTER_CUBIC)
+        whole = np.clip(np.rint(whole), 0, 255).astype(np.uint8)
+        progress = []
+        result = upscale_tiled(self.image, scale=2, tile_size=64, overlap=8, progress_callback=progress.append)
+        self.assertEqual(result.shape, (340, 500, 3))
+        self.assertLessEqual(np.abs(result.astype(int) - whole).max(), 1)
+        self.assertEqual(len(progress), 3 * 4)
+        self.assertEqual(progress[-1], 100)
+
+        gray = upscale_tiled(self.image[..., 0], scale=3, tile_size=50, overlap=4)
+        self.assertEqual(gray.shape, (510, 750))
+
+    def test_disk_output(self):
+        """测试分块图像输入和超出限制的结果写入磁盘映射文件，与内存中的结果一致"""
+        expected = upscale_tiled(self.image, scale=2, tile_size=64, overlap=8)
+        result = upscale_tiled(tiled_from_array(self.image), scale=2, tile_size=64, overlap=8)
+        self.assertIsInstance(result, TiledImage)
+        self.assertTrue(np.array_equal(np.asarray(result.to_array()), expected))
+
+        max_size = config.get('image_processing.max_image_size')
+        config.set('image_processing.max_image_size', (200, 200))
+        try:
+            self.assertIsInstance(upscale_tiled(self.image, scale=2, tile_size=64), np.ndarray)
+            result = upscale_tiled(self.image, scale=2, tile_size=64, overlap=8, spill_to_disk=True)
+            self.assertIsInstance(result, TiledImage)
+            self.assertTrue(np.array_equal(np.asarray(result.to_array()), expected))
+        finally:
+            config.set('image_processing.max_image_size', max_size)
+
+    def test_feathered_seams(self):
+        """测试重叠区域羽化拼接，分块边缘的偏差不出现在结果中"""
+        model = EdgeSensitiveModel()
+        out = np.zeros((340, 500, 3), np.uint8)
+        result = upscale_tiled(self.image, model=model, tile_size=64, overlap=8, out=out)
+        self.assertIs(result, out)
+        self.assertEqual(model.calls, 12)
+        expected = cv2.resize(self.image, (500, 340), interpolation=cv2.INTER_NEAREST)
+        # 图像边缘之外，分块边缘的偏差权重为0
+        inner = np.abs(result.astype(int) - expected)[8:-8, 8:-8]
+        self.assertLessEqual(inner.max(), 13)
+        self.assertLess(inner.mean(), 0.5)
+
+        with self.assertRaises(ValueError):
+            upscale_tiled(self.image, model=model, out=np.zeros((10, 10, 3), np.uint8))
+
+    def test_cancel(self):
+        """测试在分块之间取消"""
+        cancel_event = threading.Event()
+
+        def cancel(percent):
+            cancel_event.set()
+
+        with self.assertRaises(OperationCancelled):
+            upscale_tiled(self.image, scale=2, tile_size=64, progress_callback=cancel, cancel_event=cancel_event)
+
+    def test_model_cache(self):
+        """测试模型只加载一次，缺失的模型文件报错"""
+        model = get_model(model_path='', scale=2)
+        self.assertIs(get_model(model_path='', scale=2), model)
+        self.assertEqual(model.backend, 'interpolation')
+        self.assertIsNot(get_model(model_path='', scale=4), model)
+        with self.assertRaises(ValueError):
+            SuperResolutionModel(os.path.join(project_root, 'missing_model.onnx'), scale=4)
+
+if __name__ == "__main__":
+    unittest.main()
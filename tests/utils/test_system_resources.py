@@ -0,0 +1,65 @@
+"""
+测试容器内存限制和PSI内存压力的读取
+"""
+import os
+import sys
+import unittest
+import tempfile
+import shutil
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import utils.system_resources as system_resources
+
+class TestSystemResources(unittest.TestCase):
+    """测试cgroup和PSI文件的解析"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self.temp_dir = tempfile.mkdtemp()
+        self._cgroup_root = system_resources.CGROUP_ROOT
+        self._cgroup_dirs = system_resources._cgroup_dirs
+
+    def tearDown(self):
+        """每个测试方法执行后的清理工作"""
+        system_resources.CGROUP_ROOT = self._cgroup_root
+        system_resources._cgroup_dirs = self._cgroup_dirs
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, text):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='ascii') as f:
+            f.write(text)
+        return path
+
+    def test_memory_pressure(self):
+        """测试解析PSI的avg10"""
+        path = self._write("memory", "some avg10=12.50 avg60=3.00 avg300=1.00 total=100\n"
+                                     "full avg10=2.25 avg60=1.00 avg300=0.50 total=50\n")
+        self.assertEqual(system_resources.memory_pressure(path), {'some': 12.5, 'full': 2.25})
+        self.assertIsNone(system_resources.memory_pressure(os.path.join(self.temp_dir, "missing")))
+
+    def test_cgroup_v2(self):
+        """测试读取cgroup v2的memory.max，扣除非活跃文件缓存"""
+        self._write("memory.max", "1073741824\n")
+        self._write("memory.current", "536870912\n")
+        self._write("memory.stat", "anon 400000000\ninactive_file 36870912\n")
+        system_resources._cgroup_dirs = lambda: (self.temp_dir, None)
+        self.assertEqual(system_resources.cgroup_memory(),
+                         {'limit': 1073741824, 'used': 500000000, 'version': 2})
+
+        # 未设置限制
+        self._write("memory.max", "max\n")
+        self.assertIsNone(system_resources.cgroup_memory())
+
+    def test_memory_usage(self):
+        """测试内存使用率在合理范围内"""
+        usage = system_resources.memory_usage()
+        self.assertIn(usage['source'], ('cgroup', 'host'))
+        self.assertGreater(usage['total'], 0)
+        self.assertTrue(0 <= usage['percent'] <= 100)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+测试分块大图像模块
+"""
+import os
+import sys
+import unittest
+import tempfile
+import shutil
+import numpy as np
+import cv2
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from app.config import config
+from utils.tiled_image import open_tiled_image, read_image_size, tiled_from_array
+
+try:
+    import tifffile
+except ImportError:
+    tifffile = None
+
+class TestTiledImage(unittest.TestCase):
+    """测试分块大图像的流式读取与处理"""
+
+    def setUp(self):
+        """每个测试方法执行前的准备工作"""
+        self.temp_dir = tempfile.mkdtemp()
+        self._tile_size = config.get('performance.tile_size')
+        # 使用较小的分块，让测试图像包含多个数据段
+        config.set('performance.tile_size', 64)
+
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (300, 230, 3), dtype=np.uint8)
+        # 平滑区域和噪声行混合，使PNG编码器选用多种行过滤方式
+        image = cv2.GaussianBlur(image, (7, 7), 0)
+        image[::5] = rng.integers(0, 256, image[::5].shape, dtype=np.uint8)
+        self.image = image
+
+    def tearDown(self):
+        """每个测试方法执行后的清理工作"""
+        config.set('performance.tile_size', self._tile_size)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, image):
+        path = os.path.join(self.temp_dir, name)
+        cv2.imwrite(path, image)
+        return path
+
+    def test_read_image_size(self):
+        """测试只读文件头获取尺寸"""
+        path = self._write("a.png", self.image)
+        self.assertEqual(read_image_size(path), (300, 230))
+        path = self._write("a.tif", self.image)
+        self.assertEqual(read_image_size(path), (300, 230))
+        path = self._write("a.jpg", self.image)
+        self.assertIsNone(read_image_size(path))
+
+    @unittest.skipIf(tifffile is None, "未安装tifffile")
+    def test_bigtiff_round_trip(self):
+        """测试分块保存的BigTIFF能读取尺寸并重新打开"""
+        path = os.path.join(self.temp_dir, "big.tif")
+        tiled = tiled_from_array(self.image)
+        tiled.save(path)
+        tiled.close()
+        with open(path, 'rb') as f:
+            self.assertIn(f.read(4), (b'II+\x00', b'MM\x00+'))
+        self.assertEqual(read_image_size(path), (300, 230))
+        reopened = open_tiled_image(path)
+        self.assertTrue(np.array_equal(np.asarray(reopened.to_array()), self.image))
+        reopened.close()
+
+        # 大端字节序
+        path = os.path.join(self.temp_dir, "big_be.tif")
+        tifffile.imwrite(path, self.image, bigtiff=True, byteorder='>')
+        self.assertEqual(read_image_size(path), (300, 230))
+
+    def test_png_streaming(self):
+        """测试PNG按行带流式解码，结果与整体解码一致"""
+        for name, data in (
+            ("rgb.png", self.image),
+            ("gray16.png", self.image[:, :, 0].astype(np.uint16) * 257),
+            ("rgba.png", np.dstack([self.image, self.image[:, :, 1]])),
+        ):
+            path = self._write(name, data)
+            expected = cv2.imread(path, cv2.IMREAD_COLOR)
+            tiled = open_tiled_image(path)
+            self.assertEqual(tiled.shape, expected.shape)
+
+            # 先读后面的区域，再回到前面，验证检查点的随机访问
+            self.assertTrue(np.array_equal(tiled.read_region(20, 200, 150, 90), expected[200:290, 20:170]))
+            self.assertTrue(np.array_equal(tiled.read_region(0, 10, 230, 40), expected[10:50]))
+            tiled.close()
+
+    @unittest.skipIf(tifffile is None, "未安装tifffile")
+    def test_tiff_segments(self):
+        """测试TIFF按分块和条带读取"""
+        expected = self.image
+        rgb = cv2.cvtColor(expected, cv2.COLOR_BGR2RGB)
+        for name, kwargs in (("tiled.tif", {'tile': (64, 64)}), ("strips.tif", {'rowsperstrip': 50})):
+            path = os.path.join(self.temp_dir, name)
+            tifffile.imwrite(path, rgb, **kwargs)
+            tiled = open_tiled_image(path)
+            self.assertTrue(np.array_equal(tiled.read_region(30, 40, 180, 220), expected[40:260, 30:210]))
+            tiled.close()
+
+    def test_map_tiles_matches_full_image(self):
+        """测试重叠分块处理与整图处理结果一致"""
+        tiled = tiled_from_array(self.image)
+        result = tiled.map_tiles(cv2.GaussianBlur, (9, 9), 0, overlap=4)
+        expected = cv2.GaussianBlur(self.image, (9, 9), 0)
+        self.assertTrue(np.array_equal(np.asarray(result.to_array()), expected))
+
+        # 改变尺寸的操作不能逐块执行
+        with self.assertRaises(ValueError):
+            tiled.map_tiles(lambda image: image[:10])
+
+    def test_overview_and_save(self):
+        """测试缩略预览和全分辨率保存"""
+        path = self._write("a.png", self.image)
+        tiled = open_tiled_image(path)
+
+        overview = tiled.get_overview(10000)
+        self.assertLessEqual(overview.shape[0] * overview.shape[1], 10000)
+        expected = cv2.resize(self.image, (overview.shape[1], overview.shape[0]), interpolation=cv2.INTER_AREA)
+        self.assertLess(np.abs(overview.astype(int) - expected).mean(), 2)
+
+        save_path = os.path.join(self.temp_dir, "out.png")
+        progress = []
+        tiled.save(save_path, progress_callback=progress.append)
+        self.assertTrue(np.array_equal(cv2.imread(save_path), self.image))
+        self.assertEqual(progress[-1], 100)
+        if os.name != 'nt':
+            # 覆盖已有文件时保留原有权限
+            os.chmod(save_path, 0o640)
+            tiled.save(save_path)
+            self.assertEqual(os.stat(save_path).st_mode & 0o777, 0o640)
+        reopened = open_tiled_image(save_path)
+        self.assertTrue(np.array_equal(reopened.read_region(20, 100, 150, 120), self.image[100:220, 20:170]))
+        reopened.close()
+
+        # 不能流式编码的格式给出明确的错误，不写出任何文件
+        jpeg_path = os.path.join(self.temp_dir, "out.jpg")
+        with self.assertRaises(ValueError):
+            tiled.save(jpeg_path)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["a.png", "out.png"])
+        tiled.close()
+
+if __name__ == "__main__":
+    unittest.main()
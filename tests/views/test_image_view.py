@@ -140,6 +140,63 @@ class TestImageView(unittest.TestCase):
         
         # 验证缓存已清空
         self.assertEqual(len(self.view._cache), 0)
+    
+    def test_pyramid_level_display(self):
+        """测试缩小显示时使用金字塔中较小的一层，场景坐标保持原图大小"""
+        from models.image_pyramid import ImagePyramid
+        image = np.random.default_rng(0).integers(0, 256, (2400, 3000, 3), dtype=np.uint8)
+        pyramid = ImagePyramid(image)
+        self.view.update_image(image, pyramid)
+
+        pixmap = self.view._pixmap_item.pixmap()
+        self.assertLess(pixmap.width(), 3000)
+        self.assertEqual(self.view._scene.sceneRect(), QRectF(0, 0, 3000, 2400))
+        mapped = self.view._pixmap_item.mapRectToScene(self.view._pixmap_item.boundingRect())
+        self.assertAlmostEqual(mapped.width(), 3000, places=3)
+
+        # 放大到原始比例时换回全分辨率
+        self.view.apply_transform(QTransform())
+        self.assertEqual(self.view._pixmap_item.pixmap().width(), 3000)
+
+    def test_preview_transform(self):
+        """测试几何变换预览只变换图像项，场景为输出画布，取消后恢复"""
+        from utils.image_utils import rotation_transform
+        image = np.zeros((100, 200, 3), dtype=np.uint8)
+        self.view.update_image(image)
+        pixmap = self.view._pixmap_item.pixmap()
+        
+        matrix, size = rotation_transform(image.shape, 90, expand=True)
+        self.view.set_preview_transform(matrix, size)
+        self.assertTrue(self.view.has_preview_transform())
+        self.assertEqual(self.view._scene.sceneRect(), QRectF(0, 0, 100, 200))
+        self.assertEqual(self.view._pixmap_item.pixmap().cacheKey(), pixmap.cacheKey())
+        # 逆时针旋转90度：原图右上角的像素移到左上角
+        mapped = self.view._pixmap_item.mapRectToScene(self.view._pixmap_item.boundingRect())
+        self.assertAlmostEqual(mapped.width(), 100, places=3)
+        corner = self.view._pixmap_item.mapToScene(199.5, 0.5)
+        self.assertAlmostEqual(corner.x(), 0.5, places=3)
+        self.assertAlmostEqual(corner.y(), 0.5, places=3)
+        
+        self.view.clear_preview_transform()
+        self.assertFalse(self.view.has_preview_transform())
+        self.assertEqual(self.view._scene.sceneRect(), QRectF(0, 0, 200, 100))
+        self.assertTrue(self.view._pixmap_item.transform().isIdentity())
+        
+        # 更新图像时自动取消预览
+        self.view.set_preview_transform(matrix, size)
+        self.view.update_image(image)
+        self.assertFalse(self.view.has_preview_transform())
+
+    def test_first_painted(self):
+        """测试首次绘制后发出一次first_painted信号"""
+        painted = []
+        self.view.first_painted.connect(lambda: painted.append(True))
+        self.view.show()
+        self.view.viewport().repaint()
+        self.view.viewport().repaint()
+        app.processEvents()
+        self.assertEqual(painted, [True])
+        self.view.hide()
 
 def load_tests(loader, standard_tests, pattern):
     """自定义测试加载函数，使unittest发现所有测试"""
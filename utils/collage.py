@@ -0,0 +1,171 @@
+"""
+拼图模块
+
+把多幅图像按固定布局排列到一幅画布上：
+1. 先根据各输入的尺寸计算每幅图像在画布中的位置和大小，以及画布大小
+2. 只分配一次画布并填充背景色
+3. 各输入在线程池中并行缩放，直接写入画布中对应的区域，不产生整幅大小的中间副本
+
+支持的布局：
+- horizontal / vertical：水平或垂直排列，保持原始大小
+- auto：总宽度不超过 collage.auto_max_width 时水平排列，否则垂直排列
+- grid：按行列网格排列，每幅图像等比缩放后居中放入大小相同的单元格
+- top2_bottom1：上方两幅等宽，下方一幅与上方总宽度相同
+- left1_right2：右侧两幅等高，左侧一幅与右侧总高度相同
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from app.config import config
+from utils.memory_monitor import memory_monitor
+
+LAYOUTS = ("horizontal", "vertical", "auto", "grid", "top2_bottom1", "left1_right2")
+
+def _scaled(size, width=None, height=None):
+    """按给定的宽或高等比缩放 (宽, 高)，结果至少为1像素"""
+    w, h = size
+    if width is not None:
+        return width, max(1, round(h * width / w))
+    return max(1, round(w * height / h)), height
+
+def _row(sizes, padding):
+    """水平排列，返回 (各图像的 (x, y, 宽, 高), (画布宽, 画布高))"""
+    rects = []
+    x = 0
+    for w, h in sizes:
+        rects.append((x, 0, w, h))
+        x += w + padding
+    return rects, (x - padding, max(h for _, h in sizes))
+
+def _column(sizes, padding):
+    """垂直排列，返回值同 _row"""
+    rects, (height, width) = _row([(h, w) for w, h in sizes], padding)
+    return [(x, y, w, h) for y, x, h, w in rects], (width, height)
+
+def _grid(sizes, padding, columns=None):
+    """网格排列，单元格取所有图像的最大宽高，图像等比缩放后居中"""
+    columns = columns or math.ceil(math.sqrt(len(sizes)))
+    rows = math.ceil(len(sizes) / columns)
+    cell_w = max(w for w, _ in sizes)
+    cell_h = max(h for _, h in sizes)
+    rects = []
+    for index, (w, h) in enumerate(sizes):
+        scale = min(cell_w / w, cell_h / h)
+        fit_w, fit_h = max(1, round(w * scale)), max(1, round(h * scale))
+        row, column = divmod(index, columns)
+        x = column * (cell_w + padding) + (cell_w - fit_w) // 2
+        y = row * (cell_h + padding) + (cell_h - fit_h) // 2
+        rects.append((x, y, fit_w, fit_h))
+    return rects, (columns * (cell_w + padding) - padding, rows * (cell_h + padding) - padding)
+
+def _top2_bottom1(sizes, padding):
+    """上2下1：上方两幅缩放到相同宽度，下方一幅缩放到上方的总宽度"""
+    width = min(sizes[0][0], sizes[1][0])
+    top = [_scaled(size, width=width) for size in sizes[:2]]
+    top_height = max(h for _, h in top)
+    total_width = 2 * width + padding
+    bottom = _scaled(sizes[2], width=total_width)
+    rects = [(0, 0) + top[0], (width + padding, 0) + top[1], (0, top_height + padding) + bottom]
+    return rects, (total_width, top_height + padding + bottom[1])
+
+def _left1_right2(sizes, padding):
+    """左1右2：右侧两幅缩放到相同高度，左侧一幅缩放到右侧的总高度"""
+    height = min(sizes[1][1], sizes[2][1])
+    right = [_scaled(size, height=height) for size in sizes[1:]]
+    right_width = max(w for w, _ in right)
+    total_height = 2 * height + padding
+    left = _scaled(sizes[0], height=total_height)
+    x = left[0] + padding
+    rects = [(0, 0) + left, (x, 0) + right[0], (x, height + padding) + right[1]]
+    return rects, (x + right_width, total_height)
+
+def compute_layout(sizes, layout="horizontal", padding=0, columns=None):
+    """计算拼图布局
+
+    Args:
+        sizes: 各输入图像的 (宽, 高) 列表
+        layout: 布局名称，见 LAYOUTS
+        padding: 图像之间的间距（像素）
+        columns: grid 布局的列数，默认为接近正方形的列数
+
+    Returns:
+        tuple: (各图像在画布中的 (x, y, 宽, 高) 列表, (画布宽, 画布高))
+    """
+    sizes = [(int(w), int(h)) for w, h in sizes]
+    padding = max(0, int(padding))
+    if not sizes:
+        raise ValueError("至少需要1幅图像")
+    if min(min(size) for size in sizes) <= 0:
+        raise ValueError("图像尺寸无效")
+    if layout == "auto":
+        total_width = sum(w for w, _ in sizes) + padding * (len(sizes) - 1)
+        layout = "horizontal" if total_width <= config.get('collage.auto_max_width', 3000) else "vertical"
+    if layout == "horizontal":
+        return _row(sizes, padding)
+    if layout == "vertical":
+        return _column(sizes, padding)
+    if layout == "grid":
+        return _grid(sizes, padding, columns)
+    if layout in ("top2_bottom1", "left1_right2"):
+        if len(sizes) != 3:
+            raise ValueError(f"{layout} 布局需要3幅图像，实际为{len(sizes)}幅")
+        return _top2_bottom1(sizes, padding) if layout == "top2_bottom1" else _left1_right2(sizes, padding)
+    raise ValueError(f"未知的拼图布局: {layout}")
+
+def _draw(image, target):
+    """把图像缩放后直接写入画布中的目标区域
+
+    通道数不同时先缩放再转换，中间结果只有目标区域大小。
+    """
+    height, width = target.shape[:2]
+    shrink = width < image.shape[1] or height < image.shape[0]
+    interpolation = cv2.INTER_AREA if shrink else cv2.INTER_LINEAR
+    channels = image.shape[2] if image.ndim == 3 else 1
+    if channels == 3:
+        if image.shape[:2] == (height, width):
+            np.copyto(target, image)
+        else:
+            cv2.resize(image, (width, height), dst=target, interpolation=interpolation)
+        return
+    if image.shape[:2] != (height, width):
+        image = cv2.resize(image, (width, height), interpolation=interpolation)
+    code = cv2.COLOR_GRAY2BGR if channels == 1 else cv2.COLOR_BGRA2BGR
+    cv2.cvtColor(image, code, dst=target)
+
+def create_collage(images, layout="horizontal", padding=0, background=(255, 255, 255),
+                   columns=None, progress_callback=None):
+    """按布局把多幅图像合成为一幅拼图
+
+    Args:
+        images: BGR顺序的uint8图像列表（灰度和BGRA图像转换为BGR）
+        layout: 布局名称，见 LAYOUTS
+        padding: 图像之间的间距（像素）
+        background: 背景颜色，BGR顺序
+        columns: grid 布局的列数
+        progress_callback: 进度回调，参数为0-100的整数
+
+    Returns:
+        ndarray: 拼图结果
+    """
+    images = list(images)
+    for image in images:
+        if image is None or image.dtype != np.uint8 or image.ndim not in (2, 3):
+            raise ValueError("输入图像必须是uint8格式的灰度、BGR或BGRA图像")
+    rects, (width, height) = compute_layout(
+        [(image.shape[1], image.shape[0]) for image in images], layout, padding, columns
+    )
+    canvas = memory_monitor.allocate((height, width, 3), dtype=np.uint8)
+    canvas[...] = np.asarray(background, dtype=np.uint8)
+
+    def draw(index):
+        x, y, w, h = rects[index]
+        _draw(images[index], canvas[y:y + h, x:x + w])
+
+    # 各图像写入互不重叠的区域，OpenCV缩放时释放GIL，可以并行
+    workers = max(1, min(len(images), config.get('performance.thread_pool_size', 4)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for done, _ in enumerate(executor.map(draw, range(len(images))), 1):
+            if progress_callback is not None:
+                progress_callback(int(done * 100 / len(images)))
+    return canvas
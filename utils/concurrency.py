@@ -0,0 +1,175 @@
+"""
+运行时并发管理模块
+
+OpenCV内部自带多线程（parallel_for_）和IPP/SIMD优化路径，应用自身又有分块线程池和算子进程池。
+两层并行同时展开时线程数会超过核心数，互相争用反而变慢。本模块统一管理：
+
+1. 启动时按 performance.opencv_threads / performance.opencv_optimized 配置OpenCV
+2. 每个处理任务选择并行策略：
+   - internal：整图交给OpenCV，由其内部多线程并行
+   - tiles：应用自身按分块并行，任务期间将OpenCV内部线程数降为1
+3. 记录每个任务的耗时、CPU时间和核心利用率，便于调整配置
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import cv2
+from app.config import config
+from utils.system_resources import available_cores
+
+STRATEGIES = ('internal', 'tiles')
+CONCURRENCY_MODES = ('auto',) + STRATEGIES
+
+class ConcurrencyManager:
+    """OpenCV线程与应用分块并行的协调器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._cores = available_cores()
+        self._opencv_threads = self._cores
+        self._tile_jobs = 0  # 正在进行的分块并行任务数
+        self._history = deque(maxlen=config.get('performance.job_history_size', 200))
+
+    @property
+    def cores(self):
+        """可用核心数"""
+        return self._cores
+
+    @property
+    def opencv_threads(self):
+        """配置的OpenCV内部线程数"""
+        return self._opencv_threads
+
+    def configure(self):
+        """按配置设置OpenCV的线程数和优化开关
+
+        performance.opencv_threads 为0时使用全部可用核心。
+
+        Returns:
+            dict: 生效的设置
+        """
+        threads = config.get('performance.opencv_threads', 0) or self._cores
+        optimized = bool(config.get('performance.opencv_optimized', True))
+        with self._lock:
+            self._opencv_threads = max(1, int(threads))
+            cv2.setUseOptimized(optimized)
+            # 有分块任务进行时保持1个线程，结束后再恢复
+            if self._tile_jobs == 0:
+                cv2.setNumThreads(self._opencv_threads)
+        return {'opencv_threads': self._opencv_threads, 'optimized': cv2.useOptimized()}
+
+    def choose_strategy(self, pixels, tileable=True):
+        """为任务选择并行策略
+
+        performance.concurrency_mode 为 internal 或 tiles 时强制使用对应策略；
+        auto 时只有可分块、像素数不低于 performance.parallel_min_pixels 且有多个核心时才分块并行。
+
+        Args:
+            pixels: 任务处理的像素数
+            tileable: 任务能否分块执行
+
+        Returns:
+            str: 'internal' 或 'tiles'
+        """
+        if not tileable:
+            return 'internal'
+        mode = config.get('performance.concurrency_mode', 'auto')
+        if mode not in CONCURRENCY_MODES:
+            raise ValueError(f"未知的并发模式: {mode}")
+        if mode != 'auto':
+            return mode
+        if self._cores < 2 or pixels < config.get('performance.parallel_min_pixels', 0):
+            return 'internal'
+        return 'tiles'
+
+    @contextmanager
+    def job(self, name, pixels=0, strategy='internal'):
+        """执行一个处理任务并记录核心利用率
+
+        嵌套调用（如图像模型中的操作内部再调用分块算子）合并到最外层任务的记录中，
+        内层选择分块并行时外层记录的策略随之更新。
+
+        Args:
+            name: 任务名称
+            pixels: 处理的像素数
+            strategy: 'internal' 或 'tiles'
+
+        Yields:
+            dict: 任务记录
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知的并行策略: {strategy}")
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        outer = stack[0] if stack else None
+
+        if strategy == 'tiles':
+            with self._lock:
+                self._tile_jobs += 1
+                if self._tile_jobs == 1:
+                    cv2.setNumThreads(1)
+
+        record = outer if outer is not None else {
+            'name': name,
+            'pixels': int(pixels),
+            'strategy': strategy,
+            'opencv_threads': cv2.getNumThreads(),
+            'worker_cpu': 0.0,
+        }
+        if outer is not None and strategy == 'tiles':
+            outer['strategy'] = 'tiles'
+        stack.append(record)
+
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            stack.pop()
+            if strategy == 'tiles':
+                with self._lock:
+                    self._tile_jobs -= 1
+                    if self._tile_jobs == 0:
+                        cv2.setNumThreads(self._opencv_threads)
+
+            if outer is None:
+                wall = time.perf_counter() - start_wall
+                cpu = time.process_time() - start_cpu + record['worker_cpu']
+                record['wall_time'] = wall
+                record['cpu_time'] = cpu
+                # 核心利用率：任务期间CPU时间占全部可用核心时间的百分比
+                record['utilization'] = 100.0 * cpu / (wall * self._cores) if wall > 0 else 0.0
+                with self._lock:
+                    self._history.append(record)
+
+    def add_worker_cpu(self, seconds):
+        """将工作进程中消耗的CPU时间计入当前线程正在执行的任务"""
+        stack = getattr(self._local, 'stack', None)
+        if stack:
+            stack[0]['worker_cpu'] += seconds
+
+    def get_history(self):
+        """获取最近的任务记录（按完成顺序）"""
+        with self._lock:
+            return list(self._history)
+
+    def clear_history(self):
+        """清空任务记录"""
+        with self._lock:
+            self._history.clear()
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_concurrency_manager():
+    """获取全局并发管理器，首次获取时按配置设置OpenCV"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ConcurrencyManager()
+            _manager.configure()
+        return _manager
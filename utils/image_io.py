@@ -0,0 +1,212 @@
+"""
+图像读写工具函数
+
+主要功能：
+1. 编码参数
+   - 按文件格式（JPEG/PNG/WebP）构建OpenCV编码参数
+   - 在文件大小与编码耗时之间权衡的默认设置
+
+2. 原子写入
+   - 先编码到内存，再写入同目录下的临时文件
+   - 写入完成后通过重命名原子替换目标文件，避免产生半写入的文件
+   - 替换前把临时文件的权限设为目标文件原有的权限（新文件按umask），而不是临时文件的0600
+   - 支持进度回调
+"""
+import os
+import tempfile
+import cv2
+import numpy as np
+from app.config import config
+
+# 默认编码设置，可通过配置项 save.* 或调用参数覆盖
+DEFAULT_ENCODER_OPTIONS = {
+    'jpeg_quality': 95,        # JPEG质量 [0, 100]，越高越清晰、文件越大
+    'jpeg_optimize': False,    # 是否优化哈夫曼表（稍慢，文件略小）
+    'jpeg_progressive': False, # 是否使用渐进式JPEG
+    'png_compression': 3,      # PNG压缩级别 [0, 9]，越高文件越小但编码越慢
+    'webp_quality': 90,        # WebP质量 [1, 100]，大于100时为无损
+}
+
+# 文件扩展名到编码格式的映射
+_FORMAT_BY_EXTENSION = {
+    '.jpg': 'jpeg',
+    '.jpeg': 'jpeg',
+    '.jpe': 'jpeg',
+    '.png': 'png',
+    '.webp': 'webp',
+    '.bmp': 'bmp',
+    '.tif': 'tiff',
+    '.tiff': 'tiff',
+}
+
+# 写入文件时每次写入的字节数，用于进度汇报
+_WRITE_CHUNK_SIZE = 4 * 1024 * 1024
+
+def get_image_format(file_path):
+    """根据文件扩展名获取图像格式
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        str: 格式名称，如 'jpeg'、'png'、'webp'
+    """
+    ext = os.path.splitext(str(file_path))[1].lower()
+    if ext not in _FORMAT_BY_EXTENSION:
+        raise ValueError(f"不支持的图像格式: {ext or '(无扩展名)'}")
+    return _FORMAT_BY_EXTENSION[ext]
+
+def get_encoder_options(options=None):
+    """合并默认编码设置、配置文件设置和调用参数
+
+    Args:
+        options: 调用方指定的编码设置字典，可选
+
+    Returns:
+        dict: 完整的编码设置
+    """
+    merged = dict(DEFAULT_ENCODER_OPTIONS)
+    for key in DEFAULT_ENCODER_OPTIONS:
+        value = config.get(f'save.{key}')
+        if value is not None:
+            merged[key] = value
+    if options:
+        merged.update(options)
+    return merged
+
+def build_encode_params(file_path, options=None):
+    """构建cv2.imencode/cv2.imwrite使用的编码参数
+
+    Args:
+        file_path: 目标文件路径，用于确定格式
+        options: 编码设置字典，可选
+
+    Returns:
+        list: OpenCV编码参数列表
+    """
+    image_format = get_image_format(file_path)
+    options = get_encoder_options(options)
+
+    if image_format == 'jpeg':
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(np.clip(options['jpeg_quality'], 0, 100))]
+        if options['jpeg_optimize']:
+            params += [cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+        if options['jpeg_progressive']:
+            params += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+        return params
+    if image_format == 'png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, int(np.clip(options['png_compression'], 0, 9))]
+    if image_format == 'webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, int(np.clip(options['webp_quality'], 1, 101))]
+    return []
+
+def encode_image(image, file_path, options=None):
+    """将图像编码为目标格式的字节数据
+
+    Args:
+        image: 输入图像（OpenCV格式）
+        file_path: 目标文件路径，用于确定格式
+        options: 编码设置字典，可选
+
+    Returns:
+        numpy.ndarray: 编码后的字节数据
+    """
+    if not isinstance(image, np.ndarray):
+        raise TypeError("输入必须是numpy数组")
+
+    ext = os.path.splitext(str(file_path))[1].lower()
+    success, buffer = cv2.imencode(ext, image, build_encode_params(file_path, options))
+    if not success:
+        raise ValueError(f"图像编码失败: {file_path}")
+    return buffer
+
+def _current_umask():
+    """读取进程的umask
+
+    Linux上从/proc读取，避免临时修改umask影响其他线程创建的文件；其他系统只能先设置再恢复。
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+def replace_atomic(temp_path, file_path):
+    """用写好的临时文件原子地替换目标文件，保留目标文件原有的权限
+
+    tempfile.mkstemp 创建的临时文件权限为0600，直接重命名会改变已有文件的权限、
+    新文件也不能被其他用户读取。替换前把权限设为目标文件原有的权限，
+    目标文件不存在时设为普通新建文件的权限（0666去掉umask）。
+
+    Args:
+        temp_path: 同目录下已写好的临时文件
+        file_path: 目标文件路径
+    """
+    try:
+        mode = os.stat(file_path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_current_umask()
+    os.chmod(temp_path, mode)
+    os.replace(temp_path, file_path)
+
+def write_bytes_atomic(data, file_path, progress_callback=None):
+    """原子地将字节数据写入文件
+
+    先写入同目录下的临时文件并刷新到磁盘，再重命名为目标文件。
+    写入过程中出错时删除临时文件，目标文件保持不变。
+
+    Args:
+        data: 字节数据（bytes或numpy数组）
+        file_path: 目标文件路径
+        progress_callback: 进度回调函数，参数为已写入的比例 [0.0, 1.0]
+    """
+    file_path = os.path.abspath(str(file_path))
+    directory = os.path.dirname(file_path)
+    view = memoryview(data).cast('B')
+    total = len(view)
+
+    # 临时文件必须与目标文件在同一文件系统中，重命名才是原子的
+    fd, temp_path = tempfile.mkstemp(prefix='.imagepro-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            written = 0
+            while written < total:
+                end = min(written + _WRITE_CHUNK_SIZE, total)
+                f.write(view[written:end])
+                written = end
+                if progress_callback:
+                    progress_callback(written / total)
+            f.flush()
+            os.fsync(f.fileno())
+        replace_atomic(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    if total == 0 and progress_callback:
+        progress_callback(1.0)
+
+def save_image_atomic(image, file_path, options=None, progress_callback=None):
+    """编码并原子地保存图像
+
+    Args:
+        image: 输入图像（OpenCV格式）
+        file_path: 保存路径
+        options: 编码设置字典，可选
+        progress_callback: 进度回调函数，参数为进度百分比 [0, 100]
+    """
+    def report(percent):
+        if progress_callback:
+            progress_callback(int(percent))
+
+    report(0)
+    buffer = encode_image(image, file_path, options)
+    # 编码阶段占总进度的一半，写入阶段占另一半
+    report(50)
+    write_bytes_atomic(buffer, file_path, lambda ratio: report(50 + ratio * 50))
@@ -1,9 +1,18 @@
 """
 图像处理工具函数
+
+所有函数处理的彩色图像统一采用OpenCV原生的BGR通道顺序（见CHANNEL_ORDER），
+加载和保存时无需进行颜色空间转换，只在显示时由QImage按BGR格式解释像素。
 """
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 
+# 应用内部统一的彩色图像通道顺序（与cv2.imread/cv2.imwrite一致）
+CHANNEL_ORDER = 'BGR'
+
 def adjust_brightness_contrast(image, brightness=0, contrast=1.0):
     """调整亮度和对比度
     
@@ -143,6 +152,50 @@ def apply_adaptive_threshold(image, max_value=255, block_size=11, c=2):
     return cv2.adaptiveThreshold(image, max_value, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                                 cv2.THRESH_BINARY, block_size, c)
 
+def rotation_transform(shape, angle, center=None, scale=1.0, expand=False):
+    """计算 rotate_image 对给定尺寸图像使用的仿射矩阵和输出尺寸
+    
+    Args:
+        shape: 输入图像的形状
+        angle: 旋转角度（度），正值表示逆时针旋转
+        center: 旋转中心，默认为图像中心
+        scale: 缩放比例
+        expand: 是否扩展图像以包含整个旋转后的图像
+    
+    Returns:
+        tuple: (2x3 仿射矩阵, (输出宽, 输出高))，矩阵把输入像素坐标映射到输出像素坐标
+    """
+    height, width = shape[:2]
+    
+    # 90度的整数倍只是重排像素（与 np.rot90 逐像素一致），不扩展画布时只有180度或正方形图像恰好填满原画布
+    quarter_turns = int(angle // 90) % 4 if angle % 90 == 0 else None
+    if (quarter_turns is not None and center is None and scale == 1.0
+            and (expand or quarter_turns % 2 == 0 or height == width)):
+        cos, sin = ((1, 0), (0, 1), (-1, 0), (0, -1))[quarter_turns]
+        new_width, new_height = (width, height) if quarter_turns % 2 == 0 else (height, width)
+        # 绕像素网格的中心旋转，再把中心移到输出网格的中心
+        cx, cy = (width - 1) / 2, (height - 1) / 2
+        matrix = np.array([[cos, sin, 0.0], [-sin, cos, 0.0]])
+        matrix[:, 2] = np.array([(new_width - 1) / 2, (new_height - 1) / 2]) - matrix[:, :2] @ (cx, cy)
+        return matrix, (new_width, new_height)
+    
+    # 如果没有指定旋转中心，默认为图像中心
+    if center is None:
+        center = (width // 2, height // 2)
+    
+    # 计算旋转矩阵
+    matrix = cv2.getRotationMatrix2D(center, angle, scale)
+    if not expand:
+        return matrix, (width, height)
+    
+    # 计算旋转后图像的新尺寸，并把旋转中心移到新画布的对应位置
+    angle_rad = np.abs(np.radians(angle))
+    new_width = int(height * np.abs(np.sin(angle_rad)) + width * np.abs(np.cos(angle_rad)))
+    new_height = int(height * np.abs(np.cos(angle_rad)) + width * np.abs(np.sin(angle_rad)))
+    matrix[0, 2] += (new_width - width) / 2
+    matrix[1, 2] += (new_height - height) / 2
+    return matrix, (new_width, new_height)
+
 def rotate_image(image, angle, center=None, scale=1.0, expand=False):
     """旋转图像
     
@@ -154,7 +207,7 @@ def rotate_image(image, angle, center=None, scale=1.0, expand=False):
         expand: 是否扩展图像以包含整个旋转后的图像
     
     Returns:
-        旋转后的图像
+        旋转后的图像；绕图像中心旋转90度的整数倍且不缩放时为共享原图内存的视图
     """
     if not isinstance(image, np.ndarray):
         raise TypeError("输入必须是numpy数组")
@@ -162,31 +215,66 @@ def rotate_image(image, angle, center=None, scale=1.0, expand=False):
     # 获取图像尺寸
     height, width = image.shape[:2]
     
-    # 如果没有指定旋转中心，默认为图像中心
-    if center is None:
-        center = (width // 2, height // 2)
+    # 90度的整数倍只是重排像素，返回步长视图，不复制也不插值
+    # 不扩展画布时，只有180度或正方形图像旋转后仍恰好填满原画布
+    quarter_turns = int(angle // 90) % 4 if angle % 90 == 0 else None
+    if (quarter_turns is not None and center is None and scale == 1.0
+            and (expand or quarter_turns % 2 == 0 or height == width)):
+        return np.rot90(image, quarter_turns)
     
-    if expand:
-        # 计算旋转后图像的新尺寸
-        angle_rad = np.abs(np.radians(angle))
-        new_width = int(height * np.abs(np.sin(angle_rad)) + width * np.abs(np.cos(angle_rad)))
-        new_height = int(height * np.abs(np.cos(angle_rad)) + width * np.abs(np.sin(angle_rad)))
-        
-        # 调整旋转中心和输出图像大小
-        rotation_matrix = cv2.getRotationMatrix2D(center, angle, scale)
-        rotation_matrix[0, 2] += (new_width - width) / 2
-        rotation_matrix[1, 2] += (new_height - height) / 2
-        
-        # 执行仿射变换
-        rotated_image = cv2.warpAffine(image, rotation_matrix, (new_width, new_height))
-    else:
-        # 计算旋转矩阵
-        rotation_matrix = cv2.getRotationMatrix2D(center, angle, scale)
-        
-        # 执行仿射变换
-        rotated_image = cv2.warpAffine(image, rotation_matrix, (width, height))
+    # 执行仿射变换
+    matrix, size = rotation_transform(image.shape, angle, center, scale, expand)
+    return cv2.warpAffine(image, matrix, size)
+
+def compose_affine(first, second):
+    """合成两个2x3仿射矩阵
+    
+    Returns:
+        ndarray: 先做first再做second的2x3矩阵
+    """
+    first = np.vstack([first, (0.0, 0.0, 1.0)])
+    second = np.vstack([second, (0.0, 0.0, 1.0)])
+    return (second @ first)[:2]
+
+def warp_affine_chain(image, steps, interpolation=cv2.INTER_LINEAR):
+    """把连续的几何变换合成为一个矩阵，只对原图重采样一次
+    
+    逐步执行时每一步都要插值一次，误差和模糊逐步累积；合成后只插值一次，
+    耗时与步数无关。每一步输出画布之外的像素与逐步执行一样被裁掉（填0）。
+    
+    Args:
+        image: 输入图像
+        steps: [(2x3 仿射矩阵, (输出宽, 输出高)), ...]，按顺序作用，每个矩阵作用于上一步的输出
+        interpolation: 插值方式
     
-    return rotated_image
+    Returns:
+        ndarray: 变换后的图像，尺寸为最后一步的输出尺寸
+    """
+    if not steps:
+        return image
+    # 各步输出画布相对原图的累计矩阵
+    cumulative = []
+    total = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+    for matrix, _ in steps:
+        total = compose_affine(total, matrix)
+        cumulative.append(total)
+    width, height = steps[-1][1]
+    result = cv2.warpAffine(image, total, (width, height), flags=interpolation)
+    
+    # 中间画布：输出像素映射回该画布之外时置0；输出四角都落在画布内时整个画布都不会裁剪，跳过
+    corners = np.array([[0, 0, 1], [width - 1, 0, 1], [0, height - 1, 1], [width - 1, height - 1, 1]], dtype=np.float64)
+    for (_, (canvas_width, canvas_height)), to_canvas in zip(steps[:-1], cumulative[:-1]):
+        # 最终输出 -> 中间画布
+        output_to_canvas = compose_affine(cv2.invertAffineTransform(total), to_canvas)
+        mapped = corners @ output_to_canvas.T
+        if (mapped.min() >= -0.5 and mapped[:, 0].max() <= canvas_width - 0.5
+                and mapped[:, 1].max() <= canvas_height - 0.5):
+            continue
+        canvas_to_output = cv2.invertAffineTransform(output_to_canvas)
+        inside = np.ones((canvas_height, canvas_width), dtype=np.uint8)
+        mask = cv2.warpAffine(inside, canvas_to_output, (width, height), flags=cv2.INTER_NEAREST)
+        result[mask == 0] = 0
+    return result
 
 def flip_image(image, flip_code):
     """翻转图像
@@ -199,12 +287,17 @@ def flip_image(image, flip_code):
             -1: 同时水平和垂直翻转
     
     Returns:
-        翻转后的图像
+        翻转后的图像，为共享原图内存的步长视图，像素算子需要时才由OpenCV复制为连续数组
     """
     if not isinstance(image, np.ndarray):
         raise TypeError("输入必须是numpy数组")
     
-    return cv2.flip(image, flip_code)
+    # 与cv2.flip一致：0绕x轴，正数绕y轴，负数同时绕两个轴
+    if flip_code == 0:
+        return image[::-1]
+    if flip_code > 0:
+        return image[:, ::-1]
+    return image[::-1, ::-1]
 
 def crop_image(image, x, y, width, height):
     """裁剪图像
@@ -217,7 +310,7 @@ def crop_image(image, x, y, width, height):
         height: 裁剪区域的高度
     
     Returns:
-        裁剪后的图像
+        裁剪后的图像，为共享原图内存的视图
     """
     if not isinstance(image, np.ndarray):
         raise TypeError("输入必须是numpy数组")
@@ -236,7 +329,7 @@ def crop_image(image, x, y, width, height):
     width = min(width, width_img - x)
     height = min(height, height_img - y)
     
-    return image[y:y+height, x:x+width].copy()
+    return image[y:y+height, x:x+width]
 
 def apply_laplacian_sharpen(image, kernel_size=3, strength=1.0):
     """应用拉普拉斯锐化
@@ -347,6 +440,416 @@ def apply_custom_sharpen(image, kernel, strength=1.0):
     
     return sharpened
 
+def frequency_spectrum(image):
+    """计算频域去噪所需的正向变换
+    
+    彩色图像转换到YUV后只变换亮度通道。宽高以镜像方式扩展到 cv2.getOptimalDFTSize 给出的
+    快速尺寸（小素数因子之积），使用实数输入的FFT，只计算和保存一半频谱。
+    同一图像多次去噪（例如拖动半径滑块）时复用结果，每次只需相乘和逆变换。
+    
+    Args:
+        image: 输入图像（灰度、BGR或BGRA）
+    
+    Returns:
+        dict: {'spectrum': 亮度的半频谱, 'shape': 原图形状, 'padded': 扩展后的(高, 宽),
+               'yuv': 彩色图像的YUV数据（灰度图为None）, 'alpha': Alpha通道（没有时为None）}
+    """
+    if not isinstance(image, np.ndarray):
+        raise TypeError("输入必须是numpy数组")
+    
+    rows, cols = image.shape[:2]
+    yuv = alpha = None
+    if image.ndim == 3 and image.shape[2] >= 3:
+        yuv = cv2.cvtColor(np.ascontiguousarray(image[..., :3]), cv2.COLOR_BGR2YUV)
+        luma = yuv[..., 0]
+        if image.shape[2] == 4:
+            alpha = image[..., 3].copy()
+    else:
+        luma = image.reshape(rows, cols)
+    
+    # 扩展到快速尺寸；镜像填充避免边界不连续在低通后产生振铃
+    padded_rows, padded_cols = cv2.getOptimalDFTSize(rows), cv2.getOptimalDFTSize(cols)
+    padded = cv2.copyMakeBorder(np.ascontiguousarray(luma), 0, padded_rows - rows, 0, padded_cols - cols,
+                                cv2.BORDER_REFLECT)
+    spectrum = np.fft.rfft2(padded.astype(np.float32))
+    return {
+        'spectrum': spectrum,
+        'shape': image.shape,
+        'padded': (padded_rows, padded_cols),
+        'yuv': yuv,
+        'alpha': alpha,
+    }
+
+@functools.lru_cache(maxsize=8)
+def _lowpass_mask(padded_rows, padded_cols, rows, cols, radius):
+    """半频谱上的椭圆低通掩码，截止频率按原图尺寸换算，与是否扩展无关"""
+    fy = np.fft.fftfreq(padded_rows)[:, None] * rows
+    fx = np.fft.rfftfreq(padded_cols)[None, :] * cols
+    mask = (fy * fy + fx * fx <= radius * radius).astype(np.float32)
+    mask.setflags(write=False)
+    return mask
+
+def denoise_frequency(image, radius=30, spectrum=None):
+    """傅里叶低通去噪
+    
+    只保留亮度通道半径radius以内的低频分量，色度通道不变。
+    半径以原图尺寸下的频率序号计，即保留每个方向上每幅图像不超过radius个周期的分量。
+    
+    Args:
+        image: 输入图像（灰度、BGR或BGRA）
+        radius: 低通半径，范围[1, 短边的一半]
+        spectrum: 由 frequency_spectrum(image) 预先计算的正向变换，为None或形状不符时重新计算
+    
+    Returns:
+        处理后的图像，类型与输入相同
+    """
+    if not isinstance(image, np.ndarray):
+        raise TypeError("输入必须是numpy数组")
+    if spectrum is None or spectrum['shape'] != image.shape:
+        spectrum = frequency_spectrum(image)
+    
+    rows, cols = image.shape[:2]
+    radius = int(max(1, min(radius, min(rows, cols) // 2)))
+    padded_rows, padded_cols = spectrum['padded']
+    mask = _lowpass_mask(padded_rows, padded_cols, rows, cols, radius)
+    luma = np.fft.irfft2(spectrum['spectrum'] * mask, s=(padded_rows, padded_cols))[:rows, :cols]
+    
+    # 取实部并截断到数据类型的范围（参考实现取模再拉伸到0-255，会改变整体亮度）
+    if np.issubdtype(image.dtype, np.integer):
+        info = np.iinfo(image.dtype)
+        luma = np.clip(np.rint(luma), info.min, info.max)
+    luma = luma.astype(image.dtype)
+    
+    if spectrum['yuv'] is None:
+        return luma.reshape(image.shape)
+    yuv = spectrum['yuv'].copy()
+    yuv[..., 0] = luma
+    result = cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR)
+    if spectrum['alpha'] is not None:
+        result = np.dstack([result, spectrum['alpha']])
+    return result
+
+def denoise_nlmeans(image, h=10, h_color=10, template_window_size=7, search_window_size=21):
+    """非局部均值去噪
+    
+    每个像素取搜索窗口内与其邻域（模板窗口）相似的像素的加权平均。
+    输出像素只依赖半径 template_window_size//2 + search_window_size//2 以内的输入，可以分块执行。
+    
+    Args:
+        image: 输入图像（灰度或BGR，uint8）
+        h: 亮度的滤波强度，越大去噪越强、细节损失越多
+        h_color: 色度的滤波强度（仅彩色图像）
+        template_window_size: 模板窗口大小，奇数
+        search_window_size: 搜索窗口大小，奇数
+    
+    Returns:
+        处理后的图像
+    """
+    if not isinstance(image, np.ndarray):
+        raise TypeError("输入必须是numpy数组")
+    
+    if image.ndim == 3 and image.shape[2] == 3:
+        return cv2.fastNlMeansDenoisingColored(image, None, h, h_color, template_window_size, search_window_size)
+    if image.ndim == 3 and image.shape[2] == 4:
+        # Alpha通道不参与去噪
+        color = cv2.fastNlMeansDenoisingColored(np.ascontiguousarray(image[..., :3]), None, h, h_color,
+                                                template_window_size, search_window_size)
+        return np.dstack([color, image[..., 3]])
+    return cv2.fastNlMeansDenoising(image, None, h, template_window_size, search_window_size)
+
+_pywt = None
+
+def _import_pywt():
+    """导入可选依赖PyWavelets，未安装时返回None"""
+    global _pywt
+    if _pywt is None:
+        try:
+            import pywt
+        except ImportError:
+            pywt = False
+        _pywt = pywt
+    return _pywt or None
+
+def _haar_decompose(data, level):
+    """NumPy实现的二维正交Haar小波分解，对最后一维（通道）同时计算
+
+    Returns:
+        tuple: (系数列表 [cA_n, (cH_n, cV_n, cD_n), ..., (cH_1, cV_1, cD_1)], 各层分解前的 (高, 宽))
+    """
+    coeffs = []
+    sizes = []
+    approx = data
+    for _ in range(level):
+        rows, cols = approx.shape[:2]
+        sizes.append((rows, cols))
+        # 奇数尺寸时镜像补一行/列
+        if rows % 2 or cols % 2:
+            approx = np.pad(approx, ((0, rows % 2), (0, cols % 2), (0, 0)), mode='symmetric')
+        a, b = approx[0::2, 0::2], approx[0::2, 1::2]
+        c, d = approx[1::2, 0::2], approx[1::2, 1::2]
+        coeffs.append(((a + b - c - d) * 0.5, (a - b + c - d) * 0.5, (a - b - c + d) * 0.5))
+        approx = (a + b + c + d) * 0.5
+    return [approx] + coeffs[::-1], sizes[::-1]
+
+def _haar_reconstruct(coeffs, sizes):
+    """_haar_decompose 的逆变换"""
+    approx = coeffs[0]
+    for (horizontal, vertical, diagonal), (rows, cols) in zip(coeffs[1:], sizes):
+        half_rows, half_cols = approx.shape[:2]
+        result = np.empty((half_rows * 2, half_cols * 2) + approx.shape[2:], dtype=approx.dtype)
+        result[0::2, 0::2] = (approx + horizontal + vertical + diagonal) * 0.5
+        result[0::2, 1::2] = (approx + horizontal - vertical - diagonal) * 0.5
+        result[1::2, 0::2] = (approx - horizontal + vertical - diagonal) * 0.5
+        result[1::2, 1::2] = (approx - horizontal - vertical + diagonal) * 0.5
+        approx = result[:rows, :cols]
+    return approx
+
+def wavelet_decomposition(image, wavelet='sym8', level=2):
+    """计算小波去噪所需的多层小波分解，可缓存后供 denoise_wavelet 反复使用
+
+    所有颜色通道作为最后一维一起分解（float32），不逐通道循环。
+    未安装PyWavelets时使用NumPy实现的Haar小波，wavelet参数不起作用。
+
+    Args:
+        image: 输入图像（灰度、BGR或BGRA）
+        wavelet: PyWavelets的小波名称
+        level: 分解层数，超过图像尺寸允许的层数时取最大层数
+
+    Returns:
+        dict: 分解系数、各通道的噪声估计及恢复图像所需的信息
+    """
+    if not isinstance(image, np.ndarray):
+        raise TypeError("输入必须是numpy数组")
+
+    rows, cols = image.shape[:2]
+    alpha = None
+    if image.ndim == 3 and image.shape[2] == 4:
+        data, alpha = image[..., :3], image[..., 3].copy()
+    else:
+        data = image.reshape(rows, cols, -1)
+    data = data.astype(np.float32)
+
+    pywt = _import_pywt()
+    sizes = None
+    if pywt is not None:
+        level = max(0, min(level, pywt.dwt_max_level(min(rows, cols), wavelet)))
+        coeffs = pywt.wavedec2(data, wavelet, level=level, axes=(0, 1)) if level else [data]
+    else:
+        wavelet = 'haar'
+        level = max(0, min(level, int(np.log2(max(1, min(rows, cols))))))
+        coeffs, sizes = _haar_decompose(data, level)
+
+    # 由最细一层对角细节系数的中位数估计各通道的噪声标准差
+    if level:
+        sigma = np.median(np.abs(coeffs[-1][2]).reshape(-1, data.shape[2]), axis=0) / 0.6745
+    else:
+        sigma = np.zeros(data.shape[2], dtype=np.float32)
+    return {
+        'coeffs': coeffs,
+        'sizes': sizes,
+        'wavelet': wavelet,
+        'level': level,
+        'sigma': sigma.astype(np.float32),
+        'shape': image.shape,
+        'dtype': image.dtype,
+        'alpha': alpha,
+    }
+
+def denoise_wavelet(image, threshold_scale=1.0, wavelet='sym8', level=2, decomposition=None):
+    """小波去噪
+
+    对各层细节系数做软阈值收缩，阈值按各通道的噪声估计取 sigma * sqrt(2 ln N)（VisuShrink）乘以threshold_scale。
+    调整阈值时传入预先计算的分解，只需收缩和逆变换。
+
+    Args:
+        image: 输入图像（灰度、BGR或BGRA）
+        threshold_scale: 阈值倍数，0表示不去噪，越大去噪越强
+        wavelet: 小波名称（未安装PyWavelets时固定为Haar小波）
+        level: 分解层数
+        decomposition: 由 wavelet_decomposition(image, wavelet, level) 预先计算的分解，
+            为None或形状不符时重新计算
+
+    Returns:
+        处理后的图像，类型与输入相同
+    """
+    if not isinstance(image, np.ndarray):
+        raise TypeError("输入必须是numpy数组")
+    if decomposition is None or decomposition['shape'] != image.shape:
+        decomposition = wavelet_decomposition(image, wavelet, level)
+
+    rows, cols = image.shape[:2]
+    coeffs = decomposition['coeffs']
+    threshold = (decomposition['sigma'] * np.float32(threshold_scale * np.sqrt(2 * np.log(rows * cols))))
+    thresholded = [coeffs[0]]
+    for bands in coeffs[1:]:
+        thresholded.append(tuple(
+            np.sign(band) * np.maximum(np.abs(band) - threshold, 0, dtype=np.float32) for band in bands
+        ))
+
+    if decomposition['sizes'] is not None:
+        result = _haar_reconstruct(thresholded, decomposition['sizes'])
+    elif decomposition['level']:
+        result = _import_pywt().waverec2(thresholded, decomposition['wavelet'], axes=(0, 1))[:rows, :cols]
+    else:
+        result = thresholded[0]
+
+    if np.issubdtype(image.dtype, np.integer):
+        info = np.iinfo(image.dtype)
+        result = np.clip(np.rint(result), info.min, info.max)
+    result = result.astype(image.dtype)
+    if decomposition['alpha'] is not None:
+        return np.dstack([result, decomposition['alpha']])
+    return result.reshape(image.shape)
+
+# 噪声按固定大小的网格单元生成，每个单元使用独立的随机数流
+NOISE_CELL_SIZE = 256
+
+def noise_generator(seed, row, col):
+    """噪声网格单元 (row, col) 的随机数生成器
+
+    等价于 SeedSequence(seed).spawn() 的第row个子序列再spawn出的第col个子序列，
+    只由种子和单元位置决定，与图像大小和分块方式无关。
+
+    Args:
+        seed: 随机种子
+        row: 单元行号
+        col: 单元列号
+
+    Returns:
+        numpy.random.Generator: 该单元的随机数生成器
+    """
+    return np.random.Generator(np.random.PCG64(np.random.SeedSequence(seed, spawn_key=(row, col))))
+
+def _apply_noise(image, seed, origin, out, apply_cell):
+    """按噪声网格单元对图像加噪，各单元在线程池中并行处理
+
+    Args:
+        image: uint8图像
+        seed: 随机种子
+        origin: image左上角在完整图像中的坐标 (x, y)
+        out: 输出数组，为None时新建，可以是image本身
+        apply_cell: apply_cell(rng, source, target, y, x) 在单元内加噪，
+            source/target为单元与图像相交的部分，(y, x)为其在单元内的起点
+
+    Returns:
+        加噪后的图像
+    """
+    if not isinstance(image, np.ndarray):
+        raise TypeError("输入必须是numpy数组")
+    if image.dtype != np.uint8:
+        raise ValueError("噪声算子只支持uint8图像")
+    if out is None:
+        out = np.empty_like(image)
+    elif out.shape != image.shape or out.dtype != image.dtype:
+        raise ValueError("输出数组的形状和类型必须与输入相同")
+
+    x0, y0 = origin
+    height, width = image.shape[:2]
+    cell = NOISE_CELL_SIZE
+    cells = [
+        (row, col)
+        for row in range(y0 // cell, (y0 + height - 1) // cell + 1)
+        for col in range(x0 // cell, (x0 + width - 1) // cell + 1)
+    ]
+
+    def process(index):
+        row, col = index
+        # 单元与图像相交的部分，分别以图像和单元为坐标系
+        top, left = max(row * cell, y0), max(col * cell, x0)
+        bottom, right = min((row + 1) * cell, y0 + height), min((col + 1) * cell, x0 + width)
+        region = (slice(top - y0, bottom - y0), slice(left - x0, right - x0))
+        apply_cell(noise_generator(seed, row, col), image[region], out[region],
+                   top - row * cell, left - col * cell)
+
+    if len(cells) == 1:
+        process(cells[0])
+    else:
+        # 随机数填充时释放GIL，各单元写入互不重叠的区域
+        with ThreadPoolExecutor(max_workers=min(len(cells), os.cpu_count() or 1)) as executor:
+            list(executor.map(process, cells))
+    return out
+
+def _additive_noise(sample):
+    """由单元噪声采样函数构造加性噪声的单元处理函数，结果四舍五入并截断到[0, 255]"""
+    def apply_cell(rng, source, target, y, x):
+        # 总是生成整个单元的噪声再截取，同一像素的噪声与图像分块方式无关
+        shape = (NOISE_CELL_SIZE, NOISE_CELL_SIZE) + source.shape[2:]
+        noise = sample(rng, shape)[y:y + source.shape[0], x:x + source.shape[1]]
+        noise += source
+        np.rint(noise, out=noise)
+        np.clip(noise, 0, 255, out=noise)
+        np.copyto(target, noise, casting='unsafe')
+    return apply_cell
+
+def add_gaussian_noise(image, sigma=10.0, seed=0, origin=(0, 0), out=None):
+    """添加高斯噪声
+
+    噪声以float32叠加后截断到[0, 255]，不会因负值回绕。相同种子下每个像素的噪声
+    只由其在完整图像中的位置决定，对分块分别加噪的结果与整图加噪相同。
+
+    Args:
+        image: uint8图像（彩色图像各通道噪声独立）
+        sigma: 噪声标准差
+        seed: 随机种子
+        origin: image左上角在完整图像中的坐标 (x, y)，对分块加噪时使用
+        out: 输出数组，传入image本身时原地加噪
+
+    Returns:
+        加噪后的图像
+    """
+    def sample(rng, shape):
+        noise = rng.standard_normal(shape, dtype=np.float32)
+        noise *= sigma
+        return noise
+    return _apply_noise(image, seed, origin, out, _additive_noise(sample))
+
+def add_uniform_noise(image, amplitude=20.0, seed=0, origin=(0, 0), out=None):
+    """添加[-amplitude, amplitude)范围内的均匀噪声
+
+    Args:
+        image: uint8图像
+        amplitude: 噪声幅度
+        seed: 随机种子
+        origin: image左上角在完整图像中的坐标 (x, y)
+        out: 输出数组，传入image本身时原地加噪
+
+    Returns:
+        加噪后的图像
+    """
+    def sample(rng, shape):
+        noise = rng.random(shape, dtype=np.float32)
+        noise *= 2 * amplitude
+        noise -= amplitude
+        return noise
+    return _apply_noise(image, seed, origin, out, _additive_noise(sample))
+
+def add_salt_pepper_noise(image, amount=0.05, salt_ratio=0.5, seed=0, origin=(0, 0), out=None):
+    """添加椒盐噪声
+
+    每个像素（所有通道一起）以amount的概率被替换，其中salt_ratio比例为白点，其余为黑点。
+
+    Args:
+        image: uint8图像
+        amount: 被替换的像素比例 [0, 1]
+        salt_ratio: 替换像素中白点的比例 [0, 1]
+        seed: 随机种子
+        origin: image左上角在完整图像中的坐标 (x, y)
+        out: 输出数组，传入image本身时原地加噪
+
+    Returns:
+        加噪后的图像
+    """
+    salt_threshold = amount * salt_ratio
+
+    def apply_cell(rng, source, target, y, x):
+        draw = rng.random((NOISE_CELL_SIZE, NOISE_CELL_SIZE), dtype=np.float32)
+        draw = draw[y:y + source.shape[0], x:x + source.shape[1]]
+        if not np.may_share_memory(target, source):
+            np.copyto(target, source)
+        target[draw < salt_threshold] = 255
+        target[(draw >= salt_threshold) & (draw < amount)] = 0
+    return _apply_noise(image, seed, origin, out, apply_cell)
+
 def calculate_histogram(image, channel=None, mask=None, bins=256, range_values=(0, 256)):
     """计算图像直方图
     
@@ -416,7 +919,7 @@ def apply_histogram_equalization(image, per_channel=False):
         return result
     else:
         # 转换到LAB颜色空间，只均衡化亮度通道
-        lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB)
+        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
         l, a, b = cv2.split(lab)
         
         # 均衡化L通道
@@ -425,8 +928,8 @@ def apply_histogram_equalization(image, per_channel=False):
         # 合并通道
         lab_eq = cv2.merge([l_eq, a, b])
         
-        # 转换回RGB空间
-        result = cv2.cvtColor(lab_eq, cv2.COLOR_LAB2RGB)
+        # 转换回BGR空间
+        result = cv2.cvtColor(lab_eq, cv2.COLOR_LAB2BGR)
         return result
 
 def adjust_exposure(image, exposure=0.0):
@@ -473,7 +976,7 @@ def adjust_highlights(image, highlights=0.0):
     # 计算图像亮度
     if len(image.shape) == 3:
         # 彩色图像，转换为HSV后提取V通道
-        hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
         v = hsv[:,:,2]
     else:
         # 灰度图像，直接使用灰度值
@@ -536,7 +1039,7 @@ def adjust_shadows(image, shadows=0.0):
     # 计算图像亮度
     if len(image.shape) == 3:
         # 彩色图像，转换为HSV后提取V通道
-        hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
         v = hsv[:,:,2]
     else:
         # 灰度图像，直接使用灰度值
@@ -654,7 +1157,7 @@ def auto_contrast_enhancement(image, clip_limit=2.0, tile_grid_size=(8, 8)):
         result = clahe.apply(image)
     else:
         # 彩色图像转换到LAB颜色空间
-        lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB)
+        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
         l, a, b = cv2.split(lab)
         
         # 只对亮度通道应用CLAHE
@@ -663,8 +1166,8 @@ def auto_contrast_enhancement(image, clip_limit=2.0, tile_grid_size=(8, 8)):
         # 合并通道
         lab = cv2.merge([l, a, b])
         
-        # 转换回RGB
-        result = cv2.cvtColor(lab, cv2.COLOR_LAB2RGB)
+        # 转换回BGR
+        result = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
     
     return result
 
@@ -687,7 +1190,7 @@ def auto_color_correction(image, saturation_scale=1.3, vibrance_scale=1.2):
         return image
     
     # 转换到HSV颜色空间
-    hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
     h, s, v = cv2.split(hsv)
     
     # 全局饱和度提升
@@ -709,11 +1212,97 @@ def auto_color_correction(image, saturation_scale=1.3, vibrance_scale=1.2):
     # 合并通道
     hsv_corrected = cv2.merge([h, s, v])
     
-    # 转换回RGB
-    result = cv2.cvtColor(hsv_corrected, cv2.COLOR_HSV2RGB)
+    # 转换回BGR
+    result = cv2.cvtColor(hsv_corrected, cv2.COLOR_HSV2BGR)
     
     return result
 
+def white_balance_statistics(image):
+    """计算白平衡所需的各通道统计量
+    
+    统计量可以按分块分别计算后用 merge_white_balance_statistics 合并，
+    因此白平衡可以拆分为“统计-应用”两个可并行的阶段。
+    
+    Args:
+        image: BGR彩色图像
+    
+    Returns:
+        dict: count（像素数）、sum、sumsq、max（各为长度3的数组）
+    """
+    count = image.shape[0] * image.shape[1]
+    # meanStdDev一次遍历得到所有通道的均值和标准差
+    mean, std = cv2.meanStdDev(image)
+    mean, std = mean.ravel(), std.ravel()
+    return {
+        'count': count,
+        'sum': mean * count,
+        'sumsq': (std ** 2 + mean ** 2) * count,
+        'max': image.reshape(-1, 3).max(axis=0).astype(np.float64),
+    }
+
+def merge_white_balance_statistics(stats_list):
+    """合并分块的白平衡统计量
+    
+    Args:
+        stats_list: white_balance_statistics 的结果列表
+    
+    Returns:
+        dict: 合并后的统计量
+    """
+    return {
+        'count': sum(stats['count'] for stats in stats_list),
+        'sum': np.sum([stats['sum'] for stats in stats_list], axis=0),
+        'sumsq': np.sum([stats['sumsq'] for stats in stats_list], axis=0),
+        'max': np.max([stats['max'] for stats in stats_list], axis=0),
+    }
+
+def white_balance_gains(stats, method='gray_world'):
+    """根据统计量计算各通道的白平衡增益
+    
+    Args:
+        stats: 白平衡统计量
+        method: 白平衡方法，'gray_world'、'perfect_reflector' 或 'adaptive'
+    
+    Returns:
+        ndarray: B、G、R三个通道的增益
+    """
+    mean = stats['sum'] / stats['count']
+    channel_max = stats['max']
+    
+    # 灰色世界假设：各通道均值调整到整体均值
+    gains_gw = mean.mean() / mean
+    
+    # 完美反射假设：各通道最大值调整到最大值中的最大值
+    gains_pr = np.where(channel_max > 0, channel_max.max() / np.maximum(channel_max, 1), 1.0)
+    
+    if method == 'gray_world':
+        return gains_gw
+    elif method == 'perfect_reflector':
+        return gains_pr
+    elif method == 'adaptive':
+        # 根据标准差计算权重，标准差越大，完美反射权重越大
+        std = np.sqrt(np.maximum(stats['sumsq'] / stats['count'] - mean ** 2, 0))
+        w_pr = min(1.0, std.sum() / 100.0)  # 将标准差归一化
+        w_gw = 1.0 - w_pr
+        return gains_gw * w_gw + gains_pr * w_pr
+    else:
+        raise ValueError(f"不支持的白平衡方法: {method}")
+
+def apply_channel_gains(image, gains):
+    """按通道乘以增益并截断到[0, 255]
+    
+    Args:
+        image: BGR彩色图像
+        gains: 各通道增益
+    
+    Returns:
+        处理后的图像
+    """
+    balanced = image.astype(np.float32)
+    balanced *= np.asarray(gains, dtype=np.float32)
+    np.clip(balanced, 0, 255, out=balanced)
+    return balanced.astype(np.uint8)
+
 def auto_white_balance(image, method='gray_world'):
     """自动白平衡处理
     
@@ -734,79 +1323,8 @@ def auto_white_balance(image, method='gray_world'):
     if len(image.shape) != 3 or image.shape[2] != 3:
         return image
     
-    # 使用灰色世界假设方法
-    if method == 'gray_world':
-        # 计算每个通道的平均值
-        b_avg, g_avg, r_avg = np.mean(image[:, :, 0]), np.mean(image[:, :, 1]), np.mean(image[:, :, 2])
-        
-        # 计算整体平均值
-        k = (b_avg + g_avg + r_avg) / 3
-        
-        # 计算增益
-        kb, kg, kr = k / b_avg, k / g_avg, k / r_avg
-        
-        # 应用增益
-        balanced = image.copy().astype(np.float32)
-        balanced[:, :, 0] = np.clip(balanced[:, :, 0] * kb, 0, 255)
-        balanced[:, :, 1] = np.clip(balanced[:, :, 1] * kg, 0, 255)
-        balanced[:, :, 2] = np.clip(balanced[:, :, 2] * kr, 0, 255)
-        
-        return balanced.astype(np.uint8)
-    
-    # 使用完美反射假设方法
-    elif method == 'perfect_reflector':
-        # 找出每个通道的最大值
-        b_max, g_max, r_max = np.max(image[:, :, 0]), np.max(image[:, :, 1]), np.max(image[:, :, 2])
-        
-        # 计算最大值中的最大值
-        rgb_max = max(b_max, g_max, r_max)
-        
-        # 计算增益
-        kb, kg, kr = rgb_max / b_max if b_max > 0 else 1.0, rgb_max / g_max if g_max > 0 else 1.0, rgb_max / r_max if r_max > 0 else 1.0
-        
-        # 应用增益
-        balanced = image.copy().astype(np.float32)
-        balanced[:, :, 0] = np.clip(balanced[:, :, 0] * kb, 0, 255)
-        balanced[:, :, 1] = np.clip(balanced[:, :, 1] * kg, 0, 255)
-        balanced[:, :, 2] = np.clip(balanced[:, :, 2] * kr, 0, 255)
-        
-        return balanced.astype(np.uint8)
-    
-    # 使用自适应方法（结合灰色世界和完美反射）
-    elif method == 'adaptive':
-        # 灰色世界部分
-        b_avg, g_avg, r_avg = np.mean(image[:, :, 0]), np.mean(image[:, :, 1]), np.mean(image[:, :, 2])
-        k = (b_avg + g_avg + r_avg) / 3
-        kb_gw, kg_gw, kr_gw = k / b_avg, k / g_avg, k / r_avg
-        
-        # 完美反射部分
-        b_max, g_max, r_max = np.max(image[:, :, 0]), np.max(image[:, :, 1]), np.max(image[:, :, 2])
-        rgb_max = max(b_max, g_max, r_max)
-        kb_pr, kg_pr, kr_pr = rgb_max / b_max if b_max > 0 else 1.0, rgb_max / g_max if g_max > 0 else 1.0, rgb_max / r_max if r_max > 0 else 1.0
-        
-        # 计算标准差，用于自适应权重
-        b_std, g_std, r_std = np.std(image[:, :, 0]), np.std(image[:, :, 1]), np.std(image[:, :, 2])
-        std_sum = b_std + g_std + r_std
-        
-        # 根据标准差计算权重，标准差越大，完美反射权重越大
-        w_pr = min(1.0, std_sum / 100.0)  # 将标准差归一化
-        w_gw = 1.0 - w_pr
-        
-        # 混合两种方法的增益
-        kb = kb_gw * w_gw + kb_pr * w_pr
-        kg = kg_gw * w_gw + kg_pr * w_pr
-        kr = kr_gw * w_gw + kr_pr * w_pr
-        
-        # 应用增益
-        balanced = image.copy().astype(np.float32)
-        balanced[:, :, 0] = np.clip(balanced[:, :, 0] * kb, 0, 255)
-        balanced[:, :, 1] = np.clip(balanced[:, :, 1] * kg, 0, 255)
-        balanced[:, :, 2] = np.clip(balanced[:, :, 2] * kr, 0, 255)
-        
-        return balanced.astype(np.uint8)
-    
-    else:
-        raise ValueError(f"不支持的白平衡方法: {method}")
+    gains = white_balance_gains(white_balance_statistics(image), method)
+    return apply_channel_gains(image, gains)
         
 def auto_image_enhance(image, contrast=True, color=True, white_balance=True):
     """一键增强图像，综合应用对比度增强、色彩校正和白平衡调整
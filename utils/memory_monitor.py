@@ -1,13 +1,23 @@
 """
 内存监控器模块 - 用于管理应用程序的内存使用
+
+各子系统（撤销历史、预览缓冲区、视图缓存、解码/回放缓存、工作进程池）以内存池的形式注册，
+每个内存池提供当前占用的字节数、释放函数和重建代价。内存紧张时按重建代价从低到高依次释放，
+直到释放量满足需要，撤销历史只在内存危急时才会被削减。
+
+内存检查由分配驱动而不是定时轮询：分配大块缓冲区的代码在分配前调用 reserve()（或直接用 allocate()），
+预计超出预算时同步释放内存池。内存总量以容器的cgroup限制为准，支持时还参考Linux PSI内存压力。
+分块处理时 reserve() 调用很频繁，内存用量的采样缓存 USAGE_SAMPLE_TTL 秒，每次预留只按采样加上本次的字节数检查。
 """
 import psutil
 import gc
 import time
 import threading
 import weakref
+import numpy as np
 from PySide6.QtCore import QObject, Signal
 from app.config import config
+from utils.system_resources import memory_usage, memory_pressure
 
 class MemoryMonitor(QObject):
     """内存监控器类，管理应用内存使用"""
@@ -17,6 +27,9 @@ class MemoryMonitor(QObject):
     memory_critical = Signal(float)  # 内存使用率危急信号
     memory_status = Signal(dict)  # 内存状态信号
     
+    # 工作线程中检测到内存压力时发出，转到主线程执行释放
+    _pressure_detected = Signal(int, object)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         
@@ -24,150 +37,345 @@ class MemoryMonitor(QObject):
         self._warning_threshold = 70  # 警告阈值（百分比）
         self._critical_threshold = config.get('performance.auto_gc_threshold', 80)  # 危急阈值（百分比）
         
-        # 监控状态
-        self._running = False
-        self._stop_event = threading.Event()
-        self._monitor_thread = None
-        
         # 被监控的对象
         self._image_model_ref = None
         self._image_view_ref = None
         
-        # 上次清理时间
+        # 上次清理和发出状态信号的时间
         self._last_cleanup_time = 0
-        self._cleanup_interval = config.get('performance.memory_check_interval', 60)  # 清理间隔（秒）
+        self._last_status_time = 0
+        
+        # 已注册的内存池：名称 -> 内存池信息
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        
+        # reserve() 使用的内存用量采样及采样时间
+        self._usage_sample = None
+        self._usage_sample_time = 0
+        self._usage_lock = threading.Lock()
+        
+        self._pressure_detected.connect(self._relieve_pressure)
     
-    def start_monitoring(self, check_interval=5):
-        """开始内存监控
+    def get_usage(self):
+        """获取内存预算的使用情况
+        
+        内存总量取cgroup限制和物理内存中较小者，配置了 performance.memory_budget_mb 时再取其与之较小者。
+        
+        Returns:
+            dict: {'total', 'used', 'available': 字节数, 'percent': 使用率（%）,
+                   'source': 'cgroup'、'host' 或 'budget', 'pressure': PSI内存压力（不支持时为None）}
+        """
+        usage = memory_usage()
+        budget = config.get('performance.memory_budget_mb', 0) * 1024 * 1024
+        if 0 < budget < usage['total']:
+            # 预算只约束本进程
+            used = psutil.Process().memory_info().rss
+            usage = {
+                'total': budget,
+                'used': used,
+                'available': max(0, budget - used),
+                'percent': used / budget * 100,
+                'source': 'budget',
+            }
+        usage['pressure'] = memory_pressure() if config.get('performance.memory_use_psi', True) else None
+        return usage
+    
+    def pressure_level(self, percent, pressure=None):
+        """根据使用率和PSI压力判断内存压力等级
         
         Args:
-            check_interval: 检查间隔（秒）
+            percent: 内存使用率（%）
+            pressure: memory_pressure() 的返回值
+        
+        Returns:
+            int: PRESSURE_NONE、PRESSURE_WARNING 或 PRESSURE_CRITICAL
         """
-        if self._running:
-            return
+        level = PRESSURE_NONE
+        if percent >= self._critical_threshold:
+            level = PRESSURE_CRITICAL
+        elif percent >= self._warning_threshold:
+            level = PRESSURE_WARNING
+        if pressure is not None:
+            if pressure['full'] >= config.get('performance.memory_psi_full_threshold', 5.0):
+                level = PRESSURE_CRITICAL
+            elif pressure['some'] >= config.get('performance.memory_psi_some_threshold', 10.0):
+                level = max(level, PRESSURE_WARNING)
+        return level
+    
+    def reserve(self, nbytes):
+        """在分配缓冲区之前检查内存预算
         
-        self._running = True
-        self._stop_event.clear()
+        计算分配后的使用率，超过警告阈值时同步释放可重建的缓存，超过危急阈值时还会削减撤销历史。
+        在工作线程中调用时，释放操作转到主线程执行，当前线程不等待。
+        
+        Args:
+            nbytes: 即将分配的字节数
         
-        # 启动监控线程
-        self._monitor_thread = threading.Thread(target=self._monitor_memory, args=(check_interval,))
-        self._monitor_thread.daemon = True
-        self._monitor_thread.start()
+        Returns:
+            int: 分配后的内存压力等级
+        """
+        usage = self._sample_usage()
+        projected = (usage['used'] + nbytes) / usage['total'] * 100 if usage['total'] else 0.0
+        level = self.pressure_level(projected, usage['pressure'])
+        if threading.current_thread() is threading.main_thread():
+            self._relieve_pressure(level, nbytes, usage)
+        elif level != PRESSURE_NONE:
+            self._pressure_detected.emit(level, nbytes)
+        return level
+    
+    def _sample_usage(self):
+        """获取内存用量采样，采样超过 USAGE_SAMPLE_TTL 秒时重新读取
+        
+        采样不累加期间的预留：分块读取等短暂的缓冲区很快就会释放，累加会把它们误算成整幅图像的用量，
+        已分配且仍在使用的内存在下一次采样时计入。
+        """
+        now = time.monotonic()
+        with self._usage_lock:
+            if self._usage_sample is None or now - self._usage_sample_time >= USAGE_SAMPLE_TTL:
+                self._usage_sample = self.get_usage()
+                self._usage_sample_time = now
+            return dict(self._usage_sample)
+    
+    def invalidate_usage(self):
+        """丢弃缓存的内存用量采样，下次 reserve() 时重新读取"""
+        with self._usage_lock:
+            self._usage_sample = None
     
-    def stop_monitoring(self):
-        """停止内存监控"""
-        if not self._running:
-            return
+    def allocate(self, shape, dtype=np.uint8):
+        """检查内存预算后分配未初始化的缓冲区
+        
+        Args:
+            shape: 数组形状
+            dtype: 数据类型
         
-        self._running = False
-        self._stop_event.set()
+        Returns:
+            ndarray: 新分配的数组
+        """
+        self.reserve(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        return np.empty(shape, dtype=dtype)
+    
+    def _relieve_pressure(self, level, nbytes, usage=None):
+        """按压力等级释放内存池并发出状态信号（在主线程执行）"""
+        if usage is None:
+            usage = self.get_usage()
+        if level != PRESSURE_NONE:
+            percent = (usage['used'] + nbytes) / usage['total'] * 100
+            # 释放到警告阈值以下留出余量
+            target = (self._warning_threshold - 5) / 100 * usage['total']
+            bytes_needed = max(nbytes, usage['used'] + nbytes - target)
+            if level == PRESSURE_CRITICAL:
+                self.memory_critical.emit(percent)
+                self._perform_cleanup(bytes_needed, force=True)
+            else:
+                self.memory_warning.emit(percent)
+                self._perform_cleanup(bytes_needed)
+            self._last_cleanup_time = time.time()
+            # 释放后用量已变化，缓存的采样不再可信
+            self.invalidate_usage()
+        # 分块读取等场景会频繁检查预算，没有压力时限制状态信号的频率
+        now = time.time()
+        if level != PRESSURE_NONE or now - self._last_status_time >= STATUS_INTERVAL:
+            self._last_status_time = now
+            # 没有释放时用量未变，沿用本次的采样
+            self.memory_status.emit(self.get_memory_info(usage if level == PRESSURE_NONE else None))
+    
+    def register_pool(self, name, label, size_func, evict_func=None, rebuild_cost=0):
+        """注册一个子系统内存池
         
-        if self._monitor_thread and self._monitor_thread.is_alive():
-            self._monitor_thread.join(timeout=1.0)
-            self._monitor_thread = None
+        Args:
+            name: 内存池名称
+            label: 显示名称
+            size_func: 返回当前占用字节数的函数
+            evict_func: 释放函数 evict_func(需要释放的字节数) -> 实际释放的字节数，None表示不可释放
+            rebuild_cost: 重建代价，越小越先被释放
+        """
+        with self._pools_lock:
+            self._pools[name] = {
+                'label': label,
+                'size': size_func,
+                'evict': evict_func,
+                'rebuild_cost': rebuild_cost,
+            }
+    
+    def unregister_pool(self, name):
+        """注销内存池"""
+        with self._pools_lock:
+            self._pools.pop(name, None)
+    
+    def _pool_items(self):
+        with self._pools_lock:
+            return list(self._pools.items())
     
     def register_image_model(self, image_model):
-        """注册图像模型对象
+        """注册图像模型对象，登记撤销历史、预览缓冲区、分块解码缓存、图像金字塔、频谱缓存和回放缓存
         
         Args:
             image_model: ImageModel实例
         """
-        self._image_model_ref = weakref.ref(image_model)
+        self._image_model_ref = ref = weakref.ref(image_model)
+        self.register_pool('history', "撤销历史", _weak_call(ref, 'history_bytes'),
+                           _weak_call(ref, 'trim_history'), rebuild_cost=HISTORY_REBUILD_COST)
+        self.register_pool('preview', "预览缓冲区", _weak_call(ref, 'preview_bytes'))
+        self.register_pool('tile_cache', "分块解码缓存", _weak_call(ref, 'tile_cache_bytes'),
+                           _weak_call(ref, 'clear_tile_caches'), rebuild_cost=2)
+        self.register_pool('analysis_cache', "图像金字塔", _weak_call(ref, 'pyramid_bytes'),
+                           _weak_call(ref, 'clear_pyramids'), rebuild_cost=1)
+        self.register_pool('spectrum_cache', "频谱缓存", _weak_call(ref, 'spectrum_bytes'),
+                           _weak_call(ref, 'clear_spectrum'), rebuild_cost=1)
+        self.register_pool('wavelet_cache', "小波分解缓存", _weak_call(ref, 'wavelet_bytes'),
+                           _weak_call(ref, 'clear_wavelet'), rebuild_cost=1)
+        self.register_pool('replay_cache', "配方回放缓存", _weak_call(ref, 'replay_cache_bytes'),
+                           _weak_call(ref, 'clear_replay_cache'), rebuild_cost=3)
     
     def register_image_view(self, image_view):
-        """注册图像视图对象
+        """注册图像视图对象，登记视图的QPixmap缓存
         
         Args:
             image_view: ImageView实例
         """
-        self._image_view_ref = weakref.ref(image_view)
+        self._image_view_ref = ref = weakref.ref(image_view)
+        self.register_pool('view_cache', "视图缓存", _weak_call(ref, 'cache_bytes'),
+                           _weak_call(ref, 'clear_cache'), rebuild_cost=1)
     
-    def get_memory_info(self):
+    def get_pool_usage(self):
+        """获取各内存池的占用情况
+        
+        Returns:
+            list: 按重建代价排序的 [{'name', 'label', 'bytes', 'evictable', 'rebuild_cost'}, ...]
+        """
+        usage = []
+        for name, pool in self._pool_items():
+            try:
+                size = int(pool['size']())
+            except Exception as e:
+                print(f"统计内存池 {name} 失败: {str(e)}")
+                size = 0
+            usage.append({
+                'name': name,
+                'label': pool['label'],
+                'bytes': size,
+                'evictable': pool['evict'] is not None,
+                'rebuild_cost': pool['rebuild_cost'],
+            })
+        usage.sort(key=lambda item: item['rebuild_cost'])
+        return usage
+    
+    def evict(self, bytes_needed, max_cost=None):
+        """按重建代价从低到高释放内存池，直到释放量达到要求
+        
+        Args:
+            bytes_needed: 需要释放的字节数
+            max_cost: 只释放重建代价不超过该值的内存池，None表示不限制
+        
+        Returns:
+            list: [(内存池名称, 释放的字节数), ...]
+        """
+        released = []
+        remaining = bytes_needed
+        for item in self.get_pool_usage():
+            if remaining <= 0:
+                break
+            if not item['evictable'] or item['bytes'] <= 0:
+                continue
+            if max_cost is not None and item['rebuild_cost'] > max_cost:
+                continue
+            with self._pools_lock:
+                pool = self._pools.get(item['name'])
+            if pool is None:
+                continue
+            try:
+                freed = int(pool['evict'](remaining) or 0)
+            except Exception as e:
+                print(f"释放内存池 {item['name']} 失败: {str(e)}")
+                continue
+            released.append((item['name'], freed))
+            remaining -= freed
+        return released
+    
+    def get_memory_info(self, usage=None):
         """获取内存使用信息
         
+        Args:
+            usage: 已读取的 get_usage() 结果，默认重新读取
+        
         Returns:
-            dict: 内存使用信息
+            dict: 内存使用信息，pools 为各子系统内存池的占用（字节）
         """
-        memory = psutil.virtual_memory()
+        if usage is None:
+            usage = self.get_usage()
         return {
-            'total': memory.total / (1024 * 1024),  # MB
-            'used': memory.used / (1024 * 1024),    # MB
-            'free': memory.free / (1024 * 1024),    # MB
-            'percent': memory.percent               # 百分比
+            'total': usage['total'] / (1024 * 1024),  # MB
+            'used': usage['used'] / (1024 * 1024),    # MB
+            'free': usage['available'] / (1024 * 1024),  # MB
+            'percent': usage['percent'],              # 百分比
+            'source': usage['source'],                # 内存总量的来源
+            'pressure': usage['pressure'],            # PSI内存压力
+            'process': psutil.Process().memory_info().rss / (1024 * 1024),  # 本进程RSS（MB）
+            'pools': self.get_pool_usage(),
         }
     
     def force_cleanup(self):
-        """强制清理内存"""
-        self._perform_cleanup(force=True)
-        self._last_cleanup_time = time.time()
-    
-    def _monitor_memory(self, interval):
-        """内存监控线程函数
+        """强制清理内存
         
-        Args:
-            interval: 检查间隔（秒）
+        Returns:
+            list: [(内存池名称, 释放的字节数), ...]
         """
-        while not self._stop_event.is_set():
-            try:
-                # 获取内存使用信息
-                memory_info = self.get_memory_info()
-                
-                # 发送内存状态信号
-                self.memory_status.emit(memory_info)
-                
-                # 检查内存使用率
-                if memory_info['percent'] >= self._critical_threshold:
-                    # 发送危急信号
-                    self.memory_critical.emit(memory_info['percent'])
-                    # 执行清理
-                    self._perform_cleanup(force=True)
-                elif memory_info['percent'] >= self._warning_threshold:
-                    # 发送警告信号
-                    self.memory_warning.emit(memory_info['percent'])
-                    # 检查是否需要执行清理
-                    current_time = time.time()
-                    if current_time - self._last_cleanup_time >= self._cleanup_interval:
-                        self._perform_cleanup()
-                        self._last_cleanup_time = current_time
-            except Exception as e:
-                print(f"内存监控错误: {str(e)}")
-            
-            # 等待下一次检查
-            for _ in range(int(interval)):
-                if self._stop_event.is_set():
-                    break
-                time.sleep(1)
-    
-    def _perform_cleanup(self, force=False):
+        usage = self.get_usage()
+        target = (self._warning_threshold - 5) / 100 * usage['total']
+        released = self._perform_cleanup(max(0, usage['used'] - target), force=True)
+        self._last_cleanup_time = time.time()
+        self.invalidate_usage()
+        self.memory_status.emit(self.get_memory_info())
+        return released
+    
+    def _perform_cleanup(self, bytes_needed, force=False):
         """执行内存清理
         
+        按重建代价从低到高释放内存池。非强制清理不会削减撤销历史；
+        强制清理时所有缓存都被清空，撤销历史只削减到满足需要为止。
+        
         Args:
+            bytes_needed: 需要释放的字节数
             force: 是否强制清理
+        
+        Returns:
+            list: [(内存池名称, 释放的字节数), ...]
         """
-        # 清理图像模型缓存
-        if self._image_model_ref:
-            image_model = self._image_model_ref()
-            if image_model:
-                try:
-                    image_model.clear_memory()
-                except Exception as e:
-                    print(f"清理图像模型缓存失败: {str(e)}")
-        
-        # 清理图像视图缓存
-        if self._image_view_ref:
-            image_view = self._image_view_ref()
-            if image_view:
-                try:
-                    image_view.clear_cache()
-                except Exception as e:
-                    print(f"清理图像视图缓存失败: {str(e)}")
-        
-        # 强制清理时执行完整垃圾回收
         if force:
-            collected = gc.collect(2)  # 完整收集
-            print(f"垃圾回收完成，回收了 {collected} 个对象")
+            # 先清空全部可重建的缓存，再按需要削减撤销历史
+            released = self.evict(float('inf'), max_cost=HISTORY_REBUILD_COST - 1)
+            freed = sum(size for _, size in released)
+            if bytes_needed > freed:
+                released += self.evict(bytes_needed - freed)
         else:
-            gc.collect(0)  # 仅收集最年轻的对象
+            released = self.evict(bytes_needed, max_cost=HISTORY_REBUILD_COST - 1)
+        
+        # 释放的缓冲区由引用计数直接回收，这里只收集最年轻一代中可能残留的循环引用
+        gc.collect(0)
+        return released
+
+# 撤销历史的重建代价：历史被削减后无法恢复，只在强制清理时释放
+HISTORY_REBUILD_COST = 100
+
+# 没有内存压力时发出状态信号的最小间隔（秒）
+STATUS_INTERVAL = 0.5
+
+# reserve() 缓存内存用量采样的时间（秒），读取cgroup、PSI和进程RSS每次约需0.1毫秒
+USAGE_SAMPLE_TTL = 0.1
+
+# 内存压力等级
+PRESSURE_NONE = 0
+PRESSURE_WARNING = 1
+PRESSURE_CRITICAL = 2
+
+def _weak_call(ref, method):
+    """生成通过弱引用调用对象方法的函数，对象已被回收时返回0"""
+    def call(*args):
+        target = ref()
+        if target is None:
+            return 0
+        return getattr(target, method)(*args)
+    return call
 
 # 创建全局内存监控实例
 memory_monitor = MemoryMonitor() 
\ No newline at end of file
@@ -0,0 +1,470 @@
+"""
+共享内存进程池
+
+部分算子（高光/阴影调整中的逐通道掩码运算、USM锐化的阈值混合、白平衡统计）
+主要耗时在Python层的NumPy代码上，受GIL限制，多线程无法扩展。
+本模块提供按算子选择的执行后端：
+
+1. inline：在调用线程中直接执行（默认）
+2. thread：按行带在线程池中执行，适合释放GIL的OpenCV算子
+3. process：按行带在常驻进程池中执行，像素数据通过 multiprocessing.shared_memory 传递，
+   只序列化共享内存名称和行范围，不序列化像素数据
+
+单次耗时很长的算子（如非局部均值去噪）另外可以按带重叠的分块在线程池中执行（run_tiled_operator），
+逐块汇报进度，并可在分块之间取消。
+
+工作进程以spawn方式启动（避免在含Qt线程的进程中fork），启动时导入OpenCV和图像处理模块
+并关闭OpenCV内部多线程，之后常驻复用。配置了process后端时，应用启动后在后台线程中
+提前启动工作进程（warm_up_in_background），首次处理不必等待。
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+import psutil
+from app.config import config
+from utils.concurrency import get_concurrency_manager
+from utils.memory_monitor import memory_monitor
+from utils.image_utils import (
+    auto_white_balance,
+    white_balance_statistics,
+    merge_white_balance_statistics,
+    white_balance_gains,
+    apply_channel_gains
+)
+
+BACKENDS = ('inline', 'thread', 'process')
+
+# 可分块执行的算子及其邻域半径（根据参数计算），逐像素算子的半径为0
+TILEABLE_OPERATORS = {
+    'adjust_highlights': lambda **kwargs: 0,
+    'adjust_shadows': lambda **kwargs: 0,
+    'apply_usm_sharpen': lambda radius=5, **kwargs: max(1, radius),
+    'apply_channel_gains': lambda **kwargs: 0,
+    'denoise_nlmeans': lambda template_window_size=7, search_window_size=21, **kwargs: (
+        template_window_size // 2 + search_window_size // 2),
+}
+
+class OperationCancelled(Exception):
+    """处理在完成前被取消"""
+
+class SharedImage:
+    """位于共享内存中的图像数组"""
+
+    def __init__(self, shm, shape, dtype, owner):
+        self._shm = shm
+        self._owner = owner
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+
+    @classmethod
+    def create(cls, shape, dtype):
+        """创建新的共享内存图像"""
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        return cls(shared_memory.SharedMemory(create=True, size=size), shape, dtype, owner=True)
+
+    @classmethod
+    def from_array(cls, array):
+        """创建共享内存图像并复制数组内容"""
+        shared = cls.create(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, descriptor):
+        """在工作进程中按描述符连接共享内存"""
+        name, shape, dtype = descriptor
+        return cls(shared_memory.SharedMemory(name=name), shape, dtype, owner=False)
+
+    @property
+    def descriptor(self):
+        """可序列化的描述符（名称，形状，类型），用于在进程间传递"""
+        return self._shm.name, self.shape, self.dtype.str
+
+    def close(self):
+        """释放映射，创建者同时删除共享内存"""
+        self.array = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+def _init_worker():
+    """工作进程初始化：每个进程处理一个行带，关闭OpenCV内部多线程避免争用CPU"""
+    cv2.setNumThreads(1)
+
+def _warm_up_task():
+    """空任务，用于提前启动工作进程"""
+    return os.getpid()
+
+def _tile_task(func, source, target, rows, halo, kwargs):
+    """工作进程中处理一个行带：读取带邻域的输入，写回去掉邻域的结果
+
+    Returns:
+        float: 本任务消耗的CPU时间（秒）
+    """
+    start = time.process_time()
+    source_image = SharedImage.attach(source)
+    target_image = SharedImage.attach(target)
+    try:
+        y0, y1 = rows
+        top, bottom = max(0, y0 - halo), min(source_image.shape[0], y1 + halo)
+        result = func(source_image.array[top:bottom], **kwargs)
+        target_image.array[y0:y1] = result[y0 - top:y1 - top]
+    finally:
+        source_image.close()
+        target_image.close()
+    return time.process_time() - start
+
+def _reduce_task(func, source, rows):
+    """工作进程中对一个行带计算统计量
+
+    Returns:
+        tuple: (统计量, 本任务消耗的CPU时间)
+    """
+    start = time.process_time()
+    source_image = SharedImage.attach(source)
+    try:
+        return func(source_image.array[rows[0]:rows[1]]), time.process_time() - start
+    finally:
+        source_image.close()
+
+def split_rows(height, parts):
+    """将行范围均分为若干行带
+
+    Returns:
+        list: [(起始行, 结束行), ...]
+    """
+    parts = max(1, min(parts, height))
+    bounds = np.linspace(0, height, parts + 1).astype(int)
+    return [(int(bounds[i]), int(bounds[i + 1])) for i in range(parts)]
+
+def split_tiles(height, width, tile_size):
+    """将图像划分为分块
+
+    Returns:
+        list: [(x, y, 宽, 高), ...]，按行优先排列
+    """
+    return [
+        (x, y, min(tile_size, width - x), min(tile_size, height - y))
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+
+class OperatorPool:
+    """按算子选择后端的分块执行器"""
+
+    def __init__(self, workers=None):
+        self._workers = workers or config.get('performance.process_pool_size') or os.cpu_count() or 1
+        self._process_pool = None
+        self._thread_pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        return self._workers
+
+    def _get_process_pool(self):
+        with self._lock:
+            if self._process_pool is None:
+                context = multiprocessing.get_context('spawn')
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self._workers, mp_context=context, initializer=_init_worker
+                )
+            return self._process_pool
+
+    def _get_thread_pool(self):
+        with self._lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self._workers)
+            return self._thread_pool
+
+    def warm_up(self):
+        """提前启动全部工作进程，使首次处理不必等待进程启动和模块导入"""
+        pool = self._get_process_pool()
+        for future in [pool.submit(_warm_up_task) for _ in range(self._workers)]:
+            future.result()
+
+    def map_rows(self, func, image, backend='process', halo=0, **kwargs):
+        """按行带并行执行算子，返回与输入同形状的结果
+
+        Args:
+            func: 模块级处理函数 func(image, **kwargs)，输出形状与输入相同
+            image: 输入图像
+            backend: 'thread' 或 'process'
+            halo: 行带上下额外读取的邻域行数
+            **kwargs: 算子参数
+        """
+        bands = split_rows(image.shape[0], self._workers * 2)
+
+        if backend == 'thread':
+            result = memory_monitor.allocate(image.shape, dtype=image.dtype)
+
+            def process(rows):
+                y0, y1 = rows
+                top, bottom = max(0, y0 - halo), min(image.shape[0], y1 + halo)
+                result[y0:y1] = func(image[top:bottom], **kwargs)[y0 - top:y1 - top]
+
+            list(self._get_thread_pool().map(process, bands))
+            return result
+
+        pool = self._get_process_pool()
+        # 输入副本和结果各占一份共享内存
+        memory_monitor.reserve(2 * image.nbytes)
+        source = SharedImage.from_array(image)
+        target = SharedImage.create(image.shape, image.dtype)
+        try:
+            futures = [
+                pool.submit(_tile_task, func, source.descriptor, target.descriptor, rows, halo, kwargs)
+                for rows in bands
+            ]
+            get_concurrency_manager().add_worker_cpu(sum(future.result() for future in futures))
+            # 共享内存随后释放，结果需复制到普通数组
+            return target.array.copy()
+        finally:
+            source.close()
+            target.close()
+
+    def reduce_rows(self, func, image, backend='process'):
+        """按行带并行计算统计量
+
+        Returns:
+            list: 每个行带的 func(行带) 结果
+        """
+        bands = split_rows(image.shape[0], self._workers * 2)
+        if backend == 'thread':
+            return list(self._get_thread_pool().map(lambda rows: func(image[rows[0]:rows[1]]), bands))
+
+        pool = self._get_process_pool()
+        memory_monitor.reserve(image.nbytes)
+        source = SharedImage.from_array(image)
+        try:
+            futures = [pool.submit(_reduce_task, func, source.descriptor, rows) for rows in bands]
+            results = [future.result() for future in futures]
+            get_concurrency_manager().add_worker_cpu(sum(cpu for _, cpu in results))
+            return [result for result, _ in results]
+        finally:
+            source.close()
+
+    def map_tiles(self, func, image, overlap=0, tile_size=None, parallel=True,
+                  progress_callback=None, cancel_event=None, **kwargs):
+        """按带重叠的分块执行算子，逐块汇报进度，可在分块之间取消
+
+        每个分块连同宽度为overlap的邻域一起处理，结果裁掉邻域后写回，
+        邻域半径不超过overlap的算子与整图处理结果一致。
+
+        Args:
+            func: 处理函数 func(image, **kwargs)，输出形状与输入相同
+            image: 输入图像
+            overlap: 分块之间的重叠宽度（像素）
+            tile_size: 分块大小，默认为 performance.tile_size
+            parallel: 是否在线程池中并行处理分块（算子需释放GIL）；否则在当前线程逐块执行
+            progress_callback: 进度回调，参数为0-100的整数
+            cancel_event: threading.Event，置位后不再开始新的分块并抛出OperationCancelled
+            **kwargs: 算子参数
+
+        Returns:
+            ndarray: 处理后的图像
+        """
+        height, width = image.shape[:2]
+        tiles = split_tiles(height, width, tile_size or config.get('performance.tile_size', 256))
+        result = memory_monitor.allocate(image.shape, dtype=image.dtype)
+
+        def cancelled():
+            return cancel_event is not None and cancel_event.is_set()
+
+        def process(tile):
+            if cancelled():
+                return
+            x, y, w, h = tile
+            x0, y0 = max(0, x - overlap), max(0, y - overlap)
+            x1, y1 = min(width, x + w + overlap), min(height, y + h + overlap)
+            processed = func(image[y0:y1, x0:x1], **kwargs)
+            result[y:y + h, x:x + w] = processed[y - y0:y - y0 + h, x - x0:x - x0 + w]
+
+        def report(done):
+            if progress_callback is not None:
+                progress_callback(int(done * 100 / len(tiles)))
+
+        if not parallel:
+            for done, tile in enumerate(tiles, 1):
+                process(tile)
+                if cancelled():
+                    break
+                report(done)
+        else:
+            futures = [self._get_thread_pool().submit(process, tile) for tile in tiles]
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    future.result()
+                    if cancelled():
+                        break
+                    report(done)
+            finally:
+                # 取消尚未开始的分块，等待正在处理的分块结束后再返回
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+
+        if cancelled():
+            raise OperationCancelled("处理已取消")
+        return result
+
+    def memory_bytes(self):
+        """常驻工作进程占用的物理内存（RSS）字节数"""
+        with self._lock:
+            pool = self._process_pool
+            # ProcessPoolExecutor未公开工作进程列表，通过其内部属性获取进程号
+            pids = list(getattr(pool, '_processes', None) or {}) if pool is not None else []
+        total = 0
+        for pid in pids:
+            try:
+                total += psutil.Process(pid).memory_info().rss
+            except (psutil.Error, OSError):
+                continue
+        return total
+
+    def release(self, bytes_needed=None):
+        """关闭工作进程以释放内存，下次使用时重新启动
+
+        Returns:
+            int: 释放的字节数
+        """
+        freed = self.memory_bytes()
+        self.shutdown()
+        return freed
+
+    def shutdown(self):
+        """关闭进程池和线程池"""
+        with self._lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=True, cancel_futures=True)
+                self._process_pool = None
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown(wait=True)
+                self._thread_pool = None
+
+_operator_pool = None
+_operator_pool_lock = threading.Lock()
+
+def get_operator_pool():
+    """获取全局常驻的算子执行器"""
+    global _operator_pool
+    with _operator_pool_lock:
+        if _operator_pool is None:
+            _operator_pool = OperatorPool()
+            atexit.register(_operator_pool.shutdown)
+        return _operator_pool
+
+def warm_up_in_background():
+    """配置中有算子使用process后端时，在后台线程中提前启动全部工作进程
+
+    Returns:
+        threading.Thread: 预热线程，不需要预热时为None
+    """
+    backends = config.get('performance.operator_backends', {}) or {}
+    if 'process' not in backends.values():
+        return None
+
+    def warm_up():
+        try:
+            get_operator_pool().warm_up()
+        except Exception as e:
+            # 预热失败不影响使用，首次处理时会重新启动进程池
+            print(f"预热工作进程失败: {e}")
+
+    thread = threading.Thread(target=warm_up, name="operator-pool-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+def get_backend(name, image=None):
+    """获取算子配置的执行后端
+
+    按 performance.operator_backends 中的配置选择；图像像素数小于
+    performance.parallel_min_pixels 时分块和进程间通信的开销不划算，直接在当前线程执行。
+
+    Args:
+        name: 算子名称
+        image: 输入图像
+
+    Returns:
+        str: 'inline'、'thread' 或 'process'
+    """
+    backend = config.get('performance.operator_backends', {}).get(name, 'inline')
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的执行后端: {backend}")
+    if image is not None and image.shape[0] * image.shape[1] < config.get('performance.parallel_min_pixels', 0):
+        return 'inline'
+    return backend
+
+def run_operator(func, image, **kwargs):
+    """按配置的后端执行算子
+
+    是否分块并行由并发管理器按任务决定；不分块时整图在当前线程执行，由OpenCV内部多线程并行。
+
+    Args:
+        func: utils.image_utils 中的处理函数
+        image: 输入图像
+        **kwargs: 算子参数
+
+    Returns:
+        ndarray: 处理后的图像
+    """
+    name = func.__name__
+    backend = get_backend(name, image)
+    tileable = (
+        backend != 'inline' and image.shape[0] >= 2
+        and (func is auto_white_balance or name in TILEABLE_OPERATORS)
+    )
+    manager = get_concurrency_manager()
+    pixels = image.shape[0] * image.shape[1]
+    strategy = manager.choose_strategy(pixels, tileable)
+
+    with manager.job(name, pixels, strategy):
+        if strategy == 'internal':
+            return func(image, **kwargs)
+
+        pool = get_operator_pool()
+        if func is auto_white_balance:
+            # 白平衡依赖全图统计量：先分块统计并合并，再分块应用增益
+            if image.ndim != 3 or image.shape[2] != 3:
+                return image
+            stats = merge_white_balance_statistics(pool.reduce_rows(white_balance_statistics, image, backend))
+            gains = white_balance_gains(stats, kwargs.get('method', 'gray_world'))
+            return pool.map_rows(apply_channel_gains, image, backend, gains=gains)
+
+        halo = TILEABLE_OPERATORS[name](**kwargs)
+        return pool.map_rows(func, image, backend, halo=halo, **kwargs)
+
+def run_tiled_operator(func, image, progress_callback=None, cancel_event=None, tile_size=None, **kwargs):
+    """按带重叠的分块执行耗时较长的算子，汇报进度并支持取消
+
+    重叠宽度按 TILEABLE_OPERATORS 中该算子的邻域半径计算，结果与整图处理一致。
+    是否在线程池中并行由并发管理器决定；不并行时逐块执行，由OpenCV内部多线程并行。
+
+    Args:
+        func: utils.image_utils 中可分块的处理函数
+        image: 输入图像
+        progress_callback: 进度回调，参数为0-100的整数
+        cancel_event: threading.Event，置位后在分块之间停止并抛出OperationCancelled
+        tile_size: 分块大小，默认为 performance.tile_size
+        **kwargs: 算子参数
+
+    Returns:
+        ndarray: 处理后的图像
+    """
+    name = func.__name__
+    overlap = TILEABLE_OPERATORS[name](**kwargs)
+    manager = get_concurrency_manager()
+    pixels = image.shape[0] * image.shape[1]
+    strategy = manager.choose_strategy(pixels)
+    with manager.job(name, pixels, strategy):
+        return get_operator_pool().map_tiles(
+            func, image, overlap=overlap, tile_size=tile_size, parallel=strategy == 'tiles',
+            progress_callback=progress_callback, cancel_event=cancel_event, **kwargs
+        )
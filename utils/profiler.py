@@ -0,0 +1,238 @@
+"""
+操作性能剖析模块 - 记录每个处理/预览请求在各阶段的耗时和内存分配
+
+一个请求从界面发出到显示完成经过以下阶段：
+
+1. queue：请求发出到开始计算（分派、参数整理等）
+2. compute：执行图像处理函数
+3. qimage：将结果包装为QImage
+4. pixmap：转换为QPixmap并更新场景（像素上传）
+5. histogram：刷新直方图
+
+各阶段的分配字节数默认按阶段产生的图像缓冲区统计；
+开启 performance.profile_allocations 后改用 tracemalloc 统计阶段内的分配峰值（开销较大）。
+记录保存在固定长度的滚动队列中，可导出为JSON或Chrome trace（chrome://tracing、Perfetto）格式。
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from PySide6.QtCore import QObject, Signal
+from app.config import config
+
+PHASES = ('queue', 'compute', 'qimage', 'pixmap', 'histogram')
+
+PHASE_LABELS = {
+    'queue': "排队",
+    'compute': "计算",
+    'qimage': "QImage",
+    'pixmap': "上传",
+    'histogram': "直方图",
+}
+
+class OperationProfiler(QObject):
+    """操作性能剖析器"""
+
+    # 一个操作记录完成时发出，参数为记录字典
+    record_finished = Signal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._records = deque(maxlen=config.get('performance.profiler_history', 200))
+        self._lock = threading.Lock()
+        self._active = None  # 正在记录的操作
+        self._depth = 0  # 嵌套的begin调用层数，只记录最外层
+        self._epoch = time.perf_counter()  # 导出时间戳的起点
+        self._tracing_started = False
+
+    @property
+    def enabled(self):
+        return bool(config.get('performance.profiling', True))
+
+    def begin(self, name, kind='process'):
+        """开始记录一个操作
+
+        Args:
+            name: 操作名称
+            kind: 'process'（正式处理）或 'preview'（预览）
+
+        Returns:
+            dict: 操作记录，未启用或嵌套调用时返回None
+        """
+        if not self.enabled or threading.current_thread() is not threading.main_thread():
+            return None
+        self._depth += 1
+        if self._depth > 1:
+            return None
+
+        if config.get('performance.profile_allocations', False) and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing_started = True
+
+        self._active = {
+            'name': name,
+            'kind': kind,
+            'start': time.perf_counter() - self._epoch,
+            'total': 0.0,
+            'phases': {},
+            'bytes': {},
+            'events': [],
+        }
+        return self._active
+
+    def end(self, record):
+        """结束记录，保存到滚动队列并发出record_finished信号
+
+        Args:
+            record: begin返回的记录（为None时只减少嵌套层数）
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        self._depth = max(0, self._depth - 1)
+        if record is None or record is not self._active:
+            return
+
+        self._active = None
+        record['total'] = time.perf_counter() - self._epoch - record['start']
+        if self._tracing_started:
+            tracemalloc.stop()
+            self._tracing_started = False
+        with self._lock:
+            self._records.append(record)
+        self.record_finished.emit(record)
+
+    @contextmanager
+    def phase(self, name):
+        """记录当前操作的一个阶段
+
+        在主线程之外或没有正在记录的操作时不做任何事。
+        调用方可以向产出的字典写入 'bytes'，作为该阶段分配的字节数。
+
+        Args:
+            name: 阶段名称，见PHASES
+
+        Yields:
+            dict: 阶段信息
+        """
+        record = self._active
+        info = {'bytes': 0}
+        if record is None or threading.current_thread() is not threading.main_thread():
+            yield info
+            return
+
+        start = time.perf_counter() - self._epoch
+        if name == 'compute' and 'queue' not in record['phases']:
+            # 请求开始到首次计算之间的时间计为排队
+            queue = max(0.0, start - record['start'])
+            record['phases']['queue'] = queue
+            record['events'].append({'phase': 'queue', 'start': record['start'], 'duration': queue})
+
+        tracing = tracemalloc.is_tracing() and self._tracing_started
+        if tracing:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+        try:
+            yield info
+        finally:
+            duration = time.perf_counter() - self._epoch - start
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                info['bytes'] = peak - base
+            record['phases'][name] = record['phases'].get(name, 0.0) + duration
+            record['bytes'][name] = record['bytes'].get(name, 0) + int(info['bytes'])
+            record['events'].append({'phase': name, 'start': start, 'duration': duration})
+
+    def get_records(self):
+        """获取滚动队列中的全部记录（按完成顺序）"""
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        """清空记录"""
+        with self._lock:
+            self._records.clear()
+
+    def summary(self, count=20):
+        """计算最近若干次操作的平均耗时
+
+        Args:
+            count: 参与统计的记录数
+
+        Returns:
+            dict: {'count': 记录数, 'total': 平均总耗时, 'phases': {阶段: 平均耗时}, 'bytes': 平均分配字节数}
+        """
+        records = self.get_records()[-count:]
+        if not records:
+            return {'count': 0, 'total': 0.0, 'phases': {}, 'bytes': 0}
+        n = len(records)
+        return {
+            'count': n,
+            'total': sum(r['total'] for r in records) / n,
+            'phases': {
+                phase: sum(r['phases'].get(phase, 0.0) for r in records) / n
+                for phase in PHASES
+            },
+            'bytes': sum(sum(r['bytes'].values()) for r in records) / n,
+        }
+
+    def format_overlay(self, record=None, count=20):
+        """生成状态叠加层显示的文本
+
+        Args:
+            record: 要显示的记录，默认为最近一条
+            count: 滚动平均的记录数
+
+        Returns:
+            str: 多行文本，没有记录时为空字符串
+        """
+        records = self.get_records()
+        if record is None:
+            if not records:
+                return ""
+            record = records[-1]
+
+        def phases_text(phases):
+            return " | ".join(f"{PHASE_LABELS[p]} {phases.get(p, 0.0) * 1000:.1f}" for p in PHASES)
+
+        kind = "预览" if record['kind'] == 'preview' else "处理"
+        lines = [
+            f"{kind} {record['name']}  总计 {record['total'] * 1000:.1f} ms",
+            phases_text(record['phases']) + " ms",
+            f"分配 {sum(record['bytes'].values()) / (1024 * 1024):.1f} MB",
+        ]
+        average = self.summary(count)
+        if average['count'] > 1:
+            lines.append(f"最近{average['count']}次平均  总计 {average['total'] * 1000:.1f} ms")
+            lines.append(phases_text(average['phases']) + " ms")
+        return "\n".join(lines)
+
+    def export_json(self, file_path):
+        """将记录导出为JSON文件"""
+        data = {'phases': list(PHASES), 'records': self.get_records()}
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+
+    def export_chrome_trace(self, file_path):
+        """将记录导出为Chrome trace格式（可在chrome://tracing或Perfetto中查看）"""
+        pid = os.getpid()
+        events = []
+        for record in self.get_records():
+            events.append({
+                'name': record['name'], 'cat': record['kind'], 'ph': 'X', 'pid': pid, 'tid': 1,
+                'ts': record['start'] * 1e6, 'dur': record['total'] * 1e6,
+                'args': {'bytes': sum(record['bytes'].values())},
+            })
+            for event in record['events']:
+                events.append({
+                    'name': event['phase'], 'cat': record['name'], 'ph': 'X', 'pid': pid, 'tid': 1,
+                    'ts': event['start'] * 1e6, 'dur': event['duration'] * 1e6,
+                    'args': {'bytes': record['bytes'].get(event['phase'], 0)},
+                })
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+# 创建全局性能剖析实例
+profiler = OperationProfiler()
@@ -0,0 +1,56 @@
+"""
+Qt相关工具函数
+
+显示边界上的图像格式转换：内部图像统一为BGR通道顺序的numpy数组，
+在这里直接按对应的QImage格式解释像素，不进行颜色空间转换。
+"""
+import numpy as np
+from PySide6.QtGui import QImage
+
+def numpy_to_qimage(image):
+    """将OpenCV格式图像包装为QImage
+
+    彩色图像使用QImage.Format_BGR888直接引用numpy缓冲区（零拷贝），
+    只有当行内像素不连续（如翻转视图）时才会先复制为连续数组。
+    返回的QImage不持有像素数据，调用方需保证数组在QImage使用期间有效，
+    或在使用前调用QPixmap.fromImage/QImage.copy。
+
+    Args:
+        image: OpenCV格式图像（灰度、BGR或BGRA）
+
+    Returns:
+        QImage: Qt图像对象
+    """
+    if image is None:
+        return None
+    if not isinstance(image, np.ndarray):
+        raise TypeError("输入必须是numpy数组")
+
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+
+    if image.ndim == 2:
+        image_format = QImage.Format_Grayscale8
+        channels = 1
+    elif image.ndim == 3 and image.shape[2] == 1:
+        image = image[:, :, 0]
+        image_format = QImage.Format_Grayscale8
+        channels = 1
+    elif image.ndim == 3 and image.shape[2] == 3:
+        image_format = QImage.Format_BGR888
+        channels = 3
+    elif image.ndim == 3 and image.shape[2] == 4:
+        # 小端机器上ARGB32的内存字节顺序即为BGRA
+        image_format = QImage.Format_ARGB32
+        channels = 4
+    else:
+        raise ValueError(f"不支持的图像形状: {image.shape}")
+
+    # QImage要求每行内像素连续、行跨度为正，裁剪视图满足该条件可直接使用
+    row_contiguous = image.strides[-1] == 1 if image.ndim == 3 else True
+    pixel_contiguous = image.strides[1] == channels and row_contiguous
+    if image.strides[0] <= 0 or not pixel_contiguous:
+        image = np.ascontiguousarray(image)
+
+    height, width = image.shape[:2]
+    return QImage(image.data, width, height, image.strides[0], image_format)
@@ -0,0 +1,68 @@
+"""
+启动阶段计时模块 - 记录应用启动各阶段的耗时
+
+main.py 在最开始导入本模块（只依赖标准库，导入本身几乎不耗时），之后在每个阶段结束时调用 mark()：
+
+1. imports：导入Qt等启动画面所需的模块
+2. qapplication：创建QApplication
+3. splash：显示启动画面（用户第一次看到窗口）
+4. profile：导入numpy、OpenCV，读取或测量自适应性能配置
+5. main_window_import：导入主窗口及其余依赖
+6. main_window：创建主窗口（只创建当前显示的检查器选项卡）
+7. first_paint：主窗口图像视图首次绘制完成
+
+first_paint 相对计时起点的时间即为启动到首个完整窗口的时间。
+"""
+import json
+import time
+
+class StartupTimer:
+    """启动阶段计时器"""
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._last = self._origin
+        self._phases = []  # [(阶段名称, 耗时秒数), ...]
+
+    def mark(self, name):
+        """结束一个阶段，记录从上一个阶段结束到现在的耗时
+
+        Args:
+            name: 阶段名称
+
+        Returns:
+            float: 该阶段的耗时（秒）
+        """
+        now = time.perf_counter()
+        duration = now - self._last
+        self._last = now
+        self._phases.append((name, duration))
+        return duration
+
+    def elapsed(self):
+        """从计时起点到最近一个阶段结束的时间（秒）"""
+        return self._last - self._origin
+
+    def phases(self):
+        """获取已记录的阶段 [(阶段名称, 耗时秒数), ...]"""
+        return list(self._phases)
+
+    def to_dict(self):
+        """导出为字典：各阶段耗时和累计时间（毫秒）"""
+        return {
+            'phases': {name: duration * 1000 for name, duration in self._phases},
+            'total': self.elapsed() * 1000,
+        }
+
+    def report(self):
+        """生成单行的启动耗时报告"""
+        parts = [f"{name} {duration * 1000:.0f}ms" for name, duration in self._phases]
+        return f"启动耗时 {self.elapsed() * 1000:.0f}ms（" + "，".join(parts) + "）"
+
+    def save(self, file_path):
+        """将启动耗时保存为JSON文件"""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=4)
+
+# 创建全局启动计时实例（计时起点为首次导入本模块）
+startup_timer = StartupTimer()
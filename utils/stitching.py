@@ -0,0 +1,461 @@
+"""
+全景拼接模块
+
+主要功能：
+1. 特征检测
+   - 每幅输入图像只检测一次特征（SIFT，不可用时ORB），结果缓存在 Stitcher 中
+   - 在像素数不超过 stitching.feature_max_pixels 的缩小副本上检测，关键点坐标换算回原图
+   - 各图像的检测在线程池中并行执行
+
+2. 特征匹配
+   - FLANN近似最近邻匹配（浮点描述子用KD树，二进制描述子用LSH）加比值检验
+   - 每幅待定位的图像与所有已定位的图像匹配，取RANSAC内点最多的一对，结果按图像对缓存
+
+3. 合成
+   - 先估计所有图像到第一幅图像坐标系的单应矩阵，再由各图像四角的投影计算画布大小，只分配一次
+   - 每幅图像只在其投影的包围盒内做透视变换（线程池并行），按顺序写入画布
+   - 特征检测、透视变换和融合逐幅汇报进度，可在两幅图像之间取消
+
+4. 接缝融合
+   - 重叠区域按到各自边缘的距离划分接缝，在接缝两侧做多频段（拉普拉斯金字塔）融合
+   - 金字塔只在重叠区域的包围盒内构建，额外内存与重叠面积成正比，与全景图大小无关
+   - stitching.blend_bands 为0时不融合，先加入的图像在上层
+
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+import cv2
+import numpy as np
+from app.config import config
+from utils.memory_monitor import memory_monitor
+from utils.process_pool import OperationCancelled
+
+# FLANN索引类型
+_FLANN_INDEX_KDTREE = 1
+_FLANN_INDEX_LSH = 6
+
+def _create_detector():
+    """创建特征检测器
+
+    Returns:
+        tuple: (检测器, 描述子是否为二进制)
+    """
+    if hasattr(cv2, 'SIFT_create'):
+        return cv2.SIFT_create(), False
+    return cv2.ORB_create(nfeatures=4000), True
+
+def _create_matcher(binary):
+    """创建与描述子类型对应的FLANN匹配器"""
+    if binary:
+        index_params = dict(algorithm=_FLANN_INDEX_LSH, table_number=6, key_size=12, multi_probe_level=1)
+    else:
+        index_params = dict(algorithm=_FLANN_INDEX_KDTREE, trees=5)
+    return cv2.FlannBasedMatcher(index_params, dict(checks=50))
+
+def _workers():
+    return max(1, config.get('performance.thread_pool_size', 4))
+
+def _run_parallel(func, items, progress_callback=None, cancel_event=None):
+    """在线程池中对每一项执行func，逐项汇报进度，取消时不再开始新的项并抛出OperationCancelled"""
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    def process(item):
+        if not cancelled():
+            func(item)
+
+    with ThreadPoolExecutor(max_workers=_workers()) as executor:
+        futures = [executor.submit(process, item) for item in items]
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                future.result()
+                if cancelled():
+                    break
+                if progress_callback is not None:
+                    progress_callback(int(done * 100 / len(futures)))
+        finally:
+            for future in futures:
+                future.cancel()
+            wait(futures)
+    if cancelled():
+        raise OperationCancelled("拼接已取消")
+
+def detect_features(image, max_pixels=None):
+    """检测图像的特征点和描述子
+
+    Args:
+        image: 输入图像（灰度或BGR）
+        max_pixels: 检测时图像的最大像素数，超过时在缩小的副本上检测，
+            默认为 stitching.feature_max_pixels
+
+    Returns:
+        tuple: (关键点坐标 Nx2 float32（原图坐标）, 描述子, 描述子是否为二进制)
+    """
+    if max_pixels is None:
+        max_pixels = config.get('stitching.feature_max_pixels', 1000000)
+    gray = image if image.ndim == 2 else cv2.cvtColor(image[..., :3], cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape[:2]
+    scale = min(1.0, float(np.sqrt(max_pixels / (height * width)))) if max_pixels else 1.0
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    detector, binary = _create_detector()
+    keypoints, descriptors = detector.detectAndCompute(gray, None)
+    points = np.array([kp.pt for kp in keypoints], dtype=np.float32).reshape(-1, 2)
+    # 关键点坐标以像素中心计，缩小副本的 (x+0.5)/scale-0.5 对应原图坐标
+    points = (points + 0.5) / scale - 0.5
+    return points, descriptors, binary
+
+def match_features(features_a, features_b, ratio=None):
+    """用FLANN近似最近邻匹配两组特征
+
+    Args:
+        features_a: detect_features 的结果
+        features_b: detect_features 的结果
+        ratio: 比值检验阈值，最近邻距离小于次近邻距离的ratio倍时保留，默认为 stitching.match_ratio
+
+    Returns:
+        tuple: (A中匹配点坐标 Nx2, B中对应点坐标 Nx2)
+    """
+    if ratio is None:
+        ratio = config.get('stitching.match_ratio', 0.75)
+    points_a, descriptors_a, binary = features_a
+    points_b, descriptors_b, _ = features_b
+    empty = np.empty((0, 2), dtype=np.float32)
+    if descriptors_a is None or descriptors_b is None or len(descriptors_a) < 2 or len(descriptors_b) < 2:
+        return empty, empty
+
+    matches = _create_matcher(binary).knnMatch(descriptors_a, descriptors_b, k=2)
+    # LSH索引可能返回少于两个近邻
+    good = [pair[0] for pair in matches if len(pair) == 2 and pair[0].distance < ratio * pair[1].distance]
+    if not good:
+        return empty, empty
+    return (points_a[[m.queryIdx for m in good]], points_b[[m.trainIdx for m in good]])
+
+def estimate_homography(features_a, features_b, ratio=None, min_matches=None):
+    """估计把图像B映射到图像A坐标系的单应矩阵
+
+    Args:
+        features_a: 图像A的特征
+        features_b: 图像B的特征
+        ratio: 比值检验阈值
+        min_matches: 至少需要的RANSAC内点数，默认为 stitching.min_matches
+
+    Returns:
+        tuple: (3x3单应矩阵, 内点数)，匹配不足时为 (None, 内点数)
+    """
+    if min_matches is None:
+        min_matches = config.get('stitching.min_matches', 10)
+    points_a, points_b = match_features(features_a, features_b, ratio)
+    if len(points_a) < max(4, min_matches):
+        return None, len(points_a)
+    homography, inliers = cv2.findHomography(points_b, points_a, cv2.RANSAC, 4.0)
+    count = int(inliers.sum()) if inliers is not None else 0
+    if homography is None or count < min_matches:
+        return None, count
+    return homography, count
+
+def _project_corners(shape, matrix):
+    """图像四角经矩阵变换后的坐标，4x2"""
+    height, width = shape[:2]
+    corners = np.float64([[0, 0], [width, 0], [width, height], [0, height]]).reshape(-1, 1, 2)
+    return cv2.perspectiveTransform(corners, matrix).reshape(-1, 2)
+
+def _laplacian_pyramid(image, levels):
+    """float32拉普拉斯金字塔，最后一层为最低频的高斯层"""
+    pyramid = []
+    current = image
+    for _ in range(levels):
+        down = cv2.pyrDown(current)
+        up = cv2.pyrUp(down, dstsize=(current.shape[1], current.shape[0]))
+        pyramid.append(current - up.reshape(current.shape))
+        current = down.reshape(down.shape[:2] + current.shape[2:])
+    pyramid.append(current)
+    return pyramid
+
+def multiband_blend(image_a, image_b, weight, bands):
+    """多频段融合两幅同样大小的图像
+
+    各频段分别按对应尺度平滑后的权重混合：低频在宽的过渡带内渐变以消除亮度差异，
+    高频只在接缝附近混合以保持细节清晰。
+
+    Args:
+        image_a: 图像A
+        image_b: 图像B
+        weight: 图像B的权重，0-1，与图像同宽高的单通道数组
+        bands: 频段数（金字塔层数），受图像尺寸限制
+
+    Returns:
+        ndarray: float32融合结果
+    """
+    height, width = weight.shape
+    bands = max(0, min(int(bands), int(np.log2(max(1, min(height, width))))))
+    pyramid_a = _laplacian_pyramid(image_a.astype(np.float32), bands)
+    pyramid_b = _laplacian_pyramid(image_b.astype(np.float32), bands)
+    mask = weight.astype(np.float32)
+    blended = []
+    for level_a, level_b in zip(pyramid_a, pyramid_b):
+        level_weight = mask[..., None] if level_a.ndim == 3 else mask
+        blended.append(level_a + (level_b - level_a) * level_weight)
+        mask = cv2.pyrDown(mask)
+    # 从最低频开始逐层重建
+    result = blended[-1]
+    for level in reversed(blended[:-1]):
+        result = cv2.pyrUp(result, dstsize=(level.shape[1], level.shape[0])).reshape(level.shape) + level
+    return result
+
+def _cast(image, dtype):
+    """float32结果转换回原数据类型，整数类型先四舍五入并裁剪到取值范围"""
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        image = np.clip(np.rint(image), info.min, info.max)
+    return image.astype(dtype)
+
+class Stitcher:
+    """基于特征匹配的全景拼接器，缓存各图像的特征和单应矩阵"""
+
+    def __init__(self, images, feature_max_pixels=None, ratio=None, min_matches=None, blend_bands=None):
+        """初始化拼接器
+
+        Args:
+            images: 输入图像列表（通道数和数据类型相同），第一幅作为参考坐标系
+            feature_max_pixels: 检测特征时的最大像素数，默认为 stitching.feature_max_pixels
+            ratio: 比值检验阈值，默认为 stitching.match_ratio
+            min_matches: 两幅图像之间至少需要的内点数，默认为 stitching.min_matches
+            blend_bands: 接缝多频段融合的频段数，0表示不融合，默认为 stitching.blend_bands
+        """
+        images = list(images)
+        if len(images) < 2:
+            raise ValueError("至少需要2幅图像")
+        if len({(image.dtype, image.shape[2:]) for image in images}) > 1:
+            raise ValueError("输入图像的通道数和数据类型必须相同")
+        self._images = images
+        self._feature_max_pixels = feature_max_pixels
+        self._ratio = ratio
+        self._min_matches = min_matches
+        if blend_bands is None:
+            blend_bands = config.get('stitching.blend_bands', 5)
+        self._blend_bands = blend_bands
+        self._features = [None] * len(images)
+        self._pairs = {}  # (已定位图像, 待定位图像) -> (单应矩阵, 内点数)
+        self._transforms = None
+
+    @property
+    def images(self):
+        """输入图像列表"""
+        return self._images
+
+    def features(self, index):
+        """第index幅图像的特征，首次访问时检测"""
+        if self._features[index] is None:
+            self._features[index] = detect_features(self._images[index], self._feature_max_pixels)
+        return self._features[index]
+
+    def detect_all(self, progress_callback=None, cancel_event=None):
+        """在线程池中检测所有尚未检测的图像的特征
+
+        Args:
+            progress_callback: 进度回调，参数为0-100的整数
+            cancel_event: threading.Event，置位后不再检测新的图像并抛出OperationCancelled
+        """
+        pending = [index for index, features in enumerate(self._features) if features is None]
+        _run_parallel(self.features, pending, progress_callback, cancel_event)
+
+    def _pair(self, placed, candidate):
+        key = (placed, candidate)
+        if key not in self._pairs:
+            self._pairs[key] = estimate_homography(
+                self.features(placed), self.features(candidate), self._ratio, self._min_matches
+            )
+        return self._pairs[key]
+
+    def transforms(self):
+        """各图像到第一幅图像坐标系的单应矩阵
+
+        每次从未定位的图像中选出与某幅已定位图像内点最多的一幅加入，不要求输入按拍摄顺序排列。
+
+        Returns:
+            list: 3x3单应矩阵，与输入图像一一对应
+        """
+        if self._transforms is not None:
+            return self._transforms
+        self.detect_all()
+        transforms = [None] * len(self._images)
+        transforms[0] = np.eye(3)
+        while any(transform is None for transform in transforms):
+            best = None
+            for candidate, transform in enumerate(transforms):
+                if transform is not None:
+                    continue
+                for placed, placed_transform in enumerate(transforms):
+                    if placed_transform is None:
+                        continue
+                    homography, count = self._pair(placed, candidate)
+                    if homography is not None and (best is None or count > best[0]):
+                        best = (count, candidate, placed_transform @ homography)
+            if best is None:
+                missing = [str(index + 1) for index, transform in enumerate(transforms) if transform is None]
+                raise ValueError(f"第 {', '.join(missing)} 幅图像与其他图像没有足够的匹配特征")
+            transforms[best[1]] = best[2] / best[2][2, 2]
+        self._transforms = transforms
+        return transforms
+
+    def canvas(self):
+        """计算容纳所有变换后图像的画布
+
+        Returns:
+            tuple: (平移矩阵 3x3（参考坐标系 -> 画布坐标系）, (宽, 高))
+        """
+        corners = np.vstack([
+            _project_corners(image.shape, transform) for image, transform in zip(self._images, self.transforms())
+        ])
+        # 取整到最近的像素边界，避免单应矩阵的微小误差使画布多出一行/列空白
+        x0, y0 = np.round(corners.min(axis=0))
+        x1, y1 = np.round(corners.max(axis=0))
+        width, height = int(x1 - x0), int(y1 - y0)
+        max_pixels = config.get('stitching.max_canvas_pixels', 200000000)
+        if width * height > max_pixels:
+            raise ValueError(f"拼接结果 {width}x{height} 过大，可能是匹配错误")
+        translation = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], dtype=np.float64)
+        return translation, (width, height)
+
+    def warp(self, index, canvas=None):
+        """在投影的包围盒内对第index幅图像做透视变换
+
+        Args:
+            index: 图像序号
+            canvas: canvas() 的结果，为None时重新计算
+
+        Returns:
+            tuple: (变换后的图像, 覆盖掩码 uint8, (x, y) 在画布中的位置)
+        """
+        translation, (canvas_width, canvas_height) = canvas or self.canvas()
+        image = self._images[index]
+        matrix = translation @ self.transforms()[index]
+        corners = _project_corners(image.shape, matrix)
+        x0, y0 = np.maximum(np.floor(corners.min(axis=0)).astype(int), 0)
+        x1 = min(canvas_width, int(np.ceil(corners[:, 0].max())))
+        y1 = min(canvas_height, int(np.ceil(corners[:, 1].max())))
+        size = (max(1, x1 - x0), max(1, y1 - y0))
+        matrix = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], dtype=np.float64) @ matrix
+
+        # 边界外按复制边缘采样，避免边缘像素与黑色插值变暗；覆盖范围由掩码决定
+        warped = cv2.warpPerspective(image, matrix, size, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        mask = cv2.warpPerspective(np.full(image.shape[:2], 255, np.uint8), matrix, size,
+                                   flags=cv2.INTER_NEAREST, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+        return warped, mask, (int(x0), int(y0))
+
+    def warp_all(self, progress_callback=None, cancel_event=None):
+        """在线程池中变换所有图像
+
+        Args:
+            progress_callback: 进度回调，参数为0-100的整数
+            cancel_event: threading.Event，置位后不再变换新的图像并抛出OperationCancelled
+
+        Returns:
+            list: 每幅图像的 warp() 结果
+        """
+        canvas = self.canvas()
+        results = [None] * len(self._images)
+
+        def process(index):
+            results[index] = self.warp(index, canvas)
+
+        _run_parallel(process, range(len(self._images)), progress_callback, cancel_event)
+        return results
+
+    def compose(self, progress_callback=None, cancel_event=None):
+        """估计所有变换后一次性合成全景图
+
+        Args:
+            progress_callback: 进度回调，参数为0-100的整数，特征检测占前50%，透视变换占40%，写入和融合占10%
+            cancel_event: threading.Event，置位后在两幅图像之间停止并抛出OperationCancelled
+
+        Returns:
+            ndarray: 拼接结果，未被任何图像覆盖的区域为0
+        """
+        def stage(offset, span):
+            if progress_callback is None:
+                return None
+            return lambda percent: progress_callback(offset + percent * span // 100)
+
+        self.detect_all(stage(0, 50), cancel_event)
+        canvas = self.canvas()
+        _, (width, height) = canvas
+        first = self._images[0]
+        result = memory_monitor.allocate((height, width) + first.shape[2:], dtype=first.dtype)
+        result[...] = 0
+        warps = self.warp_all(stage(50, 40), cancel_event)
+        report = stage(90, 10)
+        for index in range(len(warps)):
+            if cancel_event is not None and cancel_event.is_set():
+                raise OperationCancelled("拼接已取消")
+            self._paste(result, warps, index)
+            if report is not None:
+                report(int((index + 1) * 100 / len(warps)))
+        return result
+
+    def _covered(self, warps, index):
+        """第index幅图像包围盒内已被之前的图像覆盖的区域，bool数组"""
+        _, mask, (x, y) = warps[index]
+        h, w = mask.shape
+        covered = np.zeros((h, w), dtype=bool)
+        for _, other, (ox, oy) in warps[:index]:
+            oh, ow = other.shape
+            x0, y0 = max(x, ox), max(y, oy)
+            x1, y1 = min(x + w, ox + ow), min(y + h, oy + oh)
+            if x0 < x1 and y0 < y1:
+                covered[y0 - y:y1 - y, x0 - x:x1 - x] |= other[y0 - oy:y1 - oy, x0 - ox:x1 - ox] > 0
+        return covered
+
+    def _paste(self, result, warps, index):
+        """把第index幅图像写入画布，与之前的图像重叠处按接缝做多频段融合"""
+        warped, mask, (x, y) = warps[index]
+        h, w = mask.shape
+        target = result[y:y + h, x:x + w]
+        own = mask > 0
+        covered = self._covered(warps, index)
+        # 未被覆盖的部分直接写入，重叠部分保留先加入的图像
+        new = own & ~covered
+        np.copyto(target, warped, where=new[..., None] if warped.ndim == 3 else new)
+        overlap = own & covered
+        if self._blend_bands <= 0 or not overlap.any():
+            return
+
+        # 只在重叠区域的包围盒（向外扩展一个最低频段的宽度）内构建金字塔
+        rows = np.flatnonzero(overlap.any(axis=1))
+        cols = np.flatnonzero(overlap.any(axis=0))
+        margin = 2 ** self._blend_bands
+        y0, y1 = max(0, rows[0] - margin), min(h, rows[-1] + 1 + margin)
+        x0, x1 = max(0, cols[0] - margin), min(w, cols[-1] + 1 + margin)
+        region = target[y0:y1, x0:x1]
+        mask_a = covered[y0:y1, x0:x1]
+        mask_b = own[y0:y1, x0:x1]
+        image_a = region.astype(np.float32)
+        image_b = warped[y0:y1, x0:x1].astype(np.float32)
+        # 只有一方覆盖的像素用另一方补齐，避免空白区域参与金字塔使接缝附近变暗
+        image_a[~mask_a] = image_b[~mask_a]
+        image_b[~mask_b] = image_a[~mask_b]
+
+        # 重叠处的像素归属于离自己边缘更远的图像，接缝位于重叠区域中间
+        distance_a = cv2.distanceTransform(mask_a.astype(np.uint8), cv2.DIST_L2, 3)
+        distance_b = cv2.distanceTransform(mask_b.astype(np.uint8), cv2.DIST_L2, 3)
+        weight = (distance_b > distance_a).astype(np.float32)
+
+        blended = _cast(multiband_blend(image_a, image_b, weight, self._blend_bands), result.dtype)
+        union = mask_a | mask_b
+        np.copyto(region, blended, where=union[..., None] if region.ndim == 3 else union)
+
+def stitch_images(images, progress_callback=None, cancel_event=None, **kwargs):
+    """基于特征匹配拼接全景图
+
+    Args:
+        images: 输入图像列表
+        progress_callback: 进度回调，参数为0-100的整数
+        cancel_event: threading.Event，置位后停止并抛出OperationCancelled
+        **kwargs: Stitcher 的参数
+
+    Returns:
+        ndarray: 拼接结果
+    """
+    return Stitcher(images, **kwargs).compose(progress_callback, cancel_event)
@@ -0,0 +1,252 @@
+"""
+超分辨率模块
+
+用ESRGAN等ONNX格式的超分辨率模型在CPU上逐块放大图像：
+1. 模型只加载一次并缓存（ONNX Runtime，未安装时用OpenCV DNN），推理由锁串行化
+2. 图像按带重叠的分块送入模型，相邻分块在重叠区域内按线性权重羽化拼接，没有接缝
+3. 按分块行处理，只为当前分块行分配浮点累加缓冲区，内存与图像高度无关
+   输入为分块图像或放大结果超过限制时，源分块按需读取，结果写入磁盘映射文件，内存与图像大小无关
+4. 逐块汇报进度，可在分块之间取消
+
+未配置模型（super_resolution.model_path 为空）时用双三次插值放大，分块方式相同。
+"""
+import os
+import threading
+import cv2
+import numpy as np
+from app.config import config
+from utils.memory_monitor import memory_monitor
+from utils.process_pool import OperationCancelled
+from utils.tiled_image import TiledImage, create_disk_array, tiled_from_array
+
+_onnxruntime = None
+_models = {}
+_models_lock = threading.Lock()
+
+
+def _import_onnxruntime():
+    """导入可选依赖onnxruntime，未安装时返回None"""
+    global _onnxruntime
+    if _onnxruntime is None:
+        try:
+            import onnxruntime
+        except ImportError:
+            onnxruntime = False
+        _onnxruntime = onnxruntime
+    return _onnxruntime or None
+
+
+class SuperResolutionModel:
+    """加载一次、逐块推理的超分辨率模型"""
+
+    def __init__(self, model_path=None, scale=None, backend=None):
+        """加载模型
+
+        Args:
+            model_path: ONNX模型路径，为空时用双三次插值，默认为 super_resolution.model_path
+            scale: 放大倍数，使用模型时必须与模型一致，默认为 super_resolution.scale
+            backend: 'auto'、'onnxruntime' 或 'opencv'，默认为 super_resolution.backend
+        """
+        if model_path is None:
+            model_path = config.get('super_resolution.model_path', '')
+        self.scale = int(scale or config.get('super_resolution.scale', 2))
+        if self.scale < 1:
+            raise ValueError(f"放大倍数无效: {self.scale}")
+        self.model_path = model_path
+        self._session = None
+        self._net = None
+        self._lock = threading.Lock()
+
+        if not model_path:
+            self.backend = 'interpolation'
+            return
+        if not os.path.exists(model_path):
+            raise ValueError(f"超分辨率模型不存在: {model_path}")
+        backend = backend or config.get('super_resolution.backend', 'auto')
+        if backend == 'auto':
+            backend = 'onnxruntime' if _import_onnxruntime() else 'opencv'
+        if backend == 'onnxruntime':
+            onnxruntime = _import_onnxruntime()
+            if onnxruntime is None:
+                raise ValueError("未安装onnxruntime")
+            self._session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+            self._input_name = self._session.get_inputs()[0].name
+        elif backend == 'opencv':
+            self._net = cv2.dnn.readNet(model_path)
+            self._net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self._net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        else:
+            raise ValueError(f"未知的超分辨率后端: {backend}")
+        self.backend = backend
+
+    def upscale(self, tile):
+        """放大一个分块
+
+        Args:
+            tile: BGR顺序的uint8分块或灰度分块
+
+        Returns:
+            ndarray: float32放大结果，取值范围0-255，通道数与输入相同
+        """
+        height, width = tile.shape[:2]
+        size = (width * self.scale, height * self.scale)
+        if self.backend == 'interpolation':
+            return cv2.resize(tile.astype(np.float32), size, interpolation=cv2.INTER_CUBIC)
+
+        bgr = cv2.cvtColor(tile, cv2.COLOR_GRAY2BGR) if tile.ndim == 2 else tile
+        # 模型输入为NCHW、RGB、0-1的float32
+        blob = cv2.dnn.blobFromImage(bgr, 1.0 / 255.0, swapRB=True)
+        with self._lock:
+            if self._session is not None:
+                output = self._session.run(None, {self._input_name: blob})[0]
+            else:
+                self._net.setInput(blob)
+                output = self._net.forward()
+        result = output[0].transpose(1, 2, 0)[..., ::-1] * 255.0
+        if result.shape[:2] != (size[1], size[0]):
+            raise ValueError(f"模型输出尺寸 {result.shape[1]}x{result.shape[0]} 与放大倍数 {self.scale} 不符")
+        result = np.ascontiguousarray(result, dtype=np.float32)
+        return cv2.cvtColor(result, cv2.COLOR_BGR2GRAY) if tile.ndim == 2 else result
+
+
+def get_model(model_path=None, scale=None, backend=None):
+    """获取缓存的超分辨率模型，首次使用时加载
+
+    Args:
+        model_path: 模型路径，默认为 super_resolution.model_path
+        scale: 放大倍数，默认为 super_resolution.scale
+        backend: 推理后端，默认为 super_resolution.backend
+
+    Returns:
+        SuperResolutionModel: 模型
+    """
+    if model_path is None:
+        model_path = config.get('super_resolution.model_path', '')
+    scale = int(scale or config.get('super_resolution.scale', 2))
+    backend = backend or config.get('super_resolution.backend', 'auto')
+    key = (model_path, scale, backend)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = SuperResolutionModel(model_path, scale, backend)
+            _models[key] = model
+    return model
+
+
+def clear_models():
+    """释放缓存的模型"""
+    with _models_lock:
+        _models.clear()
+
+
+def _feather(start, end, ext_start, ext_end, length, overlap, scale):
+    """扩展分块在放大后坐标上的一维羽化权重
+
+    相邻分块在分界两侧各overlap像素的范围内权重线性互补，之和为1。
+    """
+    x = (np.arange(ext_start * scale, ext_end * scale, dtype=np.float32) + 0.5) / scale
+    weight = np.ones_like(x)
+    if overlap > 0:
+        if start > 0:
+            weight = np.minimum(weight, np.clip((x - (start - overlap)) / (2 * overlap), 0, 1))
+        if end < length:
+            weight = np.minimum(weight, np.clip((end + overlap - x) / (2 * overlap), 0, 1))
+    return weight
+
+
+def _exceeds_memory(shape):
+    """放大结果超过 max_image_size 或可用内存时不在内存中分配"""
+    max_size = config.get('image_processing.max_image_size', (10000, 10000))
+    if shape[0] > max_size[0] or shape[1] > max_size[1]:
+        return True
+    return int(np.prod(shape)) > memory_monitor.get_usage()['available']
+
+
+def _read_tile(image, x0, y0, x1, y1):
+    """读取源图像的矩形区域，分块图像按需解码"""
+    if isinstance(image, TiledImage):
+        return image.read_region(x0, y0, x1 - x0, y1 - y0)
+    return image[y0:y1, x0:x1]
+
+
+def upscale_tiled(image, scale=None, model=None, tile_size=None, overlap=None, out=None,
+                  progress_callback=None, cancel_event=None, spill_to_disk=False):
+    """按带重叠的分块放大图像，重叠区域羽化拼接
+
+    输入为TiledImage，或spill_to_disk为True且BGR放大结果超过 max_image_size 或可用内存时，
+    结果写入磁盘映射文件并以TiledImage返回。
+
+    Args:
+        image: BGR顺序的uint8图像、灰度图像或TiledImage
+        scale: 放大倍数，默认为 super_resolution.scale（指定model时使用模型的倍数）
+        model: SuperResolutionModel，默认为 get_model(scale=scale)
+        tile_size: 分块大小，默认为 super_resolution.tile_size
+        overlap: 相邻分块各自向外扩展的像素数，默认为 super_resolution.tile_overlap，不超过分块大小的一半
+        out: 输出数组（如磁盘映射数组），默认分配新数组
+        progress_callback: 进度回调，参数为0-100的整数
+        cancel_event: threading.Event，置位后在分块之间停止并抛出OperationCancelled
+        spill_to_disk: 未指定out时，放大结果超出内存限制是否写入磁盘
+
+    Returns:
+        ndarray或TiledImage: 放大后的图像
+    """
+    if len(image.shape) == 3 and image.shape[2] != 3:
+        raise ValueError("超分辨率只支持BGR或灰度图像")
+    model = model or get_model(scale=scale)
+    scale = model.scale
+    tile_size = max(1, int(tile_size or config.get('super_resolution.tile_size', 192)))
+    if overlap is None:
+        overlap = config.get('super_resolution.tile_overlap', 16)
+    overlap = max(0, min(int(overlap), tile_size // 2))
+
+    height, width = image.shape[:2]
+    shape = (height * scale, width * scale) + image.shape[2:]
+    to_disk = out is None and len(shape) == 3 and (
+        isinstance(image, TiledImage) or (spill_to_disk and _exceeds_memory(shape)))
+    if to_disk:
+        out = create_disk_array(shape)
+    elif out is None:
+        out = memory_monitor.allocate(shape, dtype=np.uint8)
+    elif out.shape != shape:
+        raise ValueError(f"输出数组形状 {out.shape} 与放大结果 {shape} 不符")
+
+    rows = range(0, height, tile_size)
+    columns = range(0, width, tile_size)
+    total = len(rows) * len(columns)
+    done = 0
+    pending = None  # 上一分块行底部重叠区域的部分和
+    for y0 in rows:
+        y1 = min(height, y0 + tile_size)
+        ey0, ey1 = max(0, y0 - overlap), min(height, y1 + overlap)
+        band = np.zeros(((ey1 - ey0) * scale, width * scale) + image.shape[2:], dtype=np.float32)
+        if pending is not None:
+            band[:len(pending)] += pending
+        weight_y = _feather(y0, y1, ey0, ey1, height, overlap, scale)
+
+        for x0 in columns:
+            if cancel_event is not None and cancel_event.is_set():
+                raise OperationCancelled("处理已取消")
+            x1 = min(width, x0 + tile_size)
+            ex0, ex1 = max(0, x0 - overlap), min(width, x1 + overlap)
+            upscaled = model.upscale(_read_tile(image, ex0, ey0, ex1, ey1))
+            weight = weight_y[:, None] * _feather(x0, x1, ex0, ex1, width, overlap, scale)[None, :]
+            if upscaled.ndim == 3:
+                weight = weight[..., None]
+            band[:, ex0 * scale:ex1 * scale] += upscaled * weight
+            done += 1
+            if progress_callback is not None:
+                progress_callback(int(done * 100 / total))
+
+        # 下一分块行的羽化区域之前的行已经完成，写入输出；其余的部分和留给下一行
+        final = y1 - overlap if y1 < height else y1
+        rows_done = (final - ey0) * scale
+        out[ey0 * scale:final * scale] = np.clip(np.rint(band[:rows_done]), 0, 255).astype(np.uint8)
+        pending = band[rows_done:].copy() if y1 < height else None
+    if to_disk:
+        out.flush()
+        return tiled_from_array(out)
+    return out
+
+
+# 后台处理时分块模式下直接传入全分辨率分块图像（见 ImageModel.apply_operation_async）
+upscale_tiled.accepts_tiled = True
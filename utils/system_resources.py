@@ -0,0 +1,193 @@
+"""
+系统资源读取模块 - 读取容器的内存和CPU限制以及内存压力
+
+在容器中运行时，psutil.virtual_memory() 和 os.cpu_count() 返回的是整个宿主机的资源，
+而进程实际可用的内存和CPU时间受 cgroup 限制。本模块优先读取 cgroup v2 的 memory.max / memory.current
+和 cpu.max（找不到时回退到 cgroup v1 的对应文件），并读取 Linux PSI（/proc/pressure/memory）
+反映的内存压力。这些接口在非Linux系统或不可读时返回None，调用方回退到psutil。
+"""
+import math
+import os
+import psutil
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+PSI_MEMORY = "/proc/pressure/memory"
+
+# cgroup v1 用接近 2^63 的值表示不限制
+_UNLIMITED = 1 << 60
+
+def _read_text(path):
+    try:
+        with open(path, encoding='ascii') as f:
+            return f.read().strip()
+    except (OSError, ValueError):
+        return None
+
+def _read_int(path):
+    text = _read_text(path)
+    if text is None or text == 'max':
+        return None
+    try:
+        value = int(text)
+    except ValueError:
+        return None
+    return value if value < _UNLIMITED else None
+
+def _cgroup_dirs(v2_file="memory.max", v1_controller="memory", v1_file="memory.limit_in_bytes"):
+    """返回本进程所在的 (cgroup v2 目录, cgroup v1 控制器目录)，不存在时为None
+
+    Args:
+        v2_file: 用于确认cgroup v2目录的接口文件
+        v1_controller: cgroup v1 控制器名称
+        v1_file: 用于确认cgroup v1目录的接口文件
+    """
+    text = _read_text("/proc/self/cgroup")
+    if text is None:
+        return None, None
+    v2_dir = v1_dir = None
+    for line in text.splitlines():
+        parts = line.split(':', 2)
+        if len(parts) != 3:
+            continue
+        _, controllers, path = parts
+        if controllers == '':
+            candidate = os.path.join(CGROUP_ROOT, path.lstrip('/'))
+            if os.path.exists(os.path.join(candidate, v2_file)):
+                v2_dir = candidate
+        elif v1_controller in controllers.split(','):
+            # 容器内通常只挂载了自身的cgroup，路径不存在时使用挂载点根目录
+            mount = os.path.join(CGROUP_ROOT, controllers)
+            if not os.path.isdir(mount):
+                mount = os.path.join(CGROUP_ROOT, v1_controller)
+            for candidate in (os.path.join(mount, path.lstrip('/')), mount):
+                if os.path.exists(os.path.join(candidate, v1_file)):
+                    v1_dir = candidate
+                    break
+    return v2_dir, v1_dir
+
+def _inactive_file(stat_path, key):
+    """从memory.stat读取可回收的文件页缓存字节数"""
+    text = _read_text(stat_path)
+    if text is None:
+        return 0
+    for line in text.splitlines():
+        name, _, value = line.partition(' ')
+        if name == key:
+            try:
+                return int(value)
+            except ValueError:
+                return 0
+    return 0
+
+def cgroup_memory():
+    """读取cgroup内存限制和当前使用量
+
+    当前使用量扣除了可回收的非活跃文件缓存，与内核判断是否需要回收内存的口径一致。
+
+    Returns:
+        dict: {'limit': 限制字节数, 'used': 已使用字节数, 'version': 2 或 1}，未设置限制或不可读时返回None
+    """
+    v2_dir, v1_dir = _cgroup_dirs()
+    if v2_dir is not None:
+        limit = _read_int(os.path.join(v2_dir, "memory.max"))
+        used = _read_int(os.path.join(v2_dir, "memory.current"))
+        if limit is not None and used is not None:
+            used -= _inactive_file(os.path.join(v2_dir, "memory.stat"), 'inactive_file')
+            return {'limit': limit, 'used': max(0, used), 'version': 2}
+    if v1_dir is not None:
+        limit = _read_int(os.path.join(v1_dir, "memory.limit_in_bytes"))
+        used = _read_int(os.path.join(v1_dir, "memory.usage_in_bytes"))
+        if limit is not None and used is not None:
+            used -= _inactive_file(os.path.join(v1_dir, "memory.stat"), 'total_inactive_file')
+            return {'limit': limit, 'used': max(0, used), 'version': 1}
+    return None
+
+def cgroup_cpu_limit():
+    """读取cgroup CPU配额
+
+    Returns:
+        float: 配额折合的核心数（如 quota=150000、period=100000 时为1.5），未设置配额或不可读时返回None
+    """
+    v2_dir, v1_dir = _cgroup_dirs("cpu.max", "cpu", "cpu.cfs_quota_us")
+    quota = period = None
+    if v2_dir is not None:
+        fields = (_read_text(os.path.join(v2_dir, "cpu.max")) or "").split()
+        if len(fields) == 2 and fields[0] != 'max':
+            try:
+                quota, period = int(fields[0]), int(fields[1])
+            except ValueError:
+                pass
+    if quota is None and v1_dir is not None:
+        quota = _read_int(os.path.join(v1_dir, "cpu.cfs_quota_us"))
+        period = _read_int(os.path.join(v1_dir, "cpu.cfs_period_us"))
+    if quota is None or period is None or quota <= 0 or period <= 0:
+        return None
+    return quota / period
+
+def available_cores():
+    """获取当前进程可用的CPU核心数（考虑CPU亲和性设置和容器的CPU配额）"""
+    try:
+        cores = max(1, len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        cores = os.cpu_count() or 1
+    quota = cgroup_cpu_limit()
+    if quota is not None:
+        cores = min(cores, max(1, math.ceil(quota)))
+    return cores
+
+def memory_pressure(path=PSI_MEMORY):
+    """读取Linux PSI内存压力
+
+    Args:
+        path: PSI文件路径
+
+    Returns:
+        dict: {'some': 10秒内至少一个任务因内存等待的时间占比（%）,
+               'full': 10秒内所有任务都因内存等待的时间占比（%）}，不支持时返回None
+    """
+    text = _read_text(path)
+    if text is None:
+        return None
+    pressure = {}
+    for line in text.splitlines():
+        kind, _, fields = line.partition(' ')
+        for field in fields.split():
+            key, _, value = field.partition('=')
+            if key == 'avg10':
+                try:
+                    pressure[kind] = float(value)
+                except ValueError:
+                    pass
+    if 'some' not in pressure:
+        return None
+    pressure.setdefault('full', 0.0)
+    return pressure
+
+def memory_usage():
+    """获取本进程可用的内存总量和已使用量
+
+    存在cgroup限制且小于物理内存时以cgroup为准，否则使用psutil读取的整机内存。
+
+    Returns:
+        dict: {'total', 'used', 'available': 字节数, 'percent': 使用率（%）, 'source': 'cgroup' 或 'host'}
+    """
+    host = psutil.virtual_memory()
+    cgroup = cgroup_memory()
+    if cgroup is not None and cgroup['limit'] < host.total:
+        total = cgroup['limit']
+        used = min(cgroup['used'], total)
+        # 容器限制之外宿主机本身的可用内存也可能更少
+        available = min(total - used, host.available)
+        source = 'cgroup'
+    else:
+        total = host.total
+        used = host.total - host.available
+        available = host.available
+        source = 'host'
+    return {
+        'total': total,
+        'used': used,
+        'available': available,
+        'percent': used / total * 100 if total else 0.0,
+        'source': source,
+    }
@@ -0,0 +1,721 @@
+"""
+分块大图像模块
+
+为超过 max_image_size 的大图像提供流式、内存有界的读取与处理：
+1. 按条带或分块组织的文件（TIFF、PNG）只在访问时解码对应的数据段
+2. 已解码的数据段放入按字节数限制的LRU缓存
+3. 逐块处理的结果写入临时目录中的磁盘映射文件，而不是内存
+4. 按行块生成缩略预览图用于界面显示
+
+像素数据与其他模块一致，统一为BGR通道顺序的uint8数组。
+"""
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from app.config import config
+from utils.concurrency import get_concurrency_manager
+from utils.image_io import get_encoder_options, replace_atomic
+from utils.memory_monitor import memory_monitor
+
+_tifffile = None
+
+
+def _import_tifffile():
+    """导入可选依赖tifffile（用于按条带/分块读写TIFF），未安装时返回None
+
+    导入tifffile耗时较长，只在首次处理大尺寸TIFF时导入。
+    """
+    global _tifffile
+    if _tifffile is None:
+        try:
+            import tifffile
+        except ImportError:
+            tifffile = False
+        _tifffile = tifffile
+    return _tifffile or None
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# PNG颜色类型对应的每像素样本数
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# 按过滤器字节宽度选择等效的PNG格式（位深，颜色类型），用于让libpng完成反过滤
+_PNG_RAW_FORMATS = {1: (8, 0), 2: (16, 0), 3: (8, 2), 4: (8, 6), 6: (16, 2), 8: (16, 6)}
+
+def read_image_size(file_path):
+    """只读取文件头获取图像尺寸，不解码像素
+
+    Args:
+        file_path: 图像文件路径
+
+    Returns:
+        tuple: (高度, 宽度)，无法从文件头识别时返回None
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            header = f.read(24)
+            if header[:8] == PNG_SIGNATURE and header[12:16] == b'IHDR':
+                width, height = struct.unpack('>II', header[16:24])
+                return height, width
+            if header[:4] in (b'II*\x00', b'MM\x00*', b'II+\x00', b'MM\x00+'):
+                return _read_tiff_size(f, header)
+    except OSError:
+        return None
+    return None
+
+# TIFF字段类型 -> 值的struct格式：SHORT、LONG、LONG8（BigTIFF）
+_TIFF_VALUE_FORMATS = {3: 'H', 4: 'I', 16: 'Q'}
+
+def _read_tiff_size(f, header):
+    """从TIFF或BigTIFF的第一个IFD中读取ImageLength和ImageWidth
+
+    经典TIFF的偏移量和IFD条目数为4字节/2字节，条目长12字节，值字段4字节；
+    BigTIFF（版本号43）分别为8字节/8字节，条目长20字节，值字段8字节。
+    """
+    endian = '<' if header[:2] == b'II' else '>'
+    if struct.unpack(endian + 'H', header[2:4])[0] == 43:
+        offset = struct.unpack(endian + 'Q', header[8:16])[0]
+        count_format, entry_format = 'Q', 'HHQ8s'
+    else:
+        offset = struct.unpack(endian + 'I', header[4:8])[0]
+        count_format, entry_format = 'H', 'HHI4s'
+    f.seek(offset)
+    count_size = struct.calcsize(endian + count_format)
+    count = struct.unpack(endian + count_format, f.read(count_size))[0]
+    entry_size = struct.calcsize(endian + entry_format)
+    size = {}
+    for _ in range(count):
+        tag, field_type, _, value = struct.unpack(endian + entry_format, f.read(entry_size))
+        if tag in (256, 257) and field_type in _TIFF_VALUE_FORMATS:
+            # 值位于值字段的开头
+            value_format = endian + _TIFF_VALUE_FORMATS[field_type]
+            size[tag] = struct.unpack(value_format, value[:struct.calcsize(value_format)])[0]
+    if 256 in size and 257 in size:
+        return size[257], size[256]
+    return None
+
+def _to_bgr8(samples, color_order):
+    """将解码得到的样本转换为BGR通道顺序的uint8图像
+
+    与 cv2.IMREAD_COLOR 的行为保持一致：16位数据取高8位，透明通道被丢弃。
+
+    Args:
+        samples: 形状为 (高, 宽) 或 (高, 宽, 通道) 的样本数组
+        color_order: 样本的通道顺序，'GRAY' 或 'RGB'
+    """
+    if samples.dtype == np.uint16:
+        samples = (samples >> 8).astype(np.uint8)
+    elif samples.dtype != np.uint8:
+        raise ValueError(f"不支持的像素类型: {samples.dtype}")
+
+    if samples.ndim == 3 and color_order == 'GRAY':
+        samples = samples[:, :, 0]
+    if samples.ndim == 2:
+        return cv2.cvtColor(samples, cv2.COLOR_GRAY2BGR)
+    if samples.shape[2] == 4:
+        return cv2.cvtColor(samples, cv2.COLOR_RGBA2BGR)
+    return cv2.cvtColor(samples, cv2.COLOR_RGB2BGR)
+
+class _ArrayReader:
+    """以内存数组或磁盘映射数组作为数据源"""
+
+    def __init__(self, array, segment_size):
+        self.array = array
+        self.shape = array.shape
+        self.segment_shape = (segment_size, segment_size)
+
+    def read_segment(self, row, col):
+        seg_h, seg_w = self.segment_shape
+        return self.array[row * seg_h:(row + 1) * seg_h, col * seg_w:(col + 1) * seg_w]
+
+    def close(self):
+        self.array = None
+
+class _TiffReader:
+    """按条带或分块读取TIFF，每次只解码被访问的数据段"""
+
+    def __init__(self, file_path):
+        tifffile = _import_tifffile()
+        if tifffile is None:
+            raise ValueError("读取大尺寸TIFF需要安装tifffile")
+        self._file = tifffile.TiffFile(file_path)
+        self._lock = threading.Lock()
+        page = self._file.pages[0]
+        if page.imagedepth > 1 or (page.samplesperpixel > 1 and page.planarconfig != 1):
+            self._file.close()
+            raise ValueError("不支持的TIFF数据布局")
+        if page.photometric not in (0, 1, 2):
+            self._file.close()
+            raise ValueError("不支持的TIFF颜色模式")
+
+        self._page = page
+        self._color_order = 'RGB' if page.photometric == 2 else 'GRAY'
+        self._invert = page.photometric == 0  # MINISWHITE
+        height, width = page.imagelength, page.imagewidth
+        self.shape = (height, width, 3)
+        if page.is_tiled:
+            self.segment_shape = (page.tilelength, page.tilewidth)
+        else:
+            self.segment_shape = (min(page.rowsperstrip or height, height), width)
+        self._segments_across = -(-width // self.segment_shape[1])
+
+    def read_segment(self, row, col):
+        page = self._page
+        index = row * self._segments_across + col
+        with self._lock:
+            fh = self._file.filehandle
+            fh.seek(page.dataoffsets[index])
+            data = fh.read(page.databytecounts[index])
+
+        segment = page.decode(data, index, jpegtables=page.jpegtables)[0]
+        segment = segment.reshape(segment.shape[-3:])
+
+        # 边缘的分块按完整尺寸存储，需要裁剪到图像范围内
+        seg_h, seg_w = self.segment_shape
+        height = min(seg_h, self.shape[0] - row * seg_h)
+        width = min(seg_w, self.shape[1] - col * seg_w)
+        segment = segment[:height, :width]
+        if self._invert:
+            segment = np.iinfo(segment.dtype).max - segment
+        return _to_bgr8(segment, self._color_order)
+
+    def close(self):
+        self._file.close()
+
+class _PngStreamState:
+    """PNG解压流的位置，可复制以作为随机访问的检查点"""
+
+    def __init__(self, inflater, chunk_index, chunk_offset, tail, prev_row):
+        self.inflater = inflater
+        self.chunk_index = chunk_index
+        self.chunk_offset = chunk_offset
+        self.tail = tail
+        self.prev_row = prev_row
+
+    def copy(self):
+        return _PngStreamState(self.inflater.copy(), self.chunk_index,
+                               self.chunk_offset, self.tail, self.prev_row)
+
+class _PngReader:
+    """按行带流式解码非隔行PNG
+
+    IDAT数据流被逐段解压，每个行带开始处记录一个解压检查点，
+    随机访问时从最近的检查点继续解码，而不必从头解压。
+    行过滤的还原交给libpng：将上一行（以无过滤方式）与本行带的过滤数据
+    组成一个小PNG，通过 cv2.imdecode 解码，从而避免逐像素的Python循环。
+    """
+
+    _READ_SIZE = 1 << 20
+
+    def __init__(self, file_path, band_rows):
+        self._file = open(file_path, 'rb')
+        self._lock = threading.Lock()
+        try:
+            self._parse_chunks()
+        except Exception:
+            self._file.close()
+            raise
+
+        self.shape = (self._height, self._width, 3)
+        self.segment_shape = (min(band_rows, self._height), self._width)
+
+        bits_per_pixel = self._bit_depth * _PNG_CHANNELS[self._color_type]
+        self._row_bytes = (self._width * bits_per_pixel + 7) // 8
+        self._filter_bpp = max(1, bits_per_pixel // 8)
+
+        initial = _PngStreamState(zlib.decompressobj(), 0, 0, b'', bytes(self._row_bytes))
+        self._checkpoints = [initial]
+
+    def _parse_chunks(self):
+        """扫描块头，记录IHDR、PLTE和所有IDAT块的位置"""
+        f = self._file
+        if f.read(8) != PNG_SIGNATURE:
+            raise ValueError("不是有效的PNG文件")
+
+        self._idat = []
+        self._palette = None
+        header = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                break
+            length, chunk_type = struct.unpack('>I4s', chunk_header)
+            if chunk_type == b'IHDR':
+                header = f.read(length)
+                f.seek(4, os.SEEK_CUR)
+            elif chunk_type == b'PLTE':
+                palette = np.frombuffer(f.read(length), np.uint8).reshape(-1, 3)
+                self._palette = np.zeros((256, 3), np.uint8)
+                self._palette[:len(palette)] = palette[:, ::-1]  # 转为BGR
+                f.seek(4, os.SEEK_CUR)
+            elif chunk_type == b'IDAT':
+                self._idat.append((f.tell(), length))
+                f.seek(length + 4, os.SEEK_CUR)
+            elif chunk_type == b'IEND':
+                break
+            else:
+                f.seek(length + 4, os.SEEK_CUR)
+
+        if header is None or not self._idat:
+            raise ValueError("PNG文件缺少必要的数据块")
+        (self._width, self._height, self._bit_depth, self._color_type,
+         _, _, interlace) = struct.unpack('>IIBBBBB', header)
+        if interlace:
+            raise ValueError("不支持流式读取隔行扫描的PNG")
+        if self._color_type not in _PNG_CHANNELS:
+            raise ValueError(f"不支持的PNG颜色类型: {self._color_type}")
+        if self._color_type == 3 and self._palette is None:
+            raise ValueError("PNG调色板缺失")
+
+    def _read_compressed(self, state):
+        """从当前IDAT块读取下一段压缩数据"""
+        while state.chunk_index < len(self._idat):
+            offset, length = self._idat[state.chunk_index]
+            if state.chunk_offset < length:
+                size = min(self._READ_SIZE, length - state.chunk_offset)
+                self._file.seek(offset + state.chunk_offset)
+                data = self._file.read(size)
+                state.chunk_offset += size
+                return data
+            state.chunk_index += 1
+            state.chunk_offset = 0
+        return b''
+
+    def _inflate(self, state, size):
+        """解压出恰好size字节的过滤后行数据"""
+        out = bytearray()
+        while len(out) < size:
+            data = state.tail or self._read_compressed(state)
+            if not data:
+                raise ValueError("PNG数据不完整")
+            out += state.inflater.decompress(data, size - len(out))
+            state.tail = state.inflater.unconsumed_tail
+        return bytes(out)
+
+    def _unfilter(self, filtered, prev_row, rows):
+        """借助libpng还原一个行带的过滤，返回原始字节 (rows, row_bytes)"""
+        bit_depth, color_type = _PNG_RAW_FORMATS[self._filter_bpp]
+        width = self._row_bytes // self._filter_bpp
+
+        def chunk(chunk_type, data):
+            body = chunk_type + data
+            return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body))
+
+        ihdr = struct.pack('>IIBBBBB', width, rows + 1, bit_depth, color_type, 0, 0, 0)
+        idat = zlib.compress(b'\x00' + prev_row + filtered, 0)
+        png = PNG_SIGNATURE + chunk(b'IHDR', ihdr) + chunk(b'IDAT', idat) + chunk(b'IEND', b'')
+
+        decoded = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_UNCHANGED)
+        if decoded is None:
+            raise ValueError("PNG行数据解码失败")
+
+        # 撤销OpenCV的RGB到BGR转换和字节序转换，恢复文件中的原始字节
+        if decoded.ndim == 3:
+            order = [2, 1, 0, 3] if decoded.shape[2] == 4 else [2, 1, 0]
+            decoded = decoded[:, :, order]
+        if decoded.dtype == np.uint16:
+            decoded = decoded.astype('>u2')
+        raw = np.ascontiguousarray(decoded).view(np.uint8)
+        return raw.reshape(rows + 1, self._row_bytes)[1:]
+
+    def _raw_to_bgr(self, raw):
+        """将原始行字节转换为BGR图像"""
+        rows = raw.shape[0]
+        channels = _PNG_CHANNELS[self._color_type]
+        depth = self._bit_depth
+
+        if depth < 8:
+            bits = np.unpackbits(raw, axis=1).reshape(rows, -1, depth)
+            weights = (1 << np.arange(depth - 1, -1, -1)).astype(np.uint8)
+            samples = (bits * weights).sum(axis=2, dtype=np.uint8)[:, :self._width]
+            if self._color_type == 3:
+                return self._palette[samples]
+            samples = (samples.astype(np.uint16) * 255 // ((1 << depth) - 1)).astype(np.uint8)
+            return cv2.cvtColor(samples, cv2.COLOR_GRAY2BGR)
+
+        if depth == 16:
+            samples = raw.view('>u2').astype(np.uint16)
+        else:
+            samples = raw
+        samples = samples.reshape(rows, self._width, channels)
+
+        if self._color_type == 3:
+            return self._palette[samples[:, :, 0]]
+        color_order = 'GRAY' if self._color_type in (0, 4) else 'RGB'
+        return _to_bgr8(np.ascontiguousarray(samples), color_order)
+
+    def read_segment(self, row, col):
+        band_rows = self.segment_shape[0]
+        with self._lock:
+            # 从不超过目标行带的最近检查点开始解码
+            start = min(row, len(self._checkpoints) - 1)
+            state = self._checkpoints[start].copy()
+            for band in range(start, row + 1):
+                rows = min(band_rows, self._height - band * band_rows)
+                filtered = self._inflate(state, rows * (self._row_bytes + 1))
+                raw = self._unfilter(filtered, state.prev_row, rows)
+                state.prev_row = raw[-1].tobytes()
+                if band + 1 == len(self._checkpoints) and (band + 1) * band_rows < self._height:
+                    self._checkpoints.append(state.copy())
+        return self._raw_to_bgr(raw)
+
+    def close(self):
+        self._file.close()
+
+class TiledImage:
+    """延迟解码、可按块寻址的大图像
+
+    数据按读取器的自然数据段（TIFF分块/条带、PNG行带）解码并缓存，
+    对外提供任意区域读取、逐块处理和缩略预览，内存占用与图像总大小无关。
+    """
+
+    def __init__(self, reader, file_path=None):
+        self._reader = reader
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_limit = config.get('performance.tile_cache_mb', 256) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._temp_path = None
+        self.file_path = file_path
+
+    @property
+    def shape(self):
+        """图像形状 (高, 宽, 通道)"""
+        return self._reader.shape
+
+    @property
+    def height(self):
+        return self._reader.shape[0]
+
+    @property
+    def width(self):
+        return self._reader.shape[1]
+
+    @property
+    def nbytes(self):
+        """完整图像解码后的字节数"""
+        height, width, channels = self._reader.shape
+        return height * width * channels
+
+    @property
+    def cache_bytes(self):
+        """已解码数据段缓存占用的字节数"""
+        return self._cache_bytes
+
+    def clear_cache(self):
+        """清空已解码数据段缓存，之后按需重新解码
+
+        Returns:
+            int: 释放的字节数
+        """
+        with self._lock:
+            freed = self._cache_bytes
+            self._cache.clear()
+            self._cache_bytes = 0
+        return freed
+
+    def _get_segment(self, row, col):
+        """获取解码后的数据段，使用LRU缓存"""
+        key = (row, col)
+        with self._lock:
+            segment = self._cache.get(key)
+            if segment is not None:
+                self._cache.move_to_end(key)
+                return segment
+
+        segment = self._reader.read_segment(row, col)
+        if isinstance(self._reader, _ArrayReader):
+            # 数组数据源本身即可随机访问，无需缓存
+            return segment
+
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = segment
+                self._cache_bytes += segment.nbytes
+            while self._cache_bytes > self._cache_limit and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted.nbytes
+        return segment
+
+    def read_region(self, x, y, width, height):
+        """读取矩形区域，超出图像范围的部分被裁剪
+
+        Args:
+            x, y: 区域左上角坐标
+            width, height: 区域尺寸
+
+        Returns:
+            ndarray: 区域像素（新数组，可安全修改）
+        """
+        img_h, img_w = self.height, self.width
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(img_w, x + width), min(img_h, y + height)
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError("读取区域超出图像范围")
+
+        seg_h, seg_w = self._reader.segment_shape
+        region = memory_monitor.allocate((y1 - y0, x1 - x0, self.shape[2]), dtype=np.uint8)
+        for row in range(y0 // seg_h, (y1 - 1) // seg_h + 1):
+            for col in range(x0 // seg_w, (x1 - 1) // seg_w + 1):
+                segment = self._get_segment(row, col)
+                sy, sx = row * seg_h, col * seg_w
+                ty0, ty1 = max(y0, sy), min(y1, sy + segment.shape[0])
+                tx0, tx1 = max(x0, sx), min(x1, sx + segment.shape[1])
+                region[ty0 - y0:ty1 - y0, tx0 - x0:tx1 - x0] = segment[ty0 - sy:ty1 - sy, tx0 - sx:tx1 - sx]
+        return region
+
+    def iter_tiles(self, tile_size=None):
+        """按行优先顺序遍历处理分块
+
+        Yields:
+            tuple: (x, y, 宽, 高)
+        """
+        tile_size = tile_size or config.get('performance.tile_size', 256)
+        for y in range(0, self.height, tile_size):
+            for x in range(0, self.width, tile_size):
+                yield x, y, min(tile_size, self.width - x), min(tile_size, self.height - y)
+
+    def to_array(self):
+        """获取完整图像数组
+
+        由数组构建的图像直接返回底层数组；文件数据源会先逐段复制到磁盘映射文件，
+        避免一次性占用与图像等大的内存。
+        """
+        if isinstance(self._reader, _ArrayReader):
+            return self._reader.array
+        return self.map_tiles(None).to_array()
+
+    def get_overview(self, max_pixels):
+        """生成像素数不超过max_pixels的缩略预览图
+
+        以整数倍率按行块读取并用INTER_AREA缩小，内存只占用一个行块。
+
+        Args:
+            max_pixels: 预览图的最大像素数
+        """
+        factor = 1
+        while (self.height // factor) * (self.width // factor) > max_pixels:
+            factor += 1
+        if factor == 1:
+            return np.array(self.to_array())
+
+        out_w = -(-self.width // factor)
+        out_h = -(-self.height // factor)
+        overview = memory_monitor.allocate((out_h, out_w, self.shape[2]), dtype=np.uint8)
+
+        block_rows = factor * max(1, self._reader.segment_shape[0] // factor)
+        for y in range(0, self.height, block_rows):
+            rows = min(block_rows, self.height - y)
+            block = self.read_region(0, y, self.width, rows)
+            oy = y // factor
+            overview[oy:oy + -(-rows // factor)] = cv2.resize(
+                block, (out_w, -(-rows // factor)), interpolation=cv2.INTER_AREA
+            )
+        return overview
+
+    def map_tiles(self, func, *args, overlap=0, progress_callback=None, **kwargs):
+        """逐块应用处理函数，结果写入磁盘映射文件
+
+        每个分块连同宽度为overlap的邻域一起交给处理函数，结果裁掉邻域后写回，
+        因此邻域半径不超过overlap的滤波与整图处理结果一致。
+        处理函数不能改变图像尺寸。
+
+        Args:
+            func: 处理函数 func(image, *args, **kwargs)，为None时仅复制
+            *args: 位置参数
+            overlap: 分块之间的重叠宽度（像素）
+            progress_callback: 进度回调，参数为0-100的整数
+            **kwargs: 关键字参数
+
+        Returns:
+            TiledImage: 处理结果
+        """
+        tiles = list(self.iter_tiles())
+        output = self._create_output()
+        # 分块并行时OpenCV内部线程降为1；否则逐块顺序执行，由OpenCV内部多线程并行
+        manager = get_concurrency_manager()
+        strategy = manager.choose_strategy(self.width * self.height, len(tiles) > 1)
+        workers = max(1, config.get('performance.thread_pool_size', 4)) if strategy == 'tiles' else 1
+
+        def process(tile):
+            x, y, w, h = tile
+            x0, y0 = max(0, x - overlap), max(0, y - overlap)
+            region = self.read_region(x0, y0, x + w + overlap - x0, y + h + overlap - y0)
+            result = region if func is None else func(region, *args, **kwargs)
+            if result.shape != region.shape:
+                raise ValueError("该操作会改变图像尺寸或通道数，不支持分块处理")
+            output[y:y + h, x:x + w] = result[y - y0:y - y0 + h, x - x0:x - x0 + w]
+
+        # 分批提交，限制同时驻留在内存中的分块数量
+        batch_size = workers * 2
+        name = getattr(func, '__name__', 'copy')
+        with manager.job(name, self.width * self.height, strategy):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for start in range(0, len(tiles), batch_size):
+                    batch = tiles[start:start + batch_size]
+                    list(executor.map(process, batch))
+                    if progress_callback is not None:
+                        progress_callback(int((start + len(batch)) * 100 / len(tiles)))
+
+        output.flush()
+        result = TiledImage(_ArrayReader(output, config.get('performance.tile_size', 256)))
+        result._temp_path = output.filename if os.path.exists(output.filename) else None
+        return result
+
+    def _create_output(self):
+        """在临时目录中创建与图像同尺寸的磁盘映射数组"""
+        return create_disk_array(self.shape)
+
+    def save(self, file_path, options=None, progress_callback=None):
+        """逐块或逐行带写出完整图像，内存只占用一个分块或行带
+
+        只支持可以流式编码的格式：TIFF（需要tifffile，逐块写出）和PNG（逐行带压缩写出）。
+        JPEG、WebP等格式的编码器需要完整图像，分块模式下不能保存为这些格式。
+
+        Args:
+            file_path: 保存路径
+            options: 编码设置
+            progress_callback: 进度回调，参数为0-100的整数
+        """
+        file_path = str(file_path)
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext in ('.tif', '.tiff'):
+            if _import_tifffile() is None:
+                raise ValueError("大图像保存为TIFF需要安装tifffile")
+            _write_atomic(file_path, ext, lambda path: self._save_tiff(path, progress_callback))
+        elif ext == '.png':
+            _write_atomic(file_path, ext, lambda path: self._save_png(path, options, progress_callback))
+        else:
+            raise ValueError(f"大图像以分块方式打开时只能保存为TIFF或PNG格式，不支持 {ext or '(无扩展名)'}")
+
+    def _save_tiff(self, file_path, progress_callback=None):
+        """逐块写出分块BigTIFF"""
+        tile_size = config.get('performance.tile_size', 256)
+        tiles = list(self.iter_tiles(tile_size))
+
+        def tile_data():
+            for index, (x, y, w, h) in enumerate(tiles):
+                tile = np.zeros((tile_size, tile_size, 3), dtype=np.uint8)
+                tile[:h, :w] = cv2.cvtColor(self.read_region(x, y, w, h), cv2.COLOR_BGR2RGB)
+                if progress_callback is not None:
+                    progress_callback(int((index + 1) * 100 / len(tiles)))
+                yield tile
+
+        _import_tifffile().imwrite(
+            file_path, tile_data(), shape=self.shape, dtype=np.uint8,
+            tile=(tile_size, tile_size), photometric='rgb', compression='zlib', bigtiff=True
+        )
+
+    def _save_png(self, file_path, options=None, progress_callback=None):
+        """逐行带过滤、压缩并写出8位RGB的PNG
+
+        每行使用Up过滤（与上一行逐字节相减），可以整个行带向量化计算。
+        """
+        level = int(np.clip(get_encoder_options(options)['png_compression'], 0, 9))
+        band_rows = config.get('performance.tile_size', 256)
+        compressor = zlib.compressobj(level)
+
+        def chunk(chunk_type, data):
+            body = chunk_type + data
+            return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body))
+
+        with open(file_path, 'wb') as f:
+            f.write(PNG_SIGNATURE)
+            f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8, 2, 0, 0, 0)))
+            prev_row = np.zeros((1, self.width * 3), dtype=np.uint8)
+            for y in range(0, self.height, band_rows):
+                rows = min(band_rows, self.height - y)
+                band = cv2.cvtColor(self.read_region(0, y, self.width, rows), cv2.COLOR_BGR2RGB)
+                band = band.reshape(rows, -1)
+                filtered = np.empty((rows, band.shape[1] + 1), dtype=np.uint8)
+                filtered[:, 0] = 2  # Up过滤
+                np.subtract(band, np.vstack([prev_row, band[:-1]]), out=filtered[:, 1:])
+                prev_row = band[-1:].copy()
+                data = compressor.compress(filtered.tobytes())
+                if data:
+                    f.write(chunk(b'IDAT', data))
+                if progress_callback is not None:
+                    progress_callback(int((y + rows) * 100 / self.height))
+            f.write(chunk(b'IDAT', compressor.flush()))
+            f.write(chunk(b'IEND', b''))
+
+    def close(self):
+        """释放数据源和缓存"""
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+        self._reader.close()
+        if self._temp_path and os.path.exists(self._temp_path):
+            try:
+                os.remove(self._temp_path)
+            except OSError:
+                pass
+
+def _write_atomic(file_path, suffix, write):
+    """调用write(临时文件路径)写出同目录下的临时文件，成功后替换目标文件（保留原有权限），失败时删除临时文件"""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    os.close(fd)
+    try:
+        write(temp_path)
+        with open(temp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        replace_atomic(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def open_tiled_image(file_path):
+    """以流式方式打开大图像
+
+    Args:
+        file_path: 图像文件路径（TIFF或非隔行PNG）
+
+    Returns:
+        TiledImage: 分块图像
+    """
+    file_path = str(file_path)
+    with open(file_path, 'rb') as f:
+        header = f.read(8)
+
+    if header == PNG_SIGNATURE:
+        reader = _PngReader(file_path, config.get('performance.tile_size', 256))
+    elif header[:4] in (b'II*\x00', b'MM\x00*', b'II+\x00', b'MM\x00+'):
+        reader = _TiffReader(file_path)
+    else:
+        raise ValueError("该格式不支持流式读取，仅支持TIFF和PNG")
+    return TiledImage(reader, file_path)
+
+def create_disk_array(shape):
+    """在临时目录中创建uint8磁盘映射数组，用于放不进内存的处理结果
+
+    Args:
+        shape: 数组形状
+
+    Returns:
+        numpy.memmap: 磁盘映射数组
+    """
+    temp_dir = config.get('paths.temp_dir', tempfile.gettempdir())
+    os.makedirs(temp_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix='.npy', prefix='tiles_', dir=temp_dir)
+    os.close(fd)
+    output = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=tuple(shape))
+    try:
+        # 映射建立后即可删除文件名，进程退出时由系统回收磁盘空间
+        os.unlink(path)
+    except OSError:
+        pass
+    return output
+
+def tiled_from_array(image):
+    """用已有数组构建分块图像（主要用于测试和小图像）"""
+    if image.ndim != 3 or image.shape[2] != 3 or image.dtype != np.uint8:
+        raise ValueError("分块图像只支持BGR格式的uint8图像")
+    return TiledImage(_ArrayReader(image, config.get('performance.tile_size', 256)))
@@ -0,0 +1,91 @@
+"""
+拼图对话框模块
+"""
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QSpinBox, QComboBox, QPushButton)
+from app.config import config
+
+class CollageDialog(QDialog):
+    """拼图参数对话框类"""
+
+    LAYOUTS = [
+        ("自动（水平/垂直）", "auto"),
+        ("水平排列", "horizontal"),
+        ("垂直排列", "vertical"),
+        ("网格", "grid"),
+        ("上2下1", "top2_bottom1"),
+        ("左1右2", "left1_right2"),
+    ]
+    COLORS = [("白色", (255, 255, 255)), ("浅灰", (240, 240, 240)), ("黑色", (0, 0, 0))]
+
+    def __init__(self, image_count, parent=None):
+        super().__init__(parent)
+
+        # 设置窗口属性
+        self.setWindowTitle(f"拼图（{image_count}幅图像）")
+        self.setModal(True)
+        self.image_count = image_count
+
+        # 创建UI组件
+        self._create_ui()
+
+    def _create_ui(self):
+        """创建UI组件"""
+        # 创建主布局
+        main_layout = QVBoxLayout(self)
+
+        # 布局选择，上2下1和左1右2只适用于3幅图像
+        layout_layout = QHBoxLayout()
+        self.layout_combo = QComboBox()
+        for name, layout in self.LAYOUTS:
+            if layout in ("top2_bottom1", "left1_right2") and self.image_count != 3:
+                continue
+            self.layout_combo.addItem(name, layout)
+        layout_layout.addWidget(QLabel("布局:"))
+        layout_layout.addWidget(self.layout_combo)
+
+        # 间距
+        padding_layout = QHBoxLayout()
+        self.padding_spinbox = QSpinBox()
+        self.padding_spinbox.setRange(0, 200)
+        self.padding_spinbox.setValue(config.get('collage.padding', 10))
+        self.padding_spinbox.setSuffix(" 像素")
+        padding_layout.addWidget(QLabel("间距:"))
+        padding_layout.addWidget(self.padding_spinbox)
+
+        # 背景颜色
+        color_layout = QHBoxLayout()
+        self.color_combo = QComboBox()
+        for name, color in self.COLORS:
+            self.color_combo.addItem(name, color)
+        color_layout.addWidget(QLabel("背景颜色:"))
+        color_layout.addWidget(self.color_combo)
+
+        # 按钮
+        button_layout = QHBoxLayout()
+        self.ok_button = QPushButton("确定")
+        self.cancel_button = QPushButton("取消")
+        button_layout.addWidget(self.ok_button)
+        button_layout.addWidget(self.cancel_button)
+
+        # 添加所有布局
+        main_layout.addLayout(layout_layout)
+        main_layout.addLayout(padding_layout)
+        main_layout.addLayout(color_layout)
+        main_layout.addLayout(button_layout)
+
+        # 连接信号和槽
+        self.ok_button.clicked.connect(self.accept)
+        self.cancel_button.clicked.connect(self.reject)
+
+    def get_parameters(self):
+        """获取参数
+
+        Returns:
+            dict: 包含 layout、padding、background（BGR顺序）的参数字典
+        """
+        return {
+            'layout': self.layout_combo.currentData(),
+            'padding': self.padding_spinbox.value(),
+            'background': tuple(self.color_combo.currentData()),
+        }
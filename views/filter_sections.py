@@ -352,4 +352,148 @@ class SharpenSection(AdjustmentSectionWidget):
     def set_parameters(self, params: dict):
         """设置参数"""
         # TODO: 根据需要实现预设加载功能
-        pass
\ No newline at end of file
+        pass
+
+class DenoiseSection(AdjustmentSectionWidget):
+    """去噪处理区域
+
+    傅里叶低通去噪：拖动半径滑块时实时预览，释放时应用。
+    图像的频谱只在第一次预览时计算，之后调整半径只需逆变换。
+
+    非局部均值去噪：拖动强度滑块时在缩小图上快速预览，
+    点击应用后在后台按分块处理全分辨率图像，可在状态栏取消。
+
+    小波去噪：拖动阈值滑块时实时预览，释放时应用。小波分解只在第一次预览时计算。
+    """
+    preview_requested = Signal(str, dict)
+    apply_requested = Signal(str, dict)
+
+    METHODS = ("frequency_denoise", "nlmeans_denoise", "wavelet_denoise")
+
+    def __init__(self, parent=None):
+        super().__init__("去噪处理", parent)
+        self._is_dragging = False
+        self._build_ui()
+        self.on_method_changed()
+
+    def _build_ui(self):
+        # 去噪方法选择
+        method_layout = QHBoxLayout()
+        method_label = QLabel("去噪方法:")
+        self.method_combo = QComboBox()
+        self.method_combo.addItems(["傅里叶低通", "非局部均值", "小波"])
+        self.method_combo.currentIndexChanged.connect(self.on_method_changed)
+        method_layout.addWidget(method_label)
+        method_layout.addWidget(self.method_combo)
+        self.add_layout(method_layout)
+
+        # 低通半径（频率序号，越小去噪越强）
+        self.radius_widget = SliderSpinBoxWidget(
+            label_text="傅里叶半径:",
+            min_value=1,
+            max_value=300,
+            default_value=30,
+            step=1,
+            slider_scale=1,
+            use_double=False
+        )
+        self.add_widget(self.radius_widget)
+
+        # 非局部均值滤波强度（亮度和色度使用相同强度）
+        self.strength_widget = SliderSpinBoxWidget(
+            label_text="滤波强度:",
+            min_value=1,
+            max_value=50,
+            default_value=10,
+            step=1,
+            slider_scale=1,
+            use_double=False
+        )
+        self.add_widget(self.strength_widget)
+
+        # 小波阈值倍数（1.0为按噪声估计的通用阈值）
+        self.threshold_widget = SliderSpinBoxWidget(
+            label_text="阈值倍数:",
+            min_value=0.0,
+            max_value=3.0,
+            default_value=1.0,
+            step=0.1,
+            slider_scale=100,
+            use_double=True
+        )
+        self.add_widget(self.threshold_widget)
+
+        for widget in (self.radius_widget, self.strength_widget, self.threshold_widget):
+            widget.sliderPressed.connect(self._on_slider_pressed)
+            widget.sliderReleased.connect(self._on_slider_released)
+            widget.sliderMoved.connect(self._on_slider_moved)
+            widget.editingFinished.connect(self._on_editing_finished)
+
+        # --- 应用/预览按钮 ---
+        buttons_layout = QHBoxLayout()
+        preview_button = QPushButton("预览去噪")
+        apply_button = QPushButton("应用去噪")
+        preview_button.clicked.connect(lambda: self.preview_requested.emit(self.operation(), self.get_parameters()))
+        apply_button.clicked.connect(lambda: self.apply_requested.emit(self.operation(), self.get_parameters()))
+        buttons_layout.addWidget(preview_button)
+        buttons_layout.addWidget(apply_button)
+        self.add_layout(buttons_layout)
+
+    def operation(self):
+        """当前去噪方法对应的操作名称"""
+        return self.METHODS[self.method_combo.currentIndex()]
+
+    def on_method_changed(self):
+        """切换去噪方法时显示对应的参数"""
+        operation = self.operation()
+        self.radius_widget.setVisible(operation == "frequency_denoise")
+        self.strength_widget.setVisible(operation == "nlmeans_denoise")
+        self.threshold_widget.setVisible(operation == "wavelet_denoise")
+
+    def _on_slider_pressed(self):
+        """滑块按下处理"""
+        self._is_dragging = True
+
+    def _on_slider_released(self):
+        """滑块释放处理"""
+        if self._is_dragging:
+            self._is_dragging = False
+            self._commit()
+
+    def _on_slider_moved(self, value):
+        """滑块移动处理"""
+        if self._is_dragging:
+            self.preview_requested.emit(self.operation(), self.get_parameters())
+
+    def _on_editing_finished(self):
+        """编辑完成处理"""
+        if not self._is_dragging:  # 避免与滑块释放重复
+            self._commit()
+
+    def _commit(self):
+        """调整结束：傅里叶、小波去噪直接应用；非局部均值去噪处理全分辨率图像较慢，只更新预览，点击应用时才执行"""
+        if self.operation() != "nlmeans_denoise":
+            self.apply_requested.emit(self.operation(), self.get_parameters())
+        else:
+            self.preview_requested.emit(self.operation(), self.get_parameters())
+
+    def get_parameters(self) -> dict:
+        """获取当前参数"""
+        if self.operation() == "frequency_denoise":
+            return {'radius': int(self.radius_widget.value())}
+        if self.operation() == "wavelet_denoise":
+            return {'threshold_scale': float(self.threshold_widget.value()), 'wavelet': 'sym8', 'level': 2}
+        strength = int(self.strength_widget.value())
+        return {'h': strength, 'h_color': strength, 'template_window_size': 7, 'search_window_size': 21}
+
+    def set_parameters(self, params: dict):
+        """设置参数"""
+        if 'radius' in params:
+            self.method_combo.setCurrentIndex(0)
+            self.radius_widget.setValue(params['radius'])
+        elif 'h' in params:
+            self.method_combo.setCurrentIndex(1)
+            self.strength_widget.setValue(params['h'])
+        elif 'threshold_scale' in params:
+            self.method_combo.setCurrentIndex(2)
+            self.threshold_widget.setValue(params['threshold_scale'])
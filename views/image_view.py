@@ -22,6 +22,8 @@
    - 使用弱引用避免内存泄漏
    - 实现图像数据的延迟加载
    - 优化大图像的处理和显示
+   - 缩小显示时上传图像金字塔中合适的一层，而不是全分辨率图像
+   - 旋转预览只给图像项设置变换矩阵，由显卡绘制，不重新计算像素
 
 5. 信号机制
    - 定义imageChanged信号，当图像更新时发出
@@ -35,13 +37,15 @@
 - ImageView: 继承自QGraphicsView，实现图像显示和交互功能
 """
 
-from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsPixmapItem
+from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QGraphicsRectItem, QGraphicsItem, QLabel
 from PySide6.QtCore import Qt, Signal, QRectF, QSize
-from PySide6.QtGui import QImage, QPixmap, QPainter, QTransform
+from PySide6.QtGui import QPixmap, QPainter, QTransform
 import numpy as np
 import gc
 import weakref
 from collections import OrderedDict
+from utils.qt_utils import numpy_to_qimage
+from utils.profiler import profiler
 
 class LRUCache(OrderedDict):
     """
@@ -83,6 +87,7 @@ class ImageView(QGraphicsView):
     # 信号定义
     image_changed = Signal()  # 图像改变信号
     local_exposure_position_selected = Signal(int, int)  # 局部曝光位置选择信号
+    first_painted = Signal()  # 首次绘制完成信号，用于统计启动到首次显示的时间
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -123,6 +128,20 @@ class ImageView(QGraphicsView):
         
         # 局部曝光模式
         self._local_exposure_mode = False
+        
+        # 性能叠加层，首次显示时创建
+        self._overlay_label = None
+        
+        # 是否已完成首次绘制
+        self._painted = False
+        
+        # 当前图像的金字塔和正在显示的层号
+        self._pyramid = None
+        self._display_level = 0
+        
+        # 几何变换预览：图像坐标下的变换矩阵和裁剪到输出画布的父图形项
+        self._preview_transform = None
+        self._preview_clip = None
     
     def set_image(self, image):
         """设置图像    
@@ -148,6 +167,8 @@ class ImageView(QGraphicsView):
             self._scene.clear() #清空场景
             self._image = None #清空图像
             self._pixmap_item = None #清空像素图
+            self._preview_transform = None
+            self._preview_clip = None
             self._scale_factor = 1.0 #缩放因子
             self._cache.clear()  # 清空缓存
             self.image_changed.emit() #发出图像改变信号
@@ -155,6 +176,10 @@ class ImageView(QGraphicsView):
         
         # 更新图像
         self._image = image
+        self._pyramid = None
+        self._display_level = 0
+        self._preview_transform = None
+        self._preview_clip = None
         
         # 清空场景并添加新图像
         self._scene.clear()
@@ -213,6 +238,7 @@ class ImageView(QGraphicsView):
         self.resetTransform()
         # 缩放图像）
         self.scale(self._scale_factor, self._scale_factor)
+        self._refresh_display_level()
     
     def wheelEvent(self, event):
         """鼠标滚轮事件处理
@@ -243,6 +269,7 @@ class ImageView(QGraphicsView):
                 # 应用新变换并缓存
                 self.scale(factor, factor)
                 self._cache.put(cache_key, self.transform())
+            self._refresh_display_level()
     
     def resizeEvent(self, event):
         """窗口大小改变事件处理
@@ -287,6 +314,17 @@ class ImageView(QGraphicsView):
             self.setDragMode(QGraphicsView.NoDrag)
         super().mouseReleaseEvent(event) #调用父类的事件处理方法
     
+    def paintEvent(self, event):
+        """绘制事件处理，首次绘制完成后发出first_painted信号
+        
+        Args:
+            event: 事件对象
+        """
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            self.first_painted.emit()
+    
     def get_image_region(self, rect):
         """获取图像区域
         从当前图像中提取指定区域的图像数据
@@ -352,6 +390,7 @@ class ImageView(QGraphicsView):
         """
         self.setTransform(transform)
         self._scale_factor = transform.m11()  # 使用水平缩放作为缩放因子
+        self._refresh_display_level()
     
     def _clear_unused_cache(self):
         """清理不再需要的缓存"""
@@ -362,36 +401,52 @@ class ImageView(QGraphicsView):
         # 建议垃圾回收
         gc.collect()
     
-    def clear_cache(self):
-        """清空缓存，用于主动释放内存"""
+    def cache_bytes(self):
+        """缓存中未在显示的QPixmap占用的字节数（显示中的图像与缓存共享像素数据，清空缓存不会释放）"""
+        displayed = self._pixmap_item.pixmap().cacheKey() if self._pixmap_item is not None else None
+        return sum(
+            value.width() * value.height() * value.depth() // 8
+            for value in self._cache.values()
+            if isinstance(value, QPixmap) and value.cacheKey() != displayed
+        )
+    
+    def clear_cache(self, bytes_needed=None):
+        """清空缓存，用于主动释放内存
+        
+        Returns:
+            int: 释放的字节数
+        """
+        freed = self.cache_bytes()
         self._cache.clear()
-        gc.collect()
+        return freed
 
-    def update_image(self, image):
+    def update_image(self, image, pyramid=None):
         """更新图像
         
         Args:
             image: OpenCV格式的图像
+            pyramid: 该图像的ImagePyramid，提供时缩小显示只上传金字塔中合适的一层
         """
         if image is None:
             return
         
         # 以线程安全的方式更新图像
         try:
-            # 将OpenCV图像转换为QImage
-            if len(image.shape) == 3:
-                height, width, channel = image.shape
-                bytes_per_line = 3 * width
-                qimage = QImage(image.data, width, height, bytes_per_line, QImage.Format_RGB888)
-            else:
-                height, width = image.shape
-                qimage = QImage(image.data, width, height, width, QImage.Format_Grayscale8)
+            self._pyramid = pyramid if pyramid is not None and pyramid.base is image else None
+            self._display_level = self._level_for_scale(self._display_scale(image))
+            display = self._pyramid.level(self._display_level) if self._display_level else image
             
-            # 转换为QPixmap
-            pixmap = QPixmap.fromImage(qimage)
+            # 将OpenCV图像（BGR顺序）包装为QImage，零拷贝
+            with profiler.phase('qimage') as phase:
+                qimage = numpy_to_qimage(display)
+                # 非连续数组需要先复制一份
+                phase['bytes'] = 0 if display.flags['C_CONTIGUOUS'] else display.nbytes
             
-            # 设置场景图像
-            self._set_pixmap(pixmap)
+            # 转换为QPixmap（在此处完成唯一一次像素上传）并设置场景图像
+            with profiler.phase('pixmap') as phase:
+                pixmap = QPixmap.fromImage(qimage)
+                self._set_pixmap(pixmap, (image.shape[1], image.shape[0]))
+                phase['bytes'] = pixmap.width() * pixmap.height() * pixmap.depth() // 8
             
             # 更新缓存
             self._cache_current_pixmap(pixmap)
@@ -405,28 +460,128 @@ class ImageView(QGraphicsView):
             print(f"更新图像失败: {e}")
             # 可以添加更多错误处理逻辑 
 
-    def _set_pixmap(self, pixmap):
+    def _set_pixmap(self, pixmap, size=None):
         """设置场景中的图像
         
         Args:
             pixmap: 图像数据，QPixmap对象
+            size: 原图的 (宽, 高)，pixmap为金字塔缩小层时用于把图像项放大回原图坐标
         """
         if pixmap is None or pixmap.isNull():
             return
         
-        # 清空现有场景
+        # 清空现有场景（同时取消几何变换预览）
+        self._preview_transform = None
+        self._preview_clip = None
         self._scene.clear()
         
         # 添加新的图像项
         self._pixmap_item = QGraphicsPixmapItem(pixmap)
         self._pixmap_item.setTransformationMode(Qt.SmoothTransformation)
         self._scene.addItem(self._pixmap_item)
+        self._scale_pixmap_item(size)
         
-        # 更新场景矩形
-        self._scene.setSceneRect(QRectF(pixmap.rect()))
+        # 更新场景矩形（始终为原图坐标，局部曝光等按场景坐标取点的功能不受显示层影响）
+        self._scene.setSceneRect(QRectF(0, 0, *size) if size else QRectF(pixmap.rect()))
         
         # 发出信号
         self.image_changed.emit()
+    
+    def _scale_pixmap_item(self, size):
+        """按原图大小缩放图像项，有几何变换预览时再叠加预览的变换"""
+        pixmap = self._pixmap_item.pixmap()
+        if size and (pixmap.width(), pixmap.height()) != tuple(size):
+            transform = QTransform.fromScale(size[0] / pixmap.width(), size[1] / pixmap.height())
+        else:
+            transform = QTransform()
+        if self._preview_transform is not None:
+            transform = transform * self._preview_transform
+        self._pixmap_item.setTransform(transform)
+    
+    def _image_size(self):
+        """当前图像在场景中的 (宽, 高)"""
+        if self._pyramid is not None:
+            height, width = self._pyramid.shape[:2]
+            return width, height
+        pixmap = self._pixmap_item.pixmap()
+        return pixmap.width(), pixmap.height()
+    
+    def set_preview_transform(self, matrix, size):
+        """以变换图像项的方式预览几何变换，不重新计算像素
+        
+        Args:
+            matrix: 2x3 仿射矩阵，与OpenCV相同，把输入像素坐标映射到输出像素坐标
+            size: 输出画布的 (宽, 高)，画布之外的部分被裁掉
+        """
+        if self._pixmap_item is None:
+            return
+        # OpenCV以像素中心为整数坐标，场景中像素中心在 +0.5 处
+        (a, b, tx), (c, d, ty) = matrix
+        tx += 0.5 - 0.5 * (a + b)
+        ty += 0.5 - 0.5 * (c + d)
+        self._preview_transform = QTransform(a, c, b, d, tx, ty)
+        
+        # 图像项放入与输出画布等大、裁剪子项的父图形项中
+        rect = QRectF(0, 0, *size)
+        if self._preview_clip is None:
+            self._preview_clip = QGraphicsRectItem()
+            self._preview_clip.setPen(Qt.NoPen)
+            self._preview_clip.setFlag(QGraphicsItem.ItemClipsChildrenToShape)
+            self._scene.addItem(self._preview_clip)
+            self._pixmap_item.setParentItem(self._preview_clip)
+        self._preview_clip.setRect(rect)
+        self._scale_pixmap_item(self._image_size())
+        self._scene.setSceneRect(rect)
+    
+    def clear_preview_transform(self):
+        """取消几何变换预览，恢复显示原图"""
+        if self._preview_transform is None:
+            return
+        self._preview_transform = None
+        if self._pixmap_item is not None and self._preview_clip is not None:
+            size = self._image_size()
+            self._pixmap_item.setParentItem(None)
+            self._scene.removeItem(self._preview_clip)
+            self._scale_pixmap_item(size)
+            self._scene.setSceneRect(QRectF(0, 0, *size))
+        self._preview_clip = None
+    
+    def has_preview_transform(self):
+        """是否正在预览几何变换"""
+        return self._preview_transform is not None
+    
+    def _display_scale(self, image):
+        """图像将以多大的比例显示：首次显示时为适应视图的比例，之后为当前缩放比例"""
+        if getattr(self, '_first_image', True) or self._pixmap_item is None:
+            view_rect = self.viewport().rect()
+            height, width = image.shape[:2]
+            return min(view_rect.width() / width, view_rect.height() / height)
+        return self.transform().m11()
+    
+    def _level_for_scale(self, scale):
+        if self._pyramid is None:
+            return 0
+        return self._pyramid.index_for_scale(scale)
+    
+    def _refresh_display_level(self):
+        """缩放比例变化后，必要时换成金字塔中更合适的一层显示"""
+        if self._pyramid is None or self._pixmap_item is None:
+            return
+        level = self._level_for_scale(self.transform().m11())
+        if level == self._display_level:
+            return
+        
+        cache_key = f"level_{id(self._pyramid)}_{self._pyramid.version}_{level}"
+        pixmap = self._cache.get(cache_key)
+        if pixmap is None:
+            with profiler.phase('pixmap') as phase:
+                pixmap = QPixmap.fromImage(numpy_to_qimage(self._pyramid.level(level)))
+                phase['bytes'] = pixmap.width() * pixmap.height() * pixmap.depth() // 8
+            self._cache.put(cache_key, pixmap)
+        self._display_level = level
+        self._pixmap_item.setPixmap(pixmap)
+        height, width = self._pyramid.shape[:2]
+        self._scale_pixmap_item((width, height))
 
     def _cache_current_pixmap(self, pixmap):
         """缓存当前图像
@@ -455,6 +610,33 @@ class ImageView(QGraphicsView):
         # 居中
         self.centerOn(self._scene.sceneRect().center())
 
+    def set_overlay_text(self, text):
+        """在视图左上角显示半透明的状态叠加层
+        
+        叠加层是视口的子控件，不随图像缩放和平移，也不拦截鼠标事件。
+        
+        Args:
+            text: 显示的文本，为空时隐藏叠加层
+        """
+        if not text:
+            if self._overlay_label is not None:
+                self._overlay_label.hide()
+            return
+        
+        if self._overlay_label is None:
+            self._overlay_label = QLabel(self.viewport())
+            self._overlay_label.setObjectName("profilerOverlay")
+            self._overlay_label.setAttribute(Qt.WA_TransparentForMouseEvents)
+            self._overlay_label.setStyleSheet(
+                "QLabel#profilerOverlay { background-color: rgba(0, 0, 0, 160); color: white;"
+                " font-family: monospace; padding: 6px; border-radius: 4px; }"
+            )
+            self._overlay_label.move(8, 8)
+        self._overlay_label.setText(text)
+        self._overlay_label.adjustSize()
+        self._overlay_label.show()
+        self._overlay_label.raise_()
+    
     def set_local_exposure_mode(self, enabled):
         """设置局部曝光模式
         
@@ -3,14 +3,11 @@ from PySide6.QtWidgets import QWidget, QVBoxLayout, QTabWidget, QLabel, QScrollA
                               QSlider, QSpinBox, QDoubleSpinBox, QHBoxLayout # 新增导入
 from PySide6.QtCore import Signal, Qt # 新增导入
 
+from app.config import config
 from .adjustment_section_widget import AdjustmentSectionWidget 
 # 假设旧的 BrightnessContrastPanel 的核心逻辑被移到一个新类或方法中
 from .tone_adjustment_section import ToneAdjustmentSection
-from .filter_sections import BlurSection, SharpenSection
-from .transform_sections import GeometrySection # 假设您创建了 transform_sections.py
-from .analysis_sections import HistogramSection
-from .auto_process_sections import (OneClickOptimizeSection, AutoContrastSection, 
-                                   AutoColorSection, AutoWhiteBalanceSection)
+# 其余选项卡的处理部分在首次切换到该选项卡时才导入（见 InspectorPanel._build_*_tab）
 
 # --- 创建具体的调整部分 ---
 class BrightnessContrastSection(AdjustmentSectionWidget):
@@ -128,17 +125,25 @@ class BrightnessContrastSection(AdjustmentSectionWidget):
 
 
 class InspectorPanel(QWidget):
+    """检查器面板
+
+    只有默认显示的"主要调整"选项卡在启动时创建；其余选项卡在首次切换到时才导入对应模块并创建控件
+    （performance.lazy_loading 为False时全部在启动时创建）。
+    """
     # 主信号，由 MainWindow 连接
     process_requested = Signal(str, dict)
     preview_requested = Signal(str, dict)
     cancel_preview_requested = Signal() # 这个可能不再由各子面板发出，而是InspectorPanel或MainWindow管理
     histogram_requested = Signal(dict) # 新增
     local_exposure_selected = Signal(bool) # 新增
+    tab_built = Signal(int) # 延迟创建的选项卡创建完成时发出，参数为选项卡索引
     # ... 其他需要的信号 ...
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setObjectName("inspectorPanel")
+        self._pending_tabs = {}  # 尚未创建的选项卡：索引 -> 创建函数
+        self._image_size = None  # 最近一次图像尺寸 (宽, 高)，供延迟创建的面板初始化
         self._init_ui()
 
     def _init_ui(self):
@@ -151,180 +156,193 @@ class InspectorPanel(QWidget):
         self.tab_widget.setToolTip("选择不同的图像处理类别。支持快捷键切换：Alt+1-5")
 
         # --- 调整选项卡 ---
-        adjustments_tab_scroll_area = QScrollArea() # 使内容可滚动
-        adjustments_tab_scroll_area.setWidgetResizable(True)
-        adjustments_tab_scroll_area.setObjectName("adjustmentsScrollArea")
-        adjustments_tab_scroll_area.setToolTip("主要图像调整工具：亮度、对比度、曝光、高光、阴影等")
+        adjustments_tab_scroll_area = self._create_scroll_page(
+            "adjustmentsScrollArea", "主要图像调整工具：亮度、对比度、曝光、高光、阴影等")
+        self._add_tab(adjustments_tab_scroll_area, "主要调整", self._build_adjustments_tab)
+
+        # --- 滤镜选项卡 ---
+        filters_tab_content = QWidget()
+        QVBoxLayout(filters_tab_content).setContentsMargins(0, 0, 0, 0)
+        filters_tab_content.setToolTip("图像效果滤镜：模糊、锐化、去噪等后期处理效果")
+        self._add_tab(filters_tab_content, "效果滤镜", self._build_filters_tab)
+
+        # --- 变换与裁剪选项卡 ---
+        transform_scroll_area = self._create_scroll_page(
+            "transformScrollArea", "几何变换工具：旋转、翻转、裁剪图像。支持精确的数值输入")
+        self._add_tab(transform_scroll_area, "变换与裁剪", self._build_transform_tab)
+
+        # --- 图像分析选项卡 ---
+        analysis_scroll_area = self._create_scroll_page(
+            "analysisScrollArea", "图像分析工具：直方图显示、通道分析、统计信息等")
+        self._add_tab(analysis_scroll_area, "图像分析", self._build_analysis_tab)
+
+        # --- 自动处理选项卡 ---
+        auto_process_scroll_area = self._create_scroll_page(
+            "autoProcessScrollArea", "智能自动处理工具：一键优化、自动对比度、色彩校正、白平衡等")
+        self._add_tab(auto_process_scroll_area, "自动处理", self._build_auto_process_tab)
 
-        adjustments_tab_content_widget = QWidget() # QScrollArea 需要一个 QWidget 作为其子控件
-        adjustments_tab_layout = QVBoxLayout(adjustments_tab_content_widget)
-        adjustments_tab_layout.setContentsMargins(8, 8, 8, 8)
-        adjustments_tab_layout.setSpacing(10) # 各个 Section 之间的间距
+        main_layout.addWidget(self.tab_widget)
 
-        # 移除旧的 brightness_contrast_section
-        # self.brightness_contrast_section = BrightnessContrastSection()
-        # adjustments_tab_layout.addWidget(self.brightness_contrast_section)
+        # 创建当前选项卡，其余在首次切换到时创建
+        self.tab_widget.currentChanged.connect(self.ensure_tab_built)
+        if config.get('performance.lazy_loading', True):
+            self.ensure_tab_built(self.tab_widget.currentIndex())
+        else:
+            for index in range(self.tab_widget.count()):
+                self.ensure_tab_built(index)
+
+    def _create_scroll_page(self, object_name, tooltip):
+        """创建可滚动的选项卡页面，内容在选项卡创建时设置"""
+        scroll_area = QScrollArea() # 使内容可滚动
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setObjectName(object_name)
+        scroll_area.setToolTip(tooltip)
+        return scroll_area
+
+    def _add_tab(self, page, title, builder):
+        index = self.tab_widget.addTab(page, title)
+        self._pending_tabs[index] = builder
+
+    def _create_tab_content(self):
+        """创建选项卡内容控件及其布局"""
+        content_widget = QWidget() # QScrollArea 需要一个 QWidget 作为其子控件
+        layout = QVBoxLayout(content_widget)
+        layout.setContentsMargins(8, 8, 8, 8)
+        layout.setSpacing(10) # 各个 Section 之间的间距
+        return content_widget, layout
+
+    def is_tab_built(self, index):
+        """选项卡是否已创建"""
+        return 0 <= index < self.tab_widget.count() and index not in self._pending_tabs
+
+    def ensure_tab_built(self, index):
+        """确保指定选项卡已创建，未创建时导入对应模块并创建控件
+
+        Args:
+            index: 选项卡索引
+        """
+        builder = self._pending_tabs.pop(index, None)
+        if builder is None:
+            return
+        content_widget = builder()
+        page = self.tab_widget.widget(index)
+        if isinstance(page, QScrollArea):
+            page.setWidget(content_widget)
+        else:
+            page.layout().addWidget(content_widget)
+        self.tab_built.emit(index)
+
+    def _connect_section(self, section):
+        """将处理部分的预览和应用信号转发到面板信号"""
+        section.preview_requested.connect(self.preview_requested)
+        section.apply_requested.connect(self.process_requested)
+
+    def _build_adjustments_tab(self):
+        content_widget, adjustments_tab_layout = self._create_tab_content()
 
         # 添加新的 ToneAdjustmentSection
         self.tone_adjustment_section = ToneAdjustmentSection()
         self.tone_adjustment_section.setToolTip("调整图像的色调：亮度、对比度、曝光、高光和阴影。拖动滑块时实时预览，释放时应用")
         adjustments_tab_layout.addWidget(self.tone_adjustment_section)
-
-        # 在这里添加其他调整部分，例如 ExposureSection, ColorSection 等
-        # dummy_exposure_section = AdjustmentSectionWidget("曝光")
-        # dummy_exposure_section.add_widget(QLabel("曝光控件..."))
-        # adjustments_tab_layout.addWidget(dummy_exposure_section)
+        self._connect_section(self.tone_adjustment_section)
 
         adjustments_tab_layout.addStretch() # 将所有内容推到顶部
-        adjustments_tab_scroll_area.setWidget(adjustments_tab_content_widget)
-        self.tab_widget.addTab(adjustments_tab_scroll_area, "主要调整")
+        return content_widget
 
+    def _build_filters_tab(self):
+        from .filter_sections import BlurSection, SharpenSection, DenoiseSection
 
-        # --- 滤镜选项卡 ---
         filters_tab_content = QWidget()
         filters_layout = QVBoxLayout(filters_tab_content)
-        # ... (添加滤镜相关的 AdjustmentSectionWidget 实例) ...
-        # self.dummy_blur_section = AdjustmentSectionWidget("模糊") # Remove this
-        # filters_layout.addWidget(self.dummy_blur_section) # Remove this
 
         self.blur_section = BlurSection()
         self.blur_section.setToolTip("应用各种模糊效果：高斯模糊、中值滤波、双边滤波。数值越大效果越强")
         filters_layout.addWidget(self.blur_section)
+        self._connect_section(self.blur_section)
 
         self.sharpen_section = SharpenSection()
         self.sharpen_section.setToolTip("锐化图像细节：拉普拉斯锐化、USM锐化。适度使用，过度锐化会产生噪点")
         filters_layout.addWidget(self.sharpen_section)
+        self._connect_section(self.sharpen_section)
+
+        self.denoise_section = DenoiseSection()
+        self.denoise_section.setToolTip("去噪处理：傅里叶低通、非局部均值、小波。傅里叶半径越小、非局部均值强度或小波阈值越大，去噪越强，图像也越平滑")
+        filters_layout.addWidget(self.denoise_section)
+        self._connect_section(self.denoise_section)
 
         filters_layout.addStretch()
-        filters_tab_content.setToolTip("图像效果滤镜：模糊、锐化等后期处理效果")
-        self.tab_widget.addTab(filters_tab_content, "效果滤镜")
+        return filters_tab_content
+
+    def _build_transform_tab(self):
+        from .transform_sections import GeometrySection
+
+        content_widget, transform_layout = self._create_tab_content()
 
-        # --- 变换与裁剪选项卡 ---
-        transform_scroll_area = QScrollArea()
-        transform_scroll_area.setWidgetResizable(True)
-        transform_scroll_area.setObjectName("transformScrollArea")
-        transform_scroll_area.setToolTip("几何变换工具：旋转、翻转、裁剪图像。支持精确的数值输入")
-
-        transform_tab_content_widget = QWidget()
-        transform_layout = QVBoxLayout(transform_tab_content_widget)
-        transform_layout.setContentsMargins(8,8,8,8)
-        transform_layout.setSpacing(10)
-        
         self.geometry_section = GeometrySection() # 实例化
         self.geometry_section.setToolTip("旋转角度：-180°至180°，勾选'扩展'避免裁剪。翻转：水平/垂直。裁剪：输入精确坐标和尺寸")
         transform_layout.addWidget(self.geometry_section)
-        
+        self._connect_section(self.geometry_section)
+        if self._image_size is not None:
+            self.geometry_section.update_image_info(*self._image_size)
+
         transform_layout.addStretch()
-        transform_scroll_area.setWidget(transform_tab_content_widget)
-        self.tab_widget.addTab(transform_scroll_area, "变换与裁剪") # 添加选项卡
+        return content_widget
+
+    def _build_analysis_tab(self):
+        from .analysis_sections import HistogramSection
+
+        content_widget, analysis_layout = self._create_tab_content()
 
-        # --- 图像分析选项卡 ---
-        analysis_scroll_area = QScrollArea()
-        analysis_scroll_area.setWidgetResizable(True)
-        analysis_scroll_area.setObjectName("analysisScrollArea")
-        analysis_scroll_area.setToolTip("图像分析工具：直方图显示、通道分析、统计信息等")
-
-        analysis_tab_content_widget = QWidget()
-        analysis_layout = QVBoxLayout(analysis_tab_content_widget)
-        analysis_layout.setContentsMargins(8, 8, 8, 8)
-        analysis_layout.setSpacing(10)
-        
         self.histogram_section = HistogramSection()
         self.histogram_section.setToolTip("显示图像的直方图分布。可以选择查看全部通道或单独的红、绿、蓝通道，支持直方图均衡化")
         analysis_layout.addWidget(self.histogram_section)
-        
+        self._connect_section(self.histogram_section)
+        self.histogram_section.histogram_requested.connect(self.histogram_requested)
+
         analysis_layout.addStretch()
-        analysis_scroll_area.setWidget(analysis_tab_content_widget)
-        self.tab_widget.addTab(analysis_scroll_area, "图像分析")
 
-        # --- 自动处理选项卡 ---
-        auto_process_scroll_area = QScrollArea()
-        auto_process_scroll_area.setWidgetResizable(True)
-        auto_process_scroll_area.setObjectName("autoProcessScrollArea")
-        auto_process_scroll_area.setToolTip("智能自动处理工具：一键优化、自动对比度、色彩校正、白平衡等")
-
-        auto_process_tab_content_widget = QWidget()
-        auto_process_layout = QVBoxLayout(auto_process_tab_content_widget)
-        auto_process_layout.setContentsMargins(8, 8, 8, 8)
-        auto_process_layout.setSpacing(10)
-        
+        # 面板创建前图像变化时没有计算直方图，创建后补一次
+        if self._image_size is not None:
+            self.histogram_requested.emit({'channel': self.histogram_section.channel_combo.currentData()})
+        return content_widget
+
+    def _build_auto_process_tab(self):
+        from .auto_process_sections import (OneClickOptimizeSection, AutoContrastSection,
+                                           AutoColorSection, AutoWhiteBalanceSection)
+
+        content_widget, auto_process_layout = self._create_tab_content()
+
         # 添加各种自动处理功能
         self.one_click_optimize_section = OneClickOptimizeSection()
         self.one_click_optimize_section.setToolTip("一键智能优化图像：自动调整对比度、色彩和白平衡。适合快速处理大部分图像")
         auto_process_layout.addWidget(self.one_click_optimize_section)
-        
+
         self.auto_contrast_section = AutoContrastSection()
         self.auto_contrast_section.setToolTip("自动对比度增强：使用CLAHE算法提升图像细节，调整限制值避免过度增强")
         auto_process_layout.addWidget(self.auto_contrast_section)
-        
+
         self.auto_color_section = AutoColorSection()
         self.auto_color_section.setToolTip("自动色彩校正：增强图像的饱和度和鲜艳度，让色彩更加生动")
         auto_process_layout.addWidget(self.auto_color_section)
-        
+
         self.auto_white_balance_section = AutoWhiteBalanceSection()
         self.auto_white_balance_section.setToolTip("自动白平衡调整：校正图像色温，消除偏色。支持灰度世界、完美反射和自适应算法")
         auto_process_layout.addWidget(self.auto_white_balance_section)
-        
+
+        for section in (self.one_click_optimize_section, self.auto_contrast_section,
+                        self.auto_color_section, self.auto_white_balance_section):
+            self._connect_section(section)
+
         auto_process_layout.addStretch()
-        auto_process_scroll_area.setWidget(auto_process_tab_content_widget)
-        self.tab_widget.addTab(auto_process_scroll_area, "自动处理")
+        return content_widget
 
-        # 添加主布局和连接信号（在所有Section创建完成后）
-        main_layout.addWidget(self.tab_widget)
-        self._connect_signals()
-
-    def _connect_signals(self):
-        # 移除旧的 brightness_contrast_section 信号连接
-        # self.brightness_contrast_section.preview_requested.connect(...)
-        # self.brightness_contrast_section.apply_requested.connect(...)
-
-        # 连接新的 tone_adjustment_section 的信号
-        self.tone_adjustment_section.preview_requested.connect(self.preview_requested)
-        self.tone_adjustment_section.apply_requested.connect(self.process_requested)
-        # 如果 ToneAdjustmentSection 内部也处理局部曝光的激活，则连接相应信号
-        # if hasattr(self.tone_adjustment_section, 'local_exposure_mode_toggled'):
-        #     self.tone_adjustment_section.local_exposure_mode_toggled.connect(self.local_exposure_selected)
-        # if hasattr(self.tone_adjustment_section, 'cancel_preview'):
-        #     self.tone_adjustment_section.cancel_preview.connect(self.cancel_preview_requested)
-
-        if hasattr(self, 'blur_section'):
-            self.blur_section.preview_requested.connect(self.preview_requested)
-            self.blur_section.apply_requested.connect(self.process_requested)
-
-        if hasattr(self, 'sharpen_section'):
-            self.sharpen_section.preview_requested.connect(self.preview_requested)
-            self.sharpen_section.apply_requested.connect(self.process_requested)
-    
+    # 供 MainWindow 调用的方法
+    def update_image_info(self, width, height):
+        """记录当前图像尺寸，已创建变换面板时同步更新"""
+        self._image_size = (width, height)
         if hasattr(self, 'geometry_section'):
-            self.geometry_section.apply_requested.connect(self.process_requested)
-            self.geometry_section.preview_requested.connect(self.preview_requested)
-            # 如果 GeometrySection 有 cancel_preview_requested, 也在这里连接
-            # if hasattr(self.geometry_section, 'cancel_preview_requested'):
-            # self.geometry_section.cancel_preview_requested.connect(self.cancel_preview_requested)
-        
-        if hasattr(self, 'histogram_section'):
-            self.histogram_section.apply_requested.connect(self.process_requested)
-            self.histogram_section.preview_requested.connect(self.preview_requested)
-            self.histogram_section.histogram_requested.connect(self.histogram_requested)
-        
-        # 连接自动处理模块的信号
-        if hasattr(self, 'one_click_optimize_section'):
-            self.one_click_optimize_section.apply_requested.connect(self.process_requested)
-            self.one_click_optimize_section.preview_requested.connect(self.preview_requested)
-        
-        if hasattr(self, 'auto_contrast_section'):
-            self.auto_contrast_section.apply_requested.connect(self.process_requested)
-            self.auto_contrast_section.preview_requested.connect(self.preview_requested)
-        
-        if hasattr(self, 'auto_color_section'):
-            self.auto_color_section.apply_requested.connect(self.process_requested)
-            self.auto_color_section.preview_requested.connect(self.preview_requested)
-        
-        if hasattr(self, 'auto_white_balance_section'):
-            self.auto_white_balance_section.apply_requested.connect(self.process_requested)
-            self.auto_white_balance_section.preview_requested.connect(self.preview_requested)
+            self.geometry_section.update_image_info(width, height)
 
-    # 供 MainWindow 调用的方法
     def update_histogram(self, hist_data):
         print(f"InspectorPanel: 更新直方图数据")
         if hasattr(self, 'histogram_section'):